@@ -0,0 +1,281 @@
+"""Offline benchmarks of the stages that turn WSDOT Traffic API responses
+into features.
+
+Each endpoint in wsdottraffic.resturls.URLS has a recorded response in the
+fixtures directory. The records of a response are repeated to make a
+payload of the requested size, and each stage is timed separately:
+
+decode
+    bytes to JSON objects (json.loads without an object hook).
+parse
+    parse_traveler_info_object, applied to the decoded objects the way the
+    json module's object_hook applies it (innermost objects first).
+fields
+    FieldInfo.from_features.
+geojson
+    dict_list_to_geojson.
+encode
+    json.dumps with CustomEncoder.
+
+Scanweb responses are decoded with scanweb_json_hook and encoded with
+ScanwebJsonEncoder instead.
+
+Results are reported as records per second (of the best of several runs)
+and as the peak memory allocated by a stage, measured with tracemalloc in a
+separate run so the tracing doesn't slow down the timed runs.
+
+Synthetic responses (see wsdottraffic.synthetic) can be benchmarked instead
+of the recorded ones, to see how the stages scale to much larger responses.
+
+Run with ``python -m benchmarks`` (see __main__.py).
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import io
+import json
+import os
+import timeit
+import tracemalloc
+from collections import OrderedDict, namedtuple
+
+from wsdottraffic.fielddetection import FieldInfo
+from wsdottraffic.jsonhelpers import (CustomEncoder, dict_list_to_geojson,
+                                      parse_traveler_info_object)
+from wsdottraffic.resturls import URLS
+from wsdottraffic.scanweb import ScanwebJsonEncoder, scanweb_json_hook
+from wsdottraffic.synthetic import generate_payload
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+FIXTURES_DIR = os.path.join(HERE, "fixtures")
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+SYNTHETIC_BASELINE_PATH = os.path.join(HERE, "baseline-synthetic.json")
+
+DEFAULT_SCALE = 100
+DEFAULT_SYNTHETIC_SCALE = 1
+SYNTHETIC_SEED = 0
+DEFAULT_REPEAT = 7
+# Fraction by which records/sec may drop, or peak memory may grow, before a
+# stage is reported as a regression.
+DEFAULT_THRESHOLD = 0.3
+
+TRAVELER_INFO_STAGES = ("decode", "parse", "fields", "geojson", "encode")
+SCANWEB_STAGES = ("decode", "hook", "encode")
+
+StageResult = namedtuple(
+    "StageResult", ("name", "stage", "records", "seconds", "peak_memory"))
+Regression = namedtuple(
+    "Regression", ("name", "stage", "measure", "baseline", "current"))
+
+
+def get_fixture_path(name):
+    """Returns the path of an endpoint's recorded response."""
+    return os.path.join(FIXTURES_DIR, "%s.json" % name)
+
+
+def load_fixture(name):
+    """Returns the recorded response of an endpoint as bytes."""
+    with io.open(get_fixture_path(name), "rb") as fixture_file:
+        return fixture_file.read()
+
+
+def record_fixture(name, access_code=None):
+    """Replaces the recorded response of an endpoint with the current
+    response of the API.
+    """
+    if name == "Scanweb":
+        from wsdottraffic.scanweb import get_scanweb_json
+        payload = get_scanweb_json(access_code).encode("utf-8")
+    else:
+        from wsdottraffic import get_traveler_info_json
+        payload = get_traveler_info_json(name, access_code)
+    with io.open(get_fixture_path(name), "wb") as fixture_file:
+        fixture_file.write(payload)
+
+
+def scale_payload(payload, scale):
+    """Repeats the records of a response to make a response with scale times
+    as many records. Returns the new response and its number of records.
+    """
+    records = json.loads(payload.decode("utf-8"))
+    records = records * scale
+    return json.dumps(records).encode("utf-8"), len(records)
+
+
+def apply_object_hook(value, object_hook):
+    """Calls object_hook on each dict in decoded JSON, innermost first, as
+    json.loads does, and returns the result.
+    """
+    if isinstance(value, list):
+        return [apply_object_hook(item, object_hook) for item in value]
+    if isinstance(value, dict):
+        return object_hook(dict(
+            (key, apply_object_hook(item, object_hook))
+            for key, item in value.items()))
+    return value
+
+
+def get_stages(name, payload):
+    """Returns an OrderedDict of the stages of an endpoint, keyed by stage
+    name. Each stage is a function with no arguments. The input of each stage
+    is computed here, so the stages can be timed independently.
+    """
+    decoded = json.loads(payload.decode("utf-8"))
+    stages = OrderedDict()
+    stages["decode"] = lambda: json.loads(payload.decode("utf-8"))
+    if name == "Scanweb":
+        readings = apply_object_hook(decoded, scanweb_json_hook)
+        stages["hook"] = lambda: apply_object_hook(decoded,
+                                                   scanweb_json_hook)
+        stages["encode"] = lambda: json.dumps(readings,
+                                              cls=ScanwebJsonEncoder)
+        return stages
+    parsed = apply_object_hook(decoded, parse_traveler_info_object)
+    geojson = dict_list_to_geojson(parsed)
+    stages["parse"] = lambda: apply_object_hook(decoded,
+                                                parse_traveler_info_object)
+    stages["fields"] = lambda: FieldInfo.from_features(parsed)
+    stages["geojson"] = lambda: dict_list_to_geojson(parsed)
+    stages["encode"] = lambda: json.dumps(geojson, cls=CustomEncoder)
+    return stages
+
+
+def measure_peak_memory(func):
+    """Returns the peak number of bytes allocated while func runs."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(name, scale=DEFAULT_SCALE, repeat=DEFAULT_REPEAT,
+                  synthetic=False):
+    """Benchmarks the stages of an endpoint's recorded response.
+
+    Parameters
+    ----------
+    name : str
+        A key of URLS.
+    scale : int, optional
+        Number of times the recorded records are repeated. For synthetic
+        responses, the size of the response as a multiple of the size of the
+        live API's response (see synthetic.TYPICAL_COUNTS).
+    repeat : int, optional
+        Number of timed runs of each stage. The fastest run is reported.
+    synthetic : bool, optional
+        Benchmark a synthetic response instead of the recorded one.
+
+    Returns
+    -------
+    list of StageResult
+    """
+    if synthetic:
+        payload = generate_payload(name, scale=scale, seed=SYNTHETIC_SEED)
+        record_count = len(json.loads(payload.decode("utf-8")))
+    else:
+        payload, record_count = scale_payload(load_fixture(name), scale)
+    results = []
+    for stage, func in get_stages(name, payload).items():
+        seconds = min(timeit.repeat(func, number=1, repeat=repeat))
+        results.append(StageResult(name, stage, record_count, seconds,
+                                   measure_peak_memory(func)))
+    return results
+
+
+def run_benchmarks(names=None, scale=DEFAULT_SCALE, repeat=DEFAULT_REPEAT,
+                   synthetic=False):
+    """Benchmarks the stages of each of the named endpoints (all of them by
+    default). Returns a list of StageResults.
+    """
+    results = []
+    for name in names or sorted(URLS):
+        results.extend(run_benchmark(name, scale, repeat, synthetic))
+    return results
+
+
+def get_rate(result):
+    """Returns the records per second of a StageResult."""
+    return result.records / result.seconds if result.seconds else float("inf")
+
+
+def to_baseline(results, scale=DEFAULT_SCALE):
+    """Converts StageResults to a dict that can be saved as the baseline."""
+    stages = {}
+    for result in results:
+        stages.setdefault(result.name, {})[result.stage] = {
+            "records_per_second": round(get_rate(result), 1),
+            "peak_memory": result.peak_memory,
+        }
+    return {"scale": scale, "stages": stages}
+
+
+def save_baseline(results, scale=DEFAULT_SCALE, path=BASELINE_PATH):
+    """Writes StageResults to the baseline file."""
+    with io.open(path, "w", encoding="utf-8") as baseline_file:
+        baseline_file.write(json.dumps(to_baseline(results, scale), indent=2,
+                                       sort_keys=True))
+        baseline_file.write("\n")
+
+
+def load_baseline(path=BASELINE_PATH):
+    """Reads the baseline file. Returns None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    with io.open(path, encoding="utf-8") as baseline_file:
+        return json.load(baseline_file)
+
+
+def find_regressions(results, baseline, scale=DEFAULT_SCALE,
+                     threshold=DEFAULT_THRESHOLD):
+    """Compares StageResults to a baseline.
+
+    A stage has regressed if its records/sec dropped, or its peak memory
+    grew, by more than threshold (a fraction of the baseline value). Peak
+    memory depends on the size of the payload, so it is only compared if
+    the baseline was run at the same scale. Stages missing from the baseline
+    are ignored.
+
+    Returns
+    -------
+    list of Regression
+    """
+    regressions = []
+    stages = baseline.get("stages", {})
+    compare_memory = baseline.get("scale") == scale
+    for result in results:
+        expected = stages.get(result.name, {}).get(result.stage)
+        if not expected:
+            continue
+        rate = get_rate(result)
+        if rate < expected["records_per_second"] * (1 - threshold):
+            regressions.append(Regression(
+                result.name, result.stage, "records_per_second",
+                expected["records_per_second"], rate))
+        if (compare_memory and
+                result.peak_memory > expected["peak_memory"] * (1 + threshold)):
+            regressions.append(Regression(
+                result.name, result.stage, "peak_memory",
+                expected["peak_memory"], result.peak_memory))
+    return regressions
+
+
+def format_results(results, baseline=None):
+    """Formats StageResults as a table. If a baseline is given, the change in
+    records/sec from the baseline is included.
+    """
+    stages = (baseline or {}).get("stages", {})
+    lines = ["%-24s %-8s %9s %14s %12s %8s" % (
+        "Endpoint", "Stage", "Records", "Records/sec", "Peak KiB", "Change")]
+    for result in results:
+        rate = get_rate(result)
+        change = ""
+        expected = stages.get(result.name, {}).get(result.stage)
+        if expected and expected["records_per_second"]:
+            change = "%+.0f%%" % (
+                (rate / expected["records_per_second"] - 1) * 100)
+        lines.append("%-24s %-8s %9d %14.0f %12.1f %8s" % (
+            result.name, result.stage, result.records, rate,
+            result.peak_memory / 1024, change))
+    return "\n".join(lines)
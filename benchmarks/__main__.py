@@ -0,0 +1,85 @@
+"""Runs the benchmarks and reports regressions against the stored baseline.
+
+    python -m benchmarks [--scale N] [--repeat N] [--synthetic]
+        [--save-baseline] [names]
+
+Exits with status 1 if any stage regressed.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import os
+import sys
+
+from wsdottraffic import ENVIRONMENT_VAR_NAME
+from wsdottraffic.resturls import URLS
+
+from . import (BASELINE_PATH, DEFAULT_REPEAT, DEFAULT_SCALE,
+               DEFAULT_SYNTHETIC_SCALE, DEFAULT_THRESHOLD,
+               SYNTHETIC_BASELINE_PATH, find_regressions, format_results,
+               load_baseline, record_fixture, run_benchmarks, save_baseline)
+
+
+def main():
+    """Uses this when run as a script
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the parsing, field detection, GeoJSON conversion and encoding of recorded WSDOT Traffic API responses.")
+    parser.add_argument("--scale", type=int, help="Number of times the records of each recorded response are repeated. Defaults to %d. With --synthetic, the size of each response as a multiple of the live API's response. Defaults to %d." % (DEFAULT_SCALE, DEFAULT_SYNTHETIC_SCALE))
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Number of timed runs of each stage. The fastest is reported. Defaults to %d." % DEFAULT_REPEAT)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Fraction by which records/sec may drop, or peak memory may grow, before a stage counts as a regression. Defaults to %s." % DEFAULT_THRESHOLD)
+    parser.add_argument("--synthetic", action="store_true", help="Benchmark synthetic responses (see wsdottraffic.synthetic) instead of the recorded responses.")
+    parser.add_argument("--baseline", help="Path of the baseline file. Defaults to %s, or to %s with --synthetic." % (BASELINE_PATH, SYNTHETIC_BASELINE_PATH))
+    parser.add_argument("--save-baseline", action="store_true", help="Replace the baseline with the results of this run.")
+    parser.add_argument("--record", action="store_true", help="Replace the recorded responses with the current responses of the API before running.")
+    parser.add_argument("--code", "-c", default=os.environ.get(ENVIRONMENT_VAR_NAME), help="WSDOT Traffic API code, used by --record. Defaults to the value of the %s environment variable." % ENVIRONMENT_VAR_NAME)
+    parser.add_argument("names", nargs="*", help="Endpoints to benchmark: one or more of %s. Defaults to all of them." % ", ".join(sorted(URLS)))
+    args = parser.parse_args()
+
+    unknown_names = set(args.names) - set(URLS)
+    if unknown_names:
+        parser.error("Unknown endpoints: %s" % ", ".join(sorted(unknown_names)))
+    names = args.names or sorted(URLS)
+    if args.scale is None:
+        args.scale = (DEFAULT_SYNTHETIC_SCALE if args.synthetic
+                      else DEFAULT_SCALE)
+    if args.baseline is None:
+        args.baseline = (SYNTHETIC_BASELINE_PATH if args.synthetic
+                         else BASELINE_PATH)
+    if args.record:
+        if not args.code:
+            parser.error("--record requires --code or the %s environment "
+                         "variable." % ENVIRONMENT_VAR_NAME)
+        for name in names:
+            print("Recording %s..." % name)
+            record_fixture(name, args.code)
+
+    results = run_benchmarks(names, args.scale, args.repeat, args.synthetic)
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    print(format_results(results, baseline))
+
+    if args.save_baseline:
+        save_baseline(results, args.scale, args.baseline)
+        print("Saved the baseline to %s." % args.baseline)
+        return 0
+    if baseline is None:
+        print("There is no baseline at %s. Run with --save-baseline to create "
+              "one." % args.baseline)
+        return 0
+    if baseline.get("scale") != args.scale:
+        print("The baseline was run at scale %s, so peak memory was not "
+              "compared." % baseline.get("scale"))
+
+    regressions = find_regressions(results, baseline, args.scale,
+                                   args.threshold)
+    for regression in regressions:
+        print("REGRESSION: %s %s %s: %s (baseline %s)" % regression)
+    if regressions:
+        return 1
+    print("No regressions.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
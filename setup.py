@@ -35,13 +35,16 @@ setup(
         "Programming Language :: Python :: 3.7",
         "Topic :: Scientific/Engineering :: GIS"
     ],
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
     entry_points={
         'console_scripts': [
             'wsdottrafficgp = wsdottraffic.gp.__main__:main',
+            'wsdottraffictemplates = wsdottraffic.gp.templates:main',
             'wsdottraffic = wsdottraffic.__main__:main',
             'multipointtopoint = wsdottraffic.gp.multipointtopoint:main',
-            'zipgdb = wsdottraffic.gp.zipgdb:main'
+            'zipgdb = wsdottraffic.gp.zipgdb:main',
+            'wsdottrafficgpkg = wsdottraffic.geopackage:main',
+            'wsdottrafficexport = wsdottraffic.writers:main'
         ]
     },
     package_data={
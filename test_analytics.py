@@ -0,0 +1,117 @@
+"""Unit tests for wsdottraffic.analytics
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from wsdottraffic import analytics
+from wsdottraffic.flowarchive import MISSING_CODE, FlowArchive
+
+numpy = analytics.numpy
+
+
+def _travel_time_snapshots():
+    snapshots = []
+    for minute in range(6):
+        records = [
+            {"TravelTimeID": 2, "CurrentTime": 10, "AverageTime": 10},
+            {"TravelTimeID": 1, "CurrentTime": 20 + minute,
+             "AverageTime": 20},
+        ]
+        if minute == 5:
+            records[0]["CurrentTime"] = 40
+        if minute == 2:
+            # Unknown travel time.
+            records[1]["CurrentTime"] = 0
+        snapshots.append((datetime(2018, 1, 1, 8, minute), records))
+    return snapshots
+
+
+def _flow_snapshots():
+    return [
+        (datetime(2018, 1, 1, 8, 0), [
+            {"FlowDataID": 5, "FlowReadingValue": 1, "Region": "NW"},
+            {"FlowDataID": 6, "FlowReadingValue": 4, "Region": "NW"},
+            {"FlowDataID": 7, "FlowReadingValue": 1, "Region": "SW"}]),
+        (datetime(2018, 1, 1, 8, 1), [
+            {"FlowDataID": 5, "FlowReadingValue": 1, "Region": "NW"},
+            {"FlowDataID": 7, "FlowReadingValue": 2, "Region": "SW"}]),
+    ]
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestAnalytics(unittest.TestCase):
+    """Tests the analytics functions."""
+
+    def test_travel_times(self):
+        history = analytics.TravelTimeHistory.from_snapshots(
+            _travel_time_snapshots())
+        self.assertEqual(history.ids.tolist(), [1, 2])
+        self.assertEqual(history.current.shape, (6, 2))
+        self.assertTrue(numpy.isnan(history.current[2, 0]))
+        ratios = analytics.congestion_ratio(history.current, history.average)
+        self.assertAlmostEqual(ratios[1, 0], 1.05)
+        self.assertAlmostEqual(ratios[5, 1], 4.0)
+
+        means = analytics.rolling_mean(history.current, 3)
+        self.assertAlmostEqual(means[0, 0], 20)
+        # The unknown value is ignored.
+        self.assertAlmostEqual(means[3, 0], 22)
+        self.assertAlmostEqual(means[5, 0], 24)
+
+        stds = analytics.rolling_std(history.current, 2)
+        self.assertAlmostEqual(stds[1, 0], 0.5)
+        self.assertEqual(stds[4, 1], 0)
+
+        flags, scores = analytics.anomalies(history.current, 3, 3.0)
+        # 23 after 20 and 21.
+        self.assertEqual(numpy.argwhere(flags).tolist(), [[3, 0]])
+        self.assertAlmostEqual(scores[3, 0], 5.0)
+        self.assertAlmostEqual(scores[4, 0], 2.0)
+        # No variation in the preceding window.
+        self.assertTrue(numpy.isnan(scores[5, 1]))
+
+        medians = analytics.percentiles(history.current, 50)
+        self.assertEqual(medians.tolist(), [23, 10])
+        self.assertEqual(
+            analytics.percentiles(history.current, [0, 100]).tolist(),
+            [[20, 10], [25, 40]])
+
+    def test_flow_distribution(self):
+        history = analytics.FlowHistory.from_snapshots(_flow_snapshots())
+        self.assertEqual(history.codes.tolist(),
+                         [[1, 4, 1], [1, MISSING_CODE, 2]])
+        stations = dict((record["FlowDataID"], record)
+                        for record in _flow_snapshots()[0][1])
+        groups, index = analytics.group_ids(history.ids, stations)
+        self.assertEqual(groups, ["NW", "SW"])
+        counts = analytics.flow_distribution(history.codes, index,
+                                             len(groups))
+        self.assertEqual(counts.shape, (2, 2, 6))
+        self.assertEqual(counts[0, 0].tolist(), [0, 1, 0, 0, 1, 0])
+        self.assertEqual(counts[1, 0].tolist(), [0, 1, 0, 0, 0, 0])
+        self.assertEqual(counts[1, 1].tolist(), [0, 0, 1, 0, 0, 0])
+
+    def test_from_archive(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            archive = FlowArchive(os.path.join(temp_dir, "flow"))
+            for poll_time, records in _flow_snapshots():
+                archive.append(records, poll_time)
+            history = analytics.FlowHistory.from_archive(archive)
+            expected = analytics.FlowHistory.from_snapshots(
+                _flow_snapshots())
+            self.assertEqual(history.ids.tolist(), expected.ids.tolist())
+            self.assertEqual(history.codes.tolist(), expected.codes.tolist())
+            self.assertEqual(history.times.tolist(), expected.times.tolist())
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
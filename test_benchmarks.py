@@ -0,0 +1,56 @@
+"""Unit tests for the benchmarks package.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import unittest
+
+import benchmarks
+from wsdottraffic.resturls import URLS
+
+
+class BenchmarksTest(unittest.TestCase):
+    """Tests the benchmark runner and the regression check."""
+
+    def test_fixtures(self):
+        """Every endpoint has a recorded response."""
+        for name in URLS:
+            self.assertTrue(os.path.exists(benchmarks.get_fixture_path(name)),
+                            name)
+
+    def test_run_benchmarks(self):
+        results = benchmarks.run_benchmarks(scale=2, repeat=1)
+        stages = {}
+        for result in results:
+            stages.setdefault(result.name, []).append(result.stage)
+            self.assertGreater(result.records, 0)
+            self.assertGreater(result.peak_memory, 0)
+        self.assertEqual(set(stages), set(URLS))
+        self.assertEqual(tuple(stages["Scanweb"]), benchmarks.SCANWEB_STAGES)
+        self.assertEqual(tuple(stages["HighwayAlerts"]),
+                         benchmarks.TRAVELER_INFO_STAGES)
+
+    def test_find_regressions(self):
+        results = [
+            benchmarks.StageResult("TollRates", "parse", 100, 1.0, 1000),
+            benchmarks.StageResult("TollRates", "encode", 100, 1.0, 1000),
+            benchmarks.StageResult("Scanweb", "hook", 100, 1.0, 1000),
+        ]
+        baseline = benchmarks.to_baseline(results, scale=10)
+        baseline["stages"]["TollRates"]["parse"]["records_per_second"] = 200
+        baseline["stages"]["TollRates"]["encode"]["peak_memory"] = 500
+        del baseline["stages"]["Scanweb"]
+
+        regressions = benchmarks.find_regressions(results, baseline, 10, 0.25)
+        self.assertEqual(
+            [(regression.stage, regression.measure)
+             for regression in regressions],
+            [("parse", "records_per_second"), ("encode", "peak_memory")])
+        # Peak memory is only compared at the baseline's scale.
+        self.assertEqual(
+            len(benchmarks.find_regressions(results, baseline, 20, 0.25)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
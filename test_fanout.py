@@ -0,0 +1,128 @@
+"""Unit tests for wsdottraffic.fanout
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from wsdottraffic.fanout import (OutputWriterThread, write_outputs,
+                                 _field_serializer, FORMAT_COMPACT,
+                                 FORMAT_ROWS)
+from wsdottraffic.compression import COMPRESSION_GZIP
+from wsdottraffic.rowformat import read_rows
+from wsdottraffic.fielddetection import FieldInfo
+from wsdottraffic.jsonhelpers import CustomEncoder, dict_list_to_geojson
+
+FEATURES = [
+    {
+        "CameraID": 1,
+        "Title": "SR 520 at 84th Ave NE",
+        "Latitude": 47.64,
+        "Longitude": -122.23,
+        "IsActive": True,
+        "Tags": ["a", {"b": 2}]
+    },
+    {
+        "AlertID": 2,
+        "StartRoadName": "520",
+        "StartLatitude": 47.6,
+        "StartLongitude": -122.3,
+        "EndLatitude": 47.61,
+        "EndLongitude": -122.2,
+        "StartTime": datetime.datetime(2018, 1, 2, 3, 4, 5)
+    },
+    {
+        "Description": "No location",
+        "TimeUpdated": datetime.datetime(2018, 1, 2, 3, 4, 5)
+    }
+]
+
+
+class FanOutTest(unittest.TestCase):
+    """Tests that the single-pass writer matches the json module's output.
+    """
+
+    def setUp(self):
+        self.out_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.out_dir)
+
+    def read(self, file_name):
+        """Reads an output file."""
+        with open(os.path.join(self.out_dir, file_name)) as out_file:
+            return out_file.read()
+
+    def check_outputs(self, features, indent):
+        """Compares fan-out output with json.dumps output."""
+        write_outputs("Test", features, self.out_dir, indent=indent)
+        self.assertEqual(
+            self.read("Test.json"),
+            json.dumps(features, cls=CustomEncoder, indent=indent))
+        self.assertEqual(
+            self.read("Test.geojson"),
+            json.dumps(dict_list_to_geojson(features), cls=CustomEncoder,
+                       indent=indent))
+        self.assertEqual(
+            self.read("Test_fields.json"),
+            json.dumps(FieldInfo.from_features(features), indent=indent,
+                       default=_field_serializer))
+
+    def test_indented(self):
+        """Indented output"""
+        self.check_outputs(FEATURES, True)
+        self.check_outputs([], True)
+
+    def test_single_line(self):
+        """Output without indentation"""
+        self.check_outputs(FEATURES, None)
+        self.check_outputs([], None)
+
+    def test_time_zones(self):
+        """Equal instants in different time zones keep their own offsets"""
+        def get_zone(hours):
+            return datetime.timezone(datetime.timedelta(hours=hours))
+        features = [
+            {"Time": datetime.datetime(2018, 1, 1, 12, tzinfo=get_zone(-7))},
+            {"Time": datetime.datetime(2018, 1, 1, 11, tzinfo=get_zone(-8))},
+            {"Time": datetime.time(12, tzinfo=get_zone(-7))},
+            {"Time": datetime.time(11, tzinfo=get_zone(-8))},
+        ]
+        self.check_outputs(features, None)
+        self.assertIn('"2018-01-01T11:00:00-08:00"', self.read("Test.json"))
+
+    def test_compact_gzip(self):
+        """Minified and gzipped JSON output"""
+        paths = write_outputs("Test", FEATURES, self.out_dir,
+                              output_format=FORMAT_COMPACT,
+                              compression=COMPRESSION_GZIP)
+        self.assertEqual(paths[0], os.path.join(self.out_dir, "Test.json.gz"))
+        with gzip.open(paths[2], "rt") as json_file:
+            self.assertEqual(json_file.read(), json.dumps(
+                dict_list_to_geojson(FEATURES), cls=CustomEncoder,
+                separators=(",", ":")))
+
+    def test_rows(self):
+        """Binary row format output"""
+        paths = write_outputs("Test", FEATURES, self.out_dir,
+                              output_format=FORMAT_ROWS)
+        self.assertEqual(read_rows(paths[0]), FEATURES)
+
+    def test_writer_thread(self):
+        """Outputs written on the writer thread"""
+        writer = OutputWriterThread(self.out_dir, indent=True)
+        writer.submit("A", FEATURES)
+        writer.submit("B", FEATURES[:1])
+        writer.close()
+        for name in ("A.json", "A.geojson", "B.json", "B_fields.json"):
+            self.assertTrue(os.path.exists(os.path.join(self.out_dir, name)))
+
+
+if __name__ == '__main__':
+    unittest.main()
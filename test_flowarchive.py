@@ -0,0 +1,109 @@
+"""Unit tests for wsdottraffic.flowarchive
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+from wsdottraffic import flowarchive
+from wsdottraffic.flowarchive import MISSING_CODE, FlowArchive
+from wsdottraffic.jsonhelpers import CustomEncoder
+
+
+def _make_poll(minute, values):
+    return [
+        {"FlowDataID": flow_data_id, "FlowReadingValue": value,
+         "StationName": "Station %d" % flow_data_id,
+         "Time": datetime(2018, 1, 1, 8, minute)}
+        for flow_data_id, value in values
+    ]
+
+
+class TestFlowArchive(unittest.TestCase):
+    """Tests the FlowArchive class."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "TrafficFlow.flow")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_append_and_read(self):
+        archive = FlowArchive(self.path, capacity=2)
+        archive.append(_make_poll(0, [(10, 1), (20, 2)]))
+        # Adding a third station grows the rows.
+        archive.append(_make_poll(1, [(20, 3), (30, "Stop and Go")]))
+        archive.append(_make_poll(2, [(10, 99)]),
+                       poll_time=datetime(2018, 1, 1, 8, 5))
+        self.assertEqual(archive.capacity, 4)
+
+        # Reopen to read the station dictionary from disk.
+        archive = FlowArchive(self.path)
+        self.assertEqual(len(archive), 3)
+        self.assertEqual(archive.get_column(30), 2)
+        self.assertEqual(archive.stations["20"]["StationName"], "Station 20")
+        with archive.open_matrix() as matrix:
+            self.assertEqual(len(matrix), 3)
+            self.assertEqual(matrix.get_time(0), datetime(2018, 1, 1, 8, 0))
+            self.assertEqual(matrix.get_time(-1), datetime(2018, 1, 1, 8, 5))
+            self.assertEqual(bytearray(matrix.get_codes(0)),
+                             bytearray([1, 2, MISSING_CODE]))
+            self.assertEqual(bytearray(matrix.get_codes(1)),
+                             bytearray([MISSING_CODE, 3, 4]))
+            self.assertEqual(matrix.get_code(2, 0), MISSING_CODE)
+            self.assertEqual(matrix.get_series(1), [
+                (datetime(2018, 1, 1, 8, 0), 2),
+                (datetime(2018, 1, 1, 8, 1), 3)])
+
+    def test_append_json_file(self):
+        json_path = os.path.join(self.temp_dir, "TrafficFlow.json")
+        with open(json_path, "w") as json_file:
+            json.dump(_make_poll(30, [(10, 5)]), json_file, cls=CustomEncoder)
+        archive = FlowArchive(self.path)
+        self.assertEqual(archive.append_json_file(json_path), 0)
+        with archive.open_matrix() as matrix:
+            self.assertEqual(matrix.get_time(0), datetime(2018, 1, 1, 8, 30))
+            self.assertEqual(matrix.get_code(0, 0), 5)
+
+    def test_partial_row(self):
+        """An append after an interrupted append overwrites its fragment."""
+        archive = FlowArchive(self.path, capacity=2)
+        archive.append(_make_poll(0, [(10, 1), (20, 2)]))
+        with open(self.path, "ab") as data_file:
+            data_file.write(b"\x00\x01\x02")
+        self.assertEqual(archive.append(_make_poll(1, [(10, 3)])), 1)
+        self.assertEqual(os.path.getsize(self.path),
+                         flowarchive.HEADER_SIZE +
+                         2 * (flowarchive.TIME_SIZE + 2))
+        with archive.open_matrix() as matrix:
+            self.assertEqual(matrix.get_time(1), datetime(2018, 1, 1, 8, 1))
+            self.assertEqual(bytearray(matrix.get_codes(1)),
+                             bytearray([3, MISSING_CODE]))
+
+    @unittest.skipIf(flowarchive.numpy is None, "numpy is not installed")
+    def test_to_numpy(self):
+        archive = FlowArchive(self.path)
+        archive.append(_make_poll(0, [(10, 1), (20, 2)]))
+        archive.append(_make_poll(1, [(20, 3)]))
+        with archive.open_matrix() as matrix:
+            times, codes = matrix.to_numpy()
+            self.assertEqual(codes.shape, (2, 2))
+            self.assertEqual(codes[1].tolist(), [MISSING_CODE, 3])
+            self.assertEqual(str(times[1]), "2018-01-01T08:01:00.000")
+            del times, codes
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as data_file:
+            data_file.write(b"not an archive")
+        self.assertRaises(flowarchive.FlowArchiveError, FlowArchive,
+                          self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
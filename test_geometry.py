@@ -0,0 +1,103 @@
+"""Unit tests for wsdottraffic.geometry
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import random
+import unittest
+
+from wsdottraffic import geometry
+from wsdottraffic.geometry import (OUTPUT_WKB, OUTPUT_XY, build_geometries,
+                                   get_points, to_wkb, wkb_to_points)
+from wsdottraffic.tabledefs import (GEOMETRY_TYPE_MULTIPOINT,
+                                    GEOMETRY_TYPE_POINT,
+                                    MULTIPOINT_FIELD_NAMES, POINT_FIELD_NAMES)
+
+ALERTS = [
+    {"StartLongitude": -122.3, "StartLatitude": 47.6,
+     "EndLongitude": -122.2, "EndLatitude": 47.7},
+    # Only the end point is valid.
+    {"StartLongitude": 0, "StartLatitude": 0,
+     "EndLongitude": -122.2, "EndLatitude": 47.7},
+    # Falls back to the point fields.
+    {"StartLongitude": 0, "StartLatitude": 0, "EndLongitude": 0,
+     "EndLatitude": 0, "Longitude": -121.0, "Latitude": 46.0},
+    # No valid coordinates.
+    {"StartLongitude": None, "StartLatitude": 47.0},
+]
+
+
+def _random_records(count):
+    rng = random.Random(1)
+    records = []
+    for _ in range(count):
+        record = {}
+        for field in MULTIPOINT_FIELD_NAMES + POINT_FIELD_NAMES:
+            choice = rng.random()
+            if choice < 0.1:
+                record[field] = 0
+            elif choice < 0.2:
+                continue
+            else:
+                record[field] = rng.uniform(-125, -116)
+        records.append(record)
+    return records
+
+
+class TestBuildGeometries(unittest.TestCase):
+    """Tests the build_geometries function."""
+
+    def _check(self, records):
+        batch = build_geometries(records, GEOMETRY_TYPE_MULTIPOINT,
+                                 MULTIPOINT_FIELD_NAMES)
+        for record, wkb in zip(records, batch.geometries):
+            points = get_points(record, GEOMETRY_TYPE_MULTIPOINT,
+                                MULTIPOINT_FIELD_NAMES)
+            self.assertEqual(wkb, to_wkb(points, GEOMETRY_TYPE_MULTIPOINT))
+        batch = build_geometries(records, GEOMETRY_TYPE_POINT,
+                                 POINT_FIELD_NAMES, OUTPUT_XY)
+        for record, point in zip(records, batch.geometries):
+            points = get_points(record, GEOMETRY_TYPE_POINT,
+                                POINT_FIELD_NAMES)
+            self.assertEqual(point, points[0] if points else None)
+
+    def test_multipoint(self):
+        batch = build_geometries(ALERTS, GEOMETRY_TYPE_MULTIPOINT,
+                                 MULTIPOINT_FIELD_NAMES)
+        self.assertEqual(batch.null_indices, [3])
+        self.assertEqual(batch.fallback_indices, [2])
+        self.assertEqual(wkb_to_points(batch.geometries[0]),
+                         [(-122.3, 47.6), (-122.2, 47.7)])
+        self.assertEqual(wkb_to_points(batch.geometries[1]),
+                         [(-122.2, 47.7)])
+        self.assertEqual(wkb_to_points(batch.geometries[2]),
+                         [(-121.0, 46.0)])
+        self.assertIsNone(batch.geometries[3])
+
+    def test_point(self):
+        batch = build_geometries(ALERTS, GEOMETRY_TYPE_POINT,
+                                 POINT_FIELD_NAMES, OUTPUT_WKB)
+        self.assertEqual(batch.null_indices, [0, 1, 3])
+        self.assertEqual(batch.fallback_indices, [])
+        self.assertEqual(batch.geometries[2],
+                         to_wkb([(-121.0, 46.0)], GEOMETRY_TYPE_POINT))
+
+    def test_matches_per_record(self):
+        self._check(_random_records(300))
+        self._check([])
+
+    def test_without_numpy(self):
+        saved = geometry.numpy
+        geometry.numpy = None
+        try:
+            self._check(_random_records(100))
+            batch = build_geometries(ALERTS, GEOMETRY_TYPE_MULTIPOINT,
+                                     MULTIPOINT_FIELD_NAMES)
+            self.assertEqual(batch.null_indices, [3])
+            self.assertEqual(batch.fallback_indices, [2])
+        finally:
+            geometry.numpy = saved
+
+
+if __name__ == '__main__':
+    unittest.main()
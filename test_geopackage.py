@@ -0,0 +1,114 @@
+"""Unit tests for wsdottraffic.geopackage
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from wsdottraffic import geopackage
+
+ALERTS = [
+    {
+        "AlertID": 1,
+        "EventCategory": "Collision",
+        "StartTime": datetime.datetime(2018, 1, 2, 3, 4, 5, 678000),
+        "StartLatitude": 47.6,
+        "StartLongitude": -122.3,
+        "EndLatitude": 47.7,
+        "EndLongitude": -122.2
+    },
+    {
+        # Invalid coordinates result in NULL geometry.
+        "AlertID": 2,
+        "StartLatitude": 0,
+        "StartLongitude": 0,
+        "EndLatitude": 0,
+        "EndLongitude": 0
+    }
+]
+
+CAMERAS = [
+    {
+        "CameraID": 3,
+        "ImageURL": "http://example.com/image.jpg",
+        "IsActive": True,
+        "Latitude": 47.0,
+        "Longitude": -121.0
+    }
+]
+
+
+class GeoPackageTest(unittest.TestCase):
+    """Tests creating and loading GeoPackage tables.
+    """
+
+    def setUp(self):
+        self.out_dir = tempfile.mkdtemp()
+        self.gpkg_path = os.path.join(self.out_dir, "Test.gpkg")
+
+    def tearDown(self):
+        shutil.rmtree(self.out_dir)
+
+    def test_create_table(self):
+        """Tables are created, loaded and spatially indexed."""
+        alerts_path = os.path.join(self.gpkg_path, "HighwayAlerts")
+        geopackage.create_table(alerts_path, data_list=ALERTS)
+        # Loading again replaces the existing rows.
+        geopackage.create_table(alerts_path, data_list=ALERTS)
+        geopackage.create_table(os.path.join(self.gpkg_path, "HighwayCameras"),
+                                data_list=CAMERAS)
+        conn = geopackage.connect(self.gpkg_path)
+        try:
+            rows = conn.execute(
+                "SELECT fid, geom, AlertID, StartTime FROM HighwayAlerts"
+            ).fetchall()
+            self.assertEqual(len(rows), 2)
+            self.assertEqual(
+                geopackage.from_gpkg_geometry(rows[0][1]),
+                [(-122.3, 47.6), (-122.2, 47.7)])
+            self.assertEqual(rows[0][3], "2018-01-02T03:04:05.678Z")
+            self.assertIsNone(rows[1][1])
+            self.assertEqual(conn.execute(
+                "SELECT id FROM rtree_HighwayAlerts_geom WHERE "
+                "minx <= -122.25 AND maxx >= -122.25").fetchall(), [(1,)])
+
+            # Renamed field and boolean value.
+            self.assertEqual(conn.execute(
+                "SELECT ImageUrl, IsActive FROM HighwayCameras").fetchall(),
+                             [("http://example.com/image.jpg", 1)])
+            # Domain values stored with the schema extension.
+            self.assertIn(("1", "true"), conn.execute(
+                "SELECT value, description FROM gpkg_data_column_constraints "
+                "WHERE constraint_name = 'Boolean'").fetchall())
+
+            # Triggers keep the R*Tree up to date for other writers.
+            conn.execute("DELETE FROM HighwayAlerts WHERE fid = 1")
+            self.assertEqual(conn.execute(
+                "SELECT COUNT(*) FROM rtree_HighwayAlerts_geom").fetchone(),
+                             (0,))
+            self.assertEqual(conn.execute("PRAGMA integrity_check").fetchone(),
+                             ("ok",))
+        finally:
+            conn.close()
+
+    def test_schema_only(self):
+        """Tables can be created without data."""
+        geopackage.create_gpkg(self.gpkg_path, skip_data=True,
+                               names=["TrafficFlow", "TravelTimes"])
+        conn = geopackage.connect(self.gpkg_path)
+        try:
+            self.assertEqual(conn.execute(
+                "SELECT table_name, geometry_type_name FROM "
+                "gpkg_geometry_columns ORDER BY table_name").fetchall(),
+                             [("TrafficFlow", "POINT"),
+                              ("TravelTimes", "MULTIPOINT")])
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""Unit tests for wsdottraffic.jsonhelpers
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from wsdottraffic.jsonhelpers import (explode_geojson_file,
+                                      explode_multipoints, to_geo_json)
+
+
+class TestExplodeMultipoints(unittest.TestCase):
+    """Tests exploding GeoJSON MultiPoint features."""
+
+    records = [
+        {"TravelTimeID": 1, "StartLongitude": -122.0, "StartLatitude": 47.0,
+         "EndLongitude": -122.5, "EndLatitude": 47.5},
+        {"CameraID": 2, "Longitude": -121.0, "Latitude": 46.0},
+    ]
+
+    def test_explode(self):
+        features = [to_geo_json(record) for record in self.records]
+        exploded = list(explode_multipoints(features))
+        self.assertEqual(len(exploded), 3)
+        self.assertEqual(exploded[0]["geometry"],
+                         {"type": "Point", "coordinates": [-122.0, 47.0]})
+        self.assertEqual(exploded[1]["geometry"]["coordinates"],
+                         [-122.5, 47.5])
+        self.assertEqual(exploded[1]["properties"], {"TravelTimeID": 1})
+        self.assertIsNot(exploded[0]["properties"],
+                         exploded[1]["properties"])
+        self.assertIs(exploded[2], features[1])
+
+    def test_explode_file(self):
+        directory = tempfile.mkdtemp()
+        try:
+            in_path = os.path.join(directory, "in.geojson")
+            out_path = os.path.join(directory, "out.geojson")
+            with open(in_path, "w") as in_file:
+                json.dump({"type": "FeatureCollection", "features": [
+                    to_geo_json(record) for record in self.records]}, in_file)
+            self.assertEqual(explode_geojson_file(in_path, out_path), (2, 3))
+            with open(out_path) as out_file:
+                collection = json.load(out_file)
+            self.assertEqual(collection["type"], "FeatureCollection")
+            self.assertEqual(len(collection["features"]), 3)
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+"""Unit tests for wsdottraffic.intervals and wsdottraffic.linearindex
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import random
+import unittest
+
+try:
+    from unittest import mock
+except ImportError:  # pragma: no cover
+    import mock  # pylint:disable=import-error
+
+from wsdottraffic import intervals as intervals_module
+from wsdottraffic.intervals import IntervalIndex
+from wsdottraffic.linearindex import LinearIndex, normalize_route
+from wsdottraffic.tabledefs import get_key_fields
+
+ALERTS = [
+    {"AlertID": 1, "StartRoadName": "SR 520", "StartMilePost": 1.5,
+     "EndRoadName": "SR 520", "EndMilePost": 4.0},
+    {"AlertID": 2, "StartRoadName": "I-5", "StartMilePost": 165.0,
+     "EndRoadName": "I-5", "EndMilePost": 160.0},
+    # Spans from SR 520 to I-405.
+    {"AlertID": 3, "StartRoadName": "520", "StartMilePost": 9.0,
+     "EndRoadName": "405", "EndMilePost": 14.0},
+    {"AlertID": 4, "StartRoadName": "", "StartMilePost": 0},
+]
+
+CLEARANCES = [
+    {"LocationID": 10, "StateRouteID": "520", "StartMilePost": 6.0,
+     "EndMilePost": 6.1},
+    {"LocationID": 11, "StateRouteID": "005", "MilePost": 162.5},
+]
+
+
+class TestIntervalIndex(unittest.TestCase):
+    """Tests the IntervalIndex class."""
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        intervals = {}
+        index = IntervalIndex()
+        for key in range(300):
+            start = rng.uniform(0, 100)
+            end = start + rng.expovariate(0.2)
+            intervals[key] = (start, end)
+            index.insert(key, end, start)
+        for key in range(0, 300, 3):
+            del intervals[key]
+            index.remove(key)
+        for _ in range(50):
+            lo = rng.uniform(-5, 105)
+            hi = lo + rng.uniform(0, 10)
+            expected = sorted(
+                (key for key, (start, end) in intervals.items()
+                 if start <= hi and end >= lo),
+                key=lambda k: intervals[k][0])
+            self.assertEqual(index.overlapping(lo, hi), expected)
+
+    def test_interleaved_updates(self):
+        """Queries between inserts, replacements and removals see every
+        change, including across split and emptied blocks.
+        """
+        rng = random.Random(11)
+        intervals = {}
+        with mock.patch.object(intervals_module, "BLOCK_SIZE", 2):
+            index = IntervalIndex()
+            for step in range(3000):
+                key = rng.randrange(200)
+                if rng.random() < 0.3:
+                    intervals.pop(key, None)
+                    index.remove(key)
+                else:
+                    # Integer starts, so many intervals share a start.
+                    start = rng.randrange(50)
+                    end = start + rng.randrange(10)
+                    intervals[key] = (start, end)
+                    index.insert(key, start, end)
+                lo = rng.randrange(-2, 60)
+                hi = lo + rng.randrange(5)
+                expected = set(key for key, (start, end) in intervals.items()
+                               if start <= hi and end >= lo)
+                keys = index.overlapping(lo, hi)
+                self.assertEqual(set(keys), expected, step)
+                self.assertEqual(len(keys), len(expected))
+                starts = [intervals[key][0] for key in keys]
+                self.assertEqual(starts, sorted(starts))
+                self.assertEqual(len(index), len(intervals))
+
+    def test_empty(self):
+        self.assertEqual(IntervalIndex().overlapping(0, 1), [])
+        index = IntervalIndex([(1, 0, 1)])
+        index.remove(1)
+        self.assertEqual(index.overlapping(0, 1), [])
+
+
+class TestLinearIndex(unittest.TestCase):
+    """Tests the LinearIndex class."""
+
+    def setUp(self):
+        self.index = LinearIndex()
+        self.index.add_records("HighwayAlerts", ALERTS,
+                               get_key_fields("HighwayAlerts"))
+        self.index.add_records("BridgeClearances", CLEARANCES,
+                               get_key_fields("BridgeClearances"))
+
+    def test_normalize_route(self):
+        self.assertEqual(normalize_route("SR 520"), "520")
+        self.assertEqual(normalize_route("I-5"), "005")
+        self.assertEqual(normalize_route(5), "005")
+        self.assertEqual(normalize_route("520SPCANYRD"), "520")
+        self.assertIsNone(normalize_route(""))
+        self.assertIsNone(normalize_route("Main St"))
+
+    def test_query(self):
+        self.assertEqual(self.index.routes, ["005", "405", "520"])
+        self.assertEqual(self.index.query("SR 520", 2, 8), [
+            ("HighwayAlerts", 1), ("BridgeClearances", 10)])
+        self.assertEqual(self.index.query("520", 9), [("HighwayAlerts", 3)])
+        self.assertEqual(self.index.query("I-405", 14), [("HighwayAlerts", 3)])
+        self.assertEqual(self.index.query("I-5", 162.5), [
+            ("HighwayAlerts", 2), ("BridgeClearances", 11)])
+        self.assertEqual(
+            self.index.query("I-5", 162.5, datasets=["BridgeClearances"]),
+            [("BridgeClearances", 11)])
+        self.assertEqual(self.index.query("SR 99", 0, 100), [])
+
+    def test_update(self):
+        moved = dict(ALERTS[0], StartMilePost=20, EndMilePost=21)
+        self.index.insert("HighwayAlerts", 1, moved)
+        self.assertEqual(self.index.query("520", 2, 8),
+                         [("BridgeClearances", 10)])
+        self.index.clear_dataset("BridgeClearances")
+        self.assertEqual(self.index.query_records("520", 0, 100), [
+            ("HighwayAlerts", ALERTS[2]), ("HighwayAlerts", moved)])
+        self.assertEqual(len(self.index), 4)
+
+    def test_interleaved_updates(self):
+        """Queries between record updates see every update."""
+        rng = random.Random(5)
+        mileposts = {}
+        for step in range(500):
+            alert_id = rng.randrange(100)
+            start = rng.randrange(30)
+            end = start + rng.randrange(3)
+            mileposts[alert_id] = (start, end)
+            self.index.insert("HighwayAlerts", alert_id, {
+                "AlertID": alert_id, "StartRoadName": "SR 99",
+                "StartMilePost": start, "EndMilePost": end})
+            milepost = rng.randrange(30)
+            expected = set(
+                ("HighwayAlerts", alert_id)
+                for alert_id, (start, end) in mileposts.items()
+                if start <= milepost <= end)
+            self.assertEqual(set(self.index.query("99", milepost)), expected,
+                             step)
+
+
+if __name__ == '__main__':
+    unittest.main()
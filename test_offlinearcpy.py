@@ -0,0 +1,349 @@
+"""Unit tests that run wsdottraffic.gp on wsdottraffic.offlinearcpy, the
+in-memory arcpy stand-in.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+# Select the offline backend before wsdottraffic.gp imports arcpy.
+os.environ["WSDOT_TRAFFIC_ARCPY"] = "offline"
+
+# pylint: disable=wrong-import-position
+from wsdottraffic import offlinearcpy as arcpy
+from wsdottraffic.arcpybackend import is_offline
+from wsdottraffic.gp import create_table
+from wsdottraffic.gp.__main__ import create_gdb
+from wsdottraffic.gp.writer import GeodatabaseWriter
+from wsdottraffic.gp.domaintools import DomainRegistry
+from wsdottraffic.gp.multipointtopoint import explode_multipoint_fc
+from wsdottraffic.gp.templates import build_templates_gdb, get_templates_gdb
+from wsdottraffic.geometry import multipoint_to_wkb
+from wsdottraffic.jsonhelpers import parse_traveler_info_object
+from wsdottraffic.scanweb import (WeatherReading, scanweb_json_hook,
+                                  to_table_rows)
+from wsdottraffic.scanweb.gp import (create_tables as create_scanweb_tables,
+                                     populate_feature_classes)
+from wsdottraffic.synthetic import generate_payload
+from wsdottraffic.tabledefs import TABLE_DEFS_DICT_DICT
+
+POINT_TABLE_DEF = {
+    "fields": {
+        "StationID": "LONG",
+        "Name": {"field_type": "TEXT", "field_length": 10},
+        "Speed": "FLOAT",
+        "Updated": "DATE",
+        "Longitude": "DOUBLE",
+        "Latitude": "DOUBLE",
+    },
+    "keyFields": ["StationID"],
+}
+
+MULTIPOINT_TABLE_DEF = {
+    "fields": {
+        "AlertID": "LONG",
+        "StartLongitude": "DOUBLE",
+        "StartLatitude": "DOUBLE",
+        "EndLongitude": "DOUBLE",
+        "EndLatitude": "DOUBLE",
+    }
+}
+
+
+def _get_records():
+    time = datetime.datetime(2018, 1, 2, 3, 4, 5, 600000)
+    return [
+        {"StationID": 1, "Name": "One", "Speed": 55.1, "Updated": time,
+         "Longitude": -122.5, "Latitude": 47.5},
+        {"StationID": 2, "Name": "Two", "Speed": None, "Updated": None,
+         "Longitude": -122.0, "Latitude": 47.0},
+        {"StationID": 3, "Name": "Three", "Speed": 1.5, "Updated": time,
+         "Longitude": None, "Latitude": None},
+    ]
+
+
+class TestOfflineArcpy(unittest.TestCase):
+    """Tests the geoprocessing functions with the offline backend."""
+
+    def setUp(self):
+        arcpy.reset()
+        arcpy.env.overwriteOutput = False
+        self.directory = tempfile.mkdtemp()
+        arcpy.management.CreateFileGDB(self.directory, "Test.gdb")
+        self.gdb_path = os.path.join(self.directory, "Test.gdb")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _read(self, table_path, fields):
+        with arcpy.da.SearchCursor(table_path, fields) as cursor:
+            return sorted(cursor)
+
+    def test_backend(self):
+        self.assertTrue(is_offline())
+        self.assertTrue(arcpy.Exists(self.gdb_path))
+        self.assertEqual(arcpy.Describe(self.gdb_path).dataType, "Workspace")
+        self.assertFalse(arcpy.Exists(os.path.join(self.gdb_path, "None")))
+
+    def test_create_table(self):
+        table_path = os.path.join(self.gdb_path, "Stations")
+        records = _get_records()
+        records.append({"StationID": 4, "Name": "Too long a name",
+                        "Longitude": -121.0, "Latitude": 46.0})
+        quarantine_path = os.path.join(self.directory, "quarantine.jsonl")
+        create_table(table_path, POINT_TABLE_DEF, records,
+                     quarantine_path=quarantine_path)
+
+        desc = arcpy.Describe(table_path)
+        self.assertEqual(desc.shapeType, "Point")
+        self.assertEqual(desc.spatialReference.factoryCode, 4326)
+        rows = self._read(table_path, ["StationID", "Name", "Speed",
+                                       "Updated", "SHAPE@XY"])
+        self.assertEqual(len(rows), 3)
+        # FLOAT values are single precision and dates are stored to the
+        # second.
+        self.assertNotEqual(rows[0][2], 55.1)
+        self.assertAlmostEqual(rows[0][2], 55.1, 5)
+        self.assertEqual(rows[0][3], datetime.datetime(2018, 1, 2, 3, 4, 6))
+        self.assertEqual(rows[0][4], (-122.5, 47.5))
+        self.assertIsNone(rows[2][4])
+        with open(quarantine_path) as quarantine_file:
+            self.assertEqual(json.loads(quarantine_file.readline())[
+                "record"]["StationID"], 4)
+
+        # Reloading truncates the table.
+        create_table(table_path, POINT_TABLE_DEF, records[:2])
+        self.assertEqual(arcpy.management.GetCount(table_path)[0], "2")
+
+    def test_table_defs(self):
+        """Every real table definition can be created and loaded."""
+        readings = json.loads(
+            generate_payload("Scanweb", 5, seed=0).decode("utf-8"),
+            object_hook=scanweb_json_hook)
+        # Scanweb's tables are created by scanweb.gp.
+        counts = populate_feature_classes(self.gdb_path,
+                                          scanweb_data=readings)
+        for table_name, rows in to_table_rows(readings).items():
+            self.assertEqual(counts[table_name], len(rows))
+        for table_name in TABLE_DEFS_DICT_DICT:
+            if table_name in counts:
+                continue
+            data = json.loads(
+                generate_payload(table_name, 5, seed=0).decode("utf-8"),
+                object_hook=parse_traveler_info_object)
+            table_path = os.path.join(self.gdb_path, table_name)
+            create_table(table_path, data_list=data)
+            self.assertEqual(arcpy.management.GetCount(table_path)[0], "5",
+                             table_name)
+
+        lengths = dict((field.name, field.length) for field in
+                       arcpy.ListFields(os.path.join(self.gdb_path,
+                                                     "BridgeClearances")))
+        self.assertEqual(lengths["StateRouteID"], 3)
+        self.assertEqual(lengths["LRSRoute"], 11)
+
+    def test_scanweb_old_schema(self):
+        """Measurement tables keyed by StationName are recreated."""
+        readings = json.loads(
+            generate_payload("Scanweb", 5, seed=0).decode("utf-8"),
+            object_hook=scanweb_json_hook)
+        create_scanweb_tables(self.gdb_path)
+        relationship_class = os.path.join(
+            self.gdb_path, "ScanwebWeatherReadings_ScanwebSurfaceMeasurements")
+        self.assertTrue(arcpy.Exists(relationship_class))
+        table_path = os.path.join(self.gdb_path, "ScanwebSurfaceMeasurements")
+        arcpy.management.Delete(relationship_class)
+        arcpy.management.Delete(table_path)
+        arcpy.management.CreateTable(self.gdb_path,
+                                     "ScanwebSurfaceMeasurements")
+        arcpy.management.AddField(table_path, "StationName", "TEXT")
+        arcpy.management.AddField(table_path, "SensorId", "SHORT")
+
+        counts = populate_feature_classes(self.gdb_path,
+                                          scanweb_data=readings)
+        self.assertEqual(counts["ScanwebSurfaceMeasurements"],
+                         len(to_table_rows(readings)[
+                             "ScanwebSurfaceMeasurements"]))
+        field_names = [field.name for field in arcpy.ListFields(table_path)]
+        self.assertIn("StationId", field_names)
+        self.assertNotIn("StationName", field_names)
+        self.assertTrue(arcpy.Exists(relationship_class))
+
+    def test_sync(self):
+        table_path = os.path.join(self.gdb_path, "Stations")
+        records = _get_records()
+        create_table(table_path, POINT_TABLE_DEF, records)
+        oids = dict((row[1], row[0]) for row in self._read(
+            table_path, ["OID@", "StationID"]))
+
+        records = _get_records()
+        records[0]["Name"] = "Uno"
+        del records[1]
+        records.append({"StationID": 5, "Name": "Five",
+                        "Longitude": -120.0, "Latitude": 45.0})
+        arcpy.reset_stats()
+        create_table(table_path, POINT_TABLE_DEF, records, sync=True)
+
+        rows = self._read(table_path, ["StationID", "Name", "OID@"])
+        self.assertEqual([row[:2] for row in rows],
+                         [(1, "Uno"), (3, "Three"), (5, "Five")])
+        # Unchanged and updated rows keep their OBJECTIDs.
+        self.assertEqual(rows[0][2], oids[1])
+        self.assertEqual(rows[1][2], oids[3])
+        stats = arcpy.get_stats()
+        self.assertEqual(stats["da.UpdateCursor.updateRow"]["count"], 1)
+        self.assertEqual(stats["da.UpdateCursor.deleteRow"]["count"], 1)
+        self.assertEqual(stats["da.InsertCursor.insertRow"]["count"], 1)
+
+    def test_sync_quarantined(self):
+        """Rows whose new records fail validation are kept, not deleted."""
+        table_path = os.path.join(self.gdb_path, "Stations")
+        create_table(table_path, POINT_TABLE_DEF, _get_records())
+
+        records = _get_records()
+        records[2]["Name"] = "Too long a name"
+        del records[1]
+        create_table(table_path, POINT_TABLE_DEF, records, sync=True)
+        rows = self._read(table_path, ["StationID", "Name"])
+        self.assertEqual(rows, [(1, "One"), (3, "Three")])
+
+    def test_bulk(self):
+        table_path = os.path.join(self.gdb_path, "Stations")
+        records = _get_records()
+        records[0]["Name"] = None
+        create_table(table_path, POINT_TABLE_DEF, records, bulk=True)
+        rows = self._read(table_path, ["StationID", "Updated", "SHAPE@XY",
+                                       "Name"])
+        self.assertEqual([row[0] for row in rows], [1, 2, 3])
+        self.assertEqual(rows[0][2], (-122.5, 47.5))
+        self.assertIsNone(rows[0][3])
+        self.assertEqual(rows[1][3], "Two")
+        self.assertIsNone(rows[1][1])
+        self.assertEqual(rows[2][1], datetime.datetime(2018, 1, 2, 3, 4, 6))
+        stats = arcpy.get_stats()
+        self.assertEqual(stats["management.Append"]["count"], 1)
+        # Rows with NULL attributes are bulk loaded. Only the row without
+        # coordinates is inserted with the cursor.
+        self.assertEqual(stats["da.InsertCursor.insertRow"]["count"], 1)
+        self.assertFalse(arcpy.Exists("in_memory/bulkload0"))
+
+    def test_multipoint(self):
+        table_path = os.path.join(self.gdb_path, "Alerts")
+        create_table(table_path, MULTIPOINT_TABLE_DEF, [
+            {"AlertID": 1, "StartLongitude": -122.0, "StartLatitude": 47.0,
+             "EndLongitude": -121.0, "EndLatitude": 46.0},
+            {"AlertID": 2},
+        ])
+        out_path = table_path + "_singlepart"
+        self.assertEqual(explode_multipoint_fc(table_path, out_path), (2, 3))
+        rows = self._read(out_path, ["AlertID", "ORIG_FID", "SHAPE@XY"])
+        self.assertEqual(rows[0][2], (-122.0, 47.0))
+        self.assertEqual(rows[1][2], (-121.0, 46.0))
+        self.assertIsNone(rows[2][2])
+
+    def test_empty_multipoint(self):
+        table_path = os.path.join(self.gdb_path, "Alerts")
+        create_table(table_path, MULTIPOINT_TABLE_DEF)
+        with arcpy.da.InsertCursor(table_path,
+                                   ["SHAPE@WKB", "AlertID"]) as cursor:
+            cursor.insertRow([bytearray(multipoint_to_wkb([])), 1])
+        self.assertEqual(self._read(table_path, ["SHAPE@WKB"]),
+                         [(bytearray(multipoint_to_wkb([])),)])
+        out_path = table_path + "_singlepart"
+        self.assertEqual(explode_multipoint_fc(table_path, out_path), (1, 1))
+        self.assertEqual(self._read(out_path, ["AlertID", "SHAPE@XY"]),
+                         [(1, None)])
+
+    def test_domains(self):
+        table_path = os.path.join(self.gdb_path, "Stations")
+        create_table(table_path, POINT_TABLE_DEF)
+        registry = DomainRegistry(self.gdb_path)
+        registry.assign_domains(table_path, {"StationID": "Stations"}, {
+            "Stations": {"field_type": "LONG", "values": {"One": 1}}})
+        domains = arcpy.da.ListDomains(self.gdb_path)
+        self.assertEqual(domains[0].codedValues, {1: "One"})
+        field = arcpy.ListFields(table_path, "StationID")[0]
+        self.assertEqual(field.domain, "Stations")
+        self.assertRaises(arcpy.ExecuteError,
+                          arcpy.management.DeleteDomain, self.gdb_path,
+                          "Stations")
+
+    def test_editor(self):
+        table_path = os.path.join(self.gdb_path, "Stations")
+        create_table(table_path, POINT_TABLE_DEF, _get_records())
+        try:
+            with arcpy.da.Editor(self.gdb_path):
+                arcpy.management.DeleteRows(table_path)
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertEqual(arcpy.management.GetCount(table_path)[0], "3")
+
+    def test_templates(self):
+        """A cold cache builds a table for every table definition, including
+        Scanweb's, and a warm cache reuses it.
+        """
+        templates_dir = os.path.join(self.directory, "templates")
+        templates_path = get_templates_gdb(templates_dir)
+        for table_name in TABLE_DEFS_DICT_DICT:
+            self.assertTrue(arcpy.Exists(
+                os.path.join(templates_path, table_name)), table_name)
+        self.assertFalse(arcpy.Exists(
+            os.path.join(templates_path, "Scanweb")))
+        self.assertEqual(get_templates_gdb(templates_dir), templates_path)
+        self.assertEqual(os.listdir(templates_dir),
+                         [os.path.basename(templates_path)])
+
+    def test_templates_and_scanweb(self):
+        templates_path = build_templates_gdb(
+            os.path.join(self.directory, "Templates.gdb"))
+        self.assertTrue(arcpy.Exists(
+            os.path.join(templates_path, "ScanwebWeatherReadings")))
+        readings = [WeatherReading(
+            StationId="1", StationName="Station", Latitude=47.0,
+            Longitude=-122.0, Elevation=100, RelativeHumidty=50,
+            SurfaceMeasurements=[{"SensorId": 1}],
+            SubSurfaceMeasurements=[{"SensorId": 1}, {"SensorId": 2}])]
+        counts = populate_feature_classes(self.gdb_path,
+                                          scanweb_data=readings,
+                                          template_gdb=templates_path)
+        self.assertEqual(counts, {"ScanwebWeatherReadings": 1,
+                                  "ScanwebSurfaceMeasurements": 1,
+                                  "ScanwebSubSurfaceMeasurements": 2})
+        rows = self._read(
+            os.path.join(self.gdb_path, "ScanwebWeatherReadings"),
+            ["StationId", "RelativeHumidty", "SHAPE@XY", "SHAPE@Z"])
+        self.assertEqual(rows, [("1", 50, (-122.0, 47.0), 100)])
+
+    def test_writer(self):
+        with GeodatabaseWriter(self.gdb_path,
+                               use_template_cache=False) as writer:
+            writer.write_table("Stations", _get_records()[:2],
+                               POINT_TABLE_DEF)
+            writer.append("Stations", _get_records()[2:], POINT_TABLE_DEF)
+            writer.upsert("Stations", _get_records()[1:], POINT_TABLE_DEF)
+        table_path = os.path.join(self.gdb_path, "Stations")
+        self.assertEqual([row[0] for row in self._read(
+            table_path, ["StationID"])], [2, 3])
+
+        create_gdb(self.gdb_path, names=["TravelTimes", "Scanweb"],
+                   skip_data=True, use_template_cache=False)
+        self.assertTrue(arcpy.Exists(
+            os.path.join(self.gdb_path, "TravelTimes")))
+        self.assertTrue(arcpy.Exists(
+            os.path.join(self.gdb_path, "ScanwebWeatherReadings")))
+
+        # Other formats are written by their writers.
+        gpkg_path = os.path.join(self.directory, "Test.gpkg")
+        create_gdb(self.gdb_path, names=["TravelTimes"], skip_data=True,
+                   output_format="gpkg")
+        self.assertTrue(os.path.exists(gpkg_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
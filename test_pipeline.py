@@ -0,0 +1,61 @@
+"""Unit tests for wsdottraffic.pipeline
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import random
+import threading
+import time
+import unittest
+
+from wsdottraffic.pipeline import prefetch
+
+
+class TestPrefetch(unittest.TestCase):
+    """Tests the prefetch function."""
+
+    def test_order(self):
+        rng = random.Random(3)
+        delays = dict((i, rng.uniform(0, 0.01)) for i in range(20))
+
+        def fetch(item):
+            time.sleep(delays[item])
+            return item * 2
+
+        for workers in (0, 1, 4):
+            self.assertEqual(list(prefetch(range(20), fetch, workers)),
+                             [(i, i * 2) for i in range(20)])
+
+    def test_backpressure(self):
+        lock = threading.Lock()
+        fetched = []
+
+        def fetch(item):
+            with lock:
+                fetched.append(item)
+            return item
+
+        consumed = 0
+        for item, _ in prefetch(range(10), fetch, 4, 2):
+            time.sleep(0.01)
+            with lock:
+                # The current item plus at most one waiting item.
+                self.assertLessEqual(len(fetched) - consumed, 2)
+            consumed += 1
+            self.assertEqual(item, consumed - 1)
+
+    def test_error(self):
+        def fetch(item):
+            if item == 2:
+                raise ValueError("Bad item")
+            return item
+
+        results = []
+        with self.assertRaises(ValueError):
+            for item, _ in prefetch(range(5), fetch, 3):
+                results.append(item)
+        self.assertEqual(results, [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Unit tests for wsdottraffic.recordarrays
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import unittest
+
+from wsdottraffic.recordarrays import (Column, build_record_array,
+                                       get_columns, get_numpy_dtype, numpy)
+from wsdottraffic.tabledefs import TABLE_DEFS_DICT_DICT, iter_field_defs
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed.")
+class TestRecordArrays(unittest.TestCase):
+    """Tests the conversion of rows into structured arrays."""
+
+    columns = [
+        Column("Name", "TEXT", 5),
+        Column("Value", "DOUBLE", None),
+        Column("Count", "SHORT", None),
+        Column("Time", "DATE", None),
+        Column("Id", "GUID", None),
+    ]
+
+    def test_dtypes(self):
+        self.assertEqual(get_numpy_dtype("TEXT"), "<U255")
+        self.assertEqual(get_numpy_dtype("text", 11), "<U11")
+        self.assertEqual(get_numpy_dtype("SINGLE"), "<f4")
+        self.assertEqual(get_numpy_dtype("LONG"), "<i4")
+        self.assertEqual(get_numpy_dtype("DATE"), "<M8[us]")
+        self.assertRaises(ValueError, get_numpy_dtype, "BLOB")
+
+    def test_table_defs(self):
+        """Every table definition can be converted."""
+        for table_def_dict in TABLE_DEFS_DICT_DICT.values():
+            columns = get_columns(iter_field_defs(table_def_dict))
+            result = build_record_array([], columns)
+            self.assertEqual(len(result.array.dtype), len(columns))
+
+    def test_build(self):
+        time = datetime.datetime(2018, 1, 2, 3, 4, 5)
+        guid = "6f9619ff-8b86-d011-b42d-00c04fc964ff"
+        rows = [
+            ("abc", 1.5, 3, time, guid),
+            ("abc", None, 3, time, guid),
+            (None, 1.0, 3, time, guid),
+            ("abcdef", 1.0, 3, time, guid),
+            ("abc", 1.0, 40000, time, guid),
+            ("abc", 1.0, 3, "2018-01-02", guid),
+            ("abc", 1.0, 3, time, "not a guid"),
+        ]
+        result = build_record_array(rows, self.columns)
+        self.assertEqual(result.indices, [0, 1])
+        self.assertEqual(result.rejected_indices, [2, 3, 4, 5, 6])
+        array = result.array
+        self.assertEqual(array["Name"].tolist(), ["abc", "abc"])
+        self.assertEqual(array["Value"][0], 1.5)
+        self.assertTrue(numpy.isnan(array["Value"][1]))
+        self.assertEqual(array["Time"][0], numpy.datetime64(time))
+        self.assertEqual(array["Id"][0], "{%s}" % guid.upper())
+
+    def test_nulls(self):
+        """NULLs can be stored as placeholders instead of rejecting rows."""
+        time = datetime.datetime(2018, 1, 2, 3, 4, 5)
+        rows = [
+            ("abc", 1.5, 3, time, None),
+            (None, None, None, None, None),
+            ("abcdef", 1.0, None, time, None),
+            ("abc", 1.0, 3, time, "6f9619ff-8b86-d011-b42d-00c04fc964ff"),
+        ]
+        result = build_record_array(rows, self.columns, allow_nulls=True)
+        self.assertEqual(result.indices, [0, 1, 3])
+        self.assertEqual(result.rejected_indices, [2])
+        self.assertEqual(result.nulls, {"Name": [1], "Count": [1],
+                                        "Time": [1], "Id": [0, 1]})
+        self.assertEqual(result.array["Name"][1], "")
+        self.assertEqual(result.array["Count"][1], 0)
+        self.assertTrue(numpy.isnan(result.array["Value"][1]))
+        self.assertEqual(build_record_array(rows, self.columns).indices, [3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+"""Unit tests for wsdottraffic.replayserver and the API base override.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import os
+import subprocess
+import sys
+import time
+import unittest
+
+try:
+    from unittest import mock
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+except ImportError:  # pragma: no cover
+    # pylint:disable=import-error
+    import mock
+    from urllib2 import HTTPError, Request, urlopen
+
+from wsdottraffic import get_traveler_info, replayserver, resturls
+from wsdottraffic.scanweb import WeatherReading, get_scanweb
+
+
+class ApiBaseTest(unittest.TestCase):
+    """Tests overriding the API base."""
+
+    def test_get_urls(self):
+        urls = resturls.get_urls("http://localhost:8080/Traffic/api/")
+        self.assertEqual(urls["TollRates"],
+                         "http://localhost:8080/Traffic/api/api/tolling")
+        self.assertEqual(set(urls), set(resturls.URLS))
+
+    def test_environment_variable(self):
+        env = dict(os.environ)
+        env[resturls.API_BASE_ENVIRONMENT_VAR_NAME] = "http://localhost:1/api"
+        output = subprocess.check_output(
+            [sys.executable, "-c", "from wsdottraffic.resturls import URLS; "
+             "print(URLS['Scanweb'])"], env=env)
+        self.assertEqual(output.decode("utf-8").strip(),
+                         "http://localhost:1/api/api/Scanweb")
+
+
+class ReplayServerTest(unittest.TestCase):
+    """Tests fetching from the replay server."""
+
+    def setUp(self):
+        self.payloads = replayserver.load_payloads(
+            names=["HighwayCameras", "Scanweb"], scale=0.01)
+        self.server = None
+
+    def tearDown(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    def _start(self, **options):
+        self.server = replayserver.start_server(self.payloads, **options)
+        return resturls.get_urls(self.server.api_base)
+
+    def test_fetch(self):
+        urls = self._start()
+        with mock.patch.dict(resturls.URLS, urls):
+            cameras = get_traveler_info("HighwayCameras", "code")
+            # requests accepts gzip.
+            readings = get_scanweb("code")
+        self.assertEqual(len(cameras), 16)
+        self.assertIn("RoadName", cameras[0])
+        self.assertEqual(len(readings), 1)
+        self.assertIsInstance(readings[0], WeatherReading)
+        self.assertEqual(self.server.request_counts,
+                         {("HighwayCameras", 200): 1, ("Scanweb", 200): 1})
+
+        self.assertRaises(HTTPError, urlopen,
+                          urls["TravelTimes"] + "?AccessCode=code")
+
+    def test_etag_and_gzip(self):
+        url = self._start()["HighwayCameras"]
+        response = urlopen(Request(url, headers={"Accept-Encoding": "gzip"}))
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        etag = response.headers["ETag"]
+        response.read()
+
+        request = Request(url, headers={"If-None-Match": etag})
+        with self.assertRaises(HTTPError) as context:
+            urlopen(request)
+        self.assertEqual(context.exception.code, 304)
+
+        # A new payload has a new ETag.
+        self.server.set_payload("HighwayCameras", b"[]")
+        self.assertEqual(json.loads(urlopen(request).read().decode("utf-8")),
+                         [])
+
+    def test_errors_and_latency(self):
+        url = self._start(error_rate=1, latency=0.1)["HighwayCameras"]
+        start = time.time()
+        with self.assertRaises(HTTPError) as context:
+            urlopen(url)
+        self.assertEqual(context.exception.code,
+                         replayserver.DEFAULT_ERROR_STATUS)
+        self.assertGreaterEqual(time.time() - start, 0.1)
+
+    def test_bandwidth(self):
+        payload = self.payloads["HighwayCameras"]
+        url = self._start(bandwidth=len(payload) * 5)["HighwayCameras"]
+        start = time.time()
+        self.assertEqual(urlopen(url).read(), payload)
+        self.assertGreaterEqual(time.time() - start, 0.15)
+
+
+if __name__ == '__main__':
+    unittest.main()
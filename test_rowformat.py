@@ -0,0 +1,109 @@
+"""Unit tests for wsdottraffic.rowformat and wsdottraffic.compression
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from wsdottraffic import rowformat
+from wsdottraffic.compression import (COMPRESSION_GZIP, COMPRESSION_ZSTD,
+                                      is_available)
+
+RECORDS = [
+    {
+        "AlertID": 1,
+        "StartRoadName": "520",
+        "HeadlineDescription": "x" * 600,
+        "StartTime": datetime.datetime(2018, 1, 2, 3, 4, 5, 6),
+        "StartLatitude": 47.6,
+        "Offset": -12345678901,
+        "Huge": 2 ** 80,
+        "IsActive": True,
+        "IsWarning": False,
+        "Missing": None,
+        "Day": datetime.date(2018, 1, 2),
+        "Tags": ["a", "b"],
+        "Local": datetime.datetime(
+            2018, 1, 2, tzinfo=datetime.timezone(
+                datetime.timedelta(hours=-8))),
+        "Name": "École"
+    },
+    {
+        "AlertID": 2,
+        "StartRoadName": "520",
+        "StartTime": datetime.datetime(2018, 1, 2, 3, 4, 5, 6),
+    },
+    {}
+]
+
+
+class RowFormatTest(unittest.TestCase):
+    """Round trips records through the row format.
+    """
+
+    def setUp(self):
+        self.out_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.out_dir)
+
+    def test_round_trip(self):
+        """Records read back are equal to the ones written."""
+        self.assertEqual(rowformat.loads(rowformat.dumps(RECORDS)), RECORDS)
+        self.assertEqual(rowformat.loads(rowformat.dumps([])), [])
+
+    def test_time_zones(self):
+        """Aware datetimes keep their own UTC offsets, even when they refer
+        to the same instant as an earlier value.
+        """
+        def get_zone(**kwargs):
+            return datetime.timezone(datetime.timedelta(**kwargs))
+        records = [
+            {"Time": datetime.datetime(2018, 1, 2, 12,
+                                       tzinfo=get_zone(hours=-7))},
+            {"Time": datetime.datetime(2018, 1, 2, 11,
+                                       tzinfo=get_zone(hours=-8))},
+            {"Time": datetime.datetime(2018, 1, 2, 12,
+                                       tzinfo=get_zone(hours=-7))},
+            {"Time": datetime.datetime(2018, 1, 2,
+                                       tzinfo=get_zone(hours=5, seconds=30))},
+        ]
+        loaded = rowformat.loads(rowformat.dumps(records))
+        self.assertEqual([record["Time"].utcoffset() for record in loaded],
+                         [record["Time"].utcoffset() for record in records])
+        self.assertEqual(loaded, records)
+
+    def test_version_1(self):
+        """Version 1 files, with UTC offsets in minutes, can be read."""
+        data = bytearray(rowformat.MAGIC + b"\x01")
+        # One member, a new key "T" and a datetime 1 second after the epoch
+        # with a UTC offset of -480 minutes (zigzag encoded).
+        data += b"\x01\x00\x01T"
+        data += bytearray([rowformat.TAG_DATETIME_TZ, 0x80, 0x89, 0x7A,
+                           0xBF, 0x07])
+        self.assertEqual(rowformat.loads(bytes(data)), [{
+            "T": datetime.datetime(1970, 1, 1, 0, 0, 1, tzinfo=(
+                datetime.timezone(datetime.timedelta(hours=-8))))}])
+
+    def test_bad_data(self):
+        """Data in other formats is rejected."""
+        with self.assertRaises(rowformat.RowFormatError):
+            rowformat.loads(b"[{}]")
+
+    def test_compressed_files(self):
+        """Round trip through compressed files."""
+        for compression in (None, COMPRESSION_GZIP, COMPRESSION_ZSTD):
+            if not is_available(compression):
+                continue
+            path = os.path.join(self.out_dir, "test-%s.rows" % compression)
+            rowformat.write_rows(path, RECORDS, compression)
+            self.assertEqual(
+                rowformat.read_rows(path, compression), RECORDS)
+
+
+if __name__ == '__main__':
+    unittest.main()
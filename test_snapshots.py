@@ -0,0 +1,130 @@
+"""Unit tests for wsdottraffic.snapshots
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from wsdottraffic.snapshots import SnapshotStore
+
+
+def _make_polls():
+    """Returns ten polls of cameras in which camera 2 changes, camera 3 is
+    removed, and a camera is added.
+    """
+    polls = []
+    for number in range(10):
+        cameras = [
+            {"CameraID": 1, "Title": "Camera 1", "IsActive": True,
+             "Latitude": 47.0, "Longitude": -122.0},
+            {"CameraID": 2, "Title": "Camera 2 (%d)" % (number // 3),
+             "IsActive": number % 2 == 0},
+        ]
+        if number < 5:
+            cameras.append({"CameraID": 3, "Title": "Camera 3"})
+        if number >= 7:
+            cameras.append({"CameraID": 4, "Title": "Camera 4",
+                            "Updated": datetime(2018, 1, 1, 8, number)})
+        polls.append((datetime(2018, 1, 1, 8, number), cameras))
+    return polls
+
+
+class TestSnapshotStore(unittest.TestCase):
+    """Tests the SnapshotStore class."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.polls = _make_polls()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def _create_store(self, **kwargs):
+        store = SnapshotStore(self.temp_dir, "HighwayCameras",
+                              keyframe_interval=4, **kwargs)
+        for poll_time, records in self.polls:
+            store.append(records, poll_time)
+        return store
+
+    def test_reconstruct(self):
+        store = self._create_store()
+        self.assertEqual(len(store), 10)
+        # Reopen to read the index from disk.
+        store = SnapshotStore(self.temp_dir, "HighwayCameras",
+                              keyframe_interval=4)
+        for poll_time, records in self.polls:
+            self.assertEqual(store.get_snapshot(poll_time), records)
+            self.assertEqual(
+                store.get_snapshot(poll_time + timedelta(seconds=30)),
+                records)
+        self.assertEqual(store.get_snapshot(), self.polls[-1][1])
+        self.assertEqual(store.get_snapshot(datetime(2017, 1, 1)), [])
+
+    def test_iter_snapshots(self):
+        store = self._create_store(compression="gzip")
+        self.assertEqual(list(store.iter_snapshots()), self.polls)
+        self.assertEqual(
+            list(store.iter_snapshots(datetime(2018, 1, 1, 8, 2),
+                                      datetime(2018, 1, 1, 8, 5))),
+            self.polls[2:6])
+
+    def test_deltas(self):
+        store = SnapshotStore(self.temp_dir, "HighwayCameras",
+                              keyframe_interval=4)
+        counts = [store.append(records, poll_time)
+                  for poll_time, records in self.polls]
+        self.assertEqual(counts[0], {"added": 3, "changed": 0, "removed": 0})
+        self.assertEqual(counts[5], {"added": 0, "changed": 1, "removed": 1})
+        self.assertEqual(counts[7], {"added": 1, "changed": 1, "removed": 0})
+        # Unchanged polls write empty deltas.
+        sizes = [os.path.getsize(os.path.join(self.temp_dir, name))
+                 for name in sorted(os.listdir(self.temp_dir))
+                 if name.endswith(".rows")]
+        self.assertLess(sizes[1], sizes[0])
+        # Appending resumes from the stored state after reopening.
+        store = SnapshotStore(self.temp_dir, "HighwayCameras",
+                              keyframe_interval=4)
+        self.assertEqual(
+            store.append(self.polls[-1][1], datetime(2018, 1, 1, 9)),
+            {"added": 0, "changed": 0, "removed": 0})
+        self.assertRaises(ValueError, store.append, [],
+                          datetime(2018, 1, 1, 7))
+
+    def test_journal(self):
+        """Deltas are journaled and compacted into the index at keyframes.
+        """
+        store = self._create_store()
+        # Polls 8 and 9 follow the keyframe of poll 8.
+        with open(store.index_path) as index_file:
+            self.assertEqual(len(json.load(index_file)["polls"]), 9)
+        with open(store.journal_path) as journal_file:
+            self.assertEqual(len(journal_file.readlines()), 1)
+
+        # An interrupted journal write is discarded.
+        with open(store.journal_path, "a") as journal_file:
+            journal_file.write('{"time": ')
+        store = SnapshotStore(self.temp_dir, "HighwayCameras",
+                              keyframe_interval=4)
+        self.assertEqual(len(store), 10)
+        store.append(self.polls[-1][1], datetime(2018, 1, 1, 9))
+        store.append(self.polls[-1][1], datetime(2018, 1, 1, 9, 1))
+        self.assertTrue(store.get_snapshot(datetime(2018, 1, 1, 9, 1)))
+        store = SnapshotStore(self.temp_dir, "HighwayCameras",
+                              keyframe_interval=4)
+        self.assertEqual(len(store), 12)
+        self.assertEqual(store.get_snapshot(), self.polls[-1][1])
+
+        # The next keyframe empties the journal.
+        store.append(self.polls[-1][1], datetime(2018, 1, 1, 9, 2))
+        self.assertFalse(os.path.exists(store.journal_path))
+        with open(store.index_path) as index_file:
+            self.assertEqual(len(json.load(index_file)["polls"]), 13)
+
+
+if __name__ == '__main__':
+    unittest.main()
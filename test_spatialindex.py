@@ -0,0 +1,92 @@
+"""Unit tests for wsdottraffic.spatialindex
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import random
+import unittest
+
+from wsdottraffic.spatialindex import SpatialIndex, haversine_distance
+from wsdottraffic.tabledefs import get_key_fields, get_record_key
+
+CAMERAS = [
+    {"CameraID": 1, "Longitude": -122.30, "Latitude": 47.60},
+    {"CameraID": 2, "Longitude": -122.31, "Latitude": 47.61},
+    {"CameraID": 3, "Longitude": -121.00, "Latitude": 47.00},
+    # Invalid coordinates are not indexed.
+    {"CameraID": 4, "Longitude": 0, "Latitude": 0},
+]
+
+ALERT = {
+    "AlertID": 10,
+    "StartLongitude": -122.305,
+    "StartLatitude": 47.605,
+    "EndLongitude": -121.001,
+    "EndLatitude": 47.001,
+}
+
+
+class TestSpatialIndex(unittest.TestCase):
+    """Tests the SpatialIndex class."""
+
+    def setUp(self):
+        self.index = SpatialIndex.from_records(
+            CAMERAS, get_key_fields("HighwayCameras"))
+
+    def test_keys(self):
+        self.assertEqual(len(self.index), 4)
+        self.assertIn(4, self.index)
+        self.assertEqual(self.index.get(3), CAMERAS[2])
+        self.assertEqual(self.index.get_points(4), [])
+
+    def test_bbox(self):
+        self.assertEqual(self.index.bbox(-122.4, 47.5, -122.2, 47.7), {1, 2})
+        self.assertEqual(self.index.bbox(-180, -90, 180, 90), {1, 2, 3})
+        self.assertEqual(self.index.bbox(10, 10, 11, 11), set())
+
+    def test_within_distance(self):
+        results = self.index.within_distance(-122.30, 47.60, 2000)
+        self.assertEqual([key for _, key in results], [1, 2])
+        self.assertAlmostEqual(results[0][0], 0)
+
+    def test_nearest(self):
+        results = self.index.nearest(-121.1, 47.1, 2)
+        self.assertEqual([key for _, key in results], [3, 1])
+        self.assertEqual(self.index.nearest(-121.1, 47.1, 1, 100), [])
+
+    def test_near_record(self):
+        results = self.index.near_record(ALERT, 1000)
+        self.assertEqual(sorted(key for _, key in results), [1, 2, 3])
+
+    def test_apply_diff(self):
+        moved = dict(CAMERAS[0], Longitude=-121.0, Latitude=47.0)
+        self.index.apply_diff(added=[{"CameraID": 5, "Longitude": -100.0,
+                                      "Latitude": 40.0}],
+                              changed=[moved], removed=[2])
+        self.assertNotIn(2, self.index)
+        self.assertEqual(self.index.bbox(-122.4, 47.5, -122.2, 47.7), set())
+        self.assertEqual(self.index.bbox(-121.1, 46.9, -120.9, 47.1), {1, 3})
+        self.assertEqual(self.index.nearest(-100.0, 40.0)[0][1], 5)
+
+    def test_matches_brute_force(self):
+        rng = random.Random(42)
+        records = [{"Longitude": rng.uniform(-124.5, -117.0),
+                    "Latitude": rng.uniform(45.5, 49.0)}
+                   for _ in range(500)]
+        index = SpatialIndex.from_records(records)
+        for _ in range(20):
+            x, y = rng.uniform(-124.5, -117.0), rng.uniform(45.5, 49.0)
+            expected = sorted(
+                (haversine_distance(x, y, r["Longitude"], r["Latitude"]),
+                 get_record_key(r, None)) for r in records)
+            nearest = index.nearest(x, y, 5)
+            self.assertEqual([key for _, key in nearest],
+                             [key for _, key in expected[:5]])
+            within = index.within_distance(x, y, 20000)
+            self.assertEqual(
+                [key for _, key in within],
+                [key for dist, key in expected if dist <= 20000])
+
+
+if __name__ == '__main__':
+    unittest.main()
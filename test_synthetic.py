@@ -0,0 +1,107 @@
+"""Unit tests for wsdottraffic.synthetic.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from wsdottraffic import synthetic
+from wsdottraffic.jsonhelpers import parse_traveler_info_object
+from wsdottraffic.scanweb import WeatherReading, scanweb_json_hook
+from wsdottraffic.tabledefs import TABLE_DEFS_DICT_DICT
+from wsdottraffic.writers import open_writer
+
+
+def _parse(payload, object_hook=parse_traveler_info_object):
+    return json.loads(payload.decode("utf-8"), object_hook=object_hook)
+
+
+class SyntheticTest(unittest.TestCase):
+    """Tests generating synthetic API responses."""
+
+    def test_seed(self):
+        payload = synthetic.generate_payload("HighwayAlerts", 20, seed=1)
+        self.assertEqual(payload,
+                         synthetic.generate_payload("HighwayAlerts", 20,
+                                                    seed=1))
+        self.assertNotEqual(payload,
+                            synthetic.generate_payload("HighwayAlerts", 20,
+                                                       seed=2))
+
+    def test_size(self):
+        self.assertEqual(len(synthetic.generate_records("TravelTimes", 7)), 7)
+        self.assertEqual(
+            len(synthetic.generate_records("MountainPassConditions",
+                                           scale=10)),
+            synthetic.TYPICAL_COUNTS["MountainPassConditions"] * 10)
+        self.assertRaises(ValueError, synthetic.generate_records, "Foo", 1)
+
+    def test_wcf_format(self):
+        records = synthetic.generate_records("HighwayAlerts", 200, seed=3,
+                                             null_rate=0)
+        record = records[0]
+        self.assertIsInstance(record["StartRoadwayLocation"], dict)
+        self.assertRegex(record["StartTime"], r"^/Date\(\d+-0[78]00\)/$")
+        road_names = set(item["StartRoadwayLocation"]["RoadName"]
+                         for item in records)
+        self.assertTrue(any(" " in name or "-" in name for name in road_names))
+        self.assertTrue(any(name.isdigit() for name in road_names))
+
+    def test_parsed_fields(self):
+        """Parsed records have the fields of the table definitions."""
+        for name in synthetic.get_endpoint_names():
+            if name == "Scanweb":
+                continue
+            records = _parse(synthetic.generate_payload(name, 50, seed=0,
+                                                        null_rate=0))
+            fields = set(TABLE_DEFS_DICT_DICT[name]["fields"])
+            keys = set().union(*records)
+            if name == "BorderCrossings":
+                # The location's description is parsed as
+                # LocationDescription.
+                fields.remove("Description")
+                keys.remove("LocationDescription")
+            self.assertEqual(keys, fields, name)
+            key_fields = TABLE_DEFS_DICT_DICT[name].get("keyFields")
+            if key_fields:
+                # Key values are unique.
+                self.assertEqual(len(set(record[key_fields[0]]
+                                         for record in records)), 50, name)
+
+        record = _parse(synthetic.generate_payload("HighwayAlerts", 1,
+                                                   null_rate=0))[0]
+        self.assertIsInstance(record["StartTime"], datetime.datetime)
+        self.assertRegex(record["StartRoadName"], r"^\d{3}$")
+
+    def test_scanweb(self):
+        readings = _parse(synthetic.generate_payload("Scanweb", 10, seed=0),
+                          scanweb_json_hook)
+        self.assertEqual(len(readings), 10)
+        self.assertIsInstance(readings[0], WeatherReading)
+        self.assertIsInstance(readings[0].ReadingTime, datetime.datetime)
+        self.assertTrue(readings[0].SurfaceMeasurements)
+
+    def test_write(self):
+        """Synthetic records can be written by the writers."""
+        out_dir = tempfile.mkdtemp()
+        try:
+            out_path = os.path.join(out_dir, "Synthetic.pgcopy")
+            synthetic.write_payload(os.path.join(out_dir, "Alerts.json"),
+                                    "HighwayAlerts", 30, seed=0)
+            with open(os.path.join(out_dir, "Alerts.json"), "rb") as in_file:
+                records = _parse(in_file.read())
+            with open_writer(out_path) as writer:
+                writer.write_table("HighwayAlerts", records)
+            with open(os.path.join(out_path, "HighwayAlerts.copy")) as copy:
+                self.assertEqual(len(copy.read().splitlines()), 30)
+        finally:
+            shutil.rmtree(out_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
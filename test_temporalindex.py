@@ -0,0 +1,78 @@
+"""Unit tests for wsdottraffic.temporalindex
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import unittest
+from datetime import datetime
+
+from wsdottraffic.tabledefs import get_key_fields
+from wsdottraffic.temporalindex import TemporalIndex
+
+ALERTS = [
+    {"AlertID": 1, "StartTime": datetime(2018, 1, 1, 8),
+     "EndTime": datetime(2018, 1, 1, 10),
+     "LastUpdatedTime": datetime(2018, 1, 1, 7)},
+    # No end time: active indefinitely.
+    {"AlertID": 2, "StartTime": datetime(2018, 1, 1, 9), "EndTime": None,
+     "LastUpdatedTime": datetime(2018, 1, 1, 9)},
+]
+
+RESTRICTIONS = [
+    {"StateRouteID": "005", "DateEffective": datetime(2017, 6, 1),
+     "DateExpires": datetime(2018, 6, 1)},
+]
+
+
+class TestTemporalIndex(unittest.TestCase):
+    """Tests the TemporalIndex class."""
+
+    def setUp(self):
+        self.index = TemporalIndex()
+        self.index.apply_snapshot("HighwayAlerts", ALERTS,
+                                  get_key_fields("HighwayAlerts"))
+        self.restriction_key = self.index.apply_snapshot(
+            "CVRestrictions", RESTRICTIONS, None,
+            seen_time=datetime(2018, 1, 1, 12))[0][0]
+
+    def test_active_at(self):
+        self.assertEqual(self.index.active_at(datetime(2018, 1, 1, 9, 30)), [
+            ("CVRestrictions", self.restriction_key),
+            ("HighwayAlerts", 1), ("HighwayAlerts", 2)])
+        self.assertEqual(self.index.active_at(datetime(2030, 1, 1)),
+                         [("HighwayAlerts", 2)])
+        self.assertEqual(
+            self.index.active_at(datetime(2018, 1, 1, 9, 30),
+                                 datasets=["HighwayAlerts"]),
+            [("HighwayAlerts", 1), ("HighwayAlerts", 2)])
+
+    def test_active_during(self):
+        self.assertEqual(
+            self.index.active_during(datetime(2018, 1, 1, 6),
+                                     datetime(2018, 1, 1, 8, 30)),
+            [("CVRestrictions", self.restriction_key), ("HighwayAlerts", 1)])
+
+    def test_snapshots(self):
+        changed = dict(ALERTS[0], EndTime=datetime(2018, 1, 1, 11),
+                       LastUpdatedTime=datetime(2018, 1, 1, 10))
+        added = {"AlertID": 3, "StartTime": datetime(2018, 1, 2)}
+        result = self.index.apply_snapshot(
+            "HighwayAlerts", [changed, added], get_key_fields("HighwayAlerts"),
+            seen_time=datetime(2018, 1, 1, 13))
+        self.assertEqual(result, ([3], [1], [2]))
+        self.assertNotIn(("HighwayAlerts", 2), self.index)
+        self.assertEqual(self.index.changed_since(datetime(2018, 1, 1, 9)), [
+            ("HighwayAlerts", 1), ("CVRestrictions", self.restriction_key),
+            ("HighwayAlerts", 3)])
+        self.assertEqual(self.index.get_updated_time("HighwayAlerts", 3),
+                         datetime(2018, 1, 1, 13))
+        # Unchanged records keep their update times.
+        self.assertEqual(self.index.apply_snapshot(
+            "HighwayAlerts", [changed, added], get_key_fields("HighwayAlerts"),
+            seen_time=datetime(2018, 1, 1, 14)), ([], [], []))
+        self.assertEqual(self.index.get_updated_time("HighwayAlerts", 3),
+                         datetime(2018, 1, 1, 13))
+
+
+if __name__ == '__main__':
+    unittest.main()
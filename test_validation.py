@@ -0,0 +1,93 @@
+"""Unit tests for wsdottraffic.validation
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from wsdottraffic.validation import validate_records, write_quarantine
+
+TABLE_DEF_DICT = {
+    "fields": {
+        "Name": {"field_type": "TEXT", "field_length": 5},
+        "Speed": "DOUBLE",
+        "Lanes": "SHORT",
+        "Updated": "DATE",
+        "Longitude": "DOUBLE",
+    }
+}
+
+
+class TestValidation(unittest.TestCase):
+    """Tests validation of records against table definitions."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_validate(self):
+        time = datetime.datetime(2018, 1, 2, 3, 4, 5)
+        records = [
+            {"Name": "abc", "Speed": 55, "Lanes": 2.0, "Updated": time},
+            {"Name": None, "Speed": None, "Longitude": "not checked"},
+            {"Name": "abcdef", "Speed": "fast", "Lanes": 2},
+            {"Lanes": 1.5},
+            {"Lanes": 40000, "Updated": "2018-01-02"},
+        ]
+        result = validate_records(records, TABLE_DEF_DICT, ("Longitude",))
+        self.assertEqual(result.valid_indices, [0, 1])
+        self.assertEqual(sorted(result.errors), [2, 3, 4])
+        self.assertEqual(len(result.errors[2]), 2)
+        self.assertTrue(result.errors[2][0].startswith("Name: "))
+        self.assertTrue(result.errors[2][1].startswith("Speed: "))
+        self.assertEqual(len(result.errors[4]), 2)
+
+    def test_valid_columns(self):
+        """Columns that pass the whole-column checks have no errors, and a
+        single invalid value is still found.
+        """
+        table_def_dict = dict(TABLE_DEF_DICT)
+        table_def_dict["fields"] = dict(TABLE_DEF_DICT["fields"],
+                                        ID="GUID")
+        time = datetime.datetime(2018, 1, 2, 3, 4, 5)
+        records = [
+            {"Name": "abcde", "Speed": 1.5, "Lanes": 32767,
+             "Updated": time.date(),
+             "ID": "{12345678-1234-1234-1234-123456789ABC}"},
+            {"Name": "", "Speed": 2, "Lanes": -32768, "Updated": time,
+             "ID": None},
+        ] * 50
+        self.assertEqual(validate_records(records, table_def_dict).errors,
+                         {})
+        records = [dict(record) for record in records]
+        records[75]["Lanes"] = 32768
+        records[30]["ID"] = "1234"
+        self.assertEqual(
+            sorted(validate_records(records, table_def_dict).errors),
+            [30, 75])
+
+    def test_quarantine(self):
+        records = [{"Name": "abc"}, {"Name": "abcdef"}]
+        result = validate_records(records, TABLE_DEF_DICT)
+        path = os.path.join(self.directory, "quarantine.jsonl")
+        time = datetime.datetime(2018, 1, 2)
+        write_quarantine(path, "Test", records, result.errors, time)
+        write_quarantine(path, "Test", records, result.errors, time)
+        with open(path) as quarantine_file:
+            lines = [json.loads(line) for line in quarantine_file]
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]["table"], "Test")
+        self.assertEqual(lines[0]["time"], "2018-01-02T00:00:00")
+        self.assertEqual(lines[0]["record"], {"Name": "abcdef"})
+        self.assertEqual(lines[0]["errors"], result.errors[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
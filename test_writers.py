@@ -0,0 +1,150 @@
+"""Unit tests for wsdottraffic.writers and its output formats.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from wsdottraffic import geopackage, pgcopy, writers
+from wsdottraffic.geoparquet import pyarrow
+
+CAMERAS = [
+    {"CameraID": 1, "Title": "One", "IsActive": True,
+     "Latitude": 47.0, "Longitude": -122.0},
+    {"CameraID": 2, "Title": "Two\tTabbed", "IsActive": False,
+     "Latitude": 46.0, "Longitude": -121.0},
+]
+
+ALERTS = [
+    {"AlertID": 1, "StartTime": datetime.datetime(2018, 1, 2, 3, 4, 5),
+     "StartLatitude": 47.6, "StartLongitude": -122.3,
+     "EndLatitude": 47.7, "EndLongitude": -122.2},
+]
+
+
+class ChooseFormatTest(unittest.TestCase):
+    """Tests picking the output format."""
+
+    def test_choose_format(self):
+        self.assertEqual(writers.choose_format("Out.gpkg"), "gpkg")
+        self.assertEqual(writers.choose_format("Out.pgcopy/"), "copy")
+        # Unknown extensions use the fastest available format.
+        self.assertEqual(writers.choose_format("Out.db"), "gpkg")
+        self.assertEqual(writers.choose_format("Out.gpkg", "copy"), "copy")
+        self.assertRaises(ValueError, writers.choose_format, "Out.gpkg",
+                          "shapefile")
+
+
+class WriterTest(unittest.TestCase):
+    """Tests writing tables with each of the writers."""
+
+    def setUp(self):
+        self.out_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.out_dir)
+
+    def test_geopackage(self):
+        gpkg_path = os.path.join(self.out_dir, "Test.gpkg")
+        with writers.open_writer(gpkg_path) as writer:
+            self.assertIsInstance(writer, geopackage.GeoPackageWriter)
+            writer.write_table("HighwayCameras", CAMERAS[:1])
+            writer.append("HighwayCameras", CAMERAS[1:])
+            writers.write_traveler_info(writer, ["TravelTimes"],
+                                        skip_data=True)
+
+        cameras = [dict(CAMERAS[0], Title="Uno"),
+                   {"CameraID": 3, "Latitude": 45.0, "Longitude": -120.0}]
+        with writers.open_writer(gpkg_path) as writer:
+            writer.write_table("HighwayCameras", cameras, sync=True)
+
+        conn = geopackage.connect(gpkg_path)
+        try:
+            # Updated rows keep their fids.
+            self.assertEqual(conn.execute(
+                "SELECT fid, CameraID, Title FROM HighwayCameras ORDER BY fid"
+            ).fetchall(), [(1, 1, "Uno"), (3, 3, None)])
+            self.assertEqual(conn.execute(
+                "SELECT id, minx FROM rtree_HighwayCameras_geom ORDER BY id"
+            ).fetchall(), [(1, -122.0), (3, -120.0)])
+            self.assertEqual(conn.execute(
+                "SELECT min_x, max_x FROM gpkg_contents WHERE "
+                "table_name = 'HighwayCameras'").fetchone(), (-122.0, -120.0))
+            self.assertTrue(geopackage._table_exists(conn, "TravelTimes"))
+        finally:
+            conn.close()
+
+    def test_copy(self):
+        out_path = os.path.join(self.out_dir, "Test.pgcopy")
+        with writers.open_writer(out_path) as writer:
+            writer.write_table("HighwayCameras", CAMERAS)
+            writer.write_table("HighwayAlerts", ALERTS, sync=True)
+        with io.open(os.path.join(out_path, "HighwayCameras.copy"),
+                     encoding="utf-8") as copy_file:
+            lines = copy_file.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        values = lines[1].split("\t")
+        self.assertEqual(values[0], "SRID=4326;POINT(-121.0 46.0)")
+        self.assertIn("Two\\tTabbed", values)
+        self.assertIn("0", values)
+        self.assertIn("\\N", values)
+        with io.open(os.path.join(out_path, "HighwayAlerts.copy"),
+                     encoding="utf-8") as copy_file:
+            self.assertIn("SRID=4326;MULTIPOINT((-122.3 47.6),(-122.2 47.7))"
+                          "\t", copy_file.read())
+
+        with io.open(os.path.join(out_path, pgcopy.SCRIPT_NAME),
+                     encoding="utf-8") as script_file:
+            script = script_file.read()
+        self.assertIn('"geom" geometry(Point, 4326)', script)
+        self.assertIn('TRUNCATE "HighwayCameras";\n\\copy "HighwayCameras"',
+                      script)
+        self.assertIn('\\copy "HighwayAlerts_staging"', script)
+        self.assertIn('WHERE t."AlertID" = s."AlertID"', script)
+        self.assertTrue(script.endswith("COMMIT;\n"))
+
+    def test_copy_not_finalized(self):
+        """The script is only written if all of the tables are."""
+        out_path = os.path.join(self.out_dir, "Test.pgcopy")
+        try:
+            with pgcopy.CopyWriter(out_path) as writer:
+                writer.write_table("HighwayCameras", CAMERAS)
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertFalse(os.path.exists(os.path.join(out_path,
+                                                     pgcopy.SCRIPT_NAME)))
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        import pyarrow.parquet as pyarrow_parquet
+        out_path = os.path.join(self.out_dir, "Test.parquet")
+        with writers.open_writer(out_path) as writer:
+            writer.write_table("HighwayCameras", CAMERAS[:1])
+            writer.write_table("HighwayAlerts", ALERTS)
+        with writers.open_writer(out_path) as writer:
+            writer.append("HighwayCameras", CAMERAS[1:])
+
+        table = pyarrow_parquet.read_table(
+            os.path.join(out_path, "HighwayCameras.parquet"))
+        self.assertEqual(table.column("CameraID").to_pylist(), [1, 2])
+        self.assertEqual(table.column("IsActive").to_pylist(), [1, 0])
+        geo = json.loads(table.schema.metadata[b"geo"].decode("utf-8"))
+        self.assertEqual(geo["columns"]["geometry"]["geometry_types"],
+                         ["Point"])
+
+        table = pyarrow_parquet.read_table(
+            os.path.join(out_path, "HighwayAlerts.parquet"))
+        self.assertEqual(
+            table.column("StartTime").to_pylist()[0].replace(tzinfo=None),
+            ALERTS[0]["StartTime"])
+
+
+if __name__ == '__main__':
+    unittest.main()
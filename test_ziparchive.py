@@ -0,0 +1,117 @@
+"""Unit tests for wsdottraffic.ziparchive
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+try:
+    from unittest import mock
+except ImportError:  # pragma: no cover
+    import mock  # pylint:disable=import-error
+
+from wsdottraffic.ziparchive import (COMPARE_HASH, COMPRESSIONS,
+                                     get_manifest_path, zip_directory)
+
+
+class TestZipArchive(unittest.TestCase):
+    """Tests writing directories to ZIP archives."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.gdb_path = os.path.join(self.directory, "Test.gdb")
+        os.makedirs(os.path.join(self.gdb_path, "sub"))
+        self.contents = {
+            "Test.gdb/a00000001.gdbtable": b"table" * 1000,
+            "Test.gdb/gdb": b"",
+            "Test.gdb/sub/b.txt": os.urandom(5000),
+        }
+        for name, data in self.contents.items():
+            self._write(name, data)
+        self._write("Test.gdb/_gdb.host.1234.sr.lock", b"lock")
+        self.zip_path = self.gdb_path + ".zip"
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, data):
+        with open(os.path.join(self.directory, name), "wb") as out_file:
+            out_file.write(data)
+
+    def _check_archive(self, contents):
+        with zipfile.ZipFile(self.zip_path) as zip_file:
+            self.assertIsNone(zip_file.testzip())
+            self.assertEqual(zip_file.namelist(), sorted(contents))
+            for name, data in contents.items():
+                self.assertEqual(zip_file.read(name), data)
+
+    def test_compressions(self):
+        for compression in COMPRESSIONS:
+            stats = zip_directory(self.gdb_path, compression=compression,
+                                  max_workers=2)
+            self.assertEqual(stats["compressed"], 3)
+            self.assertEqual(stats["reused"], 0)
+            self.assertEqual(stats["skipped"], 1)
+            self._check_archive(self.contents)
+            self.assertFalse(os.path.exists(get_manifest_path(self.zip_path)))
+
+    def test_incremental(self):
+        for compare in (None, COMPARE_HASH):
+            kwargs = {"compare": compare} if compare else {}
+            stats = zip_directory(self.gdb_path, incremental=True, **kwargs)
+            self.assertEqual(stats["compressed"], 3)
+            self.assertTrue(os.path.exists(get_manifest_path(self.zip_path)))
+
+            stats = zip_directory(self.gdb_path, incremental=True, **kwargs)
+            self.assertEqual((stats["compressed"], stats["reused"]), (0, 3))
+            self._check_archive(self.contents)
+
+            contents = dict(self.contents)
+            contents["Test.gdb/sub/b.txt"] = os.urandom(4000)
+            contents["Test.gdb/c.txt"] = b"new"
+            for name in ("Test.gdb/sub/b.txt", "Test.gdb/c.txt"):
+                self._write(name, contents[name])
+            stats = zip_directory(self.gdb_path, incremental=True, **kwargs)
+            self.assertEqual((stats["compressed"], stats["reused"]), (2, 2))
+            self._check_archive(contents)
+
+            # Different settings invalidate the previous members.
+            stats = zip_directory(self.gdb_path, incremental=True, level=1,
+                                  **kwargs)
+            self.assertEqual((stats["compressed"], stats["reused"]), (4, 0))
+            self._check_archive(contents)
+
+            os.remove(os.path.join(self.directory, "Test.gdb/c.txt"))
+            self._write("Test.gdb/sub/b.txt", self.contents["Test.gdb/sub/b.txt"])
+            os.remove(self.zip_path)
+
+    def test_file_changed_after_stat(self):
+        """A file that grows while it is archived gets a consistent size and
+        CRC.
+        """
+        stat = os.stat
+        name = "Test.gdb/sub/b.txt"
+        contents = dict(self.contents)
+        contents[name] += b"appended"
+
+        def stat_and_append(path, *args, **kwargs):
+            result = stat(path, *args, **kwargs)
+            if path.endswith("b.txt"):
+                self._write(name, contents[name])
+            return result
+
+        with mock.patch("os.stat", stat_and_append):
+            zip_directory(self.gdb_path, max_workers=1)
+        self._check_archive(contents)
+
+    def test_invalid_compression(self):
+        self.assertRaises(ValueError, zip_directory, self.gdb_path,
+                          compression="zstd")
+
+
+if __name__ == '__main__':
+    unittest.main()
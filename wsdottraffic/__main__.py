@@ -3,21 +3,14 @@ Returns data from the WSDOT Traveler Info REST endpoints.
 '''
 
 import os
-import json
 import logging
 from argparse import ArgumentParser
 
 from . import (URLS, _DEFAULT_ACCESS_CODE,
                get_traveler_info, ENVIRONMENT_VAR_NAME)
-from .jsonhelpers import CustomEncoder, dict_list_to_geojson
-from .fielddetection import FieldInfo
-
-
-def _field_serializer(the_object):
-    if isinstance(the_object, FieldInfo):
-        return the_object.__dict__
-    else:
-        return the_object
+from .compression import COMPRESSIONS, COMPRESSION_NONE, is_available
+from .fanout import (OUTPUT_FORMATS, FORMAT_JSON, OutputWriterThread,
+                     write_outputs)
 
 
 CODE = _DEFAULT_ACCESS_CODE
@@ -35,32 +28,52 @@ def main():
         "api-code", nargs="?",
         help="WSDOT Traveler API code. This parameter can be omitted if the %s\
  environment variable is defined." % ENVIRONMENT_VAR_NAME)
-    arg_parser.parse_args()
+    arg_parser.add_argument(
+        "--writer-thread", action="store_true",
+        help="Write files on a background thread so that the next endpoint\
+ is downloaded while the previous one is being written.")
+    arg_parser.add_argument(
+        "--format", choices=OUTPUT_FORMATS, default=FORMAT_JSON,
+        dest="output_format",
+        help="json: indented JSON (default). compact: minified JSON. rows:\
+ binary row format for the data (see wsdottraffic.rowformat) with minified\
+ field and GeoJSON files.")
+    arg_parser.add_argument(
+        "--compress", choices=COMPRESSIONS, default=COMPRESSION_NONE,
+        help="Compress the output files. zstd requires the zstandard package.")
+    arg_parser.add_argument(
+        "--compress-level", type=int,
+        help="Compression level. Defaults to the compressor's default.")
+    args = arg_parser.parse_args()
+    if not is_available(args.compress):
+        arg_parser.error(
+            "The zstandard package must be installed to use zstd compression.")
+    output_options = {
+        "indent": True,
+        "output_format": args.output_format,
+        "compression": args.compress,
+        "level": args.compress_level
+    }
     # Create the output directory if not already present.
     if not os.path.exists(OUTDIR):
         os.mkdir(OUTDIR)
-    for endpoint_name in URLS:
-        # Get the features via the API.
-        features = get_traveler_info(endpoint_name, CODE)
-        # Extract field definitions
-        fields = FieldInfo.from_features(features)
-
-        # Write data and field info to JSON files.
-        out_path = os.path.join(OUTDIR, "%s.json" % endpoint_name)
-        with open(out_path, 'w') as json_file:
-            json.dump(
-                features, json_file, cls=CustomEncoder, indent=True)
-        out_path = os.path.join(OUTDIR, "%s_fields.json" % endpoint_name)
-        with open(out_path, 'w') as json_file:
-            json.dump(
-                fields, json_file, indent=True, default=_field_serializer)
 
-        # dump geojson
-        geojson = dict_list_to_geojson(features)
-        out_path = os.path.join(OUTDIR, "%s.geojson" % endpoint_name)
-        with open(out_path, 'w') as json_file:
-            json.dump(
-                geojson, json_file, cls=CustomEncoder, indent=True)
+    writer = None
+    if args.writer_thread:
+        writer = OutputWriterThread(OUTDIR, **output_options)
+    try:
+        for endpoint_name in URLS:
+            # Get the features via the API.
+            features = get_traveler_info(endpoint_name, CODE)
+            # Write data, field info and GeoJSON files in a single pass.
+            if writer:
+                writer.submit(endpoint_name, features)
+            else:
+                write_outputs(endpoint_name, features, OUTDIR,
+                              **output_options)
+    finally:
+        if writer:
+            writer.close()
 
 
 if __name__ == '__main__':
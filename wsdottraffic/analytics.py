@@ -0,0 +1,343 @@
+"""Vectorized analytics for TravelTimes and TrafficFlow history.
+
+Snapshots (lists of records, e.g. from SnapshotStore.iter_snapshots) are
+converted once into NumPy arrays with a row per poll and a column per
+TravelTimeID or FlowDataID. Rolling windows, percentiles, congestion ratios,
+anomalies and flow-level distributions are then computed with array
+operations instead of Python loops over dicts.
+
+Requires the numpy package.
+
+Example
+-------
+::
+
+    history = TravelTimeHistory.from_snapshots(store.iter_snapshots())
+    ratios = congestion_ratio(history.current, history.average)
+    smoothed = rolling_mean(ratios, 15)
+    slow = anomalies(history.current, 60, 3.0)
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import warnings
+from collections import namedtuple
+
+from .flowarchive import (FLOW_READING_VALUES, MISSING_CODE, get_flow_code,
+                          to_timestamp)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _check_numpy():
+    if numpy is None:
+        raise ImportError("The numpy package is required for analytics.")
+
+
+def align_snapshots(snapshots, key_field, value_fields, dtype="float64",
+                    missing=None, converter=None):
+    """Converts a sequence of snapshots into arrays aligned by record ID.
+
+    Parameters
+    ----------
+    snapshots : iterable
+        (time, records) tuples, ordered by time. Times are naive UTC
+        datetimes.
+    key_field : str
+        Field that identifies a record (e.g., "TravelTimeID").
+    value_fields : sequence of str
+        Fields to extract.
+    dtype : str, optional
+        Data type of the value arrays.
+    missing : optional
+        Value used where a record is missing from a snapshot. Defaults to
+        NaN.
+    converter : callable, optional
+        Function applied to each value before it is stored.
+
+    Returns
+    -------
+    tuple
+        An array of the sorted IDs, a datetime64[ms] array of the snapshot
+        times, and a dict of 2D value arrays (snapshots by IDs) keyed by
+        field name.
+    """
+    _check_numpy()
+    times = []
+    rows = []
+    ids = set()
+    for time, records in snapshots:
+        times.append(to_timestamp(time))
+        rows.append(records)
+        ids.update(record[key_field] for record in records
+                   if record.get(key_field) is not None)
+    ids = sorted(ids)
+    columns = dict((record_id, i) for i, record_id in enumerate(ids))
+    if missing is None:
+        missing = numpy.nan
+    values = dict(
+        (field, numpy.full((len(rows), len(ids)), missing, dtype=dtype))
+        for field in value_fields)
+    for row, records in enumerate(rows):
+        for record in records:
+            column = columns.get(record.get(key_field))
+            if column is None:
+                continue
+            for field in value_fields:
+                value = record.get(field)
+                if converter is not None:
+                    value = converter(value)
+                if value is not None:
+                    values[field][row, column] = value
+    return (numpy.array(ids), numpy.array(times, dtype="datetime64[ms]"),
+            values)
+
+
+class TravelTimeHistory(namedtuple("TravelTimeHistory",
+                                   ("ids", "times", "current", "average"))):
+    """TravelTimes history aligned by TravelTimeID.
+
+    ids: the TravelTimeIDs (one per column).
+    times: the datetime64[ms] snapshot times (one per row).
+    current: CurrentTime values. NaN where a route is missing or unknown.
+    average: AverageTime values. NaN where a route is missing or unknown.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_snapshots(cls, snapshots):
+        """Creates a history from (time, records) tuples."""
+        ids, times, values = align_snapshots(
+            snapshots, "TravelTimeID", ("CurrentTime", "AverageTime"))
+        # The API reports unknown travel times as 0.
+        for array in values.values():
+            array[array <= 0] = numpy.nan
+        return cls(ids, times, values["CurrentTime"], values["AverageTime"])
+
+
+class FlowHistory(namedtuple("FlowHistory", ("ids", "times", "codes"))):
+    """TrafficFlow history aligned by FlowDataID.
+
+    ids: the FlowDataIDs (one per column).
+    times: the datetime64[ms] snapshot times (one per row).
+    codes: uint8 FlowReadingValues codes. MISSING_CODE where a station is
+        missing.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_snapshots(cls, snapshots):
+        """Creates a history from (time, records) tuples."""
+        ids, times, values = align_snapshots(
+            snapshots, "FlowDataID", ("FlowReadingValue",), dtype="uint8",
+            missing=MISSING_CODE, converter=get_flow_code)
+        return cls(ids, times, values["FlowReadingValue"])
+
+    @classmethod
+    def from_archive(cls, archive):
+        """Copies the polls of a FlowArchive into a history."""
+        _check_numpy()
+        ids = numpy.zeros(len(archive.stations), dtype="int64")
+        for flow_data_id, station in archive.stations.items():
+            ids[station["column"]] = int(flow_data_id)
+        with archive.open_matrix() as matrix:
+            times, codes = matrix.to_numpy()
+            history = cls(ids, times.copy(), codes.copy())
+            del times, codes
+        return history
+
+
+def _window_sums(values, window):
+    """Returns the sums of trailing windows of up to window rows."""
+    sums = numpy.cumsum(values, axis=0)
+    sums[window:] -= sums[:-window].copy()
+    return sums
+
+
+def _rolling_stats(values, window, with_std):
+    """Returns the rolling means (and standard deviations) of the finite
+    values along the first axis of an array, over trailing windows of up to
+    window rows.
+    """
+    if window < 1:
+        raise ValueError("window must be at least 1.")
+    finite = numpy.isfinite(values)
+    filled = numpy.where(finite, values, 0.0)
+    counts = _window_sums(finite.astype("float64"), window)
+    empty = counts == 0
+    counts[empty] = numpy.nan
+    means = _window_sums(filled, window)
+    means /= counts
+    if not with_std:
+        return means, None
+    variances = _window_sums(filled * filled, window)
+    variances /= counts
+    variances -= means * means
+    # Remove rounding errors of windows with constant values.
+    variances[variances < 1e-12 * means * means] = 0.0
+    return means, numpy.sqrt(variances)
+
+
+def rolling_mean(values, window):
+    """Returns the mean of each trailing window of rows (snapshots),
+    ignoring NaN values. The result is NaN where a window has no values.
+    """
+    _check_numpy()
+    values = numpy.asarray(values, dtype="float64")
+    with numpy.errstate(invalid="ignore"):
+        return _rolling_stats(values, window, False)[0]
+
+
+def rolling_std(values, window):
+    """Returns the population standard deviation of each trailing window of
+    rows (snapshots), ignoring NaN values.
+    """
+    _check_numpy()
+    values = numpy.asarray(values, dtype="float64")
+    with numpy.errstate(invalid="ignore"):
+        return _rolling_stats(values, window, True)[1]
+
+
+def percentiles(values, q):
+    """Returns percentiles of each column (record) over all of the rows
+    (snapshots), ignoring NaN values.
+
+    Parameters
+    ----------
+    values : array
+        2D array of snapshots by records.
+    q : float or sequence of float
+        Percentiles between 0 and 100.
+
+    Returns
+    -------
+    array
+        An array with a row per percentile (or a 1D array if q is a single
+        value) and a column per record.
+    """
+    _check_numpy()
+    values = numpy.asarray(values, dtype="float64")
+    if not numpy.isnan(values).any():
+        return numpy.percentile(values, q, axis=0)
+    with warnings.catch_warnings():
+        # All-NaN columns produce NaN.
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return numpy.nanpercentile(values, q, axis=0)
+
+
+def congestion_ratio(current, average):
+    """Returns the ratio of current to average travel times. The ratio is
+    NaN where either time is missing or the average is not positive.
+    """
+    _check_numpy()
+    current = numpy.asarray(current, dtype="float64")
+    average = numpy.asarray(average, dtype="float64")
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+        return numpy.where(average > 0, current / average, numpy.nan)
+
+
+def anomalies(values, window, threshold=3.0):
+    """Flags values that are far from the values preceding them.
+
+    Each value is compared to the mean and standard deviation of the window
+    of rows (snapshots) before it.
+
+    Parameters
+    ----------
+    values : array
+        2D array of snapshots by records.
+    window : int
+        Number of preceding snapshots used for the statistics.
+    threshold : float, optional
+        Number of standard deviations beyond which a value is an anomaly.
+
+    Returns
+    -------
+    tuple
+        A boolean array of anomalies and a float array of z-scores (NaN where
+        there is not enough history or no variation).
+    """
+    _check_numpy()
+    values = numpy.asarray(values, dtype="float64")
+    with numpy.errstate(invalid="ignore"):
+        means, stds = _rolling_stats(values, window, True)
+    scores = numpy.full(values.shape, numpy.nan)
+    # Compare each row to the statistics of the window ending at the row
+    # before it.
+    stds = stds[:-1]
+    stds[stds == 0] = numpy.nan
+    with numpy.errstate(invalid="ignore"):
+        numpy.subtract(values[1:], means[:-1], out=scores[1:])
+        scores[1:] /= stds
+        flags = numpy.abs(scores) > threshold
+    return flags, scores
+
+
+def group_ids(ids, stations, field="Region"):
+    """Assigns record IDs to groups by an attribute (e.g., the Region of
+    TrafficFlow stations).
+
+    Parameters
+    ----------
+    ids : array
+        Record IDs (e.g., FlowHistory.ids).
+    stations : dict
+        Records or station attributes keyed by ID, e.g. FlowArchive.stations
+        or a dict of the latest TrafficFlow records by FlowDataID.
+    field : str, optional
+        Attribute used for grouping.
+
+    Returns
+    -------
+    tuple
+        The sorted group names and an int array with the group index of each
+        ID (-1 for IDs without the attribute).
+    """
+    _check_numpy()
+    names = []
+    for record_id in ids:
+        station = stations.get(record_id)
+        if station is None:
+            station = stations.get(str(record_id), {})
+        names.append(station.get(field))
+    groups = sorted(set(name for name in names if name is not None))
+    positions = dict((name, i) for i, name in enumerate(groups))
+    index = numpy.array([positions.get(name, -1) for name in names],
+                        dtype="int64")
+    return groups, index
+
+
+def flow_distribution(codes, group_index, group_count):
+    """Counts the stations at each flow level, by group, for each snapshot.
+
+    Parameters
+    ----------
+    codes : array
+        2D uint8 array of FlowReadingValues codes (e.g., FlowHistory.codes).
+    group_index : array
+        Group index of each column (see group_ids). Columns with a negative
+        index are ignored.
+    group_count : int
+        Number of groups.
+
+    Returns
+    -------
+    array
+        An int array of counts with the shape (snapshots, groups, flow
+        levels), where the flow levels are the FlowReadingValues codes.
+    """
+    _check_numpy()
+    codes = numpy.asarray(codes)
+    level_count = len(FLOW_READING_VALUES)
+    snapshot_count = codes.shape[0]
+    group_index = numpy.asarray(group_index, dtype="int64")
+    valid = (codes < level_count) & (group_index >= 0)[numpy.newaxis, :]
+    rows = numpy.arange(snapshot_count, dtype="int64")[:, numpy.newaxis]
+    bins = ((rows * group_count + group_index[numpy.newaxis, :]) *
+            level_count + codes.astype("int64"))
+    counts = numpy.bincount(
+        bins[valid], minlength=snapshot_count * group_count * level_count)
+    return counts.reshape(snapshot_count, group_count, level_count)
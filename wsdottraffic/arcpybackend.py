@@ -0,0 +1,58 @@
+"""Selects the arcpy implementation used by wsdottraffic.gp.
+
+By default, wsdottraffic.gp uses arcpy. Set the WSDOT_TRAFFIC_ARCPY
+environment variable to "offline" before wsdottraffic.gp is imported to use
+wsdottraffic.offlinearcpy, an in-memory stand-in that runs without ArcGIS
+and counts and times every geoprocessing operation:
+
+    WSDOT_TRAFFIC_ARCPY=offline python -m wsdottraffic.gp --schema-only
+
+Modules that need arcpy import it from here:
+
+    from ..arcpybackend import arcpy
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+
+ARCPY_VAR_NAME = "WSDOT_TRAFFIC_ARCPY"
+
+BACKEND_ARCPY = "arcpy"
+BACKEND_OFFLINE = "offline"
+
+BACKENDS = (BACKEND_ARCPY, BACKEND_OFFLINE)
+
+
+def get_backend_name():
+    """Returns the name of the selected backend (one of BACKENDS)."""
+    name = os.environ.get(ARCPY_VAR_NAME, BACKEND_ARCPY).strip().lower()
+    if name not in BACKENDS:
+        raise ValueError("Invalid %s value: %s. Must be one of %s" % (
+            ARCPY_VAR_NAME, name, BACKENDS))
+    return name
+
+
+def load_arcpy(backend=None):
+    """Imports and returns the arcpy module of a backend.
+
+    Parameters
+    ----------
+    backend : str, optional
+        One of BACKENDS. Defaults to get_backend_name().
+    """
+    if backend is None:
+        backend = get_backend_name()
+    if backend == BACKEND_OFFLINE:
+        from . import offlinearcpy
+        return offlinearcpy
+    import arcpy as esri_arcpy
+    return esri_arcpy
+
+
+def is_offline():
+    """Returns True if the offline backend is in use."""
+    return arcpy.__name__.endswith(".offlinearcpy")
+
+
+arcpy = load_arcpy()  # pylint: disable=invalid-name
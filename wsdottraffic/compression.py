@@ -0,0 +1,119 @@
+"""Helpers for opening optionally compressed output and input files.
+
+gzip support comes from the standard library. zstd support requires the
+optional zstandard package.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import gzip
+import io
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_NONE = "none"
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+
+COMPRESSIONS = (COMPRESSION_NONE, COMPRESSION_GZIP, COMPRESSION_ZSTD)
+
+# File name extension added for each type of compression.
+EXTENSIONS = {
+    COMPRESSION_NONE: "",
+    COMPRESSION_GZIP: ".gz",
+    COMPRESSION_ZSTD: ".zst",
+}
+
+
+def _check_compression(compression):
+    if compression not in COMPRESSIONS:
+        raise ValueError("Unsupported compression: %s. Must be one of %s" % (
+            compression, COMPRESSIONS))
+    if not is_available(compression):
+        raise ImportError(
+            "The zstandard package is required for zstd compression.")
+
+
+def is_available(compression):
+    """Returns True if the libraries needed for a type of compression are
+    installed.
+    """
+    return compression != COMPRESSION_ZSTD or zstandard is not None
+
+
+def get_compression(path):
+    """Determines the compression of a file from its extension.
+    """
+    for compression, extension in EXTENSIONS.items():
+        if extension and path.endswith(extension):
+            return compression
+    return COMPRESSION_NONE
+
+
+def add_extension(path, compression=None):
+    """Appends the extension for a type of compression to a path.
+    """
+    return path + EXTENSIONS[compression or COMPRESSION_NONE]
+
+
+def open_output(path, compression=None, level=None, text=False):
+    """Opens a file for writing, compressing the data as it is written.
+
+    Parameters
+    ----------
+    path : str
+        Path of the output file. The compression extension is NOT added.
+    compression : str, optional
+        One of COMPRESSIONS. Defaults to no compression.
+    level : int, optional
+        Compression level. Defaults to the compressor's default.
+    text : bool, optional
+        Set to True to return a UTF-8 text stream instead of a binary one.
+    """
+    compression = compression or COMPRESSION_NONE
+    _check_compression(compression)
+    if compression == COMPRESSION_GZIP:
+        if level is None:
+            level = 9
+        out_file = gzip.open(path, "wb", compresslevel=level)
+    elif compression == COMPRESSION_ZSTD:
+        if level is None:
+            level = 3
+        compressor = zstandard.ZstdCompressor(level=level)
+        out_file = compressor.stream_writer(open(path, "wb"), closefd=True)
+    else:
+        out_file = open(path, "wb")
+    if text:
+        return io.TextIOWrapper(out_file, encoding="utf-8")
+    return out_file
+
+
+def open_input(path, compression=None, text=False):
+    """Opens a file for reading, decompressing its data as it is read.
+
+    Parameters
+    ----------
+    path : str
+        Path of the input file.
+    compression : str, optional
+        One of COMPRESSIONS. If omitted, the compression is determined by the
+        file extension.
+    text : bool, optional
+        Set to True to return a UTF-8 text stream instead of a binary one.
+    """
+    if compression is None:
+        compression = get_compression(path)
+    _check_compression(compression)
+    if compression == COMPRESSION_GZIP:
+        in_file = gzip.open(path, "rb")
+    elif compression == COMPRESSION_ZSTD:
+        decompressor = zstandard.ZstdDecompressor()
+        in_file = decompressor.stream_reader(open(path, "rb"), closefd=True)
+    else:
+        in_file = open(path, "rb")
+    if text:
+        return io.TextIOWrapper(in_file, encoding="utf-8")
+    return in_file
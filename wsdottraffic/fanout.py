@@ -0,0 +1,442 @@
+"""Writes traveler info records to several output files in a single pass.
+
+The records returned by get_traveler_info are walked once. Each value is
+encoded to JSON text a single time, and the encoded text is shared by all of
+the sinks (the raw JSON list, the field definitions, and the GeoJSON
+FeatureCollection). Strings and dates, which repeat a lot across records
+(road names, directions, update times), are only encoded the first time they
+are seen.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import json
+import os
+import threading
+from json.encoder import encode_basestring_ascii
+
+try:
+    import queue
+except ImportError:  # pragma: no cover
+    # pylint:disable=import-error
+    import Queue as queue
+
+from .compression import add_extension, open_output
+from .fielddetection import FieldInfo, update_field_infos
+from .jsonhelpers import CustomEncoder, get_geometry_fields
+from .rowformat import RowWriter
+
+FORMAT_JSON = "json"
+FORMAT_COMPACT = "compact"
+FORMAT_ROWS = "rows"
+
+OUTPUT_FORMATS = (FORMAT_JSON, FORMAT_COMPACT, FORMAT_ROWS)
+
+COMPACT_SEPARATORS = (",", ":")
+
+_DATE_TYPES = (datetime.datetime, datetime.date, datetime.time)
+
+
+def _field_serializer(the_object):
+    if isinstance(the_object, FieldInfo):
+        return the_object.__dict__
+    else:
+        return the_object
+
+
+def _float_to_json(value):
+    """Formats a float the same way as json.dumps."""
+    if value != value:  # pylint: disable=comparison-with-itself
+        return "NaN"
+    if value == float("inf"):
+        return "Infinity"
+    if value == -float("inf"):
+        return "-Infinity"
+    return float.__repr__(value)
+
+
+class ValueEncoder(object):
+    """Encodes individual values to JSON text, remembering the encoded form
+    of strings and dates so that repeated values are only encoded once.
+
+    Attributes:
+        indent: indentation string, or None for single-line output.
+        item_separator: separator placed between list items / dict members.
+        key_separator: separator placed between a dict key and its value.
+    """
+
+    def __init__(self, indent=None, separators=None):
+        if indent is not None and not isinstance(indent, str):
+            indent = " " * indent
+        self.indent = indent
+        if separators is None:
+            separators = (", ", ": ") if indent is None else (",", ": ")
+        self.item_separator, self.key_separator = separators
+        self._strings = {}
+        self._dates = {}
+
+    def encode(self, value, level=0):
+        """Returns the JSON text for a value.
+
+        Args:
+            value: the value to encode.
+            level: nesting level of the value. Only used to indent values
+                that span multiple lines (lists and dicts).
+        """
+        if isinstance(value, str):
+            text = self._strings.get(value)
+            if text is None:
+                text = encode_basestring_ascii(value)
+                self._strings[value] = text
+            return text
+        if value is None:
+            return "null"
+        if value is True:
+            return "true"
+        if value is False:
+            return "false"
+        if isinstance(value, int):
+            return int.__repr__(value)
+        if isinstance(value, float):
+            return _float_to_json(value)
+        if isinstance(value, _DATE_TYPES):
+            # Aware datetimes for the same instant compare equal whatever
+            # their UTC offsets, so the offset is part of the key.
+            offset = (value.utcoffset() if isinstance(
+                value, (datetime.datetime, datetime.time)) else None)
+            key = value if offset is None else (value, offset)
+            text = self._dates.get(key)
+            if text is None:
+                text = encode_basestring_ascii(value.isoformat())
+                self._dates[key] = text
+            return text
+        # Nested values are uncommon in flattened records. Let the json module
+        # handle them and re-indent the result to the current level.
+        text = json.dumps(
+            value, cls=CustomEncoder, indent=self.indent,
+            separators=(self.item_separator, self.key_separator))
+        if self.indent:
+            text = text.replace("\n", "\n" + self.indent * level)
+        return text
+
+    def join(self, open_char, close_char, members, level):
+        """Joins already encoded members into a JSON list or object.
+
+        Args:
+            open_char: "[" or "{"
+            close_char: "]" or "}"
+            members: sequence of encoded member strings.
+            level: nesting level of the container.
+        """
+        if not members:
+            return open_char + close_char
+        if self.indent is None:
+            return open_char + self.item_separator.join(members) + close_char
+        inner = "\n" + self.indent * (level + 1)
+        return "".join((
+            open_char, inner, (self.item_separator + inner).join(members),
+            "\n", self.indent * level, close_char))
+
+    def encode_items(self, record, level):
+        """Encodes the members of a flat record.
+
+        Returns:
+            A list of (key, member_text) tuples, where member_text is the
+            "key": value text for the member.
+        """
+        key_separator = self.key_separator
+        encode = self.encode
+        return [
+            (key, encode(key) + key_separator + encode(value, level + 1))
+            for key, value in record.items()
+        ]
+
+
+class JsonListSink(object):
+    """Writes records as a JSON list (the same output as json.dump with
+    CustomEncoder).
+    """
+
+    def __init__(self, json_file, encoder):
+        self._file = json_file
+        self._encoder = encoder
+        self._count = 0
+
+    def write(self, record, members):
+        """Writes one record using its encoded members."""
+        del record
+        encoder = self._encoder
+        text = encoder.join("{", "}", [m for _, m in members], 1)
+        if self._count:
+            prefix = encoder.item_separator
+        else:
+            prefix = "["
+        if encoder.indent is not None:
+            prefix += "\n" + encoder.indent
+        self._file.write(prefix + text)
+        self._count += 1
+
+    def close(self):
+        """Writes the end of the list."""
+        if not self._count:
+            self._file.write("[]")
+        elif self._encoder.indent is not None:
+            self._file.write("\n]")
+        else:
+            self._file.write("]")
+
+
+class RowsSink(object):
+    """Writes records in the binary row format (see wsdottraffic.rowformat).
+    """
+
+    def __init__(self, out_file):
+        self._writer = RowWriter(out_file)
+
+    def write(self, record, members):
+        """Writes one record."""
+        del members
+        self._writer.write(record)
+
+    def close(self):
+        """Nothing to finish: the row format has no footer."""
+
+
+class FieldsSink(object):
+    """Collects field definitions (see FieldInfo.from_features) and writes
+    them as JSON when closed.
+    """
+
+    def __init__(self, json_file, indent=None, separators=None):
+        self._file = json_file
+        self._indent = indent
+        self._separators = separators
+        self.fields = {}
+
+    def write(self, record, members):
+        """Updates the field definitions with the fields of a record."""
+        del members
+        update_field_infos(self.fields, record)
+
+    def close(self):
+        """Writes the collected field definitions."""
+        json.dump(self.fields, self._file, indent=self._indent,
+                  separators=self._separators, default=_field_serializer)
+
+
+class GeoJsonSink(object):
+    """Writes records as a GeoJSON FeatureCollection (the same output as
+    dict_list_to_geojson).
+    """
+
+    def __init__(self, json_file, encoder):
+        self._file = json_file
+        self._encoder = encoder
+        self._count = 0
+
+    def _encode_geometry(self, record, geometry_type, level):
+        encoder = self._encoder
+        encode = encoder.encode
+        key_sep = encoder.key_separator
+        if geometry_type == "Point":
+            coords = encoder.join("[", "]", [
+                encode(record["Longitude"]), encode(record["Latitude"])
+            ], level + 1)
+        else:
+            coords = encoder.join("[", "]", [
+                encoder.join("[", "]", [
+                    encode(record["StartLongitude"]),
+                    encode(record["StartLatitude"])], level + 2),
+                encoder.join("[", "]", [
+                    encode(record["EndLongitude"]),
+                    encode(record["EndLatitude"])], level + 2),
+            ], level + 1)
+        return encoder.join("{", "}", [
+            '"type"' + key_sep + encode(geometry_type),
+            '"coordinates"' + key_sep + coords
+        ], level)
+
+    def write(self, record, members):
+        """Writes one record as a GeoJSON Feature."""
+        encoder = self._encoder
+        key_sep = encoder.key_separator
+        geometry_type, geometry_fields = get_geometry_fields(record)
+        if geometry_type:
+            geometry = self._encode_geometry(record, geometry_type, 3)
+        else:
+            geometry = "null"
+        # Record members were encoded at level 1. Properties sit at level 3,
+        # so values spanning multiple lines are re-encoded at that level.
+        properties = []
+        for key, member in members:
+            if key in geometry_fields:
+                continue
+            if encoder.indent and "\n" in member:
+                member = (encoder.encode(key) + key_sep +
+                          encoder.encode(record[key], 4))
+            properties.append(member)
+        feature = encoder.join("{", "}", [
+            '"type"' + key_sep + '"Feature"',
+            '"geometry"' + key_sep + geometry,
+            '"properties"' + key_sep + encoder.join(
+                "{", "}", properties, 3)
+        ], 2)
+
+        if self._count:
+            prefix = encoder.item_separator
+        else:
+            members = ['"type"' + key_sep + '"FeatureCollection"',
+                       '"features"' + key_sep + "["]
+            if encoder.indent is None:
+                prefix = "{" + encoder.item_separator.join(members)
+            else:
+                inner = "\n" + encoder.indent
+                prefix = "{" + inner + (
+                    encoder.item_separator + inner).join(members)
+        if encoder.indent is not None:
+            prefix += "\n" + encoder.indent * 2
+        self._file.write(prefix + feature)
+        self._count += 1
+
+    def close(self):
+        """Writes the end of the FeatureCollection."""
+        encoder = self._encoder
+        if not self._count:
+            self._file.write(encoder.join("{", "}", [
+                '"type"' + encoder.key_separator + '"FeatureCollection"',
+                '"features"' + encoder.key_separator + "[]"], 0))
+        elif encoder.indent is not None:
+            self._file.write("\n" + encoder.indent + "]\n}")
+        else:
+            self._file.write("]}")
+
+
+def fan_out(features, sinks, encoder):
+    """Walks a list of records once, encoding each record's values once and
+    passing the record with its encoded members to every sink.
+
+    Returns:
+        The number of records written.
+    """
+    count = 0
+    for record in features:
+        members = encoder.encode_items(record, 1)
+        for sink in sinks:
+            sink.write(record, members)
+        count += 1
+    for sink in sinks:
+        sink.close()
+    return count
+
+
+def write_outputs(endpoint_name, features, out_dir, indent=True,
+                  output_format=FORMAT_JSON, compression=None, level=None):
+    """Writes the data, _fields.json and .geojson files for an endpoint's
+    records in a single pass.
+
+    Args:
+        endpoint_name: name of the endpoint. Used for the output file names.
+        features: list of dicts returned by get_traveler_info.
+        out_dir: output directory.
+        indent: indentation passed to the JSON encoder. Only used by the
+            json format.
+        output_format: one of OUTPUT_FORMATS.
+            json: indented JSON files.
+            compact: minified JSON files.
+            rows: the data is written in the binary row format (see
+                wsdottraffic.rowformat) and the other files as minified JSON.
+        compression: one of wsdottraffic.compression.COMPRESSIONS. The
+            compression's file extension is added to each file name.
+        level: compression level.
+
+    Returns:
+        The list of paths written.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError("Unsupported output format: %s" % output_format)
+    if output_format == FORMAT_JSON:
+        separators = None
+    else:
+        indent = None
+        separators = COMPACT_SEPARATORS
+    encoder = ValueEncoder(indent, separators)
+    data_ext = ".rows" if output_format == FORMAT_ROWS else ".json"
+    paths = [
+        add_extension(os.path.join(out_dir, name), compression) for name in (
+            endpoint_name + data_ext,
+            "%s_fields.json" % endpoint_name,
+            "%s.geojson" % endpoint_name)
+    ]
+    data_file = open_output(paths[0], compression, level,
+                            text=output_format != FORMAT_ROWS)
+    fields_file, geojson_file = [
+        open_output(p, compression, level, text=True) for p in paths[1:]]
+    with data_file, fields_file, geojson_file:
+        if output_format == FORMAT_ROWS:
+            data_sink = RowsSink(data_file)
+        else:
+            data_sink = JsonListSink(data_file, encoder)
+        fan_out(features, (
+            data_sink,
+            FieldsSink(fields_file, indent, separators),
+            GeoJsonSink(geojson_file, encoder)
+        ), encoder)
+    return paths
+
+
+class OutputWriterThread(threading.Thread):
+    """Writes endpoint outputs on a background thread, so that the next
+    endpoint can be downloaded while the previous one is written to disk.
+
+    Use submit to queue an endpoint's records and close to wait for all
+    queued outputs to be written. Errors raised while writing are re-raised
+    by submit or close.
+    """
+
+    def __init__(self, out_dir, max_pending=2, **kwargs):
+        """Creates and starts a new writer thread.
+
+        Args:
+            out_dir: output directory.
+            max_pending: maximum number of endpoints waiting to be written.
+                submit blocks when this many are waiting.
+            kwargs: passed to write_outputs.
+        """
+        super(OutputWriterThread, self).__init__(name="OutputWriterThread")
+        self.daemon = True
+        self._out_dir = out_dir
+        self._kwargs = kwargs
+        self._queue = queue.Queue(max_pending)
+        self._error = None
+        self.start()
+
+    def run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                if self._error is None:
+                    write_outputs(job[0], job[1], self._out_dir,
+                                  **self._kwargs)
+            except Exception as ex:  # pylint: disable=broad-except
+                self._error = ex
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, endpoint_name, features):
+        """Queues an endpoint's records to be written."""
+        self._raise_error()
+        self._queue.put((endpoint_name, features))
+
+    def close(self):
+        """Waits for all queued outputs to be written and stops the thread.
+        """
+        self._queue.put(None)
+        self.join()
+        self._raise_error()
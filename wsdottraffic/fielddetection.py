@@ -158,16 +158,23 @@ class FieldInfo(object):
         """
         master = {}
         for feature in features:
-            for field_key, field_info in _iter_field_infos(feature):
-                new_fi = FieldInfo(
-                    field_key,
-                    None,
-                    field_info
-                )
-                master[field_key] = new_fi
+            update_field_infos(master, feature)
         return master
 
 
+def update_field_infos(master, feature):
+    """Updates a dict of FieldInfos (keyed by field_name) with the fields
+    of a single feature. Used by FieldInfo.from_features and by writers that
+    only see one feature at a time.
+
+    Args:
+        master: dict of FieldInfos keyed by field_name. Modified in place.
+        feature: a dict that defines a feature
+    """
+    for field_key, field_info in _iter_field_infos(feature):
+        master[field_key] = FieldInfo(field_key, None, field_info)
+
+
 def _iter_field_infos(feature_dict):
     """Iterates over dict key/value pairs and yields FieldInfo objects
     """
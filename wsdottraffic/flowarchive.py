@@ -0,0 +1,392 @@
+"""An append-only archive of TrafficFlow polls.
+
+Storing one JSON file per poll means reloading a day of history requires
+parsing thousands of files. The archive instead stores:
+
+* a station dictionary (a JSON sidecar file named ``<path>.stations.json``)
+  keyed by FlowDataID, which assigns each station a column and records its
+  location attributes, and
+* a binary file of fixed-width rows, one per poll. Each row is a
+  little-endian int64 timestamp (milliseconds since 1970-01-01 UTC) followed
+  by one byte per station column containing the station's FlowReadingValue
+  code (an index of the FlowReadingValues domain) or MISSING_CODE.
+
+Appending a poll writes one row at the end of the file. Readers memory-map the
+file as a poll (time) by station matrix without parsing anything. When the
+number of stations exceeds the row capacity, the file is rewritten once with
+twice the capacity.
+
+Example
+-------
+::
+
+    archive = FlowArchive("TrafficFlow.flow")
+    archive.append(get_traveler_info("TrafficFlow"))
+
+    with archive.open_matrix() as matrix:
+        times, codes = matrix.to_numpy()
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import json
+import mmap
+import os
+import re
+import struct
+from collections import OrderedDict
+
+from .compression import open_input
+from .jsonhelpers import parse_traveler_info_object
+from .tabledefs import DOMAINS
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+MAGIC = b"WSDTFLOW"
+VERSION = 1
+
+# Magic, version, reserved, station capacity.
+_HEADER_STRUCT = struct.Struct("<8sHHI")
+HEADER_SIZE = _HEADER_STRUCT.size
+_TIME_STRUCT = struct.Struct("<q")
+TIME_SIZE = _TIME_STRUCT.size
+
+# Code stored for stations that were not in a poll.
+MISSING_CODE = 255
+
+DEFAULT_CAPACITY = 256
+
+FLOW_READING_VALUES = DOMAINS["FlowReadingValues"]["values"]
+
+# Station attributes stored in the station dictionary.
+STATION_FIELDS = ("StationName", "LocationDescription", "Direction",
+                  "RoadName", "MilePost", "Region", "Latitude", "Longitude")
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_ISO_DATE_RE = re.compile(
+    r"^(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?Z?$")
+_NON_WORD_RE = re.compile(r"\W+")
+_CODES_BY_NAME = dict(
+    (_NON_WORD_RE.sub("", name).lower(), code)
+    for code, name in enumerate(FLOW_READING_VALUES))
+
+
+class FlowArchiveError(ValueError):
+    """Error for a file that is not a valid flow archive."""
+
+
+def get_stations_path(path):
+    """Returns the path of the station dictionary of an archive."""
+    return path + ".stations.json"
+
+
+def to_timestamp(value):
+    """Converts a naive UTC datetime (or an ISO 8601 string) to milliseconds
+    since 1970-01-01.
+    """
+    if not isinstance(value, datetime.datetime):
+        match = _ISO_DATE_RE.match(value)
+        if not match:
+            raise ValueError("Unsupported date: %s" % value)
+        parts = [int(part) for part in match.groups()[:6]]
+        fraction = match.group(7) or "0"
+        value = datetime.datetime(
+            *parts, microsecond=int(fraction.ljust(6, "0")))
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000 + (
+        delta.microseconds // 1000)
+
+
+def from_timestamp(timestamp):
+    """Converts milliseconds since 1970-01-01 to a naive UTC datetime."""
+    return _EPOCH + datetime.timedelta(milliseconds=timestamp)
+
+
+def get_flow_code(value):
+    """Converts a FlowReadingValue (an integer code or a domain value name
+    such as "WideOpen") to a code. Returns MISSING_CODE for unknown values.
+    """
+    if isinstance(value, bool):
+        return MISSING_CODE
+    if isinstance(value, int):
+        if 0 <= value < len(FLOW_READING_VALUES):
+            return value
+        return MISSING_CODE
+    if isinstance(value, str):
+        return _CODES_BY_NAME.get(_NON_WORD_RE.sub("", value).lower(),
+                                  MISSING_CODE)
+    return MISSING_CODE
+
+
+class FlowMatrix(object):
+    """A read-only, memory-mapped view of an archive's polls.
+
+    Rows are polls and columns are stations (see FlowArchive.stations).
+    """
+
+    def __init__(self, path, station_count):
+        self._file = open(path, "rb")
+        try:
+            capacity = _read_header(self._file.read(HEADER_SIZE), path)[3]
+            self.capacity = capacity
+            self.row_size = TIME_SIZE + capacity
+            self.station_count = min(station_count, capacity)
+            size = os.fstat(self._file.fileno()).st_size
+            self.row_count = (size - HEADER_SIZE) // self.row_size
+            if self.row_count:
+                self._map = mmap.mmap(self._file.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+            else:
+                self._map = None
+        except Exception:
+            self._file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.row_count
+
+    def close(self):
+        """Unmaps and closes the archive file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _row_offset(self, row):
+        if row < 0:
+            row += self.row_count
+        if not 0 <= row < self.row_count:
+            raise IndexError("Row index out of range: %d" % row)
+        return HEADER_SIZE + row * self.row_size
+
+    def get_timestamp(self, row):
+        """Returns the timestamp of a poll in milliseconds since 1970."""
+        return _TIME_STRUCT.unpack_from(self._map, self._row_offset(row))[0]
+
+    def get_time(self, row):
+        """Returns the time of a poll as a naive UTC datetime."""
+        return from_timestamp(self.get_timestamp(row))
+
+    def get_codes(self, row):
+        """Returns the codes of a poll as a bytes-like object indexed by
+        station column.
+        """
+        offset = self._row_offset(row) + TIME_SIZE
+        return self._map[offset:offset + self.station_count]
+
+    def get_code(self, row, column):
+        """Returns the code of a station column in a poll."""
+        if not 0 <= column < self.station_count:
+            raise IndexError("Column index out of range: %d" % column)
+        offset = self._row_offset(row) + TIME_SIZE + column
+        return bytearray(self._map[offset:offset + 1])[0]
+
+    def get_series(self, column):
+        """Returns a list of (datetime, code) tuples of a station column.
+        Polls in which the station was missing are skipped.
+        """
+        output = []
+        for row in range(self.row_count):
+            code = self.get_code(row, column)
+            if code != MISSING_CODE:
+                output.append((self.get_time(row), code))
+        return output
+
+    def to_numpy(self):
+        """Returns the polls as numpy arrays, without copying the data.
+
+        Returns
+        -------
+        tuple
+            A datetime64[ms] array of poll times and a 2D uint8 array of
+            codes with a row per poll and a column per station. The arrays
+            refer to the memory-mapped file, so they must be deleted before
+            the matrix is closed.
+        """
+        if numpy is None:
+            raise ImportError("numpy is required for FlowMatrix.to_numpy.")
+        if not self.row_count:
+            return (numpy.empty(0, dtype="datetime64[ms]"),
+                    numpy.empty((0, self.station_count), dtype=numpy.uint8))
+        dtype = numpy.dtype([("time", "<i8"),
+                             ("codes", numpy.uint8, (self.capacity,))])
+        rows = numpy.frombuffer(self._map, dtype=dtype,
+                                count=self.row_count, offset=HEADER_SIZE)
+        times = rows["time"].view("datetime64[ms]")
+        return times, rows["codes"][:, :self.station_count]
+
+
+def _read_header(header, path):
+    if len(header) < HEADER_SIZE:
+        raise FlowArchiveError("%s is not a flow archive." % path)
+    magic, version, reserved, capacity = _HEADER_STRUCT.unpack(header)
+    if magic != MAGIC:
+        raise FlowArchiveError("%s is not a flow archive." % path)
+    if version != VERSION:
+        raise FlowArchiveError("Unsupported flow archive version: %d" %
+                               version)
+    return magic, version, reserved, capacity
+
+
+class FlowArchive(object):
+    """An append-only archive of TrafficFlow polls."""
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        """Opens an archive, creating it if it doesn't exist.
+
+        Parameters
+        ----------
+        path : str
+            Path of the archive's data file.
+        capacity : int, optional
+            Initial number of station columns of a new archive.
+        """
+        self.path = path
+        self.stations_path = get_stations_path(path)
+        if os.path.exists(self.stations_path):
+            with open(self.stations_path, "r") as stations_file:
+                self.stations = json.load(stations_file,
+                                          object_pairs_hook=OrderedDict)
+        else:
+            self.stations = OrderedDict()
+        if os.path.exists(path):
+            with open(path, "rb") as data_file:
+                self.capacity = _read_header(
+                    data_file.read(HEADER_SIZE), path)[3]
+        else:
+            self.capacity = capacity
+            with open(path, "wb") as data_file:
+                data_file.write(self._get_header())
+
+    def __len__(self):
+        size = os.path.getsize(self.path)
+        return (size - HEADER_SIZE) // (TIME_SIZE + self.capacity)
+
+    def _get_header(self):
+        return _HEADER_STRUCT.pack(MAGIC, VERSION, 0, self.capacity)
+
+    def get_column(self, flow_data_id):
+        """Returns the column of a station, or None if it has never been in a
+        poll.
+        """
+        station = self.stations.get(str(flow_data_id))
+        return None if station is None else station["column"]
+
+    def _save_stations(self):
+        temp_path = self.stations_path + ".tmp"
+        with open(temp_path, "w") as stations_file:
+            json.dump(self.stations, stations_file, indent=1)
+        os.replace(temp_path, self.stations_path)
+
+    def _grow(self, station_count):
+        """Rewrites the data file with enough capacity for a number of
+        stations.
+        """
+        old_row_size = TIME_SIZE + self.capacity
+        capacity = self.capacity
+        while capacity < station_count:
+            capacity *= 2
+        padding = b"\xff" * (capacity - self.capacity)
+        temp_path = self.path + ".tmp"
+        with open(self.path, "rb") as in_file, \
+                open(temp_path, "wb") as out_file:
+            in_file.seek(HEADER_SIZE)
+            self.capacity = capacity
+            out_file.write(self._get_header())
+            while True:
+                row = in_file.read(old_row_size)
+                if len(row) < old_row_size:
+                    break
+                out_file.write(row)
+                out_file.write(padding)
+        os.replace(temp_path, self.path)
+
+    def append(self, records, poll_time=None):
+        """Appends a poll.
+
+        Parameters
+        ----------
+        records : iterable of dict
+            TrafficFlow records returned by get_traveler_info.
+        poll_time : datetime.datetime, optional
+            Time of the poll (naive UTC). Defaults to the latest Time value
+            of the records.
+
+        Returns
+        -------
+        int
+            The row index of the poll.
+        """
+        readings = []
+        new_stations = False
+        latest = None
+        for record in records:
+            flow_data_id = record.get("FlowDataID")
+            if flow_data_id is None:
+                continue
+            station_key = str(flow_data_id)
+            station = self.stations.get(station_key)
+            if station is None:
+                station = OrderedDict([("column", len(self.stations))])
+                for field in STATION_FIELDS:
+                    if record.get(field) is not None:
+                        station[field] = record[field]
+                self.stations[station_key] = station
+                new_stations = True
+            readings.append((station["column"],
+                             get_flow_code(record.get("FlowReadingValue"))))
+            time = record.get("Time")
+            if time is not None:
+                timestamp = to_timestamp(time)
+                if latest is None or timestamp > latest:
+                    latest = timestamp
+        if poll_time is not None:
+            latest = to_timestamp(poll_time)
+        elif latest is None:
+            latest = to_timestamp(datetime.datetime.utcnow())
+        if new_stations:
+            if len(self.stations) > self.capacity:
+                self._grow(len(self.stations))
+            self._save_stations()
+        codes = bytearray(b"\xff" * self.capacity)
+        for column, code in readings:
+            codes[column] = code
+        row_count = len(self)
+        with open(self.path, "r+b") as data_file:
+            # Drop the fragment of a row left by an interrupted append.
+            data_file.seek(HEADER_SIZE + row_count * (TIME_SIZE +
+                                                      self.capacity))
+            data_file.truncate()
+            data_file.write(_TIME_STRUCT.pack(latest) + bytes(codes))
+        return row_count
+
+    def append_json_file(self, path, poll_time=None):
+        """Appends a poll saved as a JSON file, either as returned by the
+        TrafficFlow endpoint or as written by the wsdottraffic command.
+        The file can be gzip or zstd compressed.
+
+        Returns
+        -------
+        int
+            The row index of the poll.
+        """
+        with open_input(path, text=True) as json_file:
+            records = json.load(json_file,
+                                object_hook=parse_traveler_info_object)
+        return self.append(records, poll_time)
+
+    def open_matrix(self):
+        """Memory-maps the archive's polls. The returned FlowMatrix should be
+        closed when it is no longer needed.
+        """
+        return FlowMatrix(self.path, len(self.stations))
@@ -0,0 +1,297 @@
+"""Builds point and multipoint geometries from traveler info records without
+ArcGIS.
+
+Geometries are returned as coordinate tuples or as Well-Known Binary (WKB).
+build_geometries converts a whole list of records at once, using numpy (if it
+is installed) to validate coordinates and pack WKB in bulk.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import struct
+from collections import namedtuple
+
+from .tabledefs import (GEOMETRY_TYPE_MULTIPOINT, GEOMETRY_TYPE_POINT,
+                        POINT_FIELD_NAMES)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+WKB_POINT = 1
+WKB_MULTIPOINT = 4
+
+# Output types of build_geometries.
+OUTPUT_WKB = "wkb"
+OUTPUT_XY = "xy"
+
+_WKB_POINT_STRUCT = struct.Struct("<BIdd")
+_WKB_HEADER_STRUCT = struct.Struct("<BII")
+
+
+def are_coords_valid(*coords):
+    """Returns False if a coordinate is either 0 or None, True otherwise.
+
+    Parameters
+    ----------
+    coords: one or more number values.
+    """
+    for coord in coords:
+        if coord == 0 or coord is None:
+            return False
+    return True
+
+
+def get_points(record, geometry_type, geometry_fields):
+    """Returns the valid (x, y) coordinate pairs of a record.
+
+    If a multipoint record has no valid coordinates, the point fields
+    (Longitude and Latitude) are used instead, if present.
+
+    Parameters
+    ----------
+    record : dict
+        A record returned by get_traveler_info.
+    geometry_type : str
+        GEOMETRY_TYPE_POINT or GEOMETRY_TYPE_MULTIPOINT.
+    geometry_fields : sequence
+        Names of the coordinate fields, in x1, y1, x2, y2... order.
+    """
+    get = record.get
+    points = []
+    for i in range(0, len(geometry_fields), 2):
+        x, y = get(geometry_fields[i]), get(geometry_fields[i + 1])
+        if are_coords_valid(x, y):
+            points.append((x, y))
+    if (not points and geometry_type == GEOMETRY_TYPE_MULTIPOINT and
+            tuple(geometry_fields) != POINT_FIELD_NAMES):
+        return get_points(record, GEOMETRY_TYPE_POINT, POINT_FIELD_NAMES)
+    return points
+
+
+def point_to_wkb(x, y):
+    """Returns a point as little-endian WKB.
+    """
+    return _WKB_POINT_STRUCT.pack(1, WKB_POINT, x, y)
+
+
+def multipoint_to_wkb(points):
+    """Returns a sequence of (x, y) tuples as a little-endian WKB multipoint.
+    """
+    parts = [_WKB_HEADER_STRUCT.pack(1, WKB_MULTIPOINT, len(points))]
+    parts.extend(point_to_wkb(x, y) for x, y in points)
+    return b"".join(parts)
+
+
+def to_wkb(points, geometry_type):
+    """Converts a list of (x, y) tuples to WKB of the given geometry type.
+    Returns None if there are no points.
+    """
+    if not points:
+        return None
+    if geometry_type == GEOMETRY_TYPE_POINT:
+        return point_to_wkb(*points[0])
+    return multipoint_to_wkb(points)
+
+
+def wkb_to_points(wkb):
+    """Returns the (x, y) coordinates of a WKB point or multipoint.
+    """
+    byte_order = "<" if bytearray(wkb[:1])[0] == 1 else ">"
+    wkb_type = struct.unpack_from(byte_order + "I", wkb, 1)[0] % 1000
+    if wkb_type == WKB_POINT:
+        return [struct.unpack_from(byte_order + "dd", wkb, 5)]
+    if wkb_type != WKB_MULTIPOINT:
+        raise ValueError("Unsupported WKB geometry type: %d" % wkb_type)
+    count = struct.unpack_from(byte_order + "I", wkb, 5)[0]
+    points = []
+    offset = 9
+    for _ in range(count):
+        points.extend(wkb_to_points(wkb[offset:offset + 21]))
+        offset += 21
+    return points
+
+
+def get_envelope(points):
+    """Returns the (min_x, max_x, min_y, max_y) envelope of a list of
+    (x, y) tuples.
+    """
+    xs = [point[0] for point in points]
+    ys = [point[1] for point in points]
+    return min(xs), max(xs), min(ys), max(ys)
+
+
+# The result of build_geometries.
+#   geometries: a WKB bytes object, (x, y) tuple or None for each record.
+#   null_indices: indices of the records without valid coordinates.
+#   fallback_indices: indices of the multipoint records that had no valid
+#       multipoint coordinates and were located by Longitude and Latitude.
+GeometryBatch = namedtuple("GeometryBatch", ("geometries", "null_indices",
+                                             "fallback_indices"))
+
+
+def _uses_point_fallback(geometry_type, geometry_fields):
+    return (geometry_type == GEOMETRY_TYPE_MULTIPOINT and
+            tuple(geometry_fields) != POINT_FIELD_NAMES)
+
+
+def _build_geometries_python(records, geometry_type, geometry_fields,
+                             output):
+    geometries = []
+    null_indices = []
+    fallback_indices = []
+    use_fallback = _uses_point_fallback(geometry_type, geometry_fields)
+    for i, record in enumerate(records):
+        points = get_points(record, GEOMETRY_TYPE_POINT, geometry_fields)
+        if not points and use_fallback:
+            points = get_points(record, GEOMETRY_TYPE_POINT,
+                                POINT_FIELD_NAMES)
+            if points:
+                fallback_indices.append(i)
+        if not points:
+            null_indices.append(i)
+            geometries.append(None)
+        elif output == OUTPUT_XY:
+            geometries.append(points[0])
+        else:
+            geometries.append(to_wkb(points, geometry_type))
+    return GeometryBatch(geometries, null_indices, fallback_indices)
+
+
+def _get_coordinate_array(records, fields):
+    """Returns the values of coordinate fields as a 2D float array, with NaN
+    for missing values.
+    """
+    return numpy.array([list(map(record.get, fields)) for record in records],
+                       dtype="float64").reshape(len(records), len(fields))
+
+
+def _get_valid_mask(coords):
+    xs = coords[:, 0::2]
+    ys = coords[:, 1::2]
+    return (xs != 0) & (ys != 0) & ~numpy.isnan(xs) & ~numpy.isnan(ys)
+
+
+def _get_point_dtype():
+    """Returns the numpy dtype of a little-endian WKB point."""
+    return numpy.dtype([
+        ("order", "u1"), ("type", "<u4"), ("x", "<f8"), ("y", "<f8")])
+
+
+def _split_bytes(data, size):
+    return [data[offset:offset + size]
+            for offset in range(0, len(data), size)]
+
+
+def _pack_wkb(xs, ys, counts, geometry_type):
+    """Packs the first counts[i] coordinates of each row of the xs and ys
+    arrays as WKB. Returns a list of bytes objects (None where the count is 0).
+    """
+    output = [None] * len(counts)
+    point_dtype = _get_point_dtype()
+    if geometry_type == GEOMETRY_TYPE_POINT:
+        rows = numpy.flatnonzero(counts)
+        packed = numpy.empty(len(rows), dtype=point_dtype)
+        packed["order"] = 1
+        packed["type"] = WKB_POINT
+        packed["x"] = xs[rows, 0]
+        packed["y"] = ys[rows, 0]
+        wkbs = _split_bytes(packed.tobytes(), point_dtype.itemsize)
+        for row, wkb in zip(rows.tolist(), wkbs):
+            output[row] = wkb
+        return output
+    # Multipoints are packed in groups with the same number of points, so
+    # every geometry in a group has the same size.
+    for count in numpy.unique(counts[counts > 0]).tolist():
+        rows = numpy.flatnonzero(counts == count)
+        dtype = numpy.dtype([("order", "u1"), ("type", "<u4"),
+                             ("count", "<u4"),
+                             ("points", point_dtype, (count,))])
+        packed = numpy.empty(len(rows), dtype=dtype)
+        packed["order"] = 1
+        packed["type"] = WKB_MULTIPOINT
+        packed["count"] = count
+        points = packed["points"]
+        points["order"] = 1
+        points["type"] = WKB_POINT
+        points["x"] = xs[rows, :count]
+        points["y"] = ys[rows, :count]
+        wkbs = _split_bytes(packed.tobytes(), dtype.itemsize)
+        for row, wkb in zip(rows.tolist(), wkbs):
+            output[row] = wkb
+    return output
+
+
+def _build_geometries_numpy(records, geometry_type, geometry_fields, output):
+    coords = _get_coordinate_array(records, geometry_fields)
+    valid = _get_valid_mask(coords)
+    xs = coords[:, 0::2]
+    ys = coords[:, 1::2]
+    fallback = numpy.zeros(len(records), dtype=bool)
+    if _uses_point_fallback(geometry_type, geometry_fields):
+        point_coords = _get_coordinate_array(records, POINT_FIELD_NAMES)
+        fallback = ~valid.any(axis=1) & _get_valid_mask(point_coords)[:, 0]
+        if fallback.any():
+            xs = xs.copy()
+            ys = ys.copy()
+            valid = valid.copy()
+            xs[fallback, 0] = point_coords[fallback, 0]
+            ys[fallback, 0] = point_coords[fallback, 1]
+            valid[fallback, 0] = True
+    if geometry_type == GEOMETRY_TYPE_POINT:
+        valid = valid[:, :1]
+    counts = valid.sum(axis=1)
+    # Move the valid coordinates of each row to the front, keeping their
+    # order.
+    order = numpy.argsort(~valid, axis=1, kind="stable")
+    xs = numpy.take_along_axis(xs, order, axis=1)
+    ys = numpy.take_along_axis(ys, order, axis=1)
+    null_indices = numpy.flatnonzero(counts == 0).tolist()
+    fallback_indices = numpy.flatnonzero(fallback).tolist()
+    if output == OUTPUT_XY:
+        geometries = [(x, y) if count else None for x, y, count in zip(
+            xs[:, 0].tolist(), ys[:, 0].tolist(), counts.tolist())]
+    else:
+        geometries = _pack_wkb(xs, ys, counts, geometry_type)
+    return GeometryBatch(geometries, null_indices, fallback_indices)
+
+
+def build_geometries(records, geometry_type, geometry_fields,
+                     output=OUTPUT_WKB):
+    """Builds the geometries of a list of records in one batch.
+
+    Coordinates are validated in bulk: a coordinate pair is valid if neither
+    value is 0 or None. Multipoint records without any valid multipoint
+    coordinates are located by their Longitude and Latitude, if valid.
+
+    Parameters
+    ----------
+    records : list of dict
+        Records returned by get_traveler_info.
+    geometry_type : str
+        GEOMETRY_TYPE_POINT or GEOMETRY_TYPE_MULTIPOINT.
+    geometry_fields : sequence
+        Names of the coordinate fields, in x1, y1, x2, y2... order.
+    output : str, optional
+        OUTPUT_WKB for little-endian WKB bytes objects (e.g., for the
+        SHAPE@WKB cursor token), or OUTPUT_XY for the (x, y) tuple of the
+        first valid point (e.g., for SHAPE@XY).
+
+    Returns
+    -------
+    GeometryBatch
+    """
+    if output not in (OUTPUT_WKB, OUTPUT_XY):
+        raise ValueError("Unsupported output: %s" % output)
+    if not isinstance(records, (list, tuple)):
+        records = list(records)
+    if numpy is not None and records:
+        try:
+            return _build_geometries_numpy(records, geometry_type,
+                                           geometry_fields, output)
+        except (TypeError, ValueError):
+            # Non-numeric coordinates. Fall back to the per-record checks.
+            pass
+    return _build_geometries_python(records, geometry_type, geometry_fields,
+                                    output)
@@ -0,0 +1,724 @@
+"""wsdottraffic.geopackage
+Queries the WSDOT Traveler Info REST endpoints and writes the results to a
+GeoPackage (SQLite) database.
+
+This module is an alternative to wsdottraffic.gp that only uses the Python
+standard library, so it can run where ArcGIS is not installed. Tables are
+defined by the same tabledefs.json and domains.json files used by
+wsdottraffic.gp. Coded value domains are stored using the GeoPackage schema
+extension (gpkg_data_columns and gpkg_data_column_constraints) and each
+feature table gets an R*Tree spatial index (the gpkg_rtree_index extension).
+
+GeoPackageWriter is the "gpkg" format of wsdottraffic.writers.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import struct
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from . import URLS, ENVIRONMENT_VAR_NAME
+from .geometry import get_points, get_envelope, to_wkb, wkb_to_points
+from .jsonhelpers import CustomEncoder
+from .tabledefs import (DOMAINS, GEOMETRY_TYPE_POINT, get_domain_values,
+                        get_geometry_info, get_table_def, iter_field_defs)
+from .pipeline import DEFAULT_MAX_WORKERS
+from .writers import TableWriter, write_traveler_info
+
+_LOGGER = logging.getLogger(__name__)
+
+# "GPKG" in ASCII, and GeoPackage version 1.2.
+APPLICATION_ID = 0x47504B47
+USER_VERSION = 10200
+
+SRS_ID = 4326
+FID_COLUMN = "fid"
+GEOMETRY_COLUMN = "geom"
+
+# GeoPackage column types for arcpy field types.
+COLUMN_TYPES = {
+    "TEXT": "TEXT",
+    "FLOAT": "FLOAT",
+    "SINGLE": "FLOAT",
+    "DOUBLE": "DOUBLE",
+    "SHORT": "SMALLINT",
+    "LONG": "MEDIUMINT",
+    "DATE": "DATETIME",
+    "GUID": "TEXT(38)",
+    "BLOB": "BLOB",
+}
+
+_WGS84_DEFINITION = (
+    'GEOGCS["WGS 84",DATUM["WGS_1984",SPHEROID["WGS 84",6378137,298.257223563,'
+    'AUTHORITY["EPSG","7030"]],AUTHORITY["EPSG","6326"]],PRIMEM["Greenwich",0,'
+    'AUTHORITY["EPSG","8901"]],UNIT["degree",0.0174532925199433,'
+    'AUTHORITY["EPSG","9122"]],AUTHORITY["EPSG","4326"]]')
+
+_CORE_TABLES_SQL = """
+CREATE TABLE IF NOT EXISTS gpkg_spatial_ref_sys (
+    srs_name TEXT NOT NULL,
+    srs_id INTEGER PRIMARY KEY,
+    organization TEXT NOT NULL,
+    organization_coordsys_id INTEGER NOT NULL,
+    definition TEXT NOT NULL,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS gpkg_contents (
+    table_name TEXT NOT NULL PRIMARY KEY,
+    data_type TEXT NOT NULL,
+    identifier TEXT UNIQUE,
+    description TEXT DEFAULT '',
+    last_change DATETIME NOT NULL
+        DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ','now')),
+    min_x DOUBLE,
+    min_y DOUBLE,
+    max_x DOUBLE,
+    max_y DOUBLE,
+    srs_id INTEGER,
+    CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id)
+        REFERENCES gpkg_spatial_ref_sys(srs_id)
+);
+CREATE TABLE IF NOT EXISTS gpkg_geometry_columns (
+    table_name TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    geometry_type_name TEXT NOT NULL,
+    srs_id INTEGER NOT NULL,
+    z TINYINT NOT NULL,
+    m TINYINT NOT NULL,
+    CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name),
+    CONSTRAINT uk_gc_table_name UNIQUE (table_name),
+    CONSTRAINT fk_gc_tn FOREIGN KEY (table_name)
+        REFERENCES gpkg_contents(table_name),
+    CONSTRAINT fk_gc_srs FOREIGN KEY (srs_id)
+        REFERENCES gpkg_spatial_ref_sys (srs_id)
+);
+CREATE TABLE IF NOT EXISTS gpkg_extensions (
+    table_name TEXT,
+    column_name TEXT,
+    extension_name TEXT NOT NULL,
+    definition TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    CONSTRAINT ge_tce UNIQUE (table_name, column_name, extension_name)
+);
+CREATE TABLE IF NOT EXISTS gpkg_data_columns (
+    table_name TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    name TEXT,
+    title TEXT,
+    description TEXT,
+    mime_type TEXT,
+    constraint_name TEXT,
+    CONSTRAINT pk_gdc PRIMARY KEY (table_name, column_name),
+    CONSTRAINT gdc_tn UNIQUE (table_name, name)
+);
+CREATE TABLE IF NOT EXISTS gpkg_data_column_constraints (
+    constraint_name TEXT NOT NULL,
+    constraint_type TEXT NOT NULL,
+    value TEXT,
+    min NUMERIC,
+    min_is_inclusive BOOLEAN,
+    max NUMERIC,
+    max_is_inclusive BOOLEAN,
+    description TEXT,
+    CONSTRAINT gdcc_ntv UNIQUE (constraint_name, constraint_type, value)
+);
+"""
+
+_RTREE_TRIGGERS_SQL = """
+CREATE TRIGGER "rtree_{t}_{c}_insert" AFTER INSERT ON "{t}"
+WHEN (new."{c}" NOT NULL AND NOT ST_IsEmpty(NEW."{c}"))
+BEGIN
+  INSERT OR REPLACE INTO "rtree_{t}_{c}" VALUES (
+    NEW."{i}", ST_MinX(NEW."{c}"), ST_MaxX(NEW."{c}"),
+    ST_MinY(NEW."{c}"), ST_MaxY(NEW."{c}"));
+END;
+CREATE TRIGGER "rtree_{t}_{c}_update1" AFTER UPDATE OF "{c}" ON "{t}"
+WHEN OLD."{i}" = NEW."{i}" AND
+     (NEW."{c}" NOTNULL AND NOT ST_IsEmpty(NEW."{c}"))
+BEGIN
+  INSERT OR REPLACE INTO "rtree_{t}_{c}" VALUES (
+    NEW."{i}", ST_MinX(NEW."{c}"), ST_MaxX(NEW."{c}"),
+    ST_MinY(NEW."{c}"), ST_MaxY(NEW."{c}"));
+END;
+CREATE TRIGGER "rtree_{t}_{c}_update2" AFTER UPDATE OF "{c}" ON "{t}"
+WHEN OLD."{i}" = NEW."{i}" AND (NEW."{c}" ISNULL OR ST_IsEmpty(NEW."{c}"))
+BEGIN
+  DELETE FROM "rtree_{t}_{c}" WHERE id = OLD."{i}";
+END;
+CREATE TRIGGER "rtree_{t}_{c}_update3" AFTER UPDATE ON "{t}"
+WHEN OLD."{i}" != NEW."{i}" AND
+     (NEW."{c}" NOTNULL AND NOT ST_IsEmpty(NEW."{c}"))
+BEGIN
+  DELETE FROM "rtree_{t}_{c}" WHERE id = OLD."{i}";
+  INSERT OR REPLACE INTO "rtree_{t}_{c}" VALUES (
+    NEW."{i}", ST_MinX(NEW."{c}"), ST_MaxX(NEW."{c}"),
+    ST_MinY(NEW."{c}"), ST_MaxY(NEW."{c}"));
+END;
+CREATE TRIGGER "rtree_{t}_{c}_update4" AFTER UPDATE ON "{t}"
+WHEN OLD."{i}" != NEW."{i}" AND (NEW."{c}" ISNULL OR ST_IsEmpty(NEW."{c}"))
+BEGIN
+  DELETE FROM "rtree_{t}_{c}" WHERE id IN (OLD."{i}", NEW."{i}");
+END;
+CREATE TRIGGER "rtree_{t}_{c}_delete" AFTER DELETE ON "{t}"
+WHEN old."{c}" NOT NULL
+BEGIN
+  DELETE FROM "rtree_{t}_{c}" WHERE id = OLD."{i}";
+END;
+"""
+
+_RTREE_TRIGGER_SUFFIXES = ("insert", "update1", "update2", "update3",
+                           "update4", "delete")
+
+_HEADER_STRUCT = struct.Struct("<2sBBi")
+_ENVELOPE_STRUCT = struct.Struct("<4d")
+# Envelope sizes for each value of the GeoPackage binary envelope indicator.
+_ENVELOPE_SIZES = (0, 32, 48, 48, 64)
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+def _execute_script(conn, sql):
+    """Executes several SQL statements. Unlike Connection.executescript, this
+    does not commit the current transaction.
+    """
+    statement = ""
+    for line in sql.splitlines(True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.execute(statement)
+            statement = ""
+
+
+def to_gpkg_geometry(points, geometry_type, srs_id=SRS_ID):
+    """Converts a list of (x, y) tuples to a GeoPackage geometry blob.
+    Returns None if there are no points.
+    """
+    wkb = to_wkb(points, geometry_type)
+    if wkb is None:
+        return None
+    if geometry_type == GEOMETRY_TYPE_POINT:
+        # Envelopes are optional and not useful for points.
+        return _HEADER_STRUCT.pack(b"GP", 0, 1, srs_id) + wkb
+    return b"".join((_HEADER_STRUCT.pack(b"GP", 0, 1 | (1 << 1), srs_id),
+                     _ENVELOPE_STRUCT.pack(*get_envelope(points)), wkb))
+
+
+def _parse_gpkg_geometry(blob):
+    """Returns the flags, envelope (or None) and WKB of a geometry blob."""
+    flags = bytearray(blob[3:4])[0]
+    byte_order = "<" if flags & 1 else ">"
+    envelope_size = _ENVELOPE_SIZES[(flags >> 1) & 7]
+    envelope = None
+    if envelope_size:
+        envelope = struct.unpack_from(byte_order + "4d", blob, 8)
+    return flags, envelope, blob[8 + envelope_size:]
+
+
+def from_gpkg_geometry(blob):
+    """Returns the (x, y) coordinates of a GeoPackage point or multipoint
+    geometry blob.
+    """
+    return wkb_to_points(_parse_gpkg_geometry(blob)[2])
+
+
+def _envelope_function(index):
+    """Creates an ST_MinX / ST_MaxX / ST_MinY / ST_MaxY SQL function."""
+    def _function(blob):
+        if blob is None:
+            return None
+        envelope = _parse_gpkg_geometry(blob)[1]
+        if envelope is None:
+            points = from_gpkg_geometry(blob)
+            if not points:
+                return None
+            envelope = get_envelope(points)
+        return envelope[index]
+    return _function
+
+
+def _st_is_empty(blob):
+    if blob is None:
+        return None
+    return (_parse_gpkg_geometry(blob)[0] >> 4) & 1
+
+
+def connect(gpkg_path):
+    """Opens a GeoPackage, creating it if it does not already exist.
+
+    The returned connection is in autocommit mode (transactions are managed
+    explicitly) and has the SQL functions used by the R*Tree triggers
+    registered.
+    """
+    is_new = not os.path.exists(gpkg_path)
+    conn = sqlite3.connect(gpkg_path, isolation_level=None)
+    for index, name in enumerate(("ST_MinX", "ST_MaxX", "ST_MinY", "ST_MaxY")):
+        conn.create_function(name, 1, _envelope_function(index))
+    conn.create_function("ST_IsEmpty", 1, _st_is_empty)
+    if is_new:
+        _LOGGER.debug("Creating GeoPackage %s", gpkg_path)
+        conn.execute("PRAGMA application_id = %d" % APPLICATION_ID)
+        conn.execute("PRAGMA user_version = %d" % USER_VERSION)
+    with _transaction(conn):
+        _execute_script(conn, _CORE_TABLES_SQL)
+        conn.executemany(
+            "INSERT OR IGNORE INTO gpkg_spatial_ref_sys VALUES "
+            "(?, ?, ?, ?, ?, ?)", [
+                ("Undefined cartesian SRS", -1, "NONE", -1, "undefined",
+                 "undefined cartesian coordinate reference system"),
+                ("Undefined geographic SRS", 0, "NONE", 0, "undefined",
+                 "undefined geographic coordinate reference system"),
+                ("WGS 84 geodetic", SRS_ID, "EPSG", SRS_ID,
+                 _WGS84_DEFINITION,
+                 "longitude/latitude coordinates in decimal degrees on the "
+                 "WGS 84 spheroid"),
+            ])
+    return conn
+
+
+@contextmanager
+def _transaction(conn):
+    """Runs the enclosed statements in a single transaction."""
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _to_sql_value(value):
+    """Converts a record value to a value that can be stored in SQLite."""
+    if isinstance(value, datetime.datetime):
+        if value.utcoffset() is not None:
+            value = (value - value.utcoffset()).replace(tzinfo=None)
+        return value.strftime("%Y-%m-%dT%H:%M:%S.") + "%03dZ" % (
+            value.microsecond // 1000)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, cls=CustomEncoder)
+    return value
+
+
+def _table_exists(conn, table_name):
+    return conn.execute(
+        "SELECT 1 FROM gpkg_contents WHERE table_name = ?",
+        (table_name,)).fetchone() is not None
+
+
+def _rtree_name(table_name):
+    return "rtree_%s_%s" % (table_name, GEOMETRY_COLUMN)
+
+
+def _create_rtree_triggers(conn, table_name):
+    _execute_script(conn, _RTREE_TRIGGERS_SQL.format(
+        t=table_name, c=GEOMETRY_COLUMN, i=FID_COLUMN))
+
+
+def _drop_rtree_triggers(conn, table_name):
+    for suffix in _RTREE_TRIGGER_SUFFIXES:
+        conn.execute("DROP TRIGGER IF EXISTS %s" % _quote("%s_%s" % (
+            _rtree_name(table_name), suffix)))
+
+
+def _create_schema(conn, table_name, table_def_dict, field_defs,
+                   geometry_type):
+    """Creates a table and registers it in the GeoPackage metadata tables.
+    Must be run inside of a transaction.
+    """
+    columns = ["%s INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL" % _quote(
+        FID_COLUMN)]
+    if geometry_type:
+        columns.append("%s %s" % (_quote(GEOMETRY_COLUMN), geometry_type))
+    for field_def in field_defs:
+        column_type = COLUMN_TYPES.get(field_def.field_type, "TEXT")
+        if field_def.field_type == "TEXT" and field_def.length:
+            column_type = "TEXT(%d)" % field_def.length
+        columns.append("%s %s" % (_quote(field_def.name), column_type))
+    conn.execute("CREATE TABLE %s (%s)" % (_quote(table_name),
+                                            ", ".join(columns)))
+    conn.execute(
+        "INSERT INTO gpkg_contents (table_name, data_type, identifier, "
+        "srs_id) VALUES (?, ?, ?, ?)",
+        (table_name, "features" if geometry_type else "attributes",
+         table_name, SRS_ID if geometry_type else None))
+
+    if geometry_type:
+        conn.execute(
+            "INSERT INTO gpkg_geometry_columns VALUES (?, ?, ?, ?, 0, 0)",
+            (table_name, GEOMETRY_COLUMN, geometry_type, SRS_ID))
+        conn.execute(
+            "CREATE VIRTUAL TABLE %s USING rtree(id, minx, maxx, miny, maxy)"
+            % _quote(_rtree_name(table_name)))
+        conn.execute(
+            "INSERT INTO gpkg_extensions VALUES (?, ?, ?, ?, ?)",
+            (table_name, GEOMETRY_COLUMN, "gpkg_rtree_index",
+             "http://www.geopackage.org/spec120/#extension_rtree",
+             "write-only"))
+        _create_rtree_triggers(conn, table_name)
+
+    # Field aliases and coded value domains use the schema extension.
+    domain_dict = table_def_dict.get("domains", {})
+    data_columns = []
+    for field_def in field_defs:
+        domain_name = domain_dict.get(field_def.key)
+        data_columns.append((table_name, field_def.name, field_def.name,
+                             field_def.alias, domain_name))
+        if domain_name:
+            conn.executemany(
+                "INSERT OR IGNORE INTO gpkg_data_column_constraints "
+                "(constraint_name, constraint_type, value, description) "
+                "VALUES (?, 'enum', ?, ?)",
+                [(domain_name, str(code), description) for code, description
+                 in get_domain_values(DOMAINS[domain_name])])
+    conn.executemany(
+        "INSERT OR REPLACE INTO gpkg_data_columns (table_name, column_name, "
+        "name, title, constraint_name) VALUES (?, ?, ?, ?, ?)", data_columns)
+    conn.executemany(
+        "INSERT OR IGNORE INTO gpkg_extensions VALUES (?, NULL, ?, ?, ?)",
+        [(name, "gpkg_schema", "http://www.geopackage.org/spec/#extension_schema",
+          "read-write") for name in ("gpkg_data_columns",
+                                     "gpkg_data_column_constraints")])
+
+
+def _build_rows(data_list, field_defs, geometry_type, geometry_fields,
+                start_fid=1):
+    """Converts records to SQL parameter tuples.
+
+    Returns the rows (fid, [geometry,] values...) and the R*Tree rows
+    (fid, min_x, max_x, min_y, max_y). fids are numbered from start_fid.
+    """
+    keys = [field_def.key for field_def in field_defs]
+    rows = []
+    rtree_rows = []
+    for fid, item in enumerate(data_list, start_fid):
+        row = [fid]
+        if geometry_type:
+            points = get_points(item, geometry_type, geometry_fields)
+            if points:
+                row.append(to_gpkg_geometry(points, geometry_type))
+                rtree_rows.append((fid,) + get_envelope(points))
+            else:
+                _LOGGER.warning("No valid geometry. Setting to NULL.\n%s",
+                                json.dumps(item, cls=CustomEncoder))
+                row.append(None)
+        get = item.get
+        row.extend([_to_sql_value(get(key)) for key in keys])
+        rows.append(row)
+    return rows, rtree_rows
+
+
+def _get_columns(field_defs, geometry_type):
+    """Returns the names of a table's columns, in _build_rows order."""
+    columns = [FID_COLUMN]
+    if geometry_type:
+        columns.append(GEOMETRY_COLUMN)
+    columns.extend(field_def.name for field_def in field_defs)
+    return columns
+
+
+def _insert_rows(conn, table_name, columns, rows):
+    conn.executemany("INSERT INTO %s (%s) VALUES (%s)" % (
+        _quote(table_name), ", ".join(map(_quote, columns)),
+        ", ".join("?" * len(columns))), rows)
+
+
+def _update_contents(conn, table_name, geometry_type):
+    """Updates the bounds and last change time of a table in gpkg_contents.
+    """
+    bounds = (None,) * 4
+    if geometry_type:
+        # The R*Tree's single precision boxes are rounded outward, so these
+        # bounds are never smaller than the data's.
+        bounds = conn.execute(
+            "SELECT MIN(minx), MIN(miny), MAX(maxx), MAX(maxy) FROM %s" %
+            _quote(_rtree_name(table_name))).fetchone()
+    conn.execute(
+        "UPDATE gpkg_contents SET min_x = ?, min_y = ?, max_x = ?, "
+        "max_y = ?, last_change = strftime('%Y-%m-%dT%H:%M:%fZ','now') "
+        "WHERE table_name = ?", tuple(bounds) + (table_name,))
+
+
+def _prepare_table(conn, table_name, table_def_dict):
+    """Creates a table if it doesn't exist. Must be run inside of a
+    transaction.
+
+    Returns the table definition, field definitions, geometry type and
+    geometry fields of the table.
+    """
+    table_def_dict = get_table_def(table_name, table_def_dict)
+    geometry_type, geometry_fields = get_geometry_info(table_def_dict)
+    field_defs = list(iter_field_defs(table_def_dict, geometry_fields))
+    if not _table_exists(conn, table_name):
+        _LOGGER.info("Creating table %(table_name)s...",
+                     {"table_name": table_name})
+        _create_schema(conn, table_name, table_def_dict, field_defs,
+                       geometry_type)
+    return table_def_dict, field_defs, geometry_type, geometry_fields
+
+
+def _load_rows(conn, table_name, data_list, field_defs, geometry_type,
+               geometry_fields, truncate):
+    """Bulk inserts records into a table. Must be run inside of a
+    transaction.
+    """
+    _LOGGER.info("Adding data to %s...", table_name)
+    start_fid = 1
+    if geometry_type:
+        # The index is updated in bulk instead of row by row by the
+        # triggers.
+        _drop_rtree_triggers(conn, table_name)
+    if truncate:
+        if geometry_type:
+            conn.execute("DELETE FROM %s" % _quote(_rtree_name(table_name)))
+        conn.execute("DELETE FROM %s" % _quote(table_name))
+    else:
+        start_fid += conn.execute("SELECT IFNULL(MAX(%s), 0) FROM %s" % (
+            _quote(FID_COLUMN), _quote(table_name))).fetchone()[0]
+    rows, rtree_rows = _build_rows(data_list, field_defs, geometry_type,
+                                   geometry_fields, start_fid)
+    _insert_rows(conn, table_name, _get_columns(field_defs, geometry_type),
+                 rows)
+    if geometry_type:
+        conn.executemany(
+            "INSERT INTO %s VALUES (?, ?, ?, ?, ?)" % _quote(
+                _rtree_name(table_name)), rtree_rows)
+        _create_rtree_triggers(conn, table_name)
+    _update_contents(conn, table_name, geometry_type)
+    return len(rows)
+
+
+def create_table(table_path, table_def_dict=None, data_list=None,
+                 templates_workspace=None):
+    """Creates a GeoPackage table for one of the Traveler API REST Endpoints'
+    data. This function can be used in place of wsdottraffic.gp.create_table.
+
+    Parameters
+    ----------
+    table_path : str
+        The GeoPackage path followed by the table name (e.g.,
+        "TravelerInfo.gpkg/HighwayAlerts"). The GeoPackage is created if it
+        does not exist. If the table already exists it will be truncated.
+    table_def_dict : dict, optional
+        A dict that defines the fields that will be created.  If omitted, the
+        fields will be determined by the table path.
+    data_list : list, optional
+        A list of data returned from wsdottraffic.get_traveler_info that will
+        be used to populate the table.
+    templates_workspace : str, optional
+        Ignored. Accepted for compatibility with wsdottraffic.gp.create_table.
+    """
+    del templates_workspace
+    gpkg_path, table_name = os.path.split(table_path)
+    conn = connect(gpkg_path)
+    try:
+        load_table(conn, table_name, table_def_dict, data_list)
+    finally:
+        conn.close()
+
+
+def load_table(conn, table_name, table_def_dict=None, data_list=None,
+               truncate=True):
+    """Creates a table in an open GeoPackage (see connect) if it doesn't
+    already exist and, if data_list is provided, replaces its data.
+
+    The data is bulk inserted in a single transaction, so readers never see
+    a partially loaded table. If truncate is False, the data is appended to
+    the table's existing rows instead of replacing them.
+
+    Returns the number of rows inserted.
+    """
+    rowcount = 0
+    with _transaction(conn):
+        _, field_defs, geometry_type, geometry_fields = _prepare_table(
+            conn, table_name, table_def_dict)
+        if data_list is None:
+            return rowcount
+        rowcount = _load_rows(conn, table_name, data_list, field_defs,
+                              geometry_type, geometry_fields, truncate)
+    _LOGGER.info("Added %(rowcount)d rows to %(table_name)s.", {
+        "rowcount": rowcount, "table_name": table_name})
+    return rowcount
+
+
+def upsert_table(conn, table_name, table_def_dict=None, data_list=()):
+    """Makes the rows of a table in an open GeoPackage match a list of
+    records, writing only the rows that changed, in a single transaction.
+
+    Rows are matched to records by the table's keyFields. Changed rows are
+    updated, new records inserted and rows without a record deleted. The
+    R*Tree triggers keep the spatial index up to date. Tables without
+    keyFields, or whose keys are not unique, are reloaded instead (see
+    load_table).
+
+    Returns the number of rows updated, inserted and deleted.
+    """
+    data_list = list(data_list)
+    with _transaction(conn):
+        table_def_dict, field_defs, geometry_type, geometry_fields = \
+            _prepare_table(conn, table_name, table_def_dict)
+        key_fields = table_def_dict.get("keyFields")
+        columns = _get_columns(field_defs, geometry_type)
+        # Rows are compared without their fids.
+        rows = [row[1:] for row in _build_rows(
+            data_list, field_defs, geometry_type, geometry_fields)[0]]
+        keys = [field_def.key for field_def in field_defs]
+        key_indices = []
+        if key_fields:
+            key_indices = [columns.index(field_defs[keys.index(key)].name) - 1
+                           for key in key_fields]
+        new_rows = OrderedDict()
+        for row in rows:
+            key = tuple(row[index] for index in key_indices)
+            if key in new_rows:
+                break
+            new_rows[key] = row
+        existing = {}
+        if key_fields and len(new_rows) == len(rows):
+            for existing_row in conn.execute("SELECT %s FROM %s" % (
+                    ", ".join(map(_quote, columns)), _quote(table_name))):
+                key = tuple(existing_row[index + 1] for index in key_indices)
+                if key in existing:
+                    break
+                existing[key] = existing_row
+            else:
+                return _sync_rows(conn, table_name, columns, new_rows,
+                                  existing, geometry_type)
+        _LOGGER.info("%(table_name)s has no unique keyFields. It will be "
+                     "truncated and reloaded.", {"table_name": table_name})
+        return _load_rows(conn, table_name, data_list, field_defs,
+                          geometry_type, geometry_fields, True)
+
+
+def _sync_rows(conn, table_name, columns, new_rows, existing, geometry_type):
+    """Writes the differences between the existing rows, (fid, values...)
+    keyed by their keys, and the new rows, (values...) keyed by their keys.
+    Must be run inside of a transaction.
+    """
+    updated_rows = []
+    deleted_fids = []
+    for key, existing_row in existing.items():
+        new_row = new_rows.get(key)
+        if new_row is None:
+            deleted_fids.append((existing_row[0],))
+        elif list(existing_row[1:]) != new_row:
+            updated_rows.append(new_row + [existing_row[0]])
+    inserted_rows = [row for key, row in new_rows.items()
+                     if key not in existing]
+    _LOGGER.info(
+        "Syncing %(table_name)s: %(updated)d updated, %(inserted)d inserted, "
+        "%(deleted)d deleted rows.", {
+            "table_name": table_name, "updated": len(updated_rows),
+            "inserted": len(inserted_rows), "deleted": len(deleted_fids)})
+    quoted_table = _quote(table_name)
+    conn.executemany("DELETE FROM %s WHERE %s = ?" % (
+        quoted_table, _quote(FID_COLUMN)), deleted_fids)
+    conn.executemany("UPDATE %s SET %s WHERE %s = ?" % (
+        quoted_table, ", ".join("%s = ?" % _quote(column)
+                                for column in columns[1:]),
+        _quote(FID_COLUMN)), updated_rows)
+    _insert_rows(conn, table_name, columns[1:], inserted_rows)
+    _update_contents(conn, table_name, geometry_type)
+    return len(updated_rows) + len(inserted_rows) + len(deleted_fids)
+
+
+class GeoPackageWriter(TableWriter):
+    """Writes tables to a GeoPackage (see writers.TableWriter). The
+    GeoPackage is created if it does not exist.
+    """
+
+    format_name = "gpkg"
+
+    def __init__(self, out_path):
+        super(GeoPackageWriter, self).__init__(out_path)
+        self.conn = connect(out_path)
+
+    def create_schema(self, table_name, table_def_dict=None):
+        load_table(self.conn, table_name, table_def_dict)
+
+    def truncate(self, table_name):
+        load_table(self.conn, table_name, data_list=[])
+
+    def append(self, table_name, data_list, table_def_dict=None):
+        load_table(self.conn, table_name, table_def_dict, data_list,
+                   truncate=False)
+
+    def upsert(self, table_name, data_list, table_def_dict=None):
+        upsert_table(self.conn, table_name, table_def_dict, data_list)
+
+    def write_table(self, table_name, data_list=None, table_def_dict=None,
+                    sync=False):
+        # Tables are created and loaded in a single transaction.
+        if sync and data_list is not None:
+            upsert_table(self.conn, table_name, table_def_dict, data_list)
+        else:
+            load_table(self.conn, table_name, table_def_dict, data_list)
+
+    def close(self):
+        self.conn.close()
+
+
+def create_gpkg(out_gpkg_path="./TravelerInfo.gpkg", access_code=None,
+                templates_gdb=None, names=None, skip_data=False, sync=False,
+                fetch_workers=DEFAULT_MAX_WORKERS):
+    """Creates a GeoPackage of traffic API info. Takes the same parameters as
+    wsdottraffic.gp.__main__.create_gdb (templates_gdb is ignored).
+    """
+    del templates_gdb
+    with GeoPackageWriter(out_gpkg_path) as writer:
+        write_traveler_info(writer, names, access_code, skip_data, sync,
+                            fetch_workers)
+
+
+def main():
+    """Uses this when run as a script
+    """
+    default_gpkg_path = "./TravelerInfo.gpkg"
+    api_code = os.environ.get(ENVIRONMENT_VAR_NAME)
+
+    parser = argparse.ArgumentParser(
+        description="Creates a GeoPackage using data from the WSDOT Traffic API.")
+    parser.add_argument("--gpkg-path", type=str, default=default_gpkg_path,
+                        help='Path to where the GeoPackage will be created. Defaults to "%s".' % default_gpkg_path,
+                        nargs="?")
+    p_help = "WSDOT Traffic API code. Defaults to value of %s environment variable if available. If this environment variable does not exist, then this parameter is required." % ENVIRONMENT_VAR_NAME
+    parser.add_argument("--code", "-c", type=str,
+                        required=api_code is None, default=api_code,
+                        help=p_help)
+    parser.add_argument("--schema-only", action="store_true", help="Using this flag will generate the tables but skips the data download and population steps.")
+    parser.add_argument("--log-level", choices=(
+        "CRITICAL",
+        "ERROR",
+        "WARNING",
+        "INFO",
+        "DEBUG",
+        "NOTSET"
+    ), default=logging.NOTSET)
+
+    p_help = 'One or more of the following values: %s' % set(URLS.keys())
+
+    parser.add_argument("names", type=str,
+                        nargs=argparse.REMAINDER, help=p_help)
+
+    args = parser.parse_args()
+    if args.log_level:
+        logging.basicConfig(level=getattr(logging, args.log_level.upper()))
+
+    create_gpkg(args.gpkg_path, args.code, names=args.names or None,
+                skip_data=args.schema_only)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+"""Writes the traveler info tables as GeoParquet files.
+
+The output is a directory with a .parquet file per table. Geometries are
+stored as WKB in a "geometry" column, described by the file's "geo"
+metadata (GeoParquet 1.0.0), so the files can be read by GeoPandas, GDAL and
+DuckDB as well as by any Parquet reader.
+
+Parquet files can't be modified in place, so the tables are kept in memory
+as Arrow tables and each file is rewritten by ParquetWriter.finalize.
+
+Requires the pyarrow package.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import json
+import logging
+import os
+
+from .geometry import get_points, to_wkb
+from .jsonhelpers import CustomEncoder
+from .tabledefs import (GEOMETRY_TYPE_MULTIPOINT, GEOMETRY_TYPE_POINT,
+                        get_geometry_info, get_table_def, iter_field_defs)
+from .writers import TableWriter
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pyarrow_parquet
+except ImportError:
+    pyarrow = None
+    pyarrow_parquet = None
+
+_LOGGER = logging.getLogger(__name__)
+
+GEOMETRY_COLUMN = "geometry"
+GEOPARQUET_VERSION = "1.0.0"
+
+# GeoParquet geometry types.
+GEOMETRY_TYPES = {
+    GEOMETRY_TYPE_POINT: "Point",
+    GEOMETRY_TYPE_MULTIPOINT: "MultiPoint",
+}
+
+
+def _check_pyarrow():
+    if pyarrow is None:
+        raise ImportError(
+            "The pyarrow package is required to write Parquet files.")
+
+
+def get_arrow_type(field_type):
+    """Returns the Arrow data type of an arcpy field type."""
+    _check_pyarrow()
+    field_type = field_type.upper()
+    if field_type in ("TEXT", "GUID"):
+        return pyarrow.string()
+    if field_type in ("FLOAT", "SINGLE"):
+        return pyarrow.float32()
+    if field_type == "DOUBLE":
+        return pyarrow.float64()
+    if field_type == "SHORT":
+        return pyarrow.int16()
+    if field_type == "LONG":
+        return pyarrow.int32()
+    if field_type == "DATE":
+        return pyarrow.timestamp("us", tz="UTC")
+    if field_type == "BLOB":
+        return pyarrow.binary()
+    raise ValueError("Unsupported field type: %s" % field_type)
+
+
+def _to_arrow_value(value):
+    """Converts a record value to a value Arrow can convert to its column's
+    type. Dates are converted to UTC, since Arrow takes naive dates as UTC.
+    """
+    if isinstance(value, datetime.datetime) and value.utcoffset() is not None:
+        return (value - value.utcoffset()).replace(tzinfo=None)
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, cls=CustomEncoder)
+    return value
+
+
+class _Table(object):
+    """The schema of a table and its rows, as a list of Arrow tables."""
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, table_name, table_def_dict, path):
+        self.name = table_name
+        self.table_def_dict = table_def_dict
+        self.path = path
+        self.geometry_type, self.geometry_fields = get_geometry_info(
+            table_def_dict)
+        self.field_defs = list(iter_field_defs(table_def_dict,
+                                               self.geometry_fields))
+        fields = [pyarrow.field(field_def.name,
+                                get_arrow_type(field_def.field_type))
+                  for field_def in self.field_defs]
+        metadata = None
+        if self.geometry_type:
+            fields.append(pyarrow.field(GEOMETRY_COLUMN, pyarrow.binary()))
+            # The default crs of GeoParquet, OGC:CRS84, is WGS 84 with
+            # longitude, latitude axis order.
+            metadata = {b"geo": json.dumps({
+                "version": GEOPARQUET_VERSION,
+                "primary_column": GEOMETRY_COLUMN,
+                "columns": {GEOMETRY_COLUMN: {
+                    "encoding": "WKB",
+                    "geometry_types": [GEOMETRY_TYPES[self.geometry_type]]}}
+            }).encode("utf-8")}
+        self.schema = pyarrow.schema(fields, metadata)
+        self.batches = []
+        if os.path.exists(path):
+            self.batches.append(pyarrow_parquet.read_table(
+                path, schema=self.schema))
+
+    def to_arrow(self, data_list):
+        """Converts records to an Arrow table with the table's schema."""
+        columns = [[_to_arrow_value(item.get(field_def.key))
+                    for item in data_list] for field_def in self.field_defs]
+        if self.geometry_type:
+            columns.append([to_wkb(get_points(item, self.geometry_type,
+                                              self.geometry_fields),
+                                   self.geometry_type)
+                            for item in data_list])
+        return pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=field.type)
+             for column, field in zip(columns, self.schema)],
+            schema=self.schema)
+
+
+class ParquetWriter(TableWriter):
+    """Writes tables as GeoParquet files in a directory (see
+    writers.TableWriter).
+
+    Existing files are read by create_schema, so appended rows are added to
+    the rows of a previous run. Tables are rewritten in full, so upsert
+    replaces the rows.
+    """
+
+    format_name = "parquet"
+
+    def __init__(self, out_path, compression="snappy"):
+        _check_pyarrow()
+        super(ParquetWriter, self).__init__(out_path)
+        self.compression = compression
+        self.tables = {}
+        if not os.path.isdir(out_path):
+            os.makedirs(out_path)
+
+    @classmethod
+    def is_available(cls):
+        return pyarrow is not None
+
+    def create_schema(self, table_name, table_def_dict=None):
+        if table_name not in self.tables:
+            self.tables[table_name] = _Table(
+                table_name, get_table_def(table_name, table_def_dict),
+                os.path.join(self.out_path, "%s.parquet" % table_name))
+
+    def truncate(self, table_name):
+        self.create_schema(table_name)
+        del self.tables[table_name].batches[:]
+
+    def append(self, table_name, data_list, table_def_dict=None):
+        self.create_schema(table_name, table_def_dict)
+        table = self.tables[table_name]
+        table.batches.append(table.to_arrow(list(data_list)))
+
+    def finalize(self):
+        for table in self.tables.values():
+            arrow_table = (pyarrow.concat_tables(table.batches)
+                           if table.batches else table.schema.empty_table())
+            # Write to a temporary file, so a failed write doesn't destroy
+            # the previous file.
+            temp_path = table.path + ".tmp"
+            pyarrow_parquet.write_table(arrow_table, temp_path,
+                                        compression=self.compression)
+            if os.path.exists(table.path):
+                os.remove(table.path)
+            os.rename(temp_path, table.path)
+            _LOGGER.info("Wrote %(rowcount)d rows to %(path)s.", {
+                "rowcount": arrow_table.num_rows, "path": table.path})
@@ -3,88 +3,43 @@ Queries the WSDOT Traveler Info REST endpoints and populates a table using the
 results.
 """
 import os
-from os.path import join, dirname
-from collections import OrderedDict
 import re
 import json
+import datetime
+import struct
 import zipfile
 import warnings
 import logging
+from collections import OrderedDict
 
-import arcpy
+from ..arcpybackend import arcpy
 from ..parseutils import split_camel_case
 from .. import get_traveler_info
 from ..resturls import URLS
-from .domaintools import add_domain
+from .bulkload import bulk_insert
+from .domaintools import DomainRegistry
 from ..jsonhelpers import CustomEncoder
-from ..dicttools import dict_has_all_keys
+from ..recordarrays import get_columns
+from ..validation import validate_records, write_quarantine
+from ..geometry import (OUTPUT_WKB, OUTPUT_XY, build_geometries,
+                        wkb_to_points)
+# DOMAINS and TABLE_DEFS_DICT_DICT are loaded from the JSON files in this
+# package's directory. They are imported here for backwards compatibility.
+from ..tabledefs import (DOMAINS, TABLE_DEFS_DICT_DICT, GEOMETRY_TYPE_POINT,
+                         GEOMETRY_TYPE_MULTIPOINT, get_geometry_info,
+                         iter_field_defs)
 
 _LOGGER = logging.getLogger(__name__)
 
-# JSON files are in the same directory as this script. This function
-# returns that directory.
-def _get_json_dir():
-    return dirname(__file__)
-
-# Load list info for creating geodatabase domains.
-with open(join(_get_json_dir(), "./domains.json"), "r") as domains_file:
-    DOMAINS = json.load(domains_file, object_pairs_hook=OrderedDict)
-
-# This dictionary defines the fields in each table.  Each field's dictionary
-# entry can either contain a single string value indicating the field type, or
-# a dictionary with parameters for the arcpy.management.AddField function
-# (excluding in_table and field_name, which are already provided by the
-# dictionary keys).
-with open(join(_get_json_dir(), "./tabledefs.json"), "r") as def_file:
-    TABLE_DEFS_DICT_DICT = json.load(def_file, object_pairs_hook=OrderedDict)
-
-
-def _are_coords_valid(*coords):
-    """Returns False if a coordinate is either 0 or None, True otherwise.
-
-    Parameters
-    ----------
-    coords: one or more number values.
-    """
-    for coord in coords:
-        if coord == 0 or coord is None:
-            return False
-    return True
-
-
-def _create_multipoint(*args):
-    """Creates an arcpy.Multipoint from a series of numbers with an even number
-    of elements.
-    """
-    if len(args) % 2 != 0:
-        raise ValueError("The number of arguments must be even.")
-    elif not args:
-        return None
-
-    # Loop through the input numbers as XY pairs.
-    # Create an array of points.
-    i = 0
-    arc_array = arcpy.Array()
-    while i < len(args):
-        x = args[i]
-        i += 1
-        y = args[i]
-        i += 1
-        # Only add the coordinates if they are valid.
-        if _are_coords_valid(x, y):
-            arc_array.add(arcpy.Point(x, y))
-
-    if not arc_array:
-        return None
-
-    # Create a Multipoint using the point array.
-    shape = arcpy.Multipoint(arc_array)
-    return shape
-
 
 def create_table(table_path, table_def_dict=None,
                  data_list=None,
-                 templates_workspace=None):
+                 templates_workspace=None,
+                 sync=False,
+                 bulk=False,
+                 domain_registry=None,
+                 quarantine_path=None,
+                 truncate=True):
     """Creates a table for one of the Traveler API REST Endpoints' data.
 
     Parameters
@@ -101,6 +56,29 @@ def create_table(table_path, table_def_dict=None,
     templatesWorkspace : str, optional
         The path to a geodatabase containing template tables.  This will be
         faster than using the AddField tool.
+    sync : bool, optional
+        If True and the table already exists, it is not truncated. Instead,
+        rows are matched to the data by the table's keyFields, and only
+        changed rows are updated, new rows inserted and vanished rows
+        deleted, in a single edit operation. Tables without keyFields are
+        truncated and reloaded.
+    bulk : bool, optional
+        If True, rows of point feature classes are loaded from a NumPy
+        structured array with a single Append (see gp.bulkload) instead of
+        an InsertCursor. Rows that fail validation, and all rows of
+        multipoint feature classes, are still inserted one at a time.
+    domain_registry : gp.domaintools.DomainRegistry, optional
+        Registry of the workspace's domains. Pass the same registry when
+        creating several tables in a workspace, so its domains are listed
+        and created only once.
+    quarantine_path : str, optional
+        Records with values that don't fit the table's fields are not
+        loaded. If this is provided, they are appended to this file, one
+        JSON object per line, with the reasons they were rejected (see
+        wsdottraffic.validation).
+    truncate : bool, optional
+        If False, the rows of an existing table are kept and data_list is
+        appended to them (unless sync applies). Defaults to True.
     """
     POINT_X_FIELD = "Longitude"
     POINT_Y_FIELD = "Latitude"
@@ -121,26 +99,19 @@ def create_table(table_path, table_def_dict=None,
     field_dict = table_def_dict["fields"]
 
     # Check to see if geometry type and fields are explicitly specified.
-    if "geometryInfo" in table_def_dict:
-        geometry_info = table_def_dict["geometryInfo"]
-        is_point = re.match("POINT", geometry_info["geometryType"],
-                            re.IGNORECASE) is not None
-        if is_point:
-            if "fields" in geometry_info:
-                POINT_FIELD_NAMES = geometry_info["fields"]
-            is_polyline = False
-    else:
-        is_point = dict_has_all_keys(field_dict, *POINT_FIELD_NAMES)
-        is_polyline = dict_has_all_keys(field_dict, *MULTIPOINT_FIELD_NAMES)
+    # If input contains fields for both shape types, multipoint is picked,
+    # since feature class can't have both.
+    geometry_type, geometry_fields = get_geometry_info(table_def_dict)
+    is_point = geometry_type == GEOMETRY_TYPE_POINT
+    is_polyline = geometry_type == GEOMETRY_TYPE_MULTIPOINT
+    if is_point:
+        POINT_FIELD_NAMES = geometry_fields
     if not (is_point or is_polyline):
         raise ValueError(
             "%s does not contain fields necessary for Shape" %
             field_dict.keys())
-    elif is_point and is_polyline:
-        # If input contains fields for both shape types,
-        # pick one, since feature class can't have both.
-        is_point = False
 
+    sync_rows = False
     # Create the table if it does not already exist.
     if not arcpy.Exists(table_path):
         # Check to see if the fieldDict parameter was provided.
@@ -153,7 +124,7 @@ def create_table(table_path, table_def_dict=None,
             template_path = os.path.join(templates_workspace, table_name)
             _LOGGER.info(
                 "Creating table %(table_path)s using template " +
-                "%s(template_path)...",
+                "%(template_path)s...",
                 {"table_path": table_path, "template_path": template_path})
             if is_point:
                 arcpy.management.CreateFeatureclass(
@@ -168,7 +139,7 @@ def create_table(table_path, table_def_dict=None,
                     workspace, fc_name, template=template_path)
         else:
             _LOGGER.info("Creating table %(table_path)s...",
-                         {"table_path", table_path})
+                         {"table_path": table_path})
             # _LOGGER.warning(
             #     "Creating table without a template.  Table creation would " +
             #     "be faster if using a template.")
@@ -189,112 +160,74 @@ def create_table(table_path, table_def_dict=None,
             _LOGGER.info("Adding fields...")
 
             _add_fields(field_dict, table_path, ignored_fields)
-            _add_domains(table_def_dict, table_path)
 
-    else:
+        # Domains are not copied from templates in other workspaces.
+        _add_domains(table_def_dict, table_path, domain_registry)
+
+    elif sync and data_list is not None and table_def_dict.get("keyFields"):
+        sync_rows = True
+    elif truncate:
+        if sync and data_list is not None:
+            _LOGGER.info("%(table_path)s has no keyFields. It will be "
+                         "truncated and reloaded.", {"table_path": table_path})
         _LOGGER.info("Truncating table %(table_path)s...",
                      {"table_path": table_path})
         # Truncate the table if it already exists
         arcpy.management.DeleteRows(table_path)
 
     if data_list is not None:
-        bad_value_re = re.compile(r"^(?P<error>.+) \[(?P<field>\w+)\]$",
-                                  re.MULTILINE)
+        if is_point:
+            geometry_fields = POINT_FIELD_NAMES
+        else:
+            geometry_fields = MULTIPOINT_FIELD_NAMES
+        data_list = list(data_list)
+        validation = validate_records(data_list, table_def_dict,
+                                      geometry_fields)
+        quarantined = []
+        if validation.errors:
+            _quarantine_records(table_path, data_list, validation,
+                                quarantine_path)
+            quarantined = [data_list[index]
+                           for index in sorted(validation.errors)]
+            data_list = [data_list[index]
+                         for index in validation.valid_indices]
+        geometries = _build_geometries(table_path, data_list, geometry_type,
+                                       geometry_fields)
+        fields, build_row = _compile_row_builder(field_dict, geometry_type,
+                                                 geometry_fields)
+        if sync_rows:
+            if _sync_rows(table_path, table_def_dict, fields, build_row,
+                          data_list, geometries, quarantined):
+                return
+            arcpy.management.DeleteRows(table_path)
         _LOGGER.info("Adding data to %s...", table_path)
-        fields = list(field_dict.keys())
-
-        if is_polyline:
-            for field in MULTIPOINT_FIELD_NAMES:
-                fields.remove(field)
-            fields.append("SHAPE@")
-        elif is_point:
-            for field in POINT_FIELD_NAMES:
-                fields.remove(field)
-            fields.append("SHAPE@XY")
-        rowcounter = 0
+        rows = [build_row(item, geometry)
+                for item, geometry in zip(data_list, geometries)]
+        if bulk and is_point:
+            columns = get_columns(iter_field_defs(table_def_dict),
+                                  fields[:-1])
+            cursor_indices = bulk_insert(table_path, columns, rows, 2)
+        else:
+            if bulk:
+                _LOGGER.info(
+                    "Multipoint feature classes can't be bulk loaded. "
+                    "Inserting rows into %(table_path)s one at a time.",
+                    {"table_path": table_path})
+            cursor_indices = range(len(rows))
+        rowcounter = len(rows) - len(cursor_indices)
         failcounter = 0
         with arcpy.da.InsertCursor(table_path, fields) as cursor:
-            for item in data_list:
-                row = []
-                for key in fields:
-                    if (key == "SHAPE@XY" and
-                            dict_has_all_keys(item, *POINT_FIELD_NAMES)):
-                        x, y = map(item.get, POINT_FIELD_NAMES, (None,) * 2)
-                        if not _are_coords_valid(x, y):
-                            _LOGGER.warning(
-                                "Invalid point coordinates. Setting to NULL." +
-                                "\n%s\n%s",
-                                table_path,
-                                json.dumps(item, cls=CustomEncoder))
-                            row.append(None)
-                        else:
-                            row.append((x, y))
-                    elif (key == "SHAPE@" and
-                          dict_has_all_keys(item, *MULTIPOINT_FIELD_NAMES)):
-                        x1, y1, x2, y2 = map(
-                            item.get, MULTIPOINT_FIELD_NAMES, (None,) * 4)
-                        shape = _create_multipoint(x1, y1, x2, y2)
-
-                        if not shape:
-                            # If the multipoint fields didn't have valid
-                            # values, check for point field definitions.
-                            if dict_has_all_keys(*POINT_FIELD_NAMES):
-                                x, y = map(
-                                    item.get, POINT_FIELD_NAMES, (None,) * 2)
-                                shape = _create_multipoint(x, y)
-                            else:
-                                _LOGGER.warning("No valid multipoint\n%s\n%s",
-                                                table_path, item)
-                        row.append(shape)
-                    elif key not in item:
-                        row.append(None)
-                    else:
-                        val = item[key]
-                        row.append(val)
+            insert_row = cursor.insertRow
+            for index in cursor_indices:
+                row = rows[index]
                 try:
-                    cursor.insertRow(row)
+                    insert_row(row)
                 except RuntimeError as err_inst:
-                    # Sample args value of errInst:
-                    # tuple: ('ERROR 999999: Error executing function.\nThe row
-                    # contains a bad value. [CVRestrictions]\nThe row contains
-                    # a bad value. [RestrictionComment]',)
-
-                    ex_message = ("Error inserting %(row)s into %(table)s, " +
-                                  "which has these fields: %(fields)s")
-                    warnings.warn(ex_message % {
-                        "row": row,
-                        "table": table_name,
-                        "fields": fields
-                    })
-
-                    if err_inst.args:
-                        msg_template = ("Bad value in [%s] field.\n" +
-                                        "Length is %s.\n" +
-                                        "Value is %s\n" + "%s")
-                        for arg in err_inst.args:
-                            matches = bad_value_re.findall(arg)
-                            # [(u'The row contains a bad value.',
-                            # u'CVRestrictions'), (u'The row contains a bad
-                            # value.', u'RestrictionComment')]
-                            for match in matches:
-                                error_msg, field_name = match
-                                if field_name != table_name:
-                                    warnings.warn(msg_template % (
-                                        field_name, len(item[field_name]),
-                                        item[field_name], error_msg))
-                                else:
-                                    pass
-                    else:
-                        warnings.warn(
-                            "Error adding row to %(table).\n" +
-                            "%(err_inst)s\n%(item)s", {
-                                "table": table_name,
-                                "err_inst": err_inst,
-                                "item": item})
+                    _warn_insert_error(err_inst, table_name, fields, row,
+                                       data_list[index])
                     failcounter += 1
                     raise
-                else:
-                    rowcounter += 1
+                rowcounter += 1
         _LOGGER.info(
             "Added %(rowcounter)d rows to %(table_path)s." +
             " Failed to add %(failcounter)d rows.", {
@@ -302,6 +235,299 @@ def create_table(table_path, table_def_dict=None,
                 "failcounter": failcounter})
 
 
+def _quarantine_records(table_path, data_list, validation, quarantine_path):
+    """Reports the records that failed validation and, if quarantine_path is
+    provided, writes them to the quarantine file.
+    """
+    first_index = min(validation.errors)
+    _LOGGER.warning(
+        "%(count)d rows of %(table_path)s failed validation and will not be "
+        "loaded%(destination)s. First row's errors: %(errors)s", {
+            "count": len(validation.errors), "table_path": table_path,
+            "destination": (" (see %s)" % quarantine_path
+                            if quarantine_path else ""),
+            "errors": "; ".join(validation.errors[first_index])})
+    if quarantine_path:
+        write_quarantine(quarantine_path, os.path.basename(table_path),
+                         data_list, validation.errors)
+
+
+def _compile_row_builder(field_dict, geometry_type, geometry_fields):
+    """Creates a function that converts a record and its geometry into an
+    InsertCursor row.
+
+    The field list is worked out once per table, so converting each record
+    only takes a projection of its attribute values.
+
+    Parameters
+    ----------
+    field_dict : dict
+        The "fields" of a table definition.
+    geometry_type : str
+        GEOMETRY_TYPE_POINT or GEOMETRY_TYPE_MULTIPOINT.
+    geometry_fields : tuple
+        Names of the coordinate fields, which are not added as attributes.
+
+    Returns
+    -------
+    tuple
+        The list of InsertCursor field names and the row building function.
+    """
+    attribute_fields = tuple(
+        key for key in field_dict if key not in geometry_fields)
+    fields = list(attribute_fields)
+    if geometry_type == GEOMETRY_TYPE_POINT:
+        fields.append("SHAPE@XY")
+    else:
+        fields.append("SHAPE@WKB")
+
+    def build_row(item, geometry):
+        """Converts a record into an InsertCursor row."""
+        row = list(map(item.get, attribute_fields))
+        row.append(geometry)
+        return row
+
+    return fields, build_row
+
+
+def _build_geometries(table_path, data_list, geometry_type, geometry_fields):
+    """Builds the SHAPE@XY (points) or SHAPE@WKB (multipoints) values of all
+    of the records of a table, and logs the records without valid
+    coordinates, which get NULL geometry.
+    """
+    if geometry_type == GEOMETRY_TYPE_POINT:
+        batch = build_geometries(data_list, geometry_type, geometry_fields,
+                                 OUTPUT_XY)
+        geometries = batch.geometries
+    else:
+        batch = build_geometries(data_list, geometry_type, geometry_fields,
+                                 OUTPUT_WKB)
+        geometries = [None if wkb is None else bytearray(wkb)
+                      for wkb in batch.geometries]
+    if batch.fallback_indices:
+        _LOGGER.info(
+            "%(count)d rows of %(table_path)s have no valid multipoint "
+            "coordinates and were located by Longitude and Latitude.",
+            {"count": len(batch.fallback_indices), "table_path": table_path})
+    if batch.null_indices:
+        _LOGGER.warning(
+            "%(count)d rows of %(table_path)s have invalid coordinates. "
+            "Setting geometry to NULL. First row:\n%(item)s", {
+                "count": len(batch.null_indices), "table_path": table_path,
+                "item": json.dumps(data_list[batch.null_indices[0]],
+                                   cls=CustomEncoder)})
+    return geometries
+
+
+def _get_value_normalizers(table_def_dict, fields):
+    """Returns functions that convert the values of each InsertCursor field
+    to the form they have after a round trip through the geodatabase, so
+    rows read from a table can be compared to new rows.
+    """
+    field_types = dict((field_def.key, field_def.field_type.upper())
+                       for field_def in iter_field_defs(table_def_dict))
+
+    def identity(value):
+        return value
+
+    def to_single(value):
+        if value is None:
+            return None
+        return struct.unpack("<f", struct.pack("<f", value))[0]
+
+    def to_double(value):
+        return None if value is None else round(value, 8)
+
+    def to_second(value):
+        if not isinstance(value, datetime.datetime):
+            return value
+        value += datetime.timedelta(microseconds=500000)
+        return value.replace(microsecond=0, tzinfo=None)
+
+    def to_upper(value):
+        return None if value is None else value.upper()
+
+    def to_xy(value):
+        if value is None:
+            return None
+        return (round(value[0], 8), round(value[1], 8))
+
+    def to_points(value):
+        if value is None:
+            return None
+        return tuple((round(x, 8), round(y, 8))
+                     for x, y in wkb_to_points(bytes(value)))
+
+    normalizers_by_type = {
+        "FLOAT": to_single,
+        "SINGLE": to_single,
+        "DOUBLE": to_double,
+        "DATE": to_second,
+        "GUID": to_upper,
+    }
+    normalizers = []
+    for field in fields:
+        if field == "SHAPE@XY":
+            normalizers.append(to_xy)
+        elif field == "SHAPE@WKB":
+            normalizers.append(to_points)
+        else:
+            normalizers.append(
+                normalizers_by_type.get(field_types.get(field), identity))
+    return normalizers
+
+
+def _get_row_signature(row, normalizers):
+    return tuple(normalize(value) for normalize, value in zip(normalizers, row))
+
+
+def _sync_rows(table_path, table_def_dict, fields, build_row, data_list,
+               geometries, quarantined=()):
+    """Makes the rows of an existing table match a list of records, writing
+    only the rows that changed.
+
+    Existing keys and row signatures are read with a single SearchCursor.
+    Changed rows are then updated, vanished rows deleted and new rows inserted
+    in one edit operation. Existing rows with the keys of quarantined records
+    (records that failed validation) are left as they are rather than
+    deleted.
+
+    Returns False, without modifying the table, if the keys of either the
+    table or the data are not unique.
+    """
+    normalizers = _get_value_normalizers(table_def_dict, fields)
+    # Keys are normalized too, e.g. so GUIDs match regardless of case.
+    key_columns = [(fields.index(field), normalizers[fields.index(field)])
+                   for field in table_def_dict["keyFields"]]
+    if len(key_columns) == 1:
+        key_index, normalize_key = key_columns[0]
+
+        def get_key(row):
+            return normalize_key(row[key_index])
+    else:
+        def get_key(row):
+            return tuple(normalize(row[i]) for i, normalize in key_columns)
+
+    new_rows = OrderedDict()
+    for item, geometry in zip(data_list, geometries):
+        row = build_row(item, geometry)
+        key = get_key(row)
+        if key in new_rows:
+            _LOGGER.warning(
+                "Duplicate key %(key)s in %(table_path)s data. Reloading "
+                "the table instead.", {"key": key, "table_path": table_path})
+            return False
+        new_rows[key] = row
+
+    kept_keys = set()
+    for item in quarantined:
+        try:
+            kept_keys.add(get_key(build_row(item, None)))
+        except (AttributeError, TypeError, ValueError):
+            # An invalid key value can't match the key of an existing row.
+            pass
+
+    oid_field = arcpy.Describe(table_path).OIDFieldName
+    existing = {}
+    changed_oids = {}
+    deleted_oids = []
+    kept_count = 0
+    with arcpy.da.SearchCursor(table_path, ["OID@"] + fields) as cursor:
+        for existing_row in cursor:
+            oid, existing_row = existing_row[0], existing_row[1:]
+            key = get_key(existing_row)
+            if key in existing:
+                _LOGGER.warning(
+                    "Duplicate key %(key)s in %(table_path)s. Reloading the "
+                    "table instead.", {"key": key, "table_path": table_path})
+                return False
+            existing[key] = oid
+            new_row = new_rows.get(key)
+            if new_row is None:
+                if key in kept_keys:
+                    kept_count += 1
+                else:
+                    deleted_oids.append(oid)
+            elif (_get_row_signature(existing_row, normalizers) !=
+                  _get_row_signature(new_row, normalizers)):
+                changed_oids[oid] = new_row
+    inserted_rows = [row for key, row in new_rows.items()
+                     if key not in existing]
+    _LOGGER.info(
+        "Syncing %(table_path)s: %(updated)d updated, %(inserted)d inserted, "
+        "%(deleted)d deleted, %(unchanged)d unchanged rows (%(kept)d kept "
+        "because their new records failed validation).", {
+            "table_path": table_path, "updated": len(changed_oids),
+            "inserted": len(inserted_rows), "deleted": len(deleted_oids),
+            "unchanged": len(existing) - len(changed_oids) -
+                         len(deleted_oids),
+            "kept": kept_count})
+    if not (changed_oids or deleted_oids or inserted_rows):
+        return True
+
+    workspace = os.path.dirname(table_path)
+    with arcpy.da.Editor(workspace):
+        oids = sorted(list(changed_oids) + deleted_oids)
+        # Keep the where clauses to a reasonable length.
+        for start in range(0, len(oids), 1000):
+            where = "%s IN (%s)" % (oid_field, ",".join(
+                str(oid) for oid in oids[start:start + 1000]))
+            with arcpy.da.UpdateCursor(table_path, ["OID@"] + fields,
+                                       where) as cursor:
+                for existing_row in cursor:
+                    new_row = changed_oids.get(existing_row[0])
+                    if new_row is None:
+                        cursor.deleteRow()
+                    else:
+                        cursor.updateRow([existing_row[0]] + new_row)
+        if inserted_rows:
+            with arcpy.da.InsertCursor(table_path, fields) as cursor:
+                for row in inserted_rows:
+                    cursor.insertRow(row)
+    return True
+
+
+def _warn_insert_error(err_inst, table_name, fields, row, item):
+    """Issues warnings describing why a row could not be inserted.
+    """
+    bad_value_re = re.compile(r"^(?P<error>.+) \[(?P<field>\w+)\]$",
+                              re.MULTILINE)
+    # Sample args value of errInst:
+    # tuple: ('ERROR 999999: Error executing function.\nThe row
+    # contains a bad value. [CVRestrictions]\nThe row contains
+    # a bad value. [RestrictionComment]',)
+
+    ex_message = ("Error inserting %(row)s into %(table)s, " +
+                  "which has these fields: %(fields)s")
+    warnings.warn(ex_message % {
+        "row": row,
+        "table": table_name,
+        "fields": fields
+    })
+
+    if err_inst.args:
+        msg_template = ("Bad value in [%s] field.\n" +
+                        "Length is %s.\n" +
+                        "Value is %s\n" + "%s")
+        for arg in err_inst.args:
+            matches = bad_value_re.findall(arg)
+            # [(u'The row contains a bad value.',
+            # u'CVRestrictions'), (u'The row contains a bad
+            # value.', u'RestrictionComment')]
+            for match in matches:
+                error_msg, field_name = match
+                if field_name != table_name and field_name in item:
+                    warnings.warn(msg_template % (
+                        field_name, len(item[field_name]),
+                        item[field_name], error_msg))
+    else:
+        warnings.warn(
+            "Error adding row to %(table)s.\n%(err_inst)s\n%(item)s" % {
+                "table": table_name,
+                "err_inst": err_inst,
+                "item": item})
+
+
 def _add_fields(field_dict, table_path, ignored_fields=None):
     """Adds fields to a table
 
@@ -333,26 +559,14 @@ def _add_fields(field_dict, table_path, ignored_fields=None):
                                       field_alias=split_camel_case(key))
 
 
-def _add_domains(table_def_dict, table_path):
+def _add_domains(table_def_dict, table_path, domain_registry=None):
     """Adds domains to table if they haven't already been specified.
     """
     # Exit without doing anything if the current table has no associated
     # domains.
     if "domains" not in table_def_dict:
         return
+    if domain_registry is None:
+        domain_registry = DomainRegistry(os.path.split(table_path)[0])
     # Key is field name, value is domain name
-    domain_dict = table_def_dict["domains"]
-    workspace = os.path.split(table_path)[0]
-
-    for field_name, domain_name in domain_dict.items():
-        domain_info = DOMAINS[domain_name]
-        add_domain(
-            workspace,
-            domain_name,
-            domain_info.get("domain_description"),
-            domain_info.get("field_type", "SHORT"),
-            domain_info.get("domain_type", "CODED"),
-            domain_info.get("values"),
-            False)
-        arcpy.management.AssignDomainToField(table_path, field_name,
-                                             domain_name)
+    domain_registry.assign_domains(table_path, table_def_dict["domains"])
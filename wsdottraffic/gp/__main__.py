@@ -13,11 +13,12 @@ import os
 import logging
 import argparse
 
-import arcpy
+from ..arcpybackend import arcpy, is_offline
 
-from .. import URLS, get_traveler_info
-from . import create_table
-from ..scanweb.gp import create_tables, populate_feature_classes
+from .. import URLS
+from .writer import GeodatabaseWriter
+from ..pipeline import DEFAULT_MAX_WORKERS
+from ..writers import FORMATS, choose_format, open_writer, write_traveler_info
 
 def main():
     """Uses this when run as a script
@@ -33,12 +34,18 @@ def main():
                         help='Path to where the GDB will be created. Defaults to "%s".' % default_gdb_path,
                         nargs="?")
     parser.add_argument(
-        "--templates-gdb", help="Path to GDB with template feature classes. (Creating feature classes with templates is faster than using the Add Field tool.)")
+        "--templates-gdb", help="Path to GDB with template feature classes. (Creating feature classes with templates is faster than using the Add Field tool.) Defaults to a templates GDB that is generated from the table definitions and cached (see wsdottraffic.gp.templates).")
+    parser.add_argument("--no-template-cache", action="store_true", help="Don't build or use the cached templates GDB when --templates-gdb is omitted.")
     p_help = "WSDOT Traffic API code. Defaults to value of %s environment variable if available. If this environment variable does not exist, then this parameter is required." % api_code_var_name
     parser.add_argument("--code", "-c", type=str,
                         required=api_code is None, default=api_code,
                         help=p_help)
     parser.add_argument("--schema-only", action="store_true", help="Using this flag will generate the tables but skips the data download and population steps.")
+    parser.add_argument("--sync", action="store_true", help="Update existing tables in place, writing only the rows that changed, instead of truncating and reloading them.")
+    parser.add_argument("--bulk", action="store_true", help="Load point feature classes and tables from NumPy arrays with a single Append each, instead of inserting rows one at a time. Rows that fail validation are still inserted one at a time. Requires numpy.")
+    parser.add_argument("--quarantine", help="Path of a file where rows that don't fit their tables' fields are written, one JSON object per line, with the reasons they were rejected. These rows are skipped either way.")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_MAX_WORKERS, help="Number of endpoints downloaded in parallel while tables are being written. Use 0 to download each endpoint just before its table is written. Defaults to %d." % DEFAULT_MAX_WORKERS)
+    parser.add_argument("--format", choices=tuple(FORMATS), help="Output format (see wsdottraffic.writers). Defaults to the format named by the extension of --gdb-path.")
     parser.add_argument("--log-level", choices=(
         "CRITICAL",
         "ERROR",
@@ -74,45 +81,52 @@ def main():
         names = args.names
 
     templates_gdb = args.templates_gdb
-    create_gdb(args.gdb_path, args.code, templates_gdb, names, args.schema_only)
+    create_gdb(args.gdb_path, args.code, templates_gdb, names, args.schema_only,
+               args.sync, args.fetch_workers, args.bulk,
+               not args.no_template_cache, args.quarantine, args.format)
+    if is_offline():
+        # Report where the time went (see wsdottraffic.offlinearcpy).
+        print(arcpy.format_stats())
 
 
 def create_gdb(out_gdb_path="./TravelerInfo.gdb", access_code=None,
-               templates_gdb=None, names=None, skip_data=False):
-    """Creates a file geodatabase of traffic API info"""
-
-    # Create the file GDB if it does not already exist.
-    arcpy.env.overwriteOutput = True
-    if not arcpy.Exists(out_gdb_path):
-        logging.debug("Creating GDB %s", out_gdb_path)
-        arcpy.management.CreateFileGDB(*os.path.split(out_gdb_path))
-    else:
-        logging.debug("%s already exists. Skipping creation.", out_gdb_path)
-
-    if not names:
-        names = tuple(URLS.keys()) + ("Scanweb",)
-
-    # Download each of the REST endpoints.
-    for name in names:
-        if name == "Scanweb":
-            if skip_data:
-                create_tables(out_gdb_path, template_gdb=templates_gdb)
-            else:
-                populate_feature_classes(out_gdb_path)
-        else:
-            print("Contacting %s..." % URLS[name])
-            # If user provided access code, use it.
-            # Otherwise don't provide to function, which will use default from
-            # environment or text file.`
-            if skip_data:
-                data = None
-            else:
-                if access_code:
-                    data = get_traveler_info(name, access_code)
-                else:
-                    data = get_traveler_info(name)
-            out_table = os.path.join(out_gdb_path, name)
-            create_table(out_table, None, data, templates_gdb)
+               templates_gdb=None, names=None, skip_data=False, sync=False,
+               fetch_workers=DEFAULT_MAX_WORKERS, bulk=False,
+               use_template_cache=True, quarantine_path=None,
+               output_format=None):
+    """Creates a file geodatabase of traffic API info.
+
+    If sync is True, existing tables are updated in place (see
+    create_table).
+
+    Endpoints are downloaded by a pool of fetch_workers threads while the
+    calling thread, the only one that uses the geodatabase, writes the
+    tables in the order of names. Set fetch_workers to 0 to download each
+    endpoint just before its table is written.
+
+    If bulk is True, rows are loaded from NumPy arrays (see gp.bulkload).
+
+    If templates_gdb is omitted and use_template_cache is True, the cached
+    templates geodatabase of the current table definitions is used, and
+    built on first use (see gp.templates).
+
+    Rows that fail validation are skipped and, if quarantine_path is
+    provided, written to that file (see create_table).
+
+    The output is written by the writer of output_format, one of
+    wsdottraffic.writers.FORMATS. If omitted, the format is chosen by the
+    extension of out_gdb_path (see writers.choose_format). The templates,
+    bulk and quarantine options only apply to geodatabases.
+    """
+    output_format = choose_format(out_gdb_path, output_format)
+    options = {}
+    if output_format == GeodatabaseWriter.format_name:
+        options = {"templates_gdb": templates_gdb, "bulk": bulk,
+                   "use_template_cache": use_template_cache,
+                   "quarantine_path": quarantine_path}
+    with open_writer(out_gdb_path, output_format, **options) as writer:
+        write_traveler_info(writer, names, access_code, skip_data, sync,
+                            fetch_workers)
 
 
 if __name__ == '__main__':
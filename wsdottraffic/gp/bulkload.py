@@ -0,0 +1,129 @@
+"""Loads rows into geodatabase tables through NumPy structured arrays.
+
+Instead of inserting rows one at a time with an InsertCursor, the rows are
+converted into a structured array (see wsdottraffic.recordarrays), written
+to an in-memory table with arcpy.da.NumPyArrayToTable (or
+NumPyArrayToFeatureClass for point feature classes), and appended to the
+target table with a single Append.
+
+NULLs in fields other than floating point fields, which structured arrays
+can't hold, are loaded as placeholder values and set back to NULL in the
+in-memory table with a single UpdateCursor pass before the Append.
+
+Rows that fail validation (e.g., text that is too long) are not loaded.
+Their indices are returned so that they can be inserted with a cursor,
+which reports the bad values.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+
+from ..arcpybackend import arcpy
+
+from ..recordarrays import Column, build_record_array, numpy
+
+_LOGGER = logging.getLogger(__name__)
+
+# Names of the coordinate columns of the in-memory feature class.
+SHAPE_COLUMN_NAMES = ("BulkLoadX", "BulkLoadY", "BulkLoadZ")
+
+
+def _restore_nulls(table_path, nulls):
+    """Sets the placeholders of NULLs (see RecordArray.nulls) to NULL in a
+    table created from a record array, whose rows are in array order.
+    """
+    field_names = list(nulls)
+    # Indices of the NULL fields of each row, by position.
+    null_fields = {}
+    for field_index, field_name in enumerate(field_names):
+        for position in nulls[field_name]:
+            null_fields.setdefault(position, []).append(field_index)
+    with arcpy.da.UpdateCursor(table_path, field_names) as cursor:
+        for position, row in enumerate(cursor):
+            field_indices = null_fields.get(position)
+            if field_indices is None:
+                continue
+            for field_index in field_indices:
+                row[field_index] = None
+            cursor.updateRow(row)
+
+
+def bulk_insert(table_path, columns, rows, shape_column_count=0):
+    """Loads rows into a table with NumPyArrayToTable and Append.
+
+    Parameters
+    ----------
+    table_path : str
+        Path of the existing table or point feature class.
+    columns : sequence of wsdottraffic.recordarrays.Column
+        Names and types of the attribute fields of the rows.
+    rows : sequence of sequences
+        Rows of attribute values, in column order. For point feature
+        classes, each row is followed by its (x, y) or (x, y, z) point as a
+        single value, like the SHAPE@XY value of an InsertCursor row.
+    shape_column_count : int, optional
+        2 (x, y) or 3 (x, y, z) for point feature classes, 0 for tables.
+
+    Returns
+    -------
+    list
+        The indices of the rows that were not loaded, either because they
+        failed validation or because the bulk load failed. All of the
+        indices are returned if numpy is not installed.
+    """
+    if numpy is None or not rows:
+        return list(range(len(rows)))
+    columns = list(columns)
+    if shape_column_count:
+        columns += [Column(name, "DOUBLE", None)
+                    for name in SHAPE_COLUMN_NAMES[:shape_column_count]]
+        attribute_count = len(columns) - shape_column_count
+        # Rows without geometry are left to the cursor.
+        candidates = []
+        rejected = []
+        for index, row in enumerate(rows):
+            point = row[attribute_count]
+            if point is None or None in point:
+                rejected.append(index)
+            else:
+                candidates.append(index)
+        record_array = build_record_array(
+            [tuple(rows[index][:attribute_count]) +
+             tuple(rows[index][attribute_count])
+             for index in candidates], columns, allow_nulls=True)
+        rejected = sorted(rejected + [
+            candidates[index] for index in record_array.rejected_indices])
+    else:
+        record_array = build_record_array(rows, columns, allow_nulls=True)
+        rejected = record_array.rejected_indices
+    if not record_array.indices:
+        return rejected
+
+    temp_table = arcpy.CreateUniqueName("bulkload", "in_memory")
+    try:
+        if shape_column_count:
+            arcpy.da.NumPyArrayToFeatureClass(
+                record_array.array, temp_table,
+                SHAPE_COLUMN_NAMES[:shape_column_count],
+                arcpy.Describe(table_path).spatialReference)
+        else:
+            arcpy.da.NumPyArrayToTable(record_array.array, temp_table)
+        if record_array.nulls:
+            _restore_nulls(temp_table, record_array.nulls)
+        arcpy.management.Append(temp_table, table_path, "NO_TEST")
+    except (arcpy.ExecuteError, RuntimeError, TypeError, ValueError) as ex:
+        _LOGGER.warning(
+            "Bulk load of %(table_path)s failed. Inserting rows one at a "
+            "time instead.\n%(error)s", {"table_path": table_path,
+                                         "error": ex})
+        return list(range(len(rows)))
+    finally:
+        if arcpy.Exists(temp_table):
+            arcpy.management.Delete(temp_table)
+    _LOGGER.info(
+        "Bulk loaded %(loaded)d rows into %(table_path)s. %(rejected)d rows "
+        "failed validation.", {
+            "loaded": len(record_array.indices), "table_path": table_path,
+            "rejected": len(rejected)})
+    return rejected
@@ -6,11 +6,116 @@ from __future__ import (absolute_import, division, print_function,
 import os
 import logging
 
-import arcpy
+from ..arcpybackend import arcpy
+
+from ..tabledefs import DOMAINS, get_domain_values
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def _create_coded_domain(in_workspace, domain_name, domain_description,
+                         field_type, coded_values):
+    """Creates a coded value domain and loads all of its values with a
+    single Table To Domain call.
+    """
+    temp_table = arcpy.CreateUniqueName("domainvalues", "in_memory")
+    arcpy.management.CreateTable(*os.path.split(temp_table))
+    try:
+        arcpy.management.AddField(temp_table, "Code", field_type)
+        arcpy.management.AddField(temp_table, "Description", "TEXT")
+        with arcpy.da.InsertCursor(temp_table,
+                                   ("Code", "Description")) as cursor:
+            is_text = field_type.upper() == "TEXT"
+            for code, description in coded_values:
+                cursor.insertRow(("%s" % code if is_text else code,
+                                  description))
+        arcpy.management.TableToDomain(
+            temp_table, "Code", "Description", in_workspace, domain_name,
+            domain_description, "REPLACE")
+    finally:
+        arcpy.management.Delete(temp_table)
+
+
+class DomainRegistry(object):
+    """Keeps track of the domains of a workspace, so that they are listed
+    only once and each missing domain is created only once.
+
+    Use a single registry for all of the tables that are added to a
+    workspace.
+    """
+
+    def __init__(self, in_workspace):
+        self.workspace = in_workspace
+        self._domain_names = None
+
+    @property
+    def domain_names(self):
+        """The names of the workspace's domains. The workspace is queried
+        the first time this is accessed.
+        """
+        if self._domain_names is None:
+            self._domain_names = set(
+                domain.name for domain in arcpy.da.ListDomains(self.workspace))
+        return self._domain_names
+
+    def add_domain(self, domain_name, domain_description=None,
+                   field_type="SHORT", domain_type="CODED", values=None,
+                   replace_existing_domain=False):
+        """Adds a domain to the workspace if it doesn't already exist.
+
+        See add_domain for a description of the parameters.
+        """
+        if domain_name in self.domain_names:
+            if replace_existing_domain:
+                arcpy.management.DeleteDomain(self.workspace, domain_name)
+                self.domain_names.discard(domain_name)
+            else:
+                _LOGGER.debug('Domain "%s" already exists in "%s".',
+                              domain_name, os.path.basename(self.workspace))
+                return
+
+        if values is not None and domain_type.upper() == "CODED":
+            _create_coded_domain(self.workspace, domain_name,
+                                 domain_description, field_type,
+                                 get_domain_values({"values": values}))
+        else:
+            arcpy.management.CreateDomain(self.workspace, domain_name,
+                                          domain_description, field_type,
+                                          domain_type)
+        self.domain_names.add(domain_name)
+
+    def assign_domains(self, table_path, domain_dict, domains=None):
+        """Adds the domains of a table's fields, and assigns them to the
+        fields that don't already have them.
+
+        Parameters
+        ----------
+        table_path : str
+            Path of a table in the registry's workspace.
+        domain_dict : dict
+            Domain names keyed by field name.
+        domains : dict, optional
+            Domain definitions keyed by domain name (see
+            wsdottraffic.tabledefs.DOMAINS). Defaults to DOMAINS.
+        """
+        if domains is None:
+            domains = DOMAINS
+        for domain_name in set(domain_dict.values()):
+            domain_info = domains[domain_name]
+            self.add_domain(
+                domain_name,
+                domain_info.get("domain_description"),
+                domain_info.get("field_type", "SHORT"),
+                domain_info.get("domain_type", "CODED"),
+                domain_info.get("values"))
+        assigned = dict((field.name, field.domain)
+                        for field in arcpy.ListFields(table_path))
+        for field_name, domain_name in domain_dict.items():
+            if assigned.get(field_name) != domain_name:
+                arcpy.management.AssignDomainToField(table_path, field_name,
+                                                     domain_name)
+
+
 def add_domain(in_workspace, domain_name, domain_description=None,
                field_type="SHORT", domain_type="CODED", values=None,
                replace_existing_domain=False):
@@ -18,7 +123,9 @@ def add_domain(in_workspace, domain_name, domain_description=None,
 
     For description of parameters, see documentation for:
     * arcpy.management.CreateDomain
-    * arcpy.management.AddCodedValueToDomain
+    * arcpy.management.TableToDomain
+
+    Use a DomainRegistry when adding several domains to a workspace.
 
     Parameters
     ----------
@@ -28,46 +135,14 @@ def add_domain(in_workspace, domain_name, domain_description=None,
     field_type : str
     domain_type : str
     values : list or dict
-        Values to be added to the domain.
+        Values to be added to the domain. A list is coded by position. A
+        dict maps descriptions to codes.
     replace_existing_domain : bool
         Determines what happens if you try to add a domain with a name that
         matches an already existing domain.
         * True: Deletes the preexisting domain
         * False: Leaves the existing domain alone and does nothing else to it.
     """
-    # Get list of existing domains
-    existing_domains = arcpy.da.ListDomains(in_workspace)
-
-    # Check to see if the specified domain already exists
-    domain_exists = False
-    for domain in existing_domains:
-        if domain.name == domain_name:
-            domain_exists = True
-            break
-
-    if domain_exists:
-        if replace_existing_domain:
-            arcpy.management.DeleteDomain(in_workspace, domain_name)
-        else:
-            _LOGGER.debug('Domain "%s" already exists in "%s".' % (
-                domain_name, os.path.basename(in_workspace)))
-            return
-
-    # Create domain and add values
-    arcpy.management.CreateDomain(in_workspace, domain_name,
-                                  domain_description, field_type, domain_type)
-    if values is not None:
-        if isinstance(values, list):
-            code = 0
-            for code_description in values:
-                arcpy.management.AddCodedValueToDomain(in_workspace,
-                                                       domain_name,
-                                                       code,
-                                                       code_description)
-                code = code + 1
-        elif isinstance(values, dict):
-            for code_description, code in values.iteritems():
-                arcpy.management.AddCodedValueToDomain(in_workspace,
-                                                       domain_name,
-                                                       code,
-                                                       code_description)
+    DomainRegistry(in_workspace).add_domain(
+        domain_name, domain_description, field_type, domain_type, values,
+        replace_existing_domain)
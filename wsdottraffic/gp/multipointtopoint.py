@@ -1,65 +1,130 @@
 """Creates point versions of multipoint feature classes
+
+Each multipoint feature class is read once with a SearchCursor and its
+points are written, with the attributes of their multipoints, through a
+single InsertCursor. Multipoint GeoJSON files (e.g., those written by
+wsdottraffic.fanout) are exploded with the --geojson option, which uses
+wsdottraffic.jsonhelpers.explode_geojson_file.
 """
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
 
 import argparse
-import arcpy
+import os
+import time
+
+from ..arcpybackend import arcpy
+
+from ..geometry import wkb_to_points
+from ..jsonhelpers import explode_geojson_file
+
+# Field that links each point to the OBJECTID of its multipoint, as in the
+# output of the Multipart To Singlepart tool.
+ORIG_FID_FIELD = "ORIG_FID"
+
+
+def _list_multipoint_fcs(fgdb_path):
+    """Returns the paths of the multipoint feature classes in a geodatabase,
+    including those in feature datasets.
+    """
+    fc_paths = []
+    for dirpath, _, filenames in arcpy.da.Walk(
+            fgdb_path, datatype="FeatureClass", type="Multipoint"):
+        fc_paths.extend(os.path.join(dirpath, name) for name in filenames)
+    return fc_paths
+
+
+def explode_multipoint_fc(in_fc, out_fc):
+    """Creates a point feature class with a feature for each point of a
+    multipoint feature class.
+
+    The point feature class has the fields of the multipoint feature class
+    and an ORIG_FID field with the OBJECTID of each point's multipoint.
+    Multipoints without geometry, or with an empty geometry, become a single
+    feature without geometry.
+
+    Returns
+    -------
+    tuple
+        The number of multipoint features read and point features written.
+    """
+    desc = arcpy.Describe(in_fc)
+    if desc.hasZ or desc.hasM:
+        # The WKB of Z and M multipoints is not decoded by wkb_to_points.
+        arcpy.management.MultipartToSinglepart(in_fc, out_fc)
+        return (int(arcpy.management.GetCount(in_fc)[0]),
+                int(arcpy.management.GetCount(out_fc)[0]))
+    out_dir, out_name = os.path.split(out_fc)
+    arcpy.management.CreateFeatureclass(
+        out_dir, out_name, "POINT", in_fc, "SAME_AS_TEMPLATE",
+        "SAME_AS_TEMPLATE", in_fc)
+    arcpy.management.AddField(out_fc, ORIG_FID_FIELD, "LONG")
+    fields = [field.name for field in desc.fields
+              if field.editable and field.type not in ("OID", "Geometry")]
+    in_count = 0
+    out_count = 0
+    with arcpy.da.SearchCursor(in_fc,
+                               ["OID@", "SHAPE@WKB"] + fields) as in_cursor, \
+            arcpy.da.InsertCursor(
+                out_fc, ["SHAPE@XY", ORIG_FID_FIELD] + fields) as out_cursor:
+        insert_row = out_cursor.insertRow
+        for row in in_cursor:
+            in_count += 1
+            attributes = list(row[2:])
+            wkb = row[1]
+            points = wkb_to_points(bytes(wkb)) if wkb else []
+            for point in points or [None]:
+                insert_row([point, row[0]] + attributes)
+                out_count += 1
+    return in_count, out_count
 
 
 def multipoint_to_point_fc(fgdb_path, preserve_multipoints=False):
     """Creates point feature classes corresponding to each multipoint feature class in a file geodatabase.
-    """
-    # TODO: Loop through feature classes.
-    # For each multipoint feature class, create a point feature class.
-    # Each point in the multipoint will have a record in the new point feature class with duplicate data.
 
+    Prints the number of features and the time taken for each feature class.
+    """
     if not arcpy.Exists(fgdb_path):
         arcpy.AddError("Not found: %s" % fgdb_path)
 
-    # Store old workspace value so it can be restored
-    old_workspace = arcpy.env.workspace
     old_overwrite = arcpy.env.overwriteOutput
-
     try:
-        # Set workspace to FGDB so feature classes can be listed.
-        arcpy.env.workspace = fgdb_path
         arcpy.env.overwriteOutput = True
 
-        # List all the point and multipoint feature classes.
-        # (This function does not have separate "Multipoint" option.)
-        fc_list = arcpy.ListFeatureClasses(feature_type="Point")
-
-        # Create another list with just "Multipoint" feature classes.
-        mp_fc_list = []
-        for fc in fc_list:
-            desc = arcpy.da.Describe(fc)
-            if desc["shapeType"] == "Multipoint":
-                mp_fc_list.append(fc)
-
-        for fc in mp_fc_list:
-            out_name = "%s_singlepart" % fc
-            arcpy.management.MultipartToSinglepart(fc, out_name)
-            arcpy.GetMessages()
-            # Delete the multipart version (unless preserve is True).
+        for fc_path in _list_multipoint_fcs(fgdb_path):
+            start = time.time()
+            out_path = "%s_singlepart" % fc_path
+            in_count, out_count = explode_multipoint_fc(fc_path, out_path)
+            # Replace the multipart version (unless preserve is True).
+            # Neither tool copies any data.
             if not preserve_multipoints:
-                arcpy.management.Delete(fc)
-                arcpy.management.Rename(out_name, fc)
+                arcpy.management.Delete(fc_path)
+                arcpy.management.Rename(out_path, fc_path)
+            print("%s: %d multipoints exploded into %d points in %.2f "
+                  "seconds." % (os.path.basename(fc_path), in_count,
+                                out_count, time.time() - start))
     finally:
-        # restore old workspace
-        arcpy.env.workspace = old_workspace
         arcpy.env.overwriteOutput = old_overwrite
 
 
-
-
 def main():
     """Console entry point
     """
     parser = argparse.ArgumentParser()
-    parser.add_argument("file_geodatabase", help="Path to file geodatabase")
+    parser.add_argument("file_geodatabase", help="Path to file geodatabase, or to a GeoJSON file if --geojson is used")
     parser.add_argument("--preserve_multipoints", action="store_true", help="Using this flag will preserve the multipoint feature classes after the singlepoint versions are created. Otherwise, the singlepoint versions will replace the multipoint versions.")
+    parser.add_argument("--geojson", metavar="OUT_GEOJSON", help="Treat the input as a GeoJSON file and write the exploded features to this GeoJSON file.")
 
     args = parser.parse_args()
 
+    if args.geojson:
+        start = time.time()
+        in_count, out_count = explode_geojson_file(args.file_geodatabase,
+                                                   args.geojson)
+        print("%d features exploded into %d features in %.2f seconds." % (
+            in_count, out_count, time.time() - start))
+        return
+
     fgdb_path = args.file_geodatabase
     preserve_multipoints = args.preserve_multipoints
 
@@ -0,0 +1,154 @@
+"""Builds and caches a templates geodatabase.
+
+Creating a table from a template is much faster than adding its fields one
+at a time with the Add Field tool. This module generates a geodatabase that
+contains an empty table for each of the table definitions in tabledefs.json,
+with the domains of domains.json.
+
+Templates geodatabases are versioned by a hash of the two JSON files, so a
+cached geodatabase is rebuilt automatically when the definitions change. By
+default they are cached in ~/.wsdottraffic/templates, or in the directory
+named by the WSDOT_TRAFFIC_TEMPLATES_DIR environment variable.
+
+Run this module as a script to build (or locate) the templates geodatabase:
+
+    python -m wsdottraffic.gp.templates
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import hashlib
+import logging
+import os
+import shutil
+
+from ..arcpybackend import arcpy
+
+from . import create_table
+from .domaintools import DomainRegistry
+from ..resturls import URLS
+from ..scanweb.gp import create_tables
+
+_LOGGER = logging.getLogger(__name__)
+
+TEMPLATES_DIR_VAR_NAME = "WSDOT_TRAFFIC_TEMPLATES_DIR"
+DEFAULT_TEMPLATES_DIR = os.path.join("~", ".wsdottraffic", "templates")
+
+_DEFINITION_FILES = ("tabledefs.json", "domains.json")
+
+
+def get_templates_version():
+    """Returns the version of the templates geodatabase: the first 12
+    hexadecimal digits of a hash of tabledefs.json and domains.json.
+    """
+    sha1 = hashlib.sha1()
+    for file_name in _DEFINITION_FILES:
+        with open(os.path.join(os.path.dirname(__file__), file_name),
+                  "rb") as def_file:
+            sha1.update(def_file.read())
+    return sha1.hexdigest()[:12]
+
+
+def get_templates_dir():
+    """Returns the directory where templates geodatabases are cached."""
+    return os.path.expanduser(os.environ.get(TEMPLATES_DIR_VAR_NAME,
+                                             DEFAULT_TEMPLATES_DIR))
+
+
+def get_templates_path(directory=None):
+    """Returns the path of the current version's templates geodatabase.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Cache directory. Defaults to get_templates_dir().
+    """
+    if directory is None:
+        directory = get_templates_dir()
+    return os.path.join(directory,
+                        "Templates-%s.gdb" % get_templates_version())
+
+
+def build_templates_gdb(out_gdb_path):
+    """Creates a templates geodatabase containing an empty table for each
+    table definition, replacing the geodatabase if it exists.
+
+    The geodatabase is built under a temporary name and then renamed, so an
+    interrupted build never leaves an incomplete geodatabase at
+    out_gdb_path.
+    """
+    out_gdb_path = os.path.abspath(out_gdb_path)
+    directory, gdb_name = os.path.split(out_gdb_path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    temp_gdb_name = "%s-%d.gdb" % (os.path.splitext(gdb_name)[0], os.getpid())
+    temp_gdb_path = os.path.join(directory, temp_gdb_name)
+    if arcpy.Exists(temp_gdb_path):
+        arcpy.management.Delete(temp_gdb_path)
+    _LOGGER.info("Building templates geodatabase %(gdb_path)s...",
+                 {"gdb_path": out_gdb_path})
+    arcpy.management.CreateFileGDB(directory, temp_gdb_name)
+    try:
+        domain_registry = DomainRegistry(temp_gdb_path)
+        # Scanweb's tables are created by create_tables.
+        for name in URLS:
+            if name == "Scanweb":
+                continue
+            create_table(os.path.join(temp_gdb_path, name),
+                         domain_registry=domain_registry)
+        create_tables(temp_gdb_path)
+        # Release the locks on the new geodatabase so it can be renamed.
+        arcpy.management.ClearWorkspaceCache()
+        if arcpy.Exists(out_gdb_path):
+            arcpy.management.Delete(out_gdb_path)
+        os.rename(temp_gdb_path, out_gdb_path)
+    finally:
+        if os.path.exists(temp_gdb_path):
+            shutil.rmtree(temp_gdb_path, ignore_errors=True)
+    return out_gdb_path
+
+
+def get_templates_gdb(directory=None, rebuild=False):
+    """Returns the path of the cached templates geodatabase of the current
+    table definitions, building it first if it doesn't exist.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Cache directory. Defaults to get_templates_dir().
+    rebuild : bool, optional
+        If True, the geodatabase is rebuilt even if it is cached.
+    """
+    gdb_path = get_templates_path(directory)
+    if rebuild or not arcpy.Exists(gdb_path):
+        build_templates_gdb(gdb_path)
+    else:
+        _LOGGER.debug("Using cached templates geodatabase %(gdb_path)s.",
+                      {"gdb_path": gdb_path})
+    return gdb_path
+
+
+def main():
+    """Builds the templates geodatabase when run as a script."""
+    parser = argparse.ArgumentParser(
+        description="Builds a templates geodatabase from the table and "
+        "domain definitions and prints its path.")
+    parser.add_argument(
+        "--out-gdb", help="Path of the geodatabase. Defaults to the "
+        "versioned geodatabase in the cache directory (%s)." %
+        get_templates_dir())
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild the geodatabase even if it exists.")
+    args = parser.parse_args()
+    if args.out_gdb:
+        if args.force or not arcpy.Exists(args.out_gdb):
+            build_templates_gdb(args.out_gdb)
+        gdb_path = args.out_gdb
+    else:
+        gdb_path = get_templates_gdb(rebuild=args.force)
+    print(gdb_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""The file geodatabase writer of wsdottraffic.writers.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+import os
+
+from ..arcpybackend import arcpy
+from ..scanweb.gp import create_tables, populate_feature_classes
+from ..tabledefs import get_table_def
+from ..writers import TableWriter
+from . import create_table
+from .domaintools import DomainRegistry
+from .templates import get_templates_gdb
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class GeodatabaseWriter(TableWriter):
+    """Writes tables to a file geodatabase with wsdottraffic.gp.create_table
+    (see writers.TableWriter). The geodatabase is created if it does not
+    exist.
+
+    Parameters
+    ----------
+    out_path : str
+        The path of the file geodatabase.
+    templates_gdb : str, optional
+        A geodatabase of template tables. If omitted and use_template_cache
+        is True, the cached templates geodatabase is used (see gp.templates).
+    bulk : bool, optional
+        Load rows from NumPy arrays (see gp.bulkload).
+    use_template_cache : bool, optional
+        See templates_gdb.
+    quarantine_path : str, optional
+        File where records that fail validation are written (see
+        create_table).
+    """
+
+    format_name = "gdb"
+
+    def __init__(self, out_path, templates_gdb=None, bulk=False,
+                 use_template_cache=True, quarantine_path=None):
+        super(GeodatabaseWriter, self).__init__(out_path)
+        self.bulk = bulk
+        self.quarantine_path = quarantine_path
+
+        # Create the file GDB if it does not already exist.
+        arcpy.env.overwriteOutput = True
+        if not arcpy.Exists(out_path):
+            _LOGGER.debug("Creating GDB %s", out_path)
+            arcpy.management.CreateFileGDB(*os.path.split(out_path))
+        else:
+            _LOGGER.debug("%s already exists. Skipping creation.", out_path)
+
+        if templates_gdb is None and use_template_cache:
+            try:
+                templates_gdb = get_templates_gdb()
+            except (arcpy.ExecuteError, EnvironmentError) as ex:
+                _LOGGER.warning("Could not build the templates GDB. Tables "
+                                "will be created without templates.\n%s", ex)
+        self.templates_gdb = templates_gdb
+
+        # Share the list of the GDB's domains between the tables.
+        self.domain_registry = DomainRegistry(out_path)
+
+    def _create_table(self, table_name, table_def_dict, data_list=None,
+                      **options):
+        create_table(os.path.join(self.out_path, table_name),
+                     get_table_def(table_name, table_def_dict), data_list,
+                     self.templates_gdb, bulk=self.bulk,
+                     domain_registry=self.domain_registry,
+                     quarantine_path=self.quarantine_path, **options)
+
+    def create_schema(self, table_name, table_def_dict=None):
+        self._create_table(table_name, table_def_dict, truncate=False)
+
+    def truncate(self, table_name):
+        table_path = os.path.join(self.out_path, table_name)
+        if arcpy.Exists(table_path):
+            arcpy.management.DeleteRows(table_path)
+
+    def append(self, table_name, data_list, table_def_dict=None):
+        self._create_table(table_name, table_def_dict, data_list,
+                           truncate=False)
+
+    def upsert(self, table_name, data_list, table_def_dict=None):
+        self._create_table(table_name, table_def_dict, data_list, sync=True)
+
+    def write_table(self, table_name, data_list=None, table_def_dict=None,
+                    sync=False):
+        # create_table creates, truncates or syncs, and loads the table.
+        if data_list is None:
+            self.create_schema(table_name, table_def_dict)
+        else:
+            self._create_table(table_name, table_def_dict, data_list,
+                               sync=sync)
+
+    def write_scanweb(self, readings=None, sync=False):
+        # The weather readings are a 3D feature class related to the
+        # measurement tables (see scanweb.gp).
+        if readings is None:
+            create_tables(self.out_path, template_gdb=self.templates_gdb)
+        else:
+            populate_feature_classes(self.out_path, scanweb_data=readings,
+                                     bulk=self.bulk,
+                                     template_gdb=self.templates_gdb)
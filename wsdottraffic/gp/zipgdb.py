@@ -1,19 +1,15 @@
-"""creategdb
-Queries the WSDOT Traveler Info REST endpoints and populates a table using the
-results.
-
-Parameters:
-0   Workspace.  Optional.  Defaults to ./TravelerInfo.gdb.
-1   Access Code. Optional if provided via environment variable.
-2   Templates GDB. Optional Defaults to "./Data/Templates.gdb"
-3   Templates GDB (output)
+"""zipgdb
+Writes a file geodatabase to a ZIP archive (see wsdottraffic.ziparchive).
 """
 from __future__ import absolute_import, print_function, unicode_literals
 import os
-import zipfile
 import logging
 import argparse
 
+from ..pipeline import DEFAULT_MAX_WORKERS
+from ..ziparchive import (COMPARE_HASH, COMPARE_MTIME, COMPRESSIONS,
+                          ZIP_DEFLATED, zip_directory)
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -23,23 +19,36 @@ def main():
 
     parser = argparse.ArgumentParser()
     parser.add_argument("gdb_path", help="Path to a file geodatabase")
+    parser.add_argument("--compression", choices=COMPRESSIONS,
+                        default=ZIP_DEFLATED,
+                        help="Compression algorithm. Defaults to %s." %
+                        ZIP_DEFLATED)
+    parser.add_argument("--level", type=int,
+                        help="Compression level. Defaults to the "
+                        "algorithm's default.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help="Number of files compressed in parallel. "
+                        "Defaults to %d." % DEFAULT_MAX_WORKERS)
+    parser.add_argument("--incremental", action="store_true",
+                        help="Reuse the compressed data of files that "
+                        "haven't changed since the previous archive.")
+    parser.add_argument("--compare", choices=(COMPARE_MTIME, COMPARE_HASH),
+                        default=COMPARE_MTIME,
+                        help="How --incremental detects unchanged files: "
+                        "by size and modification time (default) or by size "
+                        "and content hash.")
     args = parser.parse_args()
 
     gdb_path = args.gdb_path
 
-
     print("Compressing data in %s..." % gdb_path)
-    zip_path = "%s.zip" % gdb_path
-    print("Creating %s..." % zip_path)
-    if os.path.exists(zip_path):
-        os.remove(zip_path)
-    with zipfile.ZipFile(zip_path, "w") as out_zip:
-        print("Adding files to zip...")
-        for dirpath, dirnames, filenames in os.walk(gdb_path):
-            del dirnames
-            for file_name in filenames:
-                out_path = os.path.join(dirpath, file_name)
-                out_zip.write(out_path)
+    stats = zip_directory(gdb_path, compression=args.compression,
+                          level=args.level, max_workers=args.workers,
+                          incremental=args.incremental, compare=args.compare)
+    print("Created %s.zip: %d files compressed, %d reused, %d lock files "
+          "skipped in %.2f seconds." % (
+              os.path.normpath(gdb_path), stats["compressed"],
+              stats["reused"], stats["skipped"], stats["seconds"]))
 
 
 if __name__ == '__main__':
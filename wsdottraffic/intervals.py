@@ -0,0 +1,220 @@
+"""A sorted interval index used by the linear (milepost) and temporal indexes.
+
+Intervals are kept sorted by their start values in a list of blocks of at
+most 2 * BLOCK_SIZE intervals, with a max-tree of the blocks' largest end
+values built over the list of blocks. An overlap query finds the blocks
+starting at or before the end of the query range with a binary search, then
+walks only the branches of the max-tree that contain an interval ending at
+or after the start of the query range, scanning the blocks it reaches. A
+query therefore takes O(log n + k (log n + BLOCK_SIZE)) time for k results.
+
+Inserting or removing an interval updates its block in place with bisect and
+the block's path of the max-tree, so updates take O(log n + BLOCK_SIZE) time
+and queries that are interleaved with updates never rebuild the index. The
+max-tree is only rebuilt when a block is split or emptied.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from bisect import bisect_left, bisect_right
+
+# Blocks are split in half when they grow beyond twice this size.
+BLOCK_SIZE = 64
+
+
+def _get_max(left, right):
+    """Returns the larger of two values, where None is smaller than any
+    value.
+    """
+    return left if right is None or (
+        left is not None and left >= right) else right
+
+
+class IntervalIndex(object):
+    """An index of closed [start, end] intervals identified by keys.
+
+    Start and end values can be of any mutually comparable type (e.g.,
+    numbers or datetimes).
+    """
+
+    def __init__(self, intervals=None):
+        """Creates an index.
+
+        Parameters
+        ----------
+        intervals : iterable, optional
+            (key, start, end) tuples to add to the index.
+        """
+        self._intervals = {}
+        # Parallel lists of blocks of start values, end values and keys,
+        # sorted by start value.
+        self._starts = []
+        self._ends = []
+        self._keys = []
+        # The first start value and the largest end value of each block.
+        self._firsts = []
+        self._maxes = []
+        self._tree = []
+        self._size = 0
+        if intervals is not None:
+            for key, start, end in intervals:
+                self.insert(key, start, end)
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def __contains__(self, key):
+        return key in self._intervals
+
+    def __iter__(self):
+        return iter(self._intervals)
+
+    def get(self, key, default=None):
+        """Returns the (start, end) interval of a key."""
+        return self._intervals.get(key, default)
+
+    def insert(self, key, start, end):
+        """Adds an interval, replacing any interval with the same key. The
+        start and end values are swapped if they are reversed.
+        """
+        if end < start:
+            start, end = end, start
+        self.remove(key)
+        self._intervals[key] = (start, end)
+        if not self._starts:
+            self._starts.append([start])
+            self._ends.append([end])
+            self._keys.append([key])
+            self._firsts.append(start)
+            self._maxes.append(end)
+            self._build_tree()
+            return
+        block = max(bisect_right(self._firsts, start) - 1, 0)
+        starts = self._starts[block]
+        position = bisect_right(starts, start)
+        starts.insert(position, start)
+        self._ends[block].insert(position, end)
+        self._keys[block].insert(position, key)
+        self._firsts[block] = starts[0]
+        if len(starts) > 2 * BLOCK_SIZE:
+            self._split(block)
+        elif self._maxes[block] < end:
+            self._maxes[block] = end
+            self._update_tree(block)
+
+    def remove(self, key):
+        """Removes an interval. Does nothing if the key is not in the index.
+        """
+        interval = self._intervals.pop(key, None)
+        if interval is None:
+            return
+        start, end = interval
+        # Intervals with the same start value can span several blocks.
+        block = max(bisect_left(self._firsts, start) - 1, 0)
+        while True:
+            starts = self._starts[block]
+            keys = self._keys[block]
+            try:
+                position = keys.index(key, bisect_left(starts, start),
+                                      bisect_right(starts, start))
+                break
+            except ValueError:
+                block += 1
+        ends = self._ends[block]
+        del starts[position], ends[position], keys[position]
+        if not starts:
+            for blocks in (self._starts, self._ends, self._keys,
+                           self._firsts, self._maxes):
+                del blocks[block]
+            self._build_tree()
+            return
+        self._firsts[block] = starts[0]
+        if not end < self._maxes[block]:
+            self._maxes[block] = max(ends)
+            self._update_tree(block)
+
+    def _split(self, block):
+        """Splits a block in half."""
+        half = len(self._starts[block]) // 2
+        for blocks in (self._starts, self._ends, self._keys):
+            values = blocks[block]
+            blocks[block + 1:block + 1] = [values[half:]]
+            del values[half:]
+        self._firsts[block:block + 1] = [
+            self._starts[block][0], self._starts[block + 1][0]]
+        self._maxes[block:block + 1] = [
+            max(self._ends[block]), max(self._ends[block + 1])]
+        self._build_tree()
+
+    def _build_tree(self):
+        size = 1
+        while size < len(self._maxes):
+            size *= 2
+        # Leaves hold the blocks' largest end values; each parent holds the
+        # max of its children. Unused leaves hold None.
+        tree = [None] * (2 * size)
+        tree[size:size + len(self._maxes)] = self._maxes
+        for i in range(size - 1, 0, -1):
+            tree[i] = _get_max(tree[2 * i], tree[2 * i + 1])
+        self._tree = tree
+        self._size = size
+
+    def _update_tree(self, block):
+        tree = self._tree
+        node = self._size + block
+        tree[node] = self._maxes[block]
+        node //= 2
+        while node:
+            tree[node] = _get_max(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+
+    def overlapping(self, start, end=None):
+        """Returns the keys of the intervals that overlap a range.
+
+        Parameters
+        ----------
+        start : value
+            Start of the range.
+        end : value, optional
+            End of the range. If omitted, the intervals containing the start
+            value are returned.
+
+        Returns
+        -------
+        list
+            Keys, ordered by the start of their intervals.
+        """
+        if end is None:
+            end = start
+        elif end < start:
+            start, end = end, start
+        count = bisect_right(self._firsts, end)
+        if not count:
+            return []
+        tree = self._tree
+        size = self._size
+        output = []
+        # Depth-first walk of the nodes that cover blocks [0, count).
+        stack = [(1, 0, size)]
+        while stack:
+            node, lo, hi = stack.pop()
+            node_max = tree[node]
+            if node_max is None or node_max < start:
+                continue
+            if node >= size:
+                if lo < count:
+                    ends = self._ends[lo]
+                    keys = self._keys[lo]
+                    for i in range(bisect_right(self._starts[lo], end)):
+                        if not ends[i] < start:
+                            output.append(keys[i])
+                continue
+            mid = (lo + hi) // 2
+            if mid < count:
+                stack.append((2 * node + 1, mid, hi))
+            stack.append((2 * node, lo, mid))
+        return output
+
+    def containing(self, value):
+        """Returns the keys of the intervals that contain a value."""
+        return self.overlapping(value)
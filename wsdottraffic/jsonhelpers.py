@@ -102,6 +102,28 @@ def parse_traveler_info_object(dct):
                 output[simplified_key] = val
     return output
 
+
+POINT_GEO_FIELDS = ("Longitude", "Latitude")
+MULTI_POINT_GEO_FIELDS = (
+    "StartLongitude", "StartLatitude", "EndLongitude", "EndLatitude"
+)
+
+
+def get_geometry_fields(dct):
+    """Determines which GeoJSON geometry type a flattened traveler info
+    object can be converted to.
+    @type dct: dict
+    @return: A tuple: the geometry type ("Point", "MultiPoint" or None) and
+        the tuple of field names used for the coordinates.
+    @rtype: tuple
+    """
+    if dict_has_all_keys(dct, *POINT_GEO_FIELDS):
+        return "Point", POINT_GEO_FIELDS
+    if dict_has_all_keys(dct, *MULTI_POINT_GEO_FIELDS):
+        return "MultiPoint", MULTI_POINT_GEO_FIELDS
+    return None, ()
+
+
 def to_geo_json(dct):
     """This method is used by the json.load method to customize how
     the traffic info objects are deserialized.
@@ -113,12 +135,8 @@ def to_geo_json(dct):
         "type": "Feature",
     }
     prop_dict = {}
-    nonproperty_fields = ()
-    point_geo_fields = ("Longitude", "Latitude")
-    multi_point_geo_fields = (
-        "StartLongitude", "StartLatitude", "EndLongitude", "EndLatitude"
-    )
-    if dict_has_all_keys(dct, *point_geo_fields):
+    geometry_type, nonproperty_fields = get_geometry_fields(dct)
+    if geometry_type == "Point":
         outdict["geometry"] = {
             "type": "Point",
             "coordinates": [
@@ -126,8 +144,7 @@ def to_geo_json(dct):
                 dct["Latitude"]
             ]
         }
-        nonproperty_fields = point_geo_fields
-    elif dict_has_all_keys(dct, *multi_point_geo_fields):
+    elif geometry_type == "MultiPoint":
         outdict["geometry"] = {
             "type": "MultiPoint",
             "coordinates": [
@@ -135,7 +152,6 @@ def to_geo_json(dct):
                 [dct["EndLongitude"], dct["EndLatitude"]]
             ]
         }
-        nonproperty_fields = multi_point_geo_fields
     else:
         outdict["geometry"] = None
     for key, value in dct.items():
@@ -146,6 +162,44 @@ def to_geo_json(dct):
     return outdict
 
 
+def explode_multipoints(features):
+    """Converts GeoJSON MultiPoint features, such as those returned by
+    to_geo_json, into a Point feature per point, each with a copy of the
+    multipoint's properties. Other features are yielded unchanged.
+    @type features: iterable
+    @return: generator of GeoJSON features
+    """
+    for feature in features:
+        geometry = feature.get("geometry")
+        if not geometry or geometry.get("type") != "MultiPoint":
+            yield feature
+            continue
+        properties = feature.get("properties") or {}
+        for coordinates in geometry["coordinates"]:
+            point_feature = dict(feature)
+            point_feature["geometry"] = {
+                "type": "Point",
+                "coordinates": coordinates
+            }
+            point_feature["properties"] = dict(properties)
+            yield point_feature
+
+
+def explode_geojson_file(in_path, out_path):
+    """Writes a copy of a GeoJSON FeatureCollection file with its MultiPoint
+    features exploded into Point features (see explode_multipoints).
+    @return: A tuple: the number of features read and written.
+    @rtype: tuple
+    """
+    with open(in_path, "r") as in_file:
+        collection = json.load(in_file)
+    features = collection.get("features", [])
+    collection["features"] = list(explode_multipoints(features))
+    with open(out_path, "w") as out_file:
+        json.dump(collection, out_file, cls=CustomEncoder)
+    return len(features), len(collection["features"])
+
+
 def dict_list_to_geojson(dicts):
     """Converts a list of dicts, returned from parse_traveler_info_object
     into a GeoJSON FeatureCollection.
@@ -0,0 +1,205 @@
+"""A route and milepost (linear referencing) index for the records of the
+HighwayAlerts, CVRestrictions, BridgeClearances and TravelTimes endpoints.
+
+Routes are normalized to three-digit state route IDs (e.g., "SR 520", "520"
+and "520SPCANYRD" are all indexed as "520"), and each route has its own
+IntervalIndex of milepost ranges, so questions like "what affects SR 520
+between MP 2 and MP 8?" are answered without scanning every record.
+
+Example
+-------
+::
+
+    index = LinearIndex()
+    for name in LINEAR_DATASETS:
+        index.add_records(name, get_traveler_info(name), get_key_fields(name))
+    for dataset, key in index.query("SR 520", 2, 8):
+        record = index.get(dataset, key)
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+from .intervals import IntervalIndex
+from .parseutils import SRFormatError, parse_route_id
+from .routeshields import label_to_3_digit_id
+from .tabledefs import get_record_key
+
+# Endpoints whose records have route and milepost fields.
+LINEAR_DATASETS = ("HighwayAlerts", "CVRestrictions", "BridgeClearances",
+                   "TravelTimes")
+
+
+def normalize_route(route):
+    """Converts a route ID or label to a three-digit state route ID.
+
+    Returns
+    -------
+    str
+        The three-digit route ID, or None if the value is empty or is not a
+        recognized route.
+    """
+    if route is None or route == "":
+        return None
+    try:
+        return parse_route_id(route)[0]
+    except SRFormatError:
+        pass
+    if isinstance(route, float) and route.is_integer():
+        return normalize_route(int(route))
+    try:
+        return label_to_3_digit_id(route.strip())
+    except (ValueError, AttributeError):
+        return None
+
+
+def _get_milepost(record, field):
+    value = record.get(field)
+    if value is None:
+        value = record.get("MilePost")
+    return value
+
+
+def get_linear_locations(record):
+    """Determines the route milepost ranges of a record.
+
+    The route is read from StateRouteID, or from StartRoadName/EndRoadName.
+    If the start and end roads are different routes, the record is located at
+    its start milepost on the start route and its end milepost on the end
+    route.
+
+    Returns
+    -------
+    list
+        (route, start milepost, end milepost) tuples.
+    """
+    start_mp = _get_milepost(record, "StartMilePost")
+    end_mp = _get_milepost(record, "EndMilePost")
+    if start_mp is None:
+        start_mp = end_mp
+    if end_mp is None:
+        end_mp = start_mp
+    if start_mp is None:
+        return []
+    start_route = normalize_route(record.get("StateRouteID"))
+    end_route = None
+    if start_route is None:
+        start_route = normalize_route(record.get("StartRoadName"))
+        end_route = normalize_route(record.get("EndRoadName"))
+    if start_route is None:
+        start_route, end_route = end_route, None
+    if start_route is None:
+        return []
+    if end_route is None or end_route == start_route:
+        return [(start_route, start_mp, end_mp)]
+    return [(start_route, start_mp, start_mp), (end_route, end_mp, end_mp)]
+
+
+class LinearIndex(object):
+    """Indexes records from several datasets by route and milepost range.
+
+    Records are identified by (dataset, key) tuples, where key is determined
+    by tabledefs.get_record_key.
+    """
+
+    def __init__(self):
+        self._routes = {}
+        self._records = {}
+        self._locations = {}
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, item):
+        return item in self._records
+
+    @property
+    def routes(self):
+        """The sorted three-digit IDs of the routes in the index."""
+        return sorted(route for route, index in self._routes.items() if index)
+
+    def get(self, dataset, key, default=None):
+        """Returns a record in the index."""
+        return self._records.get((dataset, key), default)
+
+    def get_locations(self, dataset, key):
+        """Returns the (route, start, end) locations of a record."""
+        return self._locations.get((dataset, key), [])
+
+    def insert(self, dataset, key, record):
+        """Adds a record, replacing any record with the same dataset and key.
+        Records without a recognized route or mileposts are stored but never
+        returned by queries.
+        """
+        item = (dataset, key)
+        self.remove(dataset, key)
+        locations = get_linear_locations(record)
+        self._records[item] = record
+        self._locations[item] = locations
+        for route, start, end in locations:
+            route_index = self._routes.get(route)
+            if route_index is None:
+                route_index = self._routes[route] = IntervalIndex()
+            route_index.insert(item, start, end)
+
+    def remove(self, dataset, key):
+        """Removes a record. Does nothing if the record is not in the index.
+        """
+        item = (dataset, key)
+        if self._records.pop(item, None) is None:
+            return
+        for route, _, _ in self._locations.pop(item):
+            self._routes[route].remove(item)
+
+    def add_records(self, dataset, records, key_fields=None):
+        """Adds the records of a dataset.
+
+        Parameters
+        ----------
+        dataset : str
+            Name of the dataset (e.g., "HighwayAlerts").
+        records : iterable of dict
+            Records returned by get_traveler_info.
+        key_fields : sequence, optional
+            Fields that identify a record (see tabledefs.get_key_fields).
+        """
+        for record in records:
+            self.insert(dataset, get_record_key(record, key_fields), record)
+
+    def clear_dataset(self, dataset):
+        """Removes all of the records of a dataset."""
+        for item in [item for item in self._records if item[0] == dataset]:
+            self.remove(*item)
+
+    def query(self, route, start_milepost, end_milepost=None, datasets=None):
+        """Returns the records on a route that overlap a milepost range.
+
+        Parameters
+        ----------
+        route : str or int
+            Route ID or label (e.g., "520", "SR 520", 520).
+        start_milepost : float
+            Start of the milepost range.
+        end_milepost : float, optional
+            End of the milepost range. If omitted, returns the records that
+            contain start_milepost.
+        datasets : sequence, optional
+            Only return records from these datasets.
+
+        Returns
+        -------
+        list
+            (dataset, key) tuples, ordered by their start mileposts.
+        """
+        route_index = self._routes.get(normalize_route(route))
+        if route_index is None:
+            return []
+        items = route_index.overlapping(start_milepost, end_milepost)
+        if datasets is not None:
+            items = [item for item in items if item[0] in datasets]
+        return items
+
+    def query_records(self, route, start_milepost, end_milepost=None,
+                      datasets=None):
+        """Same as query, but returns (dataset, record) tuples."""
+        return [(item[0], self._records[item]) for item in self.query(
+            route, start_milepost, end_milepost, datasets)]
@@ -0,0 +1,175 @@
+"""An in-memory stand-in for the parts of arcpy that wsdottraffic.gp uses.
+
+It lets the geoprocessing code run, and be profiled and load-tested, on
+machines without ArcGIS. Select it by setting the WSDOT_TRAFFIC_ARCPY
+environment variable to "offline" (see wsdottraffic.arcpybackend).
+
+Geodatabases are created as directories, but their tables only live in
+memory (see offlinearcpy._store). The values inserted with cursors are
+checked and converted the way a file geodatabase stores them (e.g., text
+longer than its field raises a RuntimeError, FLOAT values are rounded to
+single precision and dates to the second), so that load errors and sync
+comparisons behave as they do with arcpy.
+
+Every tool, cursor and cursor row is counted and timed. Use get_stats or
+format_stats to see where the time went, and reset to start over:
+
+    from wsdottraffic import offlinearcpy
+    offlinearcpy.reset()
+    create_gdb("TravelerInfo.gdb")
+    print(offlinearcpy.format_stats())
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import fnmatch
+import logging
+import os
+
+from . import da, management
+from ._store import (MESSAGES, ExecuteError, Field, SpatialReference,
+                     clear_workspaces, env, get_dataset, get_stats,
+                     get_workspace, operation, reset_stats, split_path)
+
+_LOGGER = logging.getLogger(__name__)
+
+__all__ = ["AddError", "AddMessage", "AddWarning", "CheckProduct",
+           "CreateScratchName", "CreateUniqueName", "Describe", "Exists",
+           "ExecuteError", "Field", "GetMessages", "ListFields",
+           "SpatialReference", "da", "env", "format_stats", "get_stats",
+           "management", "reset", "reset_stats"]
+
+
+class _Describe(object):
+    """The properties returned by Describe."""
+    # pylint: disable=too-few-public-methods,invalid-name
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, path, workspace_path, dataset):
+        self.catalogPath = path
+        self.name = os.path.basename(path)
+        self.baseName = os.path.splitext(self.name)[0]
+        if dataset is None:
+            self.dataType = "Workspace"
+            self.workspaceType = ("LocalDatabase"
+                                  if workspace_path.lower().endswith(".gdb")
+                                  else "MemoryWorkspace")
+            self.path = os.path.dirname(path)
+            return
+        self.path = os.path.dirname(path)
+        self.dataType = "FeatureClass" if dataset.is_feature_class else "Table"
+        self.hasOID = True
+        self.OIDFieldName = dataset.fields[0].name
+        self.fields = list(dataset.fields)
+        if dataset.is_feature_class:
+            self.shapeType = dataset.shape_type
+            self.shapeFieldName = dataset.fields[dataset.shape_index].name
+            self.hasZ = dataset.has_z
+            self.hasM = dataset.has_m
+            self.spatialReference = dataset.spatial_reference
+            self.featureType = "Simple"
+
+
+@operation("Exists")
+def Exists(dataset):  # pylint: disable=invalid-name
+    """Returns True if a workspace, dataset or relationship class exists."""
+    workspace_path, name = split_path(dataset)
+    workspace = get_workspace(workspace_path)
+    if workspace is None:
+        return False
+    return (name is None or workspace.get(name) is not None or
+            name.lower() in workspace.relationship_classes)
+
+
+@operation("Describe")
+def Describe(value):  # pylint: disable=invalid-name
+    """Describes a workspace, table or feature class."""
+    workspace_path, name = split_path(value)
+    workspace, dataset = get_dataset(value)
+    if workspace is None or (name is not None and dataset is None):
+        raise IOError('"%s" does not exist' % value)
+    return _Describe(value, workspace_path, dataset)
+
+
+@operation("ListFields")
+def ListFields(dataset, wild_card=None, field_type=None):
+    # pylint: disable=invalid-name
+    """Returns the fields of a table or feature class."""
+    _, table = get_dataset(dataset)
+    if table is None:
+        raise IOError('"%s" does not exist' % dataset)
+    fields = list(table.fields)
+    if wild_card:
+        fields = [field for field in fields
+                  if fnmatch.fnmatch(field.name.lower(), wild_card.lower())]
+    if field_type and field_type.upper() != "ALL":
+        fields = [field for field in fields
+                  if field.type.upper() == field_type.upper()]
+    return fields
+
+
+def CreateUniqueName(base_name, workspace=None):  # pylint: disable=invalid-name
+    """Returns a path in a workspace that doesn't exist yet."""
+    workspace = workspace or env.workspace or ""
+    name, extension = os.path.splitext(base_name)
+    index = 0
+    while True:
+        path = os.path.join(workspace, "%s%d%s" % (name, index, extension))
+        if not Exists(path):
+            return path
+        index += 1
+
+
+def CreateScratchName(prefix="", suffix="", data_type="", workspace=None):
+    # pylint: disable=invalid-name,unused-argument
+    """Returns a path in a workspace that doesn't exist yet."""
+    return CreateUniqueName("%sxx%s" % (prefix, suffix), workspace)
+
+
+def CheckProduct(product):  # pylint: disable=invalid-name,unused-argument
+    """Reports every license as available."""
+    return "Available"
+
+
+def AddMessage(message):  # pylint: disable=invalid-name
+    """Logs an informative message."""
+    _LOGGER.info("%s", message)
+
+
+def AddWarning(message):  # pylint: disable=invalid-name
+    """Logs a warning message."""
+    _LOGGER.warning("%s", message)
+
+
+def AddError(message):  # pylint: disable=invalid-name
+    """Logs an error message."""
+    _LOGGER.error("%s", message)
+
+
+def GetMessages(severity=0):  # pylint: disable=invalid-name
+    """Returns the messages of the last tool with the given severity or
+    higher, one per line.
+    """
+    return "\n".join(message for message_severity, message in MESSAGES
+                     if message_severity >= severity)
+
+
+def format_stats(stats=None):
+    """Formats operation statistics (see get_stats) as a table, slowest
+    operation first.
+    """
+    if stats is None:
+        stats = get_stats()
+    lines = ["%-40s %10s %10s" % ("Operation", "Count", "Seconds")]
+    for name, values in sorted(stats.items(),
+                               key=lambda item: -item[1]["seconds"]):
+        lines.append("%-40s %10d %10.3f" % (name, values["count"],
+                                            values["seconds"]))
+    return "\n".join(lines)
+
+
+def reset():
+    """Forgets all workspaces, messages and statistics."""
+    clear_workspaces()
+    reset_stats()
+    del MESSAGES[:]
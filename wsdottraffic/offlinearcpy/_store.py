@@ -0,0 +1,532 @@
+"""In-memory workspaces, datasets and domains of the offline arcpy
+stand-in, and the counts and timings of the operations performed on them.
+
+File geodatabases are real directories, so that they can be zipped, renamed
+and deleted like the geodatabases written by ArcGIS, but their contents only
+live in memory. Each geodatabase directory holds an ID file that links it to
+its in-memory workspace, so the workspace follows the directory when it is
+renamed. A geodatabase directory without a registered workspace (e.g., one
+created by another process) is opened as an empty workspace.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import functools
+import os
+import shutil
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from numbers import Integral, Real
+
+from ..recordarrays import GUID_RE, INTEGER_RANGES, STRING_TYPES
+from ..tabledefs import DEFAULT_TEXT_LENGTH
+
+# Name of the file that links a geodatabase directory to its workspace.
+ID_FILE_NAME = "offlinearcpy.id"
+
+IN_MEMORY_NAMES = ("in_memory", "memory")
+
+# Field.type values, keyed by the field types of the Add Field tool.
+FIELD_TYPES = {
+    "TEXT": "String",
+    "FLOAT": "Single",
+    "SINGLE": "Single",
+    "DOUBLE": "Double",
+    "SHORT": "SmallInteger",
+    "LONG": "Integer",
+    "DATE": "Date",
+    "GUID": "GUID",
+    "BLOB": "Blob",
+}
+
+# Add Field tool field types, keyed by Field.type.
+TOOL_FIELD_TYPES = {
+    "String": "TEXT",
+    "Single": "FLOAT",
+    "Double": "DOUBLE",
+    "SmallInteger": "SHORT",
+    "Integer": "LONG",
+    "Date": "DATE",
+    "GUID": "GUID",
+    "Blob": "BLOB",
+}
+
+SHAPE_TYPES = {
+    "POINT": "Point",
+    "MULTIPOINT": "Multipoint",
+}
+
+_LOCK = threading.Lock()
+_WORKSPACES = {}
+_STATS = OrderedDict()
+
+# Messages of the last tool, as (severity, message) tuples. Severity is 0
+# (informative), 1 (warning) or 2 (error), as in arcpy.GetMessages.
+MESSAGES = []
+
+
+class _Environment(object):
+    """Geoprocessing environment settings (arcpy.env)."""
+    # pylint: disable=too-few-public-methods,invalid-name
+
+    def __init__(self):
+        self.overwriteOutput = False
+        self.workspace = None
+        self.scratchWorkspace = None
+
+
+env = _Environment()  # pylint: disable=invalid-name
+
+
+class ExecuteError(Exception):
+    """Raised when a geoprocessing tool fails, like arcpy.ExecuteError."""
+
+
+def record_operation(name, seconds, count=1):
+    """Adds to the count and time of an operation."""
+    with _LOCK:
+        stats = _STATS.get(name)
+        if stats is None:
+            stats = _STATS[name] = [0, 0.0]
+        stats[0] += count
+        stats[1] += seconds
+
+
+def operation(name):
+    """Decorates a function so that its calls are counted and timed under
+    name.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record_operation(name, time.time() - start)
+        return wrapper
+    return decorator
+
+
+def tool(name):
+    """Decorates a geoprocessing tool: its calls are counted and timed, and
+    the messages of the previous tool are cleared when it starts.
+    """
+    def decorator(function):
+        timed = operation(name)(function)
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            del MESSAGES[:]
+            return timed(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_stats():
+    """Returns the number of calls and total seconds of each operation, as
+    a dict of {"count": int, "seconds": float} dicts keyed by operation name.
+    """
+    with _LOCK:
+        return OrderedDict(
+            (name, {"count": count, "seconds": seconds})
+            for name, (count, seconds) in _STATS.items())
+
+
+def reset_stats():
+    """Clears the operation counts and timings."""
+    with _LOCK:
+        _STATS.clear()
+
+
+def clear_workspaces():
+    """Forgets the contents of all workspaces."""
+    with _LOCK:
+        _WORKSPACES.clear()
+
+
+class SpatialReference(object):
+    """A spatial reference identified by its factory code."""
+    # pylint: disable=too-few-public-methods,invalid-name
+
+    _NAMES = {
+        4326: "GCS_WGS_1984",
+        3857: "WGS_1984_Web_Mercator_Auxiliary_Sphere",
+        2927: "NAD_1983_HARN_StatePlane_Washington_South_FIPS_4602_Feet",
+    }
+
+    def __init__(self, item=None):
+        self.factoryCode = int(item) if item is not None else 0
+        self.name = self._NAMES.get(self.factoryCode, "Unknown")
+        self.type = "Geographic" if self.factoryCode == 4326 else "Projected"
+
+    def __eq__(self, other):
+        return (isinstance(other, SpatialReference) and
+                other.factoryCode == self.factoryCode)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.factoryCode)
+
+    def __repr__(self):
+        return "SpatialReference(%d)" % self.factoryCode
+
+
+class Field(object):
+    """A field of a table, with the attributes of arcpy.Field."""
+    # pylint: disable=too-few-public-methods,invalid-name
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, name, field_type, length=None, alias=None,
+                 domain=None, is_nullable=True, editable=True):
+        self.name = name
+        self.baseName = name
+        self.aliasName = alias or name
+        self.type = field_type
+        if length is None:
+            length = DEFAULT_TEXT_LENGTH if field_type == "String" else 0
+        self.length = length
+        self.domain = domain or ""
+        self.isNullable = is_nullable
+        self.editable = editable
+        self.required = not editable
+        self.precision = 0
+        self.scale = 0
+        self.defaultValue = None
+
+    def copy(self):
+        """Returns a copy of the field."""
+        field = Field(self.name, self.type, self.length, self.aliasName,
+                      self.domain, self.isNullable, self.editable)
+        field.required = self.required
+        return field
+
+    def __repr__(self):
+        return "Field(%r, %r)" % (self.name, self.type)
+
+
+class Domain(object):
+    """An attribute domain, with the attributes of arcpy.da.Domain."""
+    # pylint: disable=too-few-public-methods,invalid-name
+
+    def __init__(self, name, description, field_type, domain_type):
+        self.name = name
+        self.description = description or ""
+        self.type = FIELD_TYPES.get(field_type.upper(), field_type)
+        self.domainType = ("CodedValue" if domain_type.upper() == "CODED"
+                           else "Range")
+        self.codedValues = OrderedDict()
+        self.range = None
+        self.owner = ""
+
+
+def _bad_value(field):
+    return RuntimeError("The row contains a bad value. [%s]" % field.name)
+
+
+def _to_single(value):
+    return struct.unpack("<f", struct.pack("<f", value))[0]
+
+
+def convert_value(field, value):
+    """Converts a value to the form it is stored in a field, or raises a
+    RuntimeError like the one InsertCursors raise for bad values.
+    """
+    # pylint: disable=too-many-return-statements,too-many-branches
+    if value is None:
+        if not field.isNullable:
+            raise _bad_value(field)
+        return None
+    field_type = field.type
+    if field_type == "String":
+        if not isinstance(value, STRING_TYPES):
+            if isinstance(value, bool) or not isinstance(value, Real):
+                raise _bad_value(field)
+            value = "%s" % value
+        if len(value) > field.length:
+            raise _bad_value(field)
+        return value
+    if field_type in ("SmallInteger", "Integer"):
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        elif isinstance(value, STRING_TYPES):
+            try:
+                value = int(value)
+            except ValueError:
+                raise _bad_value(field)
+        if not isinstance(value, Integral):
+            raise _bad_value(field)
+        minimum, maximum = INTEGER_RANGES[TOOL_FIELD_TYPES[field_type]]
+        if not minimum <= value <= maximum:
+            raise _bad_value(field)
+        return int(value)
+    if field_type in ("Single", "Double"):
+        if isinstance(value, STRING_TYPES):
+            try:
+                value = float(value)
+            except ValueError:
+                raise _bad_value(field)
+        if not isinstance(value, Real):
+            raise _bad_value(field)
+        if value != value:
+            # NaN is stored as NULL.
+            return None
+        return _to_single(value) if field_type == "Single" else float(value)
+    if field_type == "Date":
+        if isinstance(value, datetime.datetime):
+            # Dates are stored to the second, without a time zone.
+            value += datetime.timedelta(microseconds=500000)
+            return value.replace(microsecond=0, tzinfo=None)
+        if isinstance(value, datetime.date):
+            return datetime.datetime(value.year, value.month, value.day)
+        raise _bad_value(field)
+    if field_type == "GUID":
+        if not isinstance(value, STRING_TYPES) or not GUID_RE.match(value):
+            raise _bad_value(field)
+        return "{%s}" % value.strip("{}").upper()
+    if field_type == "Blob":
+        if not isinstance(value, (bytes, bytearray, memoryview)):
+            raise _bad_value(field)
+        return bytearray(value)
+    return value
+
+
+class Dataset(object):
+    """A table or feature class.
+
+    Rows are lists of values in field order, keyed by OBJECTID. The value
+    of the shape field is a tuple of (x, y, z) points, or None. Empty
+    multipoints are empty tuples.
+    """
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, name, shape_type=None, has_z=False, has_m=False,
+                 spatial_reference=None):
+        self.name = name
+        self.shape_type = shape_type
+        self.has_z = has_z
+        self.has_m = has_m
+        self.spatial_reference = spatial_reference or SpatialReference()
+        self.fields = [Field("OBJECTID", "OID", 4, editable=False,
+                             is_nullable=False)]
+        if shape_type:
+            self.fields.append(Field("SHAPE", "Geometry", 0,
+                                     is_nullable=True))
+        self.rows = OrderedDict()
+        self.next_oid = 1
+
+    @property
+    def is_feature_class(self):
+        """True for feature classes, False for tables."""
+        return self.shape_type is not None
+
+    @property
+    def shape_index(self):
+        """Index of the shape field, or None for tables."""
+        return 1 if self.shape_type else None
+
+    def find_field(self, name):
+        """Returns the index of a field, matching its name regardless of
+        case, or None.
+        """
+        name = name.lower()
+        for index, field in enumerate(self.fields):
+            if field.name.lower() == name:
+                return index
+        return None
+
+    def add_field(self, field):
+        """Adds a field, setting its value to NULL in the existing rows."""
+        if self.find_field(field.name) is not None:
+            raise ExecuteError(
+                "ERROR 000012: %s already exists" % field.name)
+        self.fields.append(field)
+        for row in self.rows.values():
+            row.append(None)
+
+    def insert(self, row):
+        """Adds a row: a list of values in field order whose first value,
+        the OBJECTID, is assigned. Returns the OBJECTID of the new row.
+        """
+        oid = self.next_oid
+        self.next_oid += 1
+        row[0] = oid
+        self.rows[oid] = row
+        return oid
+
+    def new_row(self):
+        """Returns a row of NULLs to be filled in and inserted."""
+        return [None] * len(self.fields)
+
+    def copy_schema(self, name):
+        """Returns an empty dataset with the same fields."""
+        dataset = Dataset(name, self.shape_type, self.has_z, self.has_m,
+                          self.spatial_reference)
+        dataset.fields = [field.copy() for field in self.fields]
+        return dataset
+
+
+class Workspace(object):
+    """A file geodatabase or the in_memory workspace."""
+
+    def __init__(self):
+        self.datasets = OrderedDict()
+        self.domains = OrderedDict()
+        self.relationship_classes = OrderedDict()
+
+    def get(self, name):
+        """Returns a dataset, matching its name regardless of case, or
+        None.
+        """
+        return self.datasets.get(name.lower())
+
+    def add(self, dataset):
+        """Adds a dataset, replacing any with the same name."""
+        self.datasets[dataset.name.lower()] = dataset
+
+    def remove(self, name):
+        """Removes a dataset."""
+        del self.datasets[name.lower()]
+
+
+def _split_in_memory(path):
+    parts = path.replace("\\", "/").split("/")
+    if parts[0].lower() in IN_MEMORY_NAMES:
+        return parts[0].lower(), "/".join(parts[1:]) or None
+    return None
+
+
+def split_path(path):
+    """Splits a path into the path of its workspace and the name of the
+    dataset within it (None if the path is the workspace itself).
+
+    Returns (None, None) if the path isn't in a geodatabase or the in_memory
+    workspace.
+    """
+    if not path:
+        return None, None
+    in_memory = _split_in_memory(path)
+    if in_memory:
+        return in_memory
+    path = os.path.abspath(path)
+    parts = path.split(os.sep)
+    for index, part in enumerate(parts):
+        if part.lower().endswith(".gdb"):
+            workspace_path = os.sep.join(parts[:index + 1])
+            names = parts[index + 1:]
+            # Datasets inside feature datasets are addressed by name only.
+            return workspace_path, (names[-1] if names else None)
+    return None, None
+
+
+def _read_id(workspace_path):
+    try:
+        with open(os.path.join(workspace_path, ID_FILE_NAME)) as id_file:
+            return id_file.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def create_workspace(workspace_path):
+    """Creates the directory and in-memory workspace of a geodatabase."""
+    if not os.path.isdir(workspace_path):
+        os.makedirs(workspace_path)
+    workspace_id = uuid.uuid4().hex
+    with open(os.path.join(workspace_path, ID_FILE_NAME), "w") as id_file:
+        id_file.write(workspace_id)
+    workspace = Workspace()
+    with _LOCK:
+        _WORKSPACES[workspace_id] = workspace
+    return workspace
+
+
+def get_workspace(workspace_path):
+    """Returns the workspace at a path, or None if it doesn't exist."""
+    if workspace_path is None:
+        return None
+    if workspace_path in IN_MEMORY_NAMES:
+        with _LOCK:
+            workspace = _WORKSPACES.get(workspace_path)
+            if workspace is None:
+                workspace = _WORKSPACES[workspace_path] = Workspace()
+        return workspace
+    if not os.path.isdir(workspace_path):
+        return None
+    workspace_id = _read_id(workspace_path)
+    if workspace_id is None:
+        return create_workspace(workspace_path)
+    with _LOCK:
+        workspace = _WORKSPACES.get(workspace_id)
+        if workspace is None:
+            workspace = _WORKSPACES[workspace_id] = Workspace()
+    return workspace
+
+
+def delete_workspace(workspace_path):
+    """Deletes a geodatabase and its in-memory workspace."""
+    if workspace_path in IN_MEMORY_NAMES:
+        with _LOCK:
+            _WORKSPACES.pop(workspace_path, None)
+        return
+    workspace_id = _read_id(workspace_path)
+    with _LOCK:
+        _WORKSPACES.pop(workspace_id, None)
+    shutil.rmtree(workspace_path)
+
+
+def get_dataset(path):
+    """Returns the (workspace, dataset) at a path. Either is None if it
+    doesn't exist.
+    """
+    workspace_path, name = split_path(path)
+    workspace = get_workspace(workspace_path)
+    if workspace is None or name is None:
+        return workspace, None
+    return workspace, workspace.get(name)
+
+
+def require_dataset(path):
+    """Returns the (workspace, dataset) at a path, or raises an
+    ExecuteError if the dataset doesn't exist.
+    """
+    workspace, dataset = get_dataset(path)
+    if dataset is None:
+        raise ExecuteError(
+            "ERROR 000732: Dataset %s does not exist or is not supported" %
+            path)
+    return workspace, dataset
+
+
+def require_workspace(path):
+    """Returns the workspace at a path, or raises an ExecuteError if it
+    doesn't exist.
+    """
+    workspace_path, name = split_path(path)
+    workspace = get_workspace(workspace_path)
+    if workspace is None or name is not None:
+        raise ExecuteError(
+            "ERROR 000732: Workspace %s does not exist or is not supported" %
+            path)
+    return workspace
+
+
+def prepare_output(path):
+    """Returns the workspace and name of a new dataset, deleting any
+    existing dataset at the path if env.overwriteOutput is set.
+    """
+    workspace_path, name = split_path(path)
+    workspace = get_workspace(workspace_path)
+    if workspace is None or name is None:
+        raise ExecuteError(
+            "ERROR 000732: Output location of %s does not exist" % path)
+    if workspace.get(name) is not None:
+        if not env.overwriteOutput:
+            raise ExecuteError("ERROR 000725: %s already exists" % path)
+        workspace.remove(name)
+    return workspace, name
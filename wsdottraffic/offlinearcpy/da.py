@@ -0,0 +1,499 @@
+"""Cursors and other arcpy.da functions of the offline arcpy stand-in."""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import re
+import time
+from operator import itemgetter
+
+from ..geometry import multipoint_to_wkb, point_to_wkb, wkb_to_points
+from ..recordarrays import STRING_TYPES
+from ._store import (FIELD_TYPES, Dataset, Field, SpatialReference,
+                     convert_value, get_dataset, get_workspace, operation,
+                     prepare_output, record_operation, require_dataset,
+                     require_workspace, split_path)
+
+_SHAPE_TOKENS = ("SHAPE@XY", "SHAPE@X", "SHAPE@Y", "SHAPE@Z", "SHAPE@WKB")
+
+_NO_COLUMN = "A column was specified that does not exist."
+
+
+def _get_xy(shape):
+    """Returns the (x, y) of a point, or the centroid of a multipoint."""
+    if not shape:
+        return None
+    if len(shape) == 1:
+        return shape[0][:2]
+    return (sum(point[0] for point in shape) / len(shape),
+            sum(point[1] for point in shape) / len(shape))
+
+
+def _get_wkb(shape, shape_type):
+    if shape is None:
+        return None
+    if shape_type == "Point":
+        return bytearray(point_to_wkb(*shape[0][:2]))
+    return bytearray(multipoint_to_wkb([point[:2] for point in shape]))
+
+
+def _get_shape_reader(token, shape_type):
+    if token == "SHAPE@XY":
+        return _get_xy
+    if token == "SHAPE@WKB":
+        return lambda shape: _get_wkb(shape, shape_type)
+    coordinate = {"SHAPE@X": 0, "SHAPE@Y": 1}.get(token)
+    if coordinate is not None:
+        return lambda shape: (None if not shape
+                              else _get_xy(shape)[coordinate])
+    return lambda shape: None if not shape else shape[0][2]
+
+
+def _is_valid_coordinate(value):
+    return value is not None and value == value
+
+
+def _build_shape(dataset, shape, values):
+    """Returns the shape of a row after the SHAPE@ tokens' values, keyed by
+    token, are written to it.
+    """
+    field = dataset.fields[dataset.shape_index]
+    if "SHAPE@WKB" in values:
+        wkb = values["SHAPE@WKB"]
+        if wkb is None:
+            return None
+        try:
+            points = wkb_to_points(bytes(wkb))
+        except (ValueError, TypeError, IndexError):
+            raise RuntimeError("The row contains a bad value. [%s]" %
+                               field.name)
+        shape = tuple((x, y, None) for x, y in points)
+        if not shape and dataset.shape_type != "Multipoint":
+            return None
+    elif "SHAPE@XY" in values:
+        xy_value = values["SHAPE@XY"]
+        if xy_value is None or not all(map(_is_valid_coordinate, xy_value)):
+            return None
+        shape = ((xy_value[0], xy_value[1], None),)
+    if "SHAPE@Z" in values and shape is not None:
+        z_value = values["SHAPE@Z"]
+        shape = tuple((x, y, z_value) for x, y, _ in shape)
+    if shape is not None and dataset.shape_type == "Point" and len(shape) > 1:
+        raise RuntimeError("The row contains a bad value. [%s]" % field.name)
+    return shape
+
+
+def _parse_fields(dataset, field_names):
+    """Returns a (kind, field index) tuple for each cursor field. Kind is
+    "OID@", "field" or one of the SHAPE@ tokens.
+    """
+    if isinstance(field_names, STRING_TYPES):
+        field_names = [name.strip() for name in field_names.split(";")]
+    if list(field_names) == ["*"]:
+        field_names = [field.name for field in dataset.fields]
+    columns = []
+    for name in field_names:
+        token = name.upper()
+        if token == "OID@":
+            columns.append(("OID@", 0))
+        elif token.startswith("SHAPE@"):
+            if not dataset.is_feature_class or token not in _SHAPE_TOKENS:
+                raise RuntimeError(_NO_COLUMN)
+            columns.append((token, dataset.shape_index))
+        else:
+            index = dataset.find_field(name)
+            if index is None:
+                raise RuntimeError(_NO_COLUMN)
+            if index == 0:
+                columns.append(("OID@", 0))
+            elif index == dataset.shape_index:
+                columns.append(("SHAPE@XY", index))
+            else:
+                columns.append(("field", index))
+    return columns
+
+
+def _compile_reader(dataset, columns):
+    """Returns a function that returns the cursor values of a row."""
+    getters = []
+    for kind, index in columns:
+        if kind in ("OID@", "field"):
+            getters.append(itemgetter(index))
+        else:
+            read_shape = _get_shape_reader(kind, dataset.shape_type)
+            getters.append(
+                lambda row, read_shape=read_shape, index=index: read_shape(
+                    row[index]))
+    return lambda row: [get(row) for get in getters]
+
+
+def _compile_writer(dataset, columns):
+    """Returns a function that writes cursor values to a row, converting
+    them the way they are stored.
+    """
+    fields = dataset.fields
+    has_shape = any(kind.startswith("SHAPE@") for kind, _ in columns)
+    count = len(columns)
+
+    def write(row, values):
+        if len(values) != count:
+            raise TypeError("sequence size must match size of the row")
+        shape_values = {}
+        for (kind, index), value in zip(columns, values):
+            if kind == "field":
+                row[index] = convert_value(fields[index], value)
+            elif kind != "OID@":
+                shape_values[kind] = value
+        if has_shape:
+            row[dataset.shape_index] = _build_shape(
+                dataset, row[dataset.shape_index], shape_values)
+    return write
+
+
+_WHERE_IN_RE = re.compile(r"^\s*(\w+)\s+IN\s*\((.*)\)\s*$", re.IGNORECASE)
+_WHERE_EQUALS_RE = re.compile(r"^\s*(\w+)\s*=\s*(.+?)\s*$")
+
+
+def _parse_literal(literal):
+    literal = literal.strip()
+    if literal.startswith("'") and literal.endswith("'"):
+        return literal[1:-1].replace("''", "'")
+    try:
+        return int(literal)
+    except ValueError:
+        return float(literal)
+
+
+def _compile_where(dataset, where_clause):
+    """Returns a function that tests rows against a where clause. Only
+    "<field> IN (<values>)" and "<field> = <value>" are supported.
+    """
+    if not where_clause:
+        return None
+    match = _WHERE_IN_RE.match(where_clause)
+    try:
+        if match:
+            values = set(_parse_literal(literal)
+                         for literal in match.group(2).split(","))
+        else:
+            match = _WHERE_EQUALS_RE.match(where_clause)
+            if not match:
+                raise ValueError(where_clause)
+            values = set([_parse_literal(match.group(2))])
+    except ValueError:
+        raise RuntimeError("An invalid SQL statement was used. [%s]" %
+                           where_clause)
+    index = dataset.find_field(match.group(1))
+    if index is None:
+        raise RuntimeError("An invalid SQL statement was used. [%s]" %
+                           where_clause)
+    return lambda row: row[index] in values
+
+
+class _Cursor(object):
+    """Base class of the cursors."""
+
+    def __init__(self, in_table, field_names):
+        self._workspace, self._dataset = get_dataset(in_table)
+        if self._dataset is None:
+            raise RuntimeError("cannot open '%s'" % in_table)
+        self._columns = _parse_fields(self._dataset, field_names)
+        names = field_names
+        if isinstance(names, STRING_TYPES):
+            names = names.split(";")
+        self.fields = tuple(names)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class _ReadCursor(_Cursor):
+    """Base class of SearchCursor and UpdateCursor."""
+
+    def __init__(self, in_table, field_names, where_clause=None):
+        super(_ReadCursor, self).__init__(in_table, field_names)
+        self._read = _compile_reader(self._dataset, self._columns)
+        self._where = _compile_where(self._dataset, where_clause)
+        self._oids = None
+        self._position = 0
+        self._current = None
+        self.reset()
+
+    def reset(self):
+        """Moves the cursor back to the first row."""
+        matches = self._where
+        self._oids = [oid for oid, row in self._dataset.rows.items()
+                      if matches is None or matches(row)]
+        self._position = 0
+        self._current = None
+
+    def __iter__(self):
+        return self
+
+    def _next_row(self):
+        rows = self._dataset.rows
+        while self._position < len(self._oids):
+            oid = self._oids[self._position]
+            self._position += 1
+            row = rows.get(oid)
+            if row is not None:
+                self._current = oid
+                return row
+        raise StopIteration()
+
+
+class SearchCursor(_ReadCursor):
+    """Reads rows from a table or feature class."""
+
+    @operation("da.SearchCursor")
+    def __init__(self, in_table, field_names, where_clause=None,
+                 *args, **kwargs):  # pylint: disable=unused-argument
+        super(SearchCursor, self).__init__(in_table, field_names,
+                                           where_clause)
+
+    def __next__(self):
+        start = time.time()
+        row = self._next_row()
+        values = tuple(self._read(row))
+        record_operation("da.SearchCursor.next", time.time() - start)
+        return values
+
+    next = __next__
+
+
+class UpdateCursor(_ReadCursor):
+    """Reads, updates and deletes rows of a table or feature class."""
+
+    @operation("da.UpdateCursor")
+    def __init__(self, in_table, field_names, where_clause=None,
+                 *args, **kwargs):  # pylint: disable=unused-argument
+        super(UpdateCursor, self).__init__(in_table, field_names,
+                                           where_clause)
+        self._write = _compile_writer(self._dataset, self._columns)
+
+    def __next__(self):
+        start = time.time()
+        row = self._next_row()
+        values = self._read(row)
+        record_operation("da.UpdateCursor.next", time.time() - start)
+        return values
+
+    next = __next__
+
+    @operation("da.UpdateCursor.updateRow")
+    def updateRow(self, row):  # pylint: disable=invalid-name
+        """Updates the current row."""
+        if self._current is None:
+            raise RuntimeError("No current row.")
+        existing = self._dataset.rows[self._current]
+        updated = list(existing)
+        self._write(updated, row)
+        existing[:] = updated
+
+    @operation("da.UpdateCursor.deleteRow")
+    def deleteRow(self):  # pylint: disable=invalid-name
+        """Deletes the current row."""
+        if self._current is None:
+            raise RuntimeError("No current row.")
+        del self._dataset.rows[self._current]
+        self._current = None
+
+
+class InsertCursor(_Cursor):
+    """Inserts rows into a table or feature class."""
+
+    @operation("da.InsertCursor")
+    def __init__(self, in_table, field_names, *args, **kwargs):
+        # pylint: disable=unused-argument
+        super(InsertCursor, self).__init__(in_table, field_names)
+        self._write = _compile_writer(self._dataset, self._columns)
+
+    @operation("da.InsertCursor.insertRow")
+    def insertRow(self, row):  # pylint: disable=invalid-name
+        """Inserts a row and returns its OBJECTID."""
+        new_row = self._dataset.new_row()
+        self._write(new_row, row)
+        return self._dataset.insert(new_row)
+
+
+class Editor(object):
+    """An edit session. When used as a context manager, the edits are
+    discarded if an exception is raised.
+    """
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self._workspace = require_workspace(workspace)
+        self._snapshot = None
+        self.isEditing = False  # pylint: disable=invalid-name
+
+    @operation("da.Editor.startEditing")
+    def startEditing(self, with_undo=True, multiuser_mode=True):
+        # pylint: disable=invalid-name,unused-argument
+        """Starts the edit session, saving the workspace's rows so they can
+        be restored.
+        """
+        self._snapshot = dict(
+            (name, (list(dataset.rows.items()), dataset.next_oid))
+            for name, dataset in self._workspace.datasets.items())
+        self.isEditing = True
+
+    @operation("da.Editor.stopEditing")
+    def stopEditing(self, save_changes=True):  # pylint: disable=invalid-name
+        """Ends the edit session, restoring the rows unless save_changes."""
+        if not save_changes and self._snapshot is not None:
+            for name, (rows, next_oid) in self._snapshot.items():
+                dataset = self._workspace.datasets.get(name)
+                if dataset is None:
+                    continue
+                dataset.rows.clear()
+                dataset.rows.update((oid, list(row)) for oid, row in rows)
+                dataset.next_oid = next_oid
+        self._snapshot = None
+        self.isEditing = False
+
+    def startOperation(self):  # pylint: disable=invalid-name
+        """Edit operations are not tracked."""
+
+    def stopOperation(self):  # pylint: disable=invalid-name
+        """Edit operations are not tracked."""
+
+    def abortOperation(self):  # pylint: disable=invalid-name
+        """Edit operations are not tracked."""
+
+    def __enter__(self):
+        self.startEditing()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stopEditing(exc_type is None)
+        return False
+
+
+@operation("da.ListDomains")
+def ListDomains(in_workspace):  # pylint: disable=invalid-name
+    """Returns the domains of a workspace."""
+    return list(require_workspace(in_workspace).domains.values())
+
+
+def Walk(top, topdown=True, onerror=None, followlinks=False, datatype=None,
+         type=None):  # pylint: disable=invalid-name,redefined-builtin
+    # pylint: disable=unused-argument
+    """Yields a (dirpath, dirnames, filenames) tuple with the names of the
+    tables and feature classes of a geodatabase, filtered by datatype
+    ("FeatureClass" or "Table") and shape type (e.g., "Multipoint").
+    Folders that aren't geodatabases yield nothing.
+    """
+    workspace_path, name = split_path(top)
+    workspace = get_workspace(workspace_path)
+    if workspace is None or name is not None:
+        return
+
+    def as_set(value):
+        if value is None:
+            return None
+        if isinstance(value, STRING_TYPES):
+            value = [value]
+        return set(item.lower() for item in value)
+
+    datatypes = as_set(datatype)
+    types = as_set(type)
+    names = []
+    for dataset in workspace.datasets.values():
+        dataset_type = ("featureclass" if dataset.is_feature_class
+                        else "table")
+        if datatypes is not None and not datatypes & set([dataset_type,
+                                                          "any"]):
+            continue
+        if types is not None and (
+                not dataset.is_feature_class or
+                not types & set([dataset.shape_type.lower(), "any"])):
+            continue
+        names.append(dataset.name)
+    yield top, [], names
+
+
+def _get_numpy_field_type(dtype):
+    """Returns the field type and length of a structured array column."""
+    kind = dtype.kind
+    if kind == "f":
+        return ("FLOAT" if dtype.itemsize == 4 else "DOUBLE"), None
+    if kind in "iub":
+        return ("SHORT" if dtype.itemsize <= 2 else "LONG"), None
+    if kind == "U":
+        return "TEXT", dtype.itemsize // 4
+    if kind == "S":
+        return "TEXT", dtype.itemsize
+    if kind == "M":
+        return "DATE", None
+    raise TypeError("Unsupported array type: %s" % dtype)
+
+
+def _get_numpy_columns(in_array, names):
+    """Returns the values of array columns as lists of Python objects."""
+    columns = []
+    for name in names:
+        column = in_array[name]
+        if column.dtype.kind == "M":
+            column = column.astype("datetime64[us]")
+        columns.append(column.tolist())
+    return columns
+
+
+def _load_array(in_array, out_table, shape_fields=None,
+                spatial_reference=None):
+    """Creates a table, or a point feature class if shape_fields are
+    provided, from a structured array.
+    """
+    shape_fields = list(shape_fields or ())
+    workspace, name = prepare_output(out_table)
+    attribute_names = [field_name for field_name in in_array.dtype.names
+                       if field_name not in shape_fields]
+    if shape_fields:
+        if isinstance(spatial_reference, STRING_TYPES):
+            spatial_reference = require_dataset(
+                spatial_reference)[1].spatial_reference
+        elif not isinstance(spatial_reference, SpatialReference):
+            spatial_reference = SpatialReference(spatial_reference)
+        dataset = Dataset(name, "Point", has_z=len(shape_fields) > 2,
+                          spatial_reference=spatial_reference)
+    else:
+        dataset = Dataset(name)
+    for field_name in attribute_names:
+        field_type, length = _get_numpy_field_type(
+            in_array.dtype[field_name])
+        dataset.add_field(Field(field_name, FIELD_TYPES[field_type], length))
+    columns = _get_numpy_columns(in_array, attribute_names)
+    shape_columns = _get_numpy_columns(in_array, shape_fields)
+    field_indices = [dataset.find_field(field_name)
+                     for field_name in attribute_names]
+    for row_index in range(len(in_array)):
+        row = dataset.new_row()
+        for index, column in zip(field_indices, columns):
+            row[index] = convert_value(dataset.fields[index],
+                                       column[row_index])
+        if shape_fields:
+            point = tuple(column[row_index] for column in shape_columns)
+            if all(map(_is_valid_coordinate, point[:2])):
+                row[dataset.shape_index] = ((point + (None,))[:3],)
+        dataset.insert(row)
+    workspace.add(dataset)
+
+
+@operation("da.NumPyArrayToTable")
+def NumPyArrayToTable(in_array, out_table):  # pylint: disable=invalid-name
+    """Creates a table from a NumPy structured array."""
+    _load_array(in_array, out_table)
+
+
+@operation("da.NumPyArrayToFeatureClass")
+def NumPyArrayToFeatureClass(in_array, out_feature_class, shape_fields,
+                             spatial_reference=None):
+    # pylint: disable=invalid-name
+    """Creates a point feature class from a NumPy structured array, with the
+    points' coordinates in shape_fields (x, y and, optionally, z).
+    """
+    _load_array(in_array, out_feature_class, shape_fields,
+                spatial_reference)
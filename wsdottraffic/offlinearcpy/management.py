@@ -0,0 +1,433 @@
+"""Data management tools (arcpy.management) of the offline arcpy stand-in.
+
+Like their arcpy counterparts, the tools raise ExecuteError when they fail
+and return a Result whose first output is the path of the output dataset.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import os
+from collections import OrderedDict
+
+from ..recordarrays import STRING_TYPES
+from ._store import (FIELD_TYPES, TOOL_FIELD_TYPES, SHAPE_TYPES, Dataset,
+                     Domain, ExecuteError, Field, SpatialReference,
+                     convert_value, create_workspace, delete_workspace, env,
+                     get_workspace, prepare_output,
+                     require_dataset, require_workspace, split_path, tool)
+
+_NUMERIC_TYPES = ("SmallInteger", "Integer", "Single", "Double")
+
+
+class Result(object):
+    """The outputs of a tool, like arcpy.Result."""
+
+    def __init__(self, *outputs):
+        self._outputs = ["%s" % output for output in outputs]
+        self.outputCount = len(outputs)  # pylint: disable=invalid-name
+
+    def getOutput(self, index):  # pylint: disable=invalid-name
+        """Returns an output."""
+        return self._outputs[index]
+
+    def __getitem__(self, index):
+        return self._outputs[index]
+
+    def __str__(self):
+        return self._outputs[0] if self._outputs else ""
+
+
+def _split_values(values):
+    """Splits a multivalue parameter, either a list or a semicolon-delimited
+    string.
+    """
+    if not values or values == "#":
+        return []
+    if isinstance(values, STRING_TYPES):
+        return [value.strip() for value in values.split(";") if value.strip()]
+    return list(values)
+
+
+def _is_enabled(value, template_value):
+    """Interprets an ENABLED/DISABLED/SAME_AS_TEMPLATE parameter."""
+    if value is None or value == "#":
+        return False
+    value = ("%s" % value).upper()
+    if value == "SAME_AS_TEMPLATE":
+        return template_value
+    return value in ("ENABLED", "YES", "TRUE")
+
+
+def _get_spatial_reference(spatial_reference):
+    if spatial_reference is None or spatial_reference == "#":
+        return SpatialReference()
+    if isinstance(spatial_reference, SpatialReference):
+        return spatial_reference
+    if isinstance(spatial_reference, STRING_TYPES):
+        try:
+            return SpatialReference(int(spatial_reference))
+        except ValueError:
+            dataset = require_dataset(spatial_reference)[1]
+            return dataset.spatial_reference
+    return SpatialReference(spatial_reference)
+
+
+def _copy_template_fields(dataset, templates):
+    """Adds the attribute fields of template datasets."""
+    template_datasets = [require_dataset(template)[1]
+                         for template in _split_values(templates)]
+    for template in template_datasets:
+        for field in template.fields:
+            if (field.type not in ("OID", "Geometry") and
+                    dataset.find_field(field.name) is None):
+                dataset.add_field(field.copy())
+    return template_datasets
+
+
+@tool("management.CreateFileGDB")
+def CreateFileGDB(out_folder_path, out_name, out_version=None):
+    # pylint: disable=invalid-name,unused-argument
+    """Creates a file geodatabase."""
+    if not out_name.lower().endswith(".gdb"):
+        out_name += ".gdb"
+    gdb_path = os.path.join(out_folder_path, out_name)
+    if not os.path.isdir(out_folder_path):
+        raise ExecuteError("ERROR 000732: %s does not exist" %
+                           out_folder_path)
+    if os.path.exists(gdb_path):
+        if not env.overwriteOutput:
+            raise ExecuteError("ERROR 000258: %s already exists" % gdb_path)
+        delete_workspace(os.path.abspath(gdb_path))
+    create_workspace(os.path.abspath(gdb_path))
+    return Result(gdb_path)
+
+
+@tool("management.CreateFeatureclass")
+def CreateFeatureclass(out_path, out_name, geometry_type=None, template=None,
+                       has_m=None, has_z=None, spatial_reference=None,
+                       *args, **kwargs):
+    # pylint: disable=invalid-name,too-many-arguments,unused-argument
+    """Creates a point or multipoint feature class, with the fields of the
+    template datasets.
+    """
+    out_fc = os.path.join(out_path, out_name)
+    workspace, name = prepare_output(out_fc)
+    shape_type = SHAPE_TYPES.get(("%s" % (geometry_type or "POLYGON")).upper())
+    if shape_type is None:
+        raise ExecuteError("ERROR 000800: Unsupported geometry type %s" %
+                           geometry_type)
+    dataset = Dataset(name, shape_type,
+                      spatial_reference=_get_spatial_reference(
+                          spatial_reference))
+    templates = _copy_template_fields(dataset, template)
+    dataset.has_m = _is_enabled(has_m, any(t.has_m for t in templates))
+    dataset.has_z = _is_enabled(has_z, any(t.has_z for t in templates))
+    workspace.add(dataset)
+    return Result(out_fc)
+
+
+@tool("management.CreateTable")
+def CreateTable(out_path, out_name, template=None, *args, **kwargs):
+    # pylint: disable=invalid-name,unused-argument
+    """Creates a table with the fields of the template datasets."""
+    out_table = os.path.join(out_path, out_name)
+    workspace, name = prepare_output(out_table)
+    dataset = Dataset(name)
+    _copy_template_fields(dataset, template)
+    workspace.add(dataset)
+    return Result(out_table)
+
+
+def _add_field(in_table, field_name, field_type, field_length=None,
+               field_alias=None, field_is_nullable=None, field_domain=None):
+    workspace, dataset = require_dataset(in_table)
+    type_name = FIELD_TYPES.get(("%s" % field_type).upper())
+    if type_name is None:
+        raise ExecuteError("ERROR 000800: Unsupported field type %s" %
+                           field_type)
+    # arcpy accepts lengths as strings (tabledefs.json has "3", "11").
+    if field_length in (None, "", "#"):
+        field_length = None
+    else:
+        field_length = int(field_length) or None
+    field = Field(field_name, type_name, field_length, field_alias,
+                  is_nullable=("%s" % field_is_nullable).upper() !=
+                  "NON_NULLABLE")
+    dataset.add_field(field)
+    if field_domain and field_domain != "#":
+        _assign_domain(workspace, dataset, field_name, field_domain)
+
+
+@tool("management.AddField")
+def AddField(in_table, field_name, field_type, field_precision=None,
+             field_scale=None, field_length=None, field_alias=None,
+             field_is_nullable=None, field_is_required=None,
+             field_domain=None):
+    # pylint: disable=invalid-name,too-many-arguments,unused-argument
+    """Adds a field to a table."""
+    _add_field(in_table, field_name, field_type, field_length, field_alias,
+               field_is_nullable, field_domain)
+    return Result(in_table)
+
+
+@tool("management.AddFields")
+def AddFields(in_table, field_description):  # pylint: disable=invalid-name
+    """Adds fields described by [name, type, alias, length, default,
+    domain] lists.
+    """
+    for description in field_description:
+        description = (list(description) + [None] * 6)[:6]
+        name, field_type, alias, length, _, domain = description
+        _add_field(in_table, name, field_type, length, alias,
+                   field_domain=domain)
+    return Result(in_table)
+
+
+@tool("management.Delete")
+def Delete(in_data, data_type=None):  # pylint: disable=invalid-name
+    # pylint: disable=unused-argument
+    """Deletes geodatabases, tables and feature classes."""
+    for path in _split_values(in_data):
+        workspace_path, name = split_path(path)
+        workspace = get_workspace(workspace_path)
+        if workspace is None:
+            raise ExecuteError("ERROR 000732: %s does not exist" % path)
+        if name is None:
+            delete_workspace(workspace_path)
+        elif workspace.get(name) is not None:
+            workspace.remove(name)
+        elif workspace.relationship_classes.pop(name.lower(), None) is None:
+            raise ExecuteError("ERROR 000732: %s does not exist" % path)
+    return Result(in_data)
+
+
+@tool("management.DeleteRows")
+def DeleteRows(in_rows):  # pylint: disable=invalid-name
+    """Deletes all of the rows of a table."""
+    require_dataset(in_rows)[1].rows.clear()
+    return Result(in_rows)
+
+
+@tool("management.Rename")
+def Rename(in_data, out_data, data_type=None):  # pylint: disable=invalid-name
+    # pylint: disable=unused-argument
+    """Renames a dataset within its workspace."""
+    workspace, dataset = require_dataset(in_data)
+    out_workspace_path, out_name = split_path(
+        out_data if os.path.dirname(out_data) else
+        os.path.join(os.path.dirname(in_data), out_data))
+    if get_workspace(out_workspace_path) is not workspace or not out_name:
+        raise ExecuteError("ERROR 000732: Can't rename %s to %s" % (
+            in_data, out_data))
+    if workspace.get(out_name) is not None:
+        raise ExecuteError("ERROR 000725: %s already exists" % out_data)
+    workspace.remove(dataset.name)
+    dataset.name = out_name
+    workspace.add(dataset)
+    return Result(out_data)
+
+
+@tool("management.GetCount")
+def GetCount(in_rows):  # pylint: disable=invalid-name
+    """Returns the number of rows of a table."""
+    return Result(len(require_dataset(in_rows)[1].rows))
+
+
+@tool("management.ClearWorkspaceCache")
+def ClearWorkspaceCache(in_data=None):  # pylint: disable=invalid-name
+    """Does nothing: there are no workspace locks to release."""
+    return Result(in_data or "")
+
+
+@tool("management.CreateDomain")
+def CreateDomain(in_workspace, domain_name, domain_description=None,
+                 field_type="SHORT", domain_type="CODED", *args, **kwargs):
+    # pylint: disable=invalid-name,unused-argument
+    """Creates an empty domain."""
+    workspace = require_workspace(in_workspace)
+    if domain_name in workspace.domains:
+        raise ExecuteError("ERROR 000192: Domain %s already exists" %
+                           domain_name)
+    workspace.domains[domain_name] = Domain(
+        domain_name, domain_description, field_type, domain_type or "CODED")
+    return Result(in_workspace)
+
+
+@tool("management.DeleteDomain")
+def DeleteDomain(in_workspace, domain_name):  # pylint: disable=invalid-name
+    """Deletes a domain that isn't assigned to any field."""
+    workspace = require_workspace(in_workspace)
+    if domain_name not in workspace.domains:
+        raise ExecuteError("ERROR 000732: Domain %s does not exist" %
+                           domain_name)
+    for dataset in workspace.datasets.values():
+        for field in dataset.fields:
+            if field.domain == domain_name:
+                raise ExecuteError(
+                    "ERROR 999999: Domain %s is used by %s.%s" % (
+                        domain_name, dataset.name, field.name))
+    del workspace.domains[domain_name]
+    return Result(in_workspace)
+
+
+@tool("management.TableToDomain")
+def TableToDomain(in_table, code_field, description_field, in_workspace,
+                  domain_name, domain_description=None,
+                  update_option="APPEND"):
+    # pylint: disable=invalid-name,too-many-arguments
+    """Creates or updates a coded value domain from the rows of a table."""
+    _, table = require_dataset(in_table)
+    workspace = require_workspace(in_workspace)
+    code_index = table.find_field(code_field)
+    description_index = table.find_field(description_field)
+    if code_index is None or description_index is None:
+        raise ExecuteError("ERROR 000728: Field does not exist within table")
+    domain = workspace.domains.get(domain_name)
+    if domain is None:
+        domain = Domain(domain_name, domain_description,
+                        TOOL_FIELD_TYPES[table.fields[code_index].type],
+                        "CODED")
+        workspace.domains[domain_name] = domain
+    elif ("%s" % update_option).upper() == "REPLACE":
+        domain.codedValues = OrderedDict()
+    for row in table.rows.values():
+        domain.codedValues[row[code_index]] = row[description_index]
+    return Result(in_workspace)
+
+
+def _assign_domain(workspace, dataset, field_name, domain_name):
+    index = dataset.find_field(field_name)
+    if index is None:
+        raise ExecuteError("ERROR 000728: Field %s does not exist" %
+                           field_name)
+    domain = workspace.domains.get(domain_name)
+    if domain is None:
+        raise ExecuteError("ERROR 000732: Domain %s does not exist" %
+                           domain_name)
+    field = dataset.fields[index]
+    if not (domain.type == field.type or (
+            domain.type in _NUMERIC_TYPES and field.type in _NUMERIC_TYPES)):
+        raise ExecuteError(
+            "ERROR 000378: The %s domain (%s) can't be assigned to %s (%s)" %
+            (domain_name, domain.type, field_name, field.type))
+    field.domain = domain_name
+
+
+@tool("management.AssignDomainToField")
+def AssignDomainToField(in_table, field_name, domain_name,
+                        subtype_code=None):
+    # pylint: disable=invalid-name,unused-argument
+    """Assigns a domain of the table's workspace to a field."""
+    workspace, dataset = require_dataset(in_table)
+    _assign_domain(workspace, dataset, field_name, domain_name)
+    return Result(in_table)
+
+
+@tool("management.Append")
+def Append(inputs, target, schema_type="TEST", *args, **kwargs):
+    # pylint: disable=invalid-name,unused-argument
+    """Appends the rows of tables to a target table, matching fields by
+    name. With schema_type TEST, the inputs must have all of the target's
+    fields. No rows are appended if any value doesn't fit its field.
+    """
+    _, target_dataset = require_dataset(target)
+    target_fields = [(index, field) for index, field
+                     in enumerate(target_dataset.fields)
+                     if field.type not in ("OID", "Geometry")]
+    new_rows = []
+    for path in _split_values(inputs):
+        _, dataset = require_dataset(path)
+        mapping = []
+        for index, field in target_fields:
+            source_index = dataset.find_field(field.name)
+            if source_index is None:
+                if ("%s" % schema_type).upper() == "TEST":
+                    raise ExecuteError(
+                        "ERROR 000466: %s does not match the schema of %s" %
+                        (path, target))
+                continue
+            mapping.append((index, field, source_index))
+        copy_shape = (target_dataset.is_feature_class and
+                      dataset.is_feature_class)
+        for row in dataset.rows.values():
+            new_row = target_dataset.new_row()
+            try:
+                for index, field, source_index in mapping:
+                    new_row[index] = convert_value(field, row[source_index])
+            except RuntimeError as ex:
+                raise ExecuteError("ERROR 999999: %s" % ex)
+            if copy_shape:
+                shape = row[dataset.shape_index]
+                if shape is not None and not target_dataset.has_z:
+                    shape = tuple((x, y, None) for x, y, _ in shape)
+                new_row[target_dataset.shape_index] = shape
+            new_rows.append(new_row)
+    for new_row in new_rows:
+        target_dataset.insert(new_row)
+    return Result(target)
+
+
+@tool("management.CreateRelationshipClass")
+def CreateRelationshipClass(origin_table, destination_table,
+                            out_relationship_class, relationship_type,
+                            forward_label, backward_label,
+                            message_direction, cardinality, attributed,
+                            origin_primary_key, origin_foreign_key,
+                            destination_primary_key=None,
+                            destination_foreign_key=None):
+    # pylint: disable=invalid-name,too-many-arguments,too-many-locals
+    """Records a relationship class between two tables of a workspace."""
+    workspace, origin = require_dataset(origin_table)
+    destination_workspace, destination = require_dataset(destination_table)
+    if destination_workspace is not workspace:
+        raise ExecuteError("ERROR 000732: The tables must be in the same "
+                           "workspace")
+    if (origin.find_field(origin_primary_key) is None or
+            destination.find_field(origin_foreign_key) is None):
+        raise ExecuteError("ERROR 000728: Key field does not exist")
+    out_workspace_path, name = split_path(out_relationship_class)
+    if get_workspace(out_workspace_path) is not workspace or not name:
+        raise ExecuteError("ERROR 000732: %s is not in the tables' workspace"
+                           % out_relationship_class)
+    if name.lower() in workspace.relationship_classes or workspace.get(name):
+        if not env.overwriteOutput:
+            raise ExecuteError("ERROR 000725: %s already exists" %
+                               out_relationship_class)
+    workspace.relationship_classes[name.lower()] = {
+        "name": name,
+        "origin": origin.name,
+        "destination": destination.name,
+        "relationship_type": relationship_type,
+        "forward_label": forward_label,
+        "backward_label": backward_label,
+        "message_direction": message_direction,
+        "cardinality": cardinality,
+        "attributed": attributed,
+        "origin_primary_key": origin_primary_key,
+        "origin_foreign_key": origin_foreign_key,
+        "destination_primary_key": destination_primary_key,
+        "destination_foreign_key": destination_foreign_key,
+    }
+    return Result(out_relationship_class)
+
+
+@tool("management.MultipartToSinglepart")
+def MultipartToSinglepart(in_features, out_feature_class):
+    # pylint: disable=invalid-name
+    """Creates a point feature class with a feature for each point of a
+    multipoint feature class, and an ORIG_FID field with the OBJECTID of
+    each point's multipoint.
+    """
+    _, dataset = require_dataset(in_features)
+    workspace, name = prepare_output(out_feature_class)
+    out_dataset = dataset.copy_schema(name)
+    out_dataset.shape_type = "Point"
+    out_dataset.add_field(Field("ORIG_FID", "Integer"))
+    for row in dataset.rows.values():
+        shape = row[dataset.shape_index]
+        for point in shape or [None]:
+            new_row = list(row) + [row[0]]
+            new_row[dataset.shape_index] = None if point is None else (point,)
+            out_dataset.insert(new_row)
+    workspace.add(out_dataset)
+    return Result(out_feature_class)
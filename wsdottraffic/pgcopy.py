@@ -0,0 +1,259 @@
+"""Writes the traveler info tables as PostgreSQL COPY text files and a psql
+script that loads them into PostGIS tables.
+
+The output is a directory with a .copy file per load and a load.sql
+script, which creates the tables if they don't exist and then truncates,
+appends to or upserts them, in a single transaction. \\copy reads files
+relative to the current directory, so run the script from the output
+directory:
+
+    cd TravelerInfo.pgcopy
+    psql --dbname traffic --file load.sql
+
+Geometries are written as EWKT (e.g., SRID=4326;POINT(-122.3 47.6)), which
+PostGIS parses on input. Only the Python standard library is used, so the
+files can be produced on workers that can't reach the database.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import binascii
+import datetime
+import io
+import json
+import logging
+import os
+
+from .geometry import get_points
+from .jsonhelpers import CustomEncoder
+from .recordarrays import STRING_TYPES
+from .tabledefs import (GEOMETRY_TYPE_MULTIPOINT, GEOMETRY_TYPE_POINT,
+                        get_geometry_info, get_table_def, iter_field_defs)
+from .writers import TableWriter
+
+_LOGGER = logging.getLogger(__name__)
+
+SCRIPT_NAME = "load.sql"
+SRID = 4326
+FID_COLUMN = "fid"
+GEOMETRY_COLUMN = "geom"
+
+# PostgreSQL column types for arcpy field types.
+COLUMN_TYPES = {
+    "TEXT": "text",
+    "FLOAT": "real",
+    "SINGLE": "real",
+    "DOUBLE": "double precision",
+    "SHORT": "smallint",
+    "LONG": "integer",
+    "DATE": "timestamp",
+    "GUID": "varchar(38)",
+    "BLOB": "bytea",
+}
+
+# PostGIS geometry types.
+GEOMETRY_TYPES = {
+    GEOMETRY_TYPE_POINT: "Point",
+    GEOMETRY_TYPE_MULTIPOINT: "MultiPoint",
+}
+
+# Characters escaped in COPY text format.
+_ESCAPES = {"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"}
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+def _escape(text):
+    return "".join(_ESCAPES.get(char, char) for char in text)
+
+
+def to_ewkt(points, geometry_type, srid=SRID):
+    """Converts a list of (x, y) tuples to EWKT. Returns None if there are no
+    points.
+    """
+    if not points:
+        return None
+    if geometry_type == GEOMETRY_TYPE_POINT:
+        return "SRID=%d;POINT(%r %r)" % ((srid,) + tuple(points[0]))
+    return "SRID=%d;MULTIPOINT(%s)" % (srid, ",".join(
+        "(%r %r)" % (x, y) for x, y in points))
+
+
+def to_copy_text(value):
+    """Converts a record value to a field of a COPY text format line."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, datetime.datetime):
+        if value.utcoffset() is not None:
+            value = (value - value.utcoffset()).replace(tzinfo=None)
+        return value.isoformat(str(" "))
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, bytes) and not isinstance(value, STRING_TYPES):
+        # bytea hex format. The backslash is escaped for COPY.
+        return "\\\\x" + binascii.hexlify(value).decode("ascii")
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value, cls=CustomEncoder)
+    elif isinstance(value, float):
+        value = repr(value)
+    elif not isinstance(value, STRING_TYPES):
+        value = str(value)
+    return _escape(value)
+
+
+class _Table(object):
+    """The definition of a table and the statements that load it."""
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, table_name, table_def_dict):
+        self.name = table_name
+        self.table_def_dict = table_def_dict
+        self.geometry_type, self.geometry_fields = get_geometry_info(
+            table_def_dict)
+        self.field_defs = list(iter_field_defs(table_def_dict,
+                                               self.geometry_fields))
+        self.columns = [field_def.name for field_def in self.field_defs]
+        if self.geometry_type:
+            self.columns.insert(0, GEOMETRY_COLUMN)
+        self.file_count = 0
+
+    def get_create_sql(self):
+        """Returns the statements that create the table and its indexes."""
+        quoted_name = _quote(self.name)
+        columns = ["%s serial PRIMARY KEY" % _quote(FID_COLUMN)]
+        if self.geometry_type:
+            columns.append("%s geometry(%s, %d)" % (
+                _quote(GEOMETRY_COLUMN), GEOMETRY_TYPES[self.geometry_type],
+                SRID))
+        for field_def in self.field_defs:
+            column_type = COLUMN_TYPES.get(field_def.field_type, "text")
+            if field_def.field_type == "TEXT" and field_def.length:
+                column_type = "varchar(%d)" % field_def.length
+            columns.append("%s %s" % (_quote(field_def.name), column_type))
+        statements = ["CREATE TABLE IF NOT EXISTS %s (\n    %s\n);" % (
+            quoted_name, ",\n    ".join(columns))]
+        if self.geometry_type:
+            statements.append(
+                "CREATE INDEX IF NOT EXISTS %s ON %s USING GIST (%s);" % (
+                    _quote("%s_%s_idx" % (self.name, GEOMETRY_COLUMN)),
+                    quoted_name, _quote(GEOMETRY_COLUMN)))
+        return statements
+
+    def get_copy_sql(self, target, file_name):
+        """Returns the psql \\copy meta-command that loads a file."""
+        return "\\copy %s (%s) FROM '%s'" % (
+            _quote(target), ", ".join(map(_quote, self.columns)),
+            file_name.replace("'", "''"))
+
+    def get_upsert_sql(self, file_name):
+        """Returns statements that load a file into a staging table and make
+        the table's rows match it, matching rows by keyFields.
+        """
+        quoted_name = _quote(self.name)
+        staging = "%s_staging" % os.path.splitext(file_name)[0]
+        quoted_staging = _quote(staging)
+        key_names = [field_def.name for field_def in self.field_defs
+                     if field_def.key in self.table_def_dict["keyFields"]]
+        key_match = " AND ".join("t.%s = s.%s" % (_quote(name), _quote(name))
+                                 for name in key_names)
+        columns = ", ".join(map(_quote, self.columns))
+        return [
+            "CREATE TEMPORARY TABLE %s ON COMMIT DROP AS SELECT %s FROM %s "
+            "WITH NO DATA;" % (quoted_staging, columns, quoted_name),
+            self.get_copy_sql(staging, file_name),
+            "DELETE FROM %s AS t WHERE NOT EXISTS (SELECT 1 FROM %s AS s "
+            "WHERE %s);" % (quoted_name, quoted_staging, key_match),
+            "UPDATE %s AS t SET %s FROM %s AS s WHERE %s AND "
+            "ROW(%s) IS DISTINCT FROM ROW(%s);" % (
+                quoted_name, ", ".join(
+                    "%s = s.%s" % (_quote(name), _quote(name))
+                    for name in self.columns),
+                quoted_staging, key_match,
+                ", ".join("t.%s" % _quote(name) for name in self.columns),
+                ", ".join("s.%s" % _quote(name) for name in self.columns)),
+            "INSERT INTO %s (%s) SELECT %s FROM %s AS s WHERE NOT EXISTS "
+            "(SELECT 1 FROM %s AS t WHERE %s);" % (
+                quoted_name, columns, ", ".join(
+                    "s.%s" % _quote(name) for name in self.columns),
+                quoted_staging, quoted_name, key_match),
+        ]
+
+
+class CopyWriter(TableWriter):
+    """Writes tables as PostgreSQL COPY files and a psql script that loads
+    them (see writers.TableWriter).
+
+    Rows are written to the .copy files as they are appended. The script is
+    written by finalize, so it only exists if every table was written.
+    """
+
+    format_name = "copy"
+
+    def __init__(self, out_path):
+        super(CopyWriter, self).__init__(out_path)
+        if not os.path.isdir(out_path):
+            os.makedirs(out_path)
+        self.tables = {}
+        self.statements = ["\\set ON_ERROR_STOP on", "BEGIN;",
+                           "CREATE EXTENSION IF NOT EXISTS postgis;"]
+
+    def create_schema(self, table_name, table_def_dict=None):
+        if table_name not in self.tables:
+            table = _Table(table_name, get_table_def(table_name,
+                                                     table_def_dict))
+            self.tables[table_name] = table
+            self.statements.extend(table.get_create_sql())
+
+    def truncate(self, table_name):
+        self.create_schema(table_name)
+        self.statements.append("TRUNCATE %s;" % _quote(table_name))
+
+    def _write_file(self, table, data_list):
+        """Writes records to a new COPY file and returns its name."""
+        table.file_count += 1
+        file_name = "%s.copy" % table.name
+        if table.file_count > 1:
+            file_name = "%s_%d.copy" % (table.name, table.file_count)
+        keys = [field_def.key for field_def in table.field_defs]
+        rowcount = 0
+        with io.open(os.path.join(self.out_path, file_name), "w",
+                     encoding="utf-8", newline="\n") as copy_file:
+            for item in data_list:
+                values = [item.get(key) for key in keys]
+                if table.geometry_type:
+                    values.insert(0, to_ewkt(get_points(
+                        item, table.geometry_type, table.geometry_fields),
+                                             table.geometry_type))
+                copy_file.write("\t".join(map(to_copy_text, values)))
+                copy_file.write("\n")
+                rowcount += 1
+        _LOGGER.info("Wrote %(rowcount)d rows to %(file_name)s.", {
+            "rowcount": rowcount, "file_name": file_name})
+        return file_name
+
+    def append(self, table_name, data_list, table_def_dict=None):
+        self.create_schema(table_name, table_def_dict)
+        table = self.tables[table_name]
+        self.statements.append(table.get_copy_sql(
+            table_name, self._write_file(table, data_list)))
+
+    def upsert(self, table_name, data_list, table_def_dict=None):
+        self.create_schema(table_name, table_def_dict)
+        table = self.tables[table_name]
+        if not table.table_def_dict.get("keyFields"):
+            super(CopyWriter, self).upsert(table_name, data_list,
+                                           table_def_dict)
+            return
+        self.statements.extend(table.get_upsert_sql(
+            self._write_file(table, data_list)))
+
+    def finalize(self):
+        script_path = os.path.join(self.out_path, SCRIPT_NAME)
+        with io.open(script_path, "w", encoding="utf-8",
+                     newline="\n") as script_file:
+            script_file.write("\n".join(self.statements + ["COMMIT;", ""]))
+        _LOGGER.info("Wrote %s", script_path)
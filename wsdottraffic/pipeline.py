@@ -0,0 +1,126 @@
+"""Overlaps downloading endpoint data with writing it.
+
+prefetch runs a bounded pool of worker threads that fetch (download and
+parse) items ahead of the consumer, while the consumer, typically the
+thread that owns a geodatabase, receives the results one at a time in the
+original order. At most max_pending fetched results wait for the consumer,
+so a slow writer applies backpressure to the fetchers.
+
+Example
+-------
+::
+
+    for name, data in prefetch(names, get_traveler_info):
+        create_table(os.path.join(gdb_path, name), None, data)
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import logging
+import threading
+import time
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_PENDING = 4
+
+
+class _Prefetcher(object):
+    """Shared state of the prefetch worker threads."""
+
+    def __init__(self, items, fetch, max_workers, max_pending):
+        self.items = list(items)
+        self.fetch = fetch
+        self.slots = threading.Semaphore(max_pending)
+        self.lock = threading.Lock()
+        self.done = threading.Condition(self.lock)
+        self.next_index = 0
+        self.results = {}
+        self.stopped = False
+        self.threads = [
+            threading.Thread(target=self.run, name="PrefetchThread-%d" % i)
+            for i in range(min(max_workers, len(self.items)))]
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+    def run(self):
+        """Fetches items until there are none left or the consumer stops."""
+        while True:
+            # Items are claimed in order, each holding a slot, so the item
+            # the consumer is waiting for is always being fetched.
+            self.slots.acquire()
+            with self.lock:
+                if self.stopped or self.next_index >= len(self.items):
+                    self.slots.release()
+                    return
+                index = self.next_index
+                self.next_index += 1
+            start = time.time()
+            try:
+                result = (self.fetch(self.items[index]), None)
+            except Exception as ex:  # pylint: disable=broad-except
+                result = (None, ex)
+            with self.lock:
+                self.results[index] = result + (time.time() - start,)
+                self.done.notify_all()
+
+    def get(self, index):
+        """Waits for and returns the (result, error, seconds) of an item.
+        """
+        with self.lock:
+            while index not in self.results:
+                self.done.wait()
+            return self.results.pop(index)
+
+    def stop(self):
+        """Stops the workers from claiming new items."""
+        with self.lock:
+            self.stopped = True
+        # Wake any workers waiting for a slot.
+        for _ in self.threads:
+            self.slots.release()
+
+
+def prefetch(items, fetch, max_workers=DEFAULT_MAX_WORKERS,
+             max_pending=DEFAULT_MAX_PENDING):
+    """Fetches items on worker threads, yielding the results in order.
+
+    Parameters
+    ----------
+    items : iterable
+        Items to fetch (e.g., endpoint names).
+    fetch : callable
+        Function that returns the result of an item. It is called on worker
+        threads.
+    max_workers : int, optional
+        Number of worker threads. If less than 1, items are fetched on the
+        calling thread, one at a time, when the consumer requests them.
+    max_pending : int, optional
+        Maximum number of items fetched or being fetched ahead of the
+        consumer.
+
+    Yields
+    ------
+    tuple
+        Each item and its result. If fetching an item raised an exception,
+        the exception is re-raised when that item is reached.
+    """
+    if max_workers < 1:
+        for item in items:
+            yield item, fetch(item)
+        return
+    prefetcher = _Prefetcher(items, fetch, max_workers, max(max_pending, 1))
+    try:
+        for index, item in enumerate(prefetcher.items):
+            result, error, seconds = prefetcher.get(index)
+            if error is not None:
+                raise error
+            _LOGGER.debug("Fetched %(item)s in %(seconds).2f seconds.",
+                          {"item": item, "seconds": seconds})
+            yield item, result
+            # The result has been consumed: let another item be fetched.
+            prefetcher.slots.release()
+    finally:
+        prefetcher.stop()
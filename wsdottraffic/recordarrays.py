@@ -0,0 +1,247 @@
+"""Converts table rows into NumPy structured arrays for bulk loading.
+
+The dtype of each column is derived from the field definitions in
+tabledefs.json (see tabledefs.iter_field_defs), so the arrays can be passed
+to the array-based table APIs, such as arcpy.da.NumPyArrayToTable, instead of
+inserting the rows one at a time.
+
+Structured arrays can't hold NULLs other than NaN in floating point columns,
+and their text columns silently truncate long values. Rows with values that
+can't be stored exactly are therefore rejected, so they can be inserted by
+other means (e.g., an InsertCursor), which reports bad values as errors.
+Optionally, NULLs in the other columns are stored as placeholder values
+(NULL_PLACEHOLDERS) and their positions are returned, so they can be set to
+NULL once the array has been loaded into a table.
+
+Requires the numpy package.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import re
+from collections import namedtuple
+from numbers import Integral, Real
+
+from .tabledefs import DEFAULT_TEXT_LENGTH
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Types of text values (str and, in Python 2, unicode).
+try:
+    STRING_TYPES = (str, unicode)  # noqa: F821 pylint: disable=undefined-variable
+except NameError:
+    STRING_TYPES = (str,)
+
+# Length of a GUID string in registry format, e.g.
+# {6F9619FF-8B86-D011-B42D-00C04FC964FF}
+GUID_LENGTH = 38
+
+# Matches GUIDs with or without braces.
+GUID_RE = re.compile(
+    r"^\{?[0-9A-F]{8}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{4}-[0-9A-F]{12}\}?$",
+    re.IGNORECASE)
+
+# Minimum and maximum values of the integer field types.
+INTEGER_RANGES = {
+    "SHORT": (-2 ** 15, 2 ** 15 - 1),
+    "LONG": (-2 ** 31, 2 ** 31 - 1),
+}
+
+FLOAT_TYPES = ("FLOAT", "SINGLE", "DOUBLE")
+
+# Values stored in place of NULLs in the columns that can't hold NaN.
+NULL_PLACEHOLDERS = {
+    "TEXT": "",
+    "SHORT": 0,
+    "LONG": 0,
+    "DATE": datetime.datetime(1970, 1, 1),
+    "GUID": "{00000000-0000-0000-0000-000000000000}",
+}
+
+# Describes a column of a structured array.
+#   name: the name of the field.
+#   field_type: an arcpy field type name (e.g., TEXT, DOUBLE, DATE).
+#   length: the length of a TEXT field or None for the default length.
+Column = namedtuple("Column", ("name", "field_type", "length"))
+
+# The result of build_record_array.
+#   array: the structured array, with a row per accepted row.
+#   indices: the indices of the accepted rows in the input.
+#   rejected_indices: the indices of the rows that could not be converted.
+#   nulls: dict of lists of the positions in array of the placeholders of
+#       NULLs, keyed by column name. Empty unless NULLs are allowed.
+RecordArray = namedtuple("RecordArray",
+                         ("array", "indices", "rejected_indices", "nulls"))
+
+
+def _check_numpy():
+    if numpy is None:
+        raise ImportError(
+            "The numpy package is required to build record arrays.")
+
+
+def get_numpy_dtype(field_type, length=None):
+    """Returns the NumPy dtype string of an arcpy field type.
+
+    Parameters
+    ----------
+    field_type : str
+        TEXT, FLOAT, SINGLE, DOUBLE, SHORT, LONG, DATE or GUID.
+    length : int, optional
+        Length of a TEXT field. Defaults to DEFAULT_TEXT_LENGTH.
+    """
+    field_type = field_type.upper()
+    if field_type == "TEXT":
+        return "<U%d" % (length or DEFAULT_TEXT_LENGTH)
+    if field_type in ("FLOAT", "SINGLE"):
+        return "<f4"
+    if field_type == "DOUBLE":
+        return "<f8"
+    if field_type == "SHORT":
+        return "<i2"
+    if field_type == "LONG":
+        return "<i4"
+    if field_type == "DATE":
+        return "<M8[us]"
+    if field_type == "GUID":
+        return "<U%d" % GUID_LENGTH
+    raise ValueError("Unsupported field type: %s" % field_type)
+
+
+def get_columns(field_defs, names=None):
+    """Creates Columns from FieldDefs (see tabledefs.iter_field_defs).
+
+    Parameters
+    ----------
+    field_defs : iterable of FieldDef
+        Field definitions.
+    names : sequence of str, optional
+        Keys of the fields to include, in column order. Defaults to all of
+        the fields, in definition order.
+    """
+    field_defs = list(field_defs)
+    if names is not None:
+        by_key = dict((field_def.key, field_def) for field_def in field_defs)
+        field_defs = [by_key[name] for name in names]
+    return [Column(field_def.name, field_def.field_type, field_def.length)
+            for field_def in field_defs]
+
+
+def _get_converter(column):
+    """Returns a function that converts a value to the type of a column,
+    raising ValueError if the value can't be stored exactly.
+    """
+    field_type = column.field_type.upper()
+    if field_type == "TEXT":
+        length = column.length or DEFAULT_TEXT_LENGTH
+
+        def to_text(value):
+            if not isinstance(value, STRING_TYPES) or len(value) > length:
+                raise ValueError(value)
+            return value
+        return to_text
+    if field_type in FLOAT_TYPES:
+        def to_float(value):
+            if value is None:
+                return numpy.nan
+            if isinstance(value, bool) or not isinstance(value, Real):
+                raise ValueError(value)
+            return value
+        return to_float
+    if field_type in INTEGER_RANGES:
+        minimum, maximum = INTEGER_RANGES[field_type]
+
+        def to_integer(value):
+            if (not isinstance(value, Integral) or
+                    not minimum <= value <= maximum):
+                raise ValueError(value)
+            return int(value)
+        return to_integer
+    if field_type == "DATE":
+        def to_date(value):
+            if isinstance(value, datetime.datetime):
+                # Date fields don't store time zones.
+                return value.replace(tzinfo=None)
+            if isinstance(value, datetime.date):
+                return datetime.datetime(value.year, value.month, value.day)
+            raise ValueError(value)
+        return to_date
+    if field_type == "GUID":
+        def to_guid(value):
+            if (not isinstance(value, STRING_TYPES) or
+                    not GUID_RE.match(value)):
+                raise ValueError(value)
+            return "{%s}" % value.strip("{}").upper()
+        return to_guid
+    raise ValueError("Unsupported field type: %s" % field_type)
+
+
+def build_record_array(rows, columns, allow_nulls=False):
+    """Converts rows into a structured array, rejecting rows with values
+    that can't be stored exactly.
+
+    Values are rejected if they are None (except in floating point columns,
+    where None becomes NaN, or if allow_nulls is True), are of the wrong
+    type, are out of range for SHORT and LONG columns, are longer than TEXT
+    columns, or are not GUIDs.
+
+    Parameters
+    ----------
+    rows : sequence of sequences
+        Rows of values, in column order.
+    columns : sequence of Column
+        Names and types of the columns.
+    allow_nulls : bool, optional
+        If True, None values in columns other than floating point columns
+        are stored as NULL_PLACEHOLDERS values, and their positions are
+        returned in RecordArray.nulls.
+
+    Returns
+    -------
+    RecordArray
+    """
+    _check_numpy()
+    converters = [_get_converter(column) for column in columns]
+    dtype = numpy.dtype([
+        (str(column.name), get_numpy_dtype(column.field_type, column.length))
+        for column in columns])
+    # Indices and placeholders of the columns whose NULLs are replaced.
+    null_columns = []
+    if allow_nulls:
+        null_columns = [
+            (column_index, NULL_PLACEHOLDERS[column.field_type.upper()])
+            for column_index, column in enumerate(columns)
+            if column.field_type.upper() not in FLOAT_TYPES]
+    null_positions = [[] for _ in null_columns]
+    values = []
+    indices = []
+    rejected_indices = []
+    for index, row in enumerate(rows):
+        row_nulls = None
+        if null_columns and None in row:
+            row = list(row)
+            row_nulls = []
+            for i, (column_index, placeholder) in enumerate(null_columns):
+                if row[column_index] is None:
+                    row[column_index] = placeholder
+                    row_nulls.append(i)
+        try:
+            values.append(tuple(
+                convert(value) for convert, value in zip(converters, row)))
+        except ValueError:
+            rejected_indices.append(index)
+        else:
+            if row_nulls:
+                for i in row_nulls:
+                    null_positions[i].append(len(indices))
+            indices.append(index)
+    nulls = dict((columns[column_index].name, positions)
+                 for (column_index, _), positions in zip(null_columns,
+                                                         null_positions)
+                 if positions)
+    return RecordArray(numpy.array(values, dtype=dtype), indices,
+                       rejected_indices, nulls)
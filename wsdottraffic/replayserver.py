@@ -0,0 +1,344 @@
+"""A local HTTP server that emulates the WSDOT Traffic API, for testing and
+load testing the fetch layer (get_traveler_info, get_scanweb) without the
+live service.
+
+The server serves recorded responses (<name>.json files, e.g. the fixtures
+of the benchmarks) or synthetic responses (see wsdottraffic.synthetic) at
+the paths of resturls.URLS. It can inject latency, cap the bandwidth of
+each response and fail a fraction of the requests. Responses have ETags, so
+conditional requests (If-None-Match) get 304 Not Modified, and are gzip
+compressed for clients that accept it.
+
+To point the package at the server, set the WSDOT_TRAFFIC_API_BASE
+environment variable to the server's API base (printed when it starts)
+before running the scripts:
+
+    python -m wsdottraffic.replayserver --port 8080 --latency 0.2
+    WSDOT_TRAFFIC_API_BASE=http://127.0.0.1:8080/Traffic/api wsdottraffic
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import gzip
+import hashlib
+import io
+import logging
+import os
+import random
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit
+except ImportError:  # pragma: no cover
+    # pylint:disable=import-error
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit
+
+from .resturls import API_BASE_ENVIRONMENT_VAR_NAME, URL_PATHS, URLS
+from .synthetic import generate_payload
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+# The path of the live API's base URL.
+DEFAULT_BASE_PATH = "/Traffic/api"
+DEFAULT_ERROR_STATUS = 503
+# Size of the chunks a bandwidth capped response is written in.
+CHUNK_SIZE = 16 * 1024
+
+
+def load_payloads(fixtures_dir=None, names=None, scale=1, seed=0):
+    """Returns the responses the server replays, as a dict of UTF-8 encoded
+    JSON keyed by endpoint name.
+
+    Parameters
+    ----------
+    fixtures_dir : str, optional
+        Directory of recorded responses, named <name>.json. Endpoints without
+        a recorded response get a synthetic response.
+    names : sequence, optional
+        Endpoint names. Defaults to all of the keys of resturls.URLS.
+    scale : float, optional
+        Size of the synthetic responses, as a multiple of the size of the
+        live API's responses.
+    seed : optional
+        Seed of the synthetic responses.
+    """
+    payloads = {}
+    for name in names or sorted(URLS):
+        path = (os.path.join(fixtures_dir, "%s.json" % name)
+                if fixtures_dir else None)
+        if path and os.path.exists(path):
+            with io.open(path, "rb") as fixture_file:
+                payloads[name] = fixture_file.read()
+        else:
+            if fixtures_dir:
+                _LOGGER.info("There is no recorded response for %s. Serving "
+                             "a synthetic response.", name)
+            payloads[name] = generate_payload(name, scale=scale, seed=seed)
+    return payloads
+
+
+class _Response(object):
+    """A response body, with its ETag and gzip compressed body."""
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, body):
+        self.body = body
+        self.etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        self._gzip_body = None
+
+    @property
+    def gzip_body(self):
+        """The body, gzip compressed. Compressed the first time it's used."""
+        if self._gzip_body is None:
+            buffer = io.BytesIO()
+            with gzip.GzipFile(fileobj=buffer, mode="wb") as gzip_file:
+                gzip_file.write(self.body)
+            self._gzip_body = buffer.getvalue()
+        return self._gzip_body
+
+
+class ReplayRequestHandler(BaseHTTPRequestHandler):
+    """Answers requests with the responses of the ReplayServer."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Sends the response of an endpoint."""
+        server = self.server
+        name = server.paths.get(urlsplit(self.path).path)
+        response = server.responses.get(name)
+        if response is None:
+            self._send_status(404)
+            return
+
+        delay = server.get_delay()
+        if delay:
+            time.sleep(delay)
+        if server.should_fail():
+            self._send_status(server.error_status, name)
+            return
+
+        if server.etag:
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match and response.etag in (
+                    tag.strip() for tag in if_none_match.split(",")):
+                self.send_response(304)
+                self.send_header("ETag", response.etag)
+                self.end_headers()
+                server.count_request(name, 304)
+                return
+
+        body = response.body
+        accept_encoding = self.headers.get("Accept-Encoding") or ""
+        compressed = server.gzip and "gzip" in accept_encoding
+        if compressed:
+            body = response.gzip_body
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if server.etag:
+            self.send_header("ETag", response.etag)
+        if server.gzip:
+            self.send_header("Vary", "Accept-Encoding")
+        if compressed:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        self._write_body(body)
+        server.count_request(name, 200)
+
+    def _write_body(self, body):
+        """Writes the body, at most server.bandwidth bytes per second."""
+        bandwidth = self.server.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        for start in range(0, len(body), CHUNK_SIZE):
+            chunk = body[start:start + CHUNK_SIZE]
+            # Wait for the time the chunk takes at the capped bandwidth before
+            # sending it, so the client can't receive it any sooner.
+            time.sleep(len(chunk) / bandwidth)
+            self.wfile.write(chunk)
+            self.wfile.flush()
+
+    def _send_status(self, status, name=None):
+        body = ("%d %s" % (status, self.responses.get(status, ("",))[0])
+               ).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count_request(name, status)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        _LOGGER.debug("%s - %s", self.address_string(), format % args)
+
+
+class ReplayServer(ThreadingMixIn, HTTPServer):
+    """An HTTP server that emulates the WSDOT Traffic API. Each request is
+    handled in its own thread.
+
+    Parameters
+    ----------
+    server_address : tuple
+        (host, port). Use port 0 to pick a free port.
+    payloads : dict
+        Responses keyed by endpoint name (see load_payloads).
+    latency : float, optional
+        Seconds each request is delayed.
+    jitter : float, optional
+        Maximum number of seconds added at random to the latency.
+    bandwidth : float, optional
+        Maximum number of bytes per second written for each response.
+    error_rate : float, optional
+        Fraction of the requests that fail with error_status.
+    error_status : int, optional
+        HTTP status of the failed requests.
+    use_gzip : bool, optional
+        Compress responses for clients that accept gzip.
+    etag : bool, optional
+        Send ETags and answer matching If-None-Match requests with 304.
+    base_path : str, optional
+        Path of the API base. The endpoints are served at base_path plus
+        their paths in resturls.URL_PATHS.
+    seed : optional
+        Seed of the random latency and errors.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, server_address, payloads, latency=0, jitter=0,
+                 bandwidth=None, error_rate=0,
+                 error_status=DEFAULT_ERROR_STATUS, use_gzip=True, etag=True,
+                 base_path=DEFAULT_BASE_PATH, seed=None):
+        HTTPServer.__init__(self, server_address, ReplayRequestHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.gzip = use_gzip
+        self.etag = etag
+        base_path = base_path.strip("/")
+        self.base_path = "/" + base_path if base_path else ""
+        self.paths = dict((self.base_path + path, name)
+                          for name, path in URL_PATHS.items())
+        self.responses = {}
+        for name, payload in payloads.items():
+            self.set_payload(name, payload)
+        # Counts of the responses sent, keyed by (endpoint name, status).
+        self.request_counts = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+    @property
+    def api_base(self):
+        """The URL to use as the API base (see resturls.get_urls)."""
+        host, port = self.server_address[:2]
+        return "http://%s:%d%s" % (host, port, self.base_path)
+
+    def set_payload(self, name, payload):
+        """Replaces the response of an endpoint. Its ETag changes, so clients
+        get the new response instead of 304.
+        """
+        if name not in URL_PATHS:
+            raise ValueError("Unknown endpoint: %s" % name)
+        self.responses[name] = _Response(payload)
+
+    def get_delay(self):
+        """Returns the number of seconds to delay a request."""
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter)
+
+    def should_fail(self):
+        """Randomly decides whether a request fails, at error_rate."""
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def count_request(self, name, status):
+        """Counts a response."""
+        with self._lock:
+            key = (name, status)
+            self.request_counts[key] = self.request_counts.get(key, 0) + 1
+
+
+def start_server(payloads=None, host=DEFAULT_HOST, port=0, **options):
+    """Starts a ReplayServer in a background thread and returns it. Stop it
+    with its shutdown and server_close methods.
+
+    payloads defaults to synthetic responses for every endpoint. The other
+    options are passed to ReplayServer.
+    """
+    if payloads is None:
+        payloads = load_payloads()
+    server = ReplayServer((host, port), payloads, **options)
+    thread = threading.Thread(target=server.serve_forever,
+                              name="ReplayServer")
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def main():
+    """Uses this when run as a script
+    """
+    parser = argparse.ArgumentParser(
+        description="Serves recorded or synthetic responses at the paths of the WSDOT Traffic API.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Defaults to %s." % DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Defaults to %d." % DEFAULT_PORT)
+    parser.add_argument("--base-path", default=DEFAULT_BASE_PATH, help="Path of the API base. Defaults to %s, the path of the live API." % DEFAULT_BASE_PATH)
+    parser.add_argument("--fixtures", help="Directory of recorded responses, named <name>.json (e.g. benchmarks/fixtures). Endpoints without one get synthetic responses.")
+    parser.add_argument("--scale", type=float, default=1, help="Size of the synthetic responses, as a multiple of the size of the live API's responses. Defaults to 1.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic responses, latency jitter and errors. Defaults to 0.")
+    parser.add_argument("--latency", type=float, default=0, help="Seconds each request is delayed.")
+    parser.add_argument("--jitter", type=float, default=0, help="Maximum number of seconds added at random to the latency.")
+    parser.add_argument("--bandwidth", type=float, help="Maximum number of bytes per second sent for each response.")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests that fail.")
+    parser.add_argument("--error-status", type=int, default=DEFAULT_ERROR_STATUS, help="HTTP status of failed requests. Defaults to %d." % DEFAULT_ERROR_STATUS)
+    parser.add_argument("--no-gzip", action="store_true", help="Don't compress responses.")
+    parser.add_argument("--no-etag", action="store_true", help="Don't send ETags or answer conditional requests with 304.")
+    parser.add_argument("--log-level", choices=(
+        "CRITICAL",
+        "ERROR",
+        "WARNING",
+        "INFO",
+        "DEBUG",
+        "NOTSET"
+    ), default=logging.NOTSET)
+    args = parser.parse_args()
+    if args.log_level:
+        logging.basicConfig(level=getattr(logging, args.log_level.upper()))
+
+    payloads = load_payloads(args.fixtures, scale=args.scale, seed=args.seed)
+    server = ReplayServer(
+        (args.host, args.port), payloads, latency=args.latency,
+        jitter=args.jitter, bandwidth=args.bandwidth,
+        error_rate=args.error_rate, error_status=args.error_status,
+        use_gzip=not args.no_gzip, etag=not args.no_etag,
+        base_path=args.base_path, seed=args.seed)
+    print("Serving the WSDOT Traffic API at %s" % server.api_base)
+    print("Set %s=%s to use it." % (API_BASE_ENVIRONMENT_VAR_NAME,
+                                    server.api_base))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
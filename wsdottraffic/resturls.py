@@ -1,26 +1,49 @@
 """
 Provides a list of URLs for REST endpoints.
+
+The URLs start with API_BASE, which can be overridden by setting the
+WSDOT_TRAFFIC_API_BASE environment variable (e.g., to the address of a
+wsdottraffic.replayserver). The variable must be set before the package is
+imported.
 """
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
-API_BASE = "https://www.wsdot.wa.gov/Traffic/api"
-
-URLS = {
-    "BorderCrossings": "%s/BorderCrossings/BorderCrossingsREST.svc/GetBorderCrossingsAsJson" % API_BASE,
-    "BridgeClearances": "%s/Bridges/ClearanceREST.svc/GetClearancesAsJson" % API_BASE,
-    "CVRestrictions": "%s/CVRestrictions/CVRestrictionsREST.svc/GetCommercialVehicleRestrictionsAsJson" % API_BASE,
-    "HighwayAlerts": "%s/HighwayAlerts/HighwayAlertsREST.svc/GetAlertsAsJson" % API_BASE,
-    "HighwayCameras": "%s/HighwayCameras/HighwayCamerasREST.svc/GetCamerasAsJson" % API_BASE,
-    "MountainPassConditions": "%s/MountainPassConditions/MountainPassConditionsREST.svc/GetMountainPassConditionsAsJson" % API_BASE,
-    "TollRates": "%s/api/tolling" % API_BASE,
-    "TrafficFlow": "%s/TrafficFlow/TrafficFlowREST.svc/GetTrafficFlowsAsJson" % API_BASE,
-    "TravelTimes": "%s/TravelTimes/TravelTimesREST.svc/GetTravelTimesAsJson" % API_BASE,
-    "WeatherInformation": "%s/WeatherInformation/WeatherInformationREST.svc/GetCurrentWeatherInformationAsJson" % API_BASE,
-    "WeatherStations": "%s/WeatherStations/WeatherStationsREST.svc/GetCurrentStationsAsJson" % API_BASE,
-    "Scanweb": "%s/api/Scanweb" % API_BASE
+import os
+
+DEFAULT_API_BASE = "https://www.wsdot.wa.gov/Traffic/api"
+API_BASE_ENVIRONMENT_VAR_NAME = "WSDOT_TRAFFIC_API_BASE"
+
+API_BASE = os.environ.get(API_BASE_ENVIRONMENT_VAR_NAME,
+                          DEFAULT_API_BASE).rstrip("/")
+
+# The paths of the endpoints, relative to API_BASE.
+URL_PATHS = {
+    "BorderCrossings": "/BorderCrossings/BorderCrossingsREST.svc/GetBorderCrossingsAsJson",
+    "BridgeClearances": "/Bridges/ClearanceREST.svc/GetClearancesAsJson",
+    "CVRestrictions": "/CVRestrictions/CVRestrictionsREST.svc/GetCommercialVehicleRestrictionsAsJson",
+    "HighwayAlerts": "/HighwayAlerts/HighwayAlertsREST.svc/GetAlertsAsJson",
+    "HighwayCameras": "/HighwayCameras/HighwayCamerasREST.svc/GetCamerasAsJson",
+    "MountainPassConditions": "/MountainPassConditions/MountainPassConditionsREST.svc/GetMountainPassConditionsAsJson",
+    "TollRates": "/api/tolling",
+    "TrafficFlow": "/TrafficFlow/TrafficFlowREST.svc/GetTrafficFlowsAsJson",
+    "TravelTimes": "/TravelTimes/TravelTimesREST.svc/GetTravelTimesAsJson",
+    "WeatherInformation": "/WeatherInformation/WeatherInformationREST.svc/GetCurrentWeatherInformationAsJson",
+    "WeatherStations": "/WeatherStations/WeatherStationsREST.svc/GetCurrentStationsAsJson",
+    "Scanweb": "/api/Scanweb"
 }
 
-ALERT_EVENT_CATEGORIES_URL = (
-    "%s/HighwayAlerts/HighwayAlertsREST.svc/GetEventCategoriesAsJson" %
-    API_BASE)
+ALERT_EVENT_CATEGORIES_PATH = (
+    "/HighwayAlerts/HighwayAlertsREST.svc/GetEventCategoriesAsJson")
+
+
+def get_urls(api_base=API_BASE):
+    """Returns the URLs of the endpoints of an API, keyed by endpoint name.
+    """
+    api_base = api_base.rstrip("/")
+    return dict((name, api_base + path) for name, path in URL_PATHS.items())
+
+
+URLS = get_urls()
+
+ALERT_EVENT_CATEGORIES_URL = API_BASE + ALERT_EVENT_CATEGORIES_PATH
@@ -0,0 +1,334 @@
+"""A compact binary format for lists of traveler info records.
+
+Records are the flat dicts returned by get_traveler_info. Unlike JSON, the
+format keeps datetime values as datetimes, so records read back have the same
+shape as the ones returned by the API functions without having to parse the
+dates again.
+
+Layout
+------
+The file starts with MAGIC followed by a version byte, then one entry per
+record until the end of the data::
+
+    record  := varint(member count) member*
+    member  := key value
+    key     := varint(0) varint(length) utf8-bytes   (new key)
+             | varint(index + 1)                      (previously seen key)
+    value   := tag-byte payload
+
+Strings (and keys) shorter than INTERN_MAX_LENGTH bytes and datetimes are
+interned: the first occurrence is written in full and later occurrences are
+written as a reference (TAG_REF) to a shared table, which the reader builds as
+it goes. Aware datetimes are interned by their UTC offset as well as their
+value, since datetimes in different time zones that refer to the same instant
+are equal.
+
+Aware datetimes store their UTC offset in seconds. Version 1 files stored it
+in minutes; they can still be read.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import io
+import json
+import struct
+
+from .compression import open_input, open_output
+from .jsonhelpers import CustomEncoder
+
+MAGIC = b"WSDTROWS"
+VERSION = 2
+INTERN_MAX_LENGTH = 256
+
+TAG_NULL = 0
+TAG_FALSE = 1
+TAG_TRUE = 2
+TAG_INT = 3
+TAG_FLOAT = 4
+TAG_STR = 5
+TAG_REF = 6
+TAG_DATETIME = 7
+TAG_DATETIME_TZ = 8
+TAG_DATE = 9
+TAG_JSON = 10
+TAG_STR_RAW = 11
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_DOUBLE = struct.Struct("<d")
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
+class RowFormatError(ValueError):
+    """Error for data that is not in the binary row format.
+    """
+
+
+def _write_varint(buf, value):
+    """Appends an unsigned variable length integer to a bytearray."""
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def _timedelta_microseconds(delta):
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+class RowWriter(object):
+    """Writes records to a binary file object in the row format.
+    """
+
+    def __init__(self, out_file):
+        """Creates a new writer and writes the file header.
+
+        Parameters
+        ----------
+        out_file : file
+            A binary file object opened for writing.
+        """
+        self._file = out_file
+        self._table = {}
+        self._file.write(MAGIC + bytes(bytearray((VERSION,))))
+
+    def _intern(self, buf, value):
+        """Writes a reference if the value was seen before.
+        Returns True if a reference was written.
+        """
+        index = self._table.get(value)
+        if index is None:
+            self._table[value] = len(self._table)
+            return False
+        buf.append(TAG_REF)
+        _write_varint(buf, index)
+        return True
+
+    def _write_str(self, buf, value):
+        data = value.encode("utf-8")
+        if len(data) >= INTERN_MAX_LENGTH:
+            buf.append(TAG_STR_RAW)
+        elif self._intern(buf, value):
+            return
+        else:
+            buf.append(TAG_STR)
+        _write_varint(buf, len(data))
+        buf += data
+
+    def _write_value(self, buf, value):
+        # pylint: disable=too-many-branches
+        if isinstance(value, str):
+            self._write_str(buf, value)
+        elif value is None:
+            buf.append(TAG_NULL)
+        elif value is True:
+            buf.append(TAG_TRUE)
+        elif value is False:
+            buf.append(TAG_FALSE)
+        elif isinstance(value, int) and _INT64_MIN <= value <= _INT64_MAX:
+            buf.append(TAG_INT)
+            _write_varint(buf, _zigzag(value))
+        elif isinstance(value, float):
+            buf.append(TAG_FLOAT)
+            buf += _DOUBLE.pack(value)
+        elif isinstance(value, datetime.datetime):
+            offset = value.utcoffset()
+            if self._intern(buf, value if offset is None
+                            else (value, offset)):
+                return
+            if offset is None:
+                buf.append(TAG_DATETIME)
+                _write_varint(buf, _zigzag(
+                    _timedelta_microseconds(value - _EPOCH)))
+            else:
+                buf.append(TAG_DATETIME_TZ)
+                naive = value.replace(tzinfo=None)
+                _write_varint(buf, _zigzag(
+                    _timedelta_microseconds(naive - _EPOCH)))
+                _write_varint(buf, _zigzag(
+                    _timedelta_microseconds(offset) // 1000000))
+        elif isinstance(value, datetime.date):
+            buf.append(TAG_DATE)
+            _write_varint(buf, value.toordinal())
+        else:
+            # Lists, dicts, times and very large integers.
+            data = json.dumps(value, cls=CustomEncoder,
+                              separators=(",", ":")).encode("utf-8")
+            buf.append(TAG_JSON)
+            _write_varint(buf, len(data))
+            buf += data
+
+    def write(self, record):
+        """Writes a single record (a flat dict).
+        """
+        buf = bytearray()
+        _write_varint(buf, len(record))
+        table = self._table
+        for key, value in record.items():
+            index = table.get(key)
+            if index is None:
+                table[key] = len(table)
+                buf.append(0)
+                data = key.encode("utf-8")
+                _write_varint(buf, len(data))
+                buf += data
+            else:
+                _write_varint(buf, index + 1)
+            self._write_value(buf, value)
+        self._file.write(bytes(buf))
+
+    def write_all(self, records):
+        """Writes a sequence of records. Returns the number written.
+        """
+        count = 0
+        for record in records:
+            self.write(record)
+            count += 1
+        return count
+
+
+def _read_varint(data, pos):
+    value = data[pos]
+    pos += 1
+    if value < 0x80:
+        return value, pos
+    value &= 0x7F
+    shift = 7
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def iter_rows(data):
+    """Iterates over the records stored in a bytes or bytearray object.
+    """
+    # pylint: disable=too-many-branches,too-many-statements
+    header_len = len(MAGIC) + 1
+    if data[:len(MAGIC)] != MAGIC:
+        raise RowFormatError("Not a row format file.")
+    if len(data) < header_len or data[len(MAGIC)] not in (1, VERSION):
+        raise RowFormatError("Unsupported row format version.")
+    # Version 1 files store UTC offsets in minutes.
+    offset_unit = 60 if data[len(MAGIC)] == 1 else 1
+    table = []
+    append = table.append
+    unpack_double = _DOUBLE.unpack_from
+    epoch = _EPOCH
+    timedelta = datetime.timedelta
+    pos = header_len
+    end = len(data)
+    while pos < end:
+        count, pos = _read_varint(data, pos)
+        record = {}
+        for _ in range(count):
+            # Single byte varints are by far the most common, so they are
+            # read inline.
+            index = data[pos]
+            if index < 0x80:
+                pos += 1
+            else:
+                index, pos = _read_varint(data, pos)
+            if index:
+                key = table[index - 1]
+            else:
+                length, pos = _read_varint(data, pos)
+                key = data[pos:pos + length].decode("utf-8")
+                pos += length
+                append(key)
+            tag = data[pos]
+            pos += 1
+            if tag == TAG_REF:
+                index = data[pos]
+                if index < 0x80:
+                    pos += 1
+                else:
+                    index, pos = _read_varint(data, pos)
+                value = table[index]
+            elif tag == TAG_STR or tag == TAG_STR_RAW:
+                length, pos = _read_varint(data, pos)
+                value = data[pos:pos + length].decode("utf-8")
+                pos += length
+                if tag == TAG_STR:
+                    append(value)
+            elif tag == TAG_INT:
+                value, pos = _read_varint(data, pos)
+                value = _unzigzag(value)
+            elif tag == TAG_FLOAT:
+                value = unpack_double(data, pos)[0]
+                pos += 8
+            elif tag == TAG_NULL:
+                value = None
+            elif tag == TAG_TRUE:
+                value = True
+            elif tag == TAG_FALSE:
+                value = False
+            elif tag == TAG_DATETIME:
+                value, pos = _read_varint(data, pos)
+                value = epoch + timedelta(microseconds=_unzigzag(value))
+                append(value)
+            elif tag == TAG_DATETIME_TZ:
+                value, pos = _read_varint(data, pos)
+                offset, pos = _read_varint(data, pos)
+                tzinfo = datetime.timezone(
+                    timedelta(seconds=_unzigzag(offset) * offset_unit))
+                value = (epoch + timedelta(
+                    microseconds=_unzigzag(value))).replace(tzinfo=tzinfo)
+                append(value)
+            elif tag == TAG_DATE:
+                value, pos = _read_varint(data, pos)
+                value = datetime.date.fromordinal(value)
+            elif tag == TAG_JSON:
+                length, pos = _read_varint(data, pos)
+                value = json.loads(data[pos:pos + length].decode("utf-8"))
+                pos += length
+            else:
+                raise RowFormatError("Unknown value tag %d at %d." % (
+                    tag, pos - 1))
+            record[key] = value
+        yield record
+
+
+def dumps(records):
+    """Returns records encoded in the row format as bytes.
+    """
+    out_file = io.BytesIO()
+    RowWriter(out_file).write_all(records)
+    return out_file.getvalue()
+
+
+def loads(data):
+    """Returns the list of records stored in a row format bytes object.
+    """
+    return list(iter_rows(data))
+
+
+def write_rows(path, records, compression=None, level=None):
+    """Writes records to a (possibly compressed) row format file.
+
+    Returns the number of records written.
+    """
+    with open_output(path, compression, level) as out_file:
+        return RowWriter(out_file).write_all(records)
+
+
+def read_rows(path, compression=None):
+    """Reads the records from a row format file. If compression is omitted,
+    it is determined by the file extension.
+
+    Returns a list of dicts.
+    """
+    with open_input(path, compression) as in_file:
+        return loads(in_file.read())
@@ -10,6 +10,10 @@ import requests
 from ..resturls import URLS
 from .. import _DEFAULT_ACCESS_CODE
 
+WEATHER_READINGS_TABLE_NAME = "ScanwebWeatherReadings"
+SURFACE_TABLE_NAME = "ScanwebSurfaceMeasurements"
+SUBSURFACE_TABLE_NAME = "ScanwebSubSurfaceMeasurements"
+
 # pylint: disable=invalid-name,too-few-public-methods
 
 class SurfaceMeasurements(object):
@@ -175,3 +179,31 @@ def get_scanweb(accesscode=_DEFAULT_ACCESS_CODE):
     """
     response = _get_scanweb_response(accesscode)
     return response.json(object_hook=scanweb_json_hook)
+
+
+def to_table_rows(readings):
+    """Splits weather readings into rows for the weather readings, surface
+    measurements and sub-surface measurements tables.
+
+    Returns a dict of lists of dicts keyed by table name. The measurement
+    rows include the StationId of the reading they belong to.
+    """
+    tables = {
+        WEATHER_READINGS_TABLE_NAME: [],
+        SURFACE_TABLE_NAME: [],
+        SUBSURFACE_TABLE_NAME: []
+    }
+    for reading in readings:
+        row = dict(reading.__dict__)
+        # The table's field keeps the API's misspelling.
+        row["RelativeHumidty"] = row.pop("RelativeHumidity", None)
+        surface = row.pop("SurfaceMeasurements", None) or []
+        subsurface = row.pop("SubSurfaceMeasurements", None) or []
+        tables[WEATHER_READINGS_TABLE_NAME].append(row)
+        for table_name, measurements in ((SURFACE_TABLE_NAME, surface),
+                                         (SUBSURFACE_TABLE_NAME, subsurface)):
+            for measurement in measurements:
+                measurement_row = dict(measurement.__dict__)
+                measurement_row["StationId"] = reading.StationId
+                tables[table_name].append(measurement_row)
+    return tables
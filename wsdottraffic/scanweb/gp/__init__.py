@@ -4,18 +4,52 @@
 from __future__ import print_function, unicode_literals, absolute_import, division
 import os.path
 import re
-import arcpy
-from .. import get_scanweb
+import time
+from collections import OrderedDict
+from operator import attrgetter
+
+from ...arcpybackend import arcpy
+from .. import (get_scanweb, WEATHER_READINGS_TABLE_NAME, SURFACE_TABLE_NAME,
+                SUBSURFACE_TABLE_NAME)
 from ... import _DEFAULT_ACCESS_CODE
 from ...gp import TABLE_DEFS_DICT_DICT
+from ...gp.bulkload import bulk_insert
+from ...recordarrays import get_columns
+from ...tabledefs import iter_field_defs
+
+
+def _get_relationship_class_path(workspace, table_name):
+    return os.path.join(workspace, "%s_%s" % (WEATHER_READINGS_TABLE_NAME,
+                                              table_name))
+
 
-WEATHER_READINGS_TABLE_NAME = "ScanwebWeatherReadings"
-SURFACE_TABLE_NAME = "ScanwebSurfaceMeasurements"
-SUBSURFACE_TABLE_NAME = "ScanwebSubSurfaceMeasurements"
+def _drop_old_measurement_tables(workspace):
+    """Deletes measurement tables (and their relationship classes) that
+    have the schema of earlier versions, which related measurements to
+    readings by StationName rather than StationId, so they are recreated.
+
+    The tables are truncated whenever they are loaded, so no data is lost.
+    """
+    for name in (SURFACE_TABLE_NAME, SUBSURFACE_TABLE_NAME):
+        table_path = os.path.join(workspace, name)
+        if not arcpy.Exists(table_path) or arcpy.ListFields(table_path,
+                                                            "StationId"):
+            continue
+        arcpy.AddWarning(
+            "%s has no StationId field. Recreating it with the current "
+            "schema." % table_path)
+        relationship_class_path = _get_relationship_class_path(workspace,
+                                                               name)
+        if arcpy.Exists(relationship_class_path):
+            arcpy.management.Delete(relationship_class_path)
+        arcpy.management.Delete(table_path)
 
 
 def create_tables(workspace, force_overwrite=False, template_gdb=None):
     """Creates the tables
+
+    Measurement tables created by earlier versions, which have StationName
+    instead of StationId fields, are recreated.
     """
     if not arcpy.Exists(workspace):
         # TODO: Use AddIDMessage
@@ -27,6 +61,9 @@ def create_tables(workspace, force_overwrite=False, template_gdb=None):
         arcpy.AddWarning("Template geodatabase not found: %s" % template_gdb)
         template_gdb = None
 
+    if not force_overwrite:
+        _drop_old_measurement_tables(workspace)
+
     for name in (WEATHER_READINGS_TABLE_NAME, SURFACE_TABLE_NAME, SUBSURFACE_TABLE_NAME):
         table_path = os.path.join(workspace, name)
         template = None
@@ -82,10 +119,15 @@ def create_tables(workspace, force_overwrite=False, template_gdb=None):
         try:
             # Create relationships: arcpy.management.AddRelate()
             for table_name in (SURFACE_TABLE_NAME, SUBSURFACE_TABLE_NAME):
+                relationship_class_path = _get_relationship_class_path(
+                    workspace, table_name)
+                if arcpy.Exists(relationship_class_path):
+                    continue
                 arcpy.management.CreateRelationshipClass(
                     origin_table=os.path.join(
                         workspace, WEATHER_READINGS_TABLE_NAME),
                     destination_table=os.path.join(workspace, table_name),
+                    out_relationship_class=relationship_class_path,
                     relationship_type="COMPOSITE",
                     forward_label="%sTo%s" % (
                         WEATHER_READINGS_TABLE_NAME, table_name),
@@ -94,21 +136,168 @@ def create_tables(workspace, force_overwrite=False, template_gdb=None):
                     message_direction="FORWARD",
                     cardinality="ONE_TO_MANY",
                     attributed="NONE",
-                    origin_primary_key="StationName",
-                    origin_foreign_key="StationName"
+                    origin_primary_key="StationId",
+                    origin_foreign_key="StationId"
                 )
         except arcpy.ExecuteError as err:
-            print("Could not create relationship classes\n%s" % err)
+            arcpy.AddWarning(
+                "Could not create relationship classes\n%s" % err)
     else:
         arcpy.AddWarning(
             "Could not create relationship classes because required license was not available")
 
 
-def populate_feature_classes(workspace, accesscode=_DEFAULT_ACCESS_CODE):
+# Attributes of WeatherReading objects whose names differ from the fields of
+# the weather readings table.
+_ATTRIBUTE_NAMES = {"RelativeHumidty": "RelativeHumidity"}
+
+
+def _get_attribute_getter(fields):
+    """Returns a function that returns a list of the values of an object's
+    attributes for a list of fields.
+    """
+    get_values = attrgetter(*[_ATTRIBUTE_NAMES.get(field, field)
+                              for field in fields])
+    if len(fields) == 1:
+        return lambda obj: [get_values(obj)]
+    return lambda obj: list(get_values(obj))
+
+
+def _iter_table_rows(scanweb_data, fc_fields, surface_fields,
+                     subsurface_fields):
+    """Decodes weather readings into (table name, row) tuples, yielding the
+    row of each reading followed by the rows of its measurements.
+
+    Weather reading rows end with an (x, y, z) point, or None if the reading
+    has no location. Measurement rows start with the reading's StationId.
+    """
+    get_fc_values = _get_attribute_getter(fc_fields)
+    # The first field of the measurement tables is StationId.
+    get_surface_values = _get_attribute_getter(surface_fields[1:])
+    get_subsurface_values = _get_attribute_getter(subsurface_fields[1:])
+    for item in scanweb_data:
+        point = None
+        if item.Longitude != 0 and item.Latitude != 0:
+            point = (item.Longitude, item.Latitude, item.Elevation)
+        row = get_fc_values(item)
+        row.append(point)
+        yield WEATHER_READINGS_TABLE_NAME, row
+
+        station_id = item.StationId
+        for measurement in item.SurfaceMeasurements or ():
+            yield SURFACE_TABLE_NAME, [station_id] + get_surface_values(
+                measurement)
+        for measurement in item.SubSurfaceMeasurements or ():
+            yield SUBSURFACE_TABLE_NAME, [station_id] + get_subsurface_values(
+                measurement)
+
+
+def _split_point_z(row):
+    """Converts a row ending with an (x, y, z) point into an InsertCursor row
+    ending with SHAPE@XY and SHAPE@Z values.
+    """
+    point = row[-1]
+    if point is None:
+        return row[:-1] + [None, None]
+    return row[:-1] + [point[:2], point[2]]
+
+
+def _insert_rows(table_path, fields, rows, columns=None):
+    """Inserts rows with an InsertCursor or, if columns are provided, bulk
+    loads them, inserting only the rows that fail validation with the
+    cursor.
+
+    Rows of the weather readings feature class end with an (x, y, z) point,
+    which is split into SHAPE@XY and SHAPE@Z values for the cursor.
+    """
+    is_feature_class = fields[-1] == "SHAPE@Z"
+    if columns is not None:
+        cursor_indices = bulk_insert(table_path, columns, rows,
+                                     3 if is_feature_class else 0)
+    else:
+        cursor_indices = range(len(rows))
+    with arcpy.da.InsertCursor(table_path, fields) as cursor:
+        for index in cursor_indices:
+            row = rows[index]
+            if is_feature_class:
+                row = _split_point_z(row)
+            try:
+                cursor.insertRow(row)
+            except RuntimeError as ex:
+                arcpy.AddWarning("Error inserting row into %s: %s\n%s" % (
+                    os.path.basename(table_path), row, ex))
+
+
+def _report_throughput(counts, seconds):
+    """Adds a message with the number of rows written to each table and the
+    rate at which they were written.
+    """
+    for name in (WEATHER_READINGS_TABLE_NAME, SURFACE_TABLE_NAME,
+                 SUBSURFACE_TABLE_NAME):
+        rate = counts[name] / seconds[name] if seconds[name] else 0
+        arcpy.AddMessage("Wrote %d rows to %s in %.2f seconds (%d rows/s)." % (
+            counts[name], name, seconds[name], rate))
+
+
+def _stream_rows(workspace, table_rows, fields_dict):
+    """Writes rows with the InsertCursors of all three tables open at once,
+    as each reading is decoded.
+
+    Returns the number of rows written to each table and the time spent
+    writing them, as dicts keyed by table name.
+    """
+    counts = dict((name, 0) for name in fields_dict)
+    seconds = dict((name, 0.0) for name in fields_dict)
+    with arcpy.da.InsertCursor(
+            os.path.join(workspace, WEATHER_READINGS_TABLE_NAME),
+            fields_dict[WEATHER_READINGS_TABLE_NAME]) as fc_cursor, \
+            arcpy.da.InsertCursor(
+                os.path.join(workspace, SURFACE_TABLE_NAME),
+                fields_dict[SURFACE_TABLE_NAME]) as surf_cursor, \
+            arcpy.da.InsertCursor(
+                os.path.join(workspace, SUBSURFACE_TABLE_NAME),
+                fields_dict[SUBSURFACE_TABLE_NAME]) as sub_cursor:
+        insert_functions = {
+            WEATHER_READINGS_TABLE_NAME: fc_cursor.insertRow,
+            SURFACE_TABLE_NAME: surf_cursor.insertRow,
+            SUBSURFACE_TABLE_NAME: sub_cursor.insertRow
+        }
+        for name, row in table_rows:
+            if name == WEATHER_READINGS_TABLE_NAME:
+                row = _split_point_z(row)
+            start = time.time()
+            try:
+                insert_functions[name](row)
+            except RuntimeError as ex:
+                arcpy.AddWarning("Error inserting row into %s: %s\n%s" % (
+                    name, row, ex))
+            else:
+                counts[name] += 1
+            seconds[name] += time.time() - start
+    return counts, seconds
+
+
+def populate_feature_classes(workspace, accesscode=_DEFAULT_ACCESS_CODE,
+                             scanweb_data=None, bulk=False,
+                             template_gdb=None):
     """Creates or updates ScanWeb feature classes and tables
+
+    If scanweb_data (the output of get_scanweb) is provided, it is written
+    instead of downloading the data.
+
+    Rows are written as each reading is decoded, with the cursors of all
+    three tables open at once. Measurement rows are related to their
+    readings by StationId. If bulk is True, the rows are instead loaded from
+    NumPy structured arrays (see wsdottraffic.gp.bulkload).
+
+    template_gdb is used to create tables that don't exist (see
+    create_tables).
+
+    Returns a dict with the number of rows written to each table.
     """
-    create_tables(workspace)
-    scanweb_data = get_scanweb(accesscode)
+    create_tables(workspace, template_gdb=template_gdb)
+    if scanweb_data is None:
+        scanweb_data = get_scanweb(accesscode)
 
     # Delete the data from the existing tables.
     arcpy.AddMessage("Deleting existing data from tables...")
@@ -118,53 +307,32 @@ def populate_feature_classes(workspace, accesscode=_DEFAULT_ACCESS_CODE):
         if delete_msgs:
             arcpy.AddMessage(delete_msgs)
 
-    fc_fields = list(TABLE_DEFS_DICT_DICT[WEATHER_READINGS_TABLE_NAME]["fields"].keys(
-    )) + ["SHAPE@XY", "SHAPE@Z"]
-    surface_fields = list(
-        TABLE_DEFS_DICT_DICT[SURFACE_TABLE_NAME]["fields"].keys())
-    subsurface_fields = list(
-        TABLE_DEFS_DICT_DICT[SUBSURFACE_TABLE_NAME]["fields"].keys())
-    surface_data = []
-    subsurface_data = []
-
-    fc_cursor = arcpy.da.InsertCursor(os.path.join(
-        workspace, WEATHER_READINGS_TABLE_NAME), fc_fields)
-    with fc_cursor:
-        for item in scanweb_data:
-            point = None
-            if item.Longitude != 0 and item.Latitude != 0:
-                point = (item.Longitude, item.Latitude)
-            row = list(
-                map(item.__dict__.get, fc_fields[:-2])) + [point, item.Elevation]
-            try:
-                fc_cursor.insertRow(row)
-            except RuntimeError as ex:
-                arcpy.AddWarning("Error inserting row into %s: %s\n%s" % (WEATHER_READINGS_TABLE_NAME, row, ex))
-
-            station_name = row[1]
-            if item.SurfaceMeasurements:
-                for m in item.SurfaceMeasurements:
-                    mrow = list(map(m.__dict__.get, surface_fields))
-                    mrow[0] = station_name
-                    surface_data.append(mrow)
-            if item.SubSurfaceMeasurements:
-                for m in item.SurfaceMeasurements:
-                    mrow = list(map(m.__dict__.get, subsurface_fields))
-                    mrow[0] = station_name
-                    subsurface_data.append(mrow)
-
-    surf_cursor = arcpy.da.InsertCursor(os.path.join(
-        workspace, SURFACE_TABLE_NAME), surface_fields)
-    with surf_cursor:
-        for item in surface_data:
-            try:
-                surf_cursor.insertRow(item)
-            except TypeError:
-                print(item)
-                raise
-
-    sub_cursor = arcpy.da.InsertCursor(os.path.join(
-        workspace, SUBSURFACE_TABLE_NAME), subsurface_fields)
-    with sub_cursor:
-        for item in subsurface_data:
-            sub_cursor.insertRow(item)
+    fields_dict = OrderedDict(
+        (name, list(TABLE_DEFS_DICT_DICT[name]["fields"].keys()))
+        for name in (WEATHER_READINGS_TABLE_NAME, SURFACE_TABLE_NAME,
+                     SUBSURFACE_TABLE_NAME))
+    table_rows = _iter_table_rows(scanweb_data, *fields_dict.values())
+    # Rebind (rather than extend) the list, which the generator uses.
+    fields_dict[WEATHER_READINGS_TABLE_NAME] = (
+        fields_dict[WEATHER_READINGS_TABLE_NAME] + ["SHAPE@XY", "SHAPE@Z"])
+
+    if not bulk:
+        counts, seconds = _stream_rows(workspace, table_rows, fields_dict)
+        _report_throughput(counts, seconds)
+        return counts
+
+    rows_dict = dict((name, []) for name in fields_dict)
+    for name, row in table_rows:
+        rows_dict[name].append(row)
+    counts = {}
+    seconds = {}
+    for name, fields in fields_dict.items():
+        columns = get_columns(iter_field_defs(TABLE_DEFS_DICT_DICT[name]),
+                              TABLE_DEFS_DICT_DICT[name]["fields"].keys())
+        start = time.time()
+        _insert_rows(os.path.join(workspace, name), fields, rows_dict[name],
+                     columns)
+        seconds[name] = time.time() - start
+        counts[name] = len(rows_dict[name])
+    _report_throughput(counts, seconds)
+    return counts
@@ -2,7 +2,7 @@ from __future__ import print_function, absolute_import, unicode_literals
 import argparse
 from os.path import split, abspath
 from . import populate_feature_classes
-import arcpy
+from ...arcpybackend import arcpy
 
 def main():
     parser = argparse.ArgumentParser()
@@ -0,0 +1,325 @@
+"""Delta-encoded storage of an endpoint's snapshots (polls).
+
+Most records of endpoints such as HighwayCameras, WeatherStations and
+MountainPassConditions don't change between polls, so storing every full
+snapshot wastes disk space. A SnapshotStore writes a keyframe (all of the
+records) every N polls and, in between, delta files that contain only the
+records that were added or changed since the previous poll. Records are
+identified by their natural keys (see tabledefs.get_key_fields) and compared
+by their content hashes.
+
+The files of a store are written to a directory:
+
+* ``<dataset>.index.json`` lists the polls: their times, data files, whether
+  they are keyframes, and the keys of the records removed by each delta.
+* ``<dataset>.journal.jsonl`` lists the polls appended since the latest
+  keyframe, one JSON object per line. Appending a delta only adds a line to
+  the journal; the journal is compacted into the index when a keyframe is
+  written.
+* ``<dataset>-<poll number>.rows`` files contain the keyframe and delta
+  records in the wsdottraffic.rowformat format, optionally compressed.
+
+The snapshot at any time is reconstructed by finding the preceding keyframe
+in the index with a binary search and applying at most N - 1 deltas.
+
+Example
+-------
+::
+
+    store = SnapshotStore("snapshots", "HighwayCameras")
+    store.append(get_traveler_info("HighwayCameras"))
+    ...
+    records = store.get_snapshot(datetime.datetime(2018, 1, 1, 8))
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import json
+import logging
+import os
+from bisect import bisect_right
+from collections import OrderedDict
+
+from .compression import add_extension
+from .flowarchive import from_timestamp, to_timestamp
+from .rowformat import read_rows, write_rows
+from .tabledefs import get_key_fields, get_record_hash, get_record_key
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_KEYFRAME_INTERVAL = 60
+
+INDEX_VERSION = 1
+
+
+def _key_to_json(key):
+    return list(key) if isinstance(key, tuple) else key
+
+
+def _key_from_json(key):
+    return tuple(key) if isinstance(key, list) else key
+
+
+def _poll_to_json(poll):
+    poll = dict(poll)
+    if poll["removed"]:
+        poll["removed"] = [_key_to_json(key) for key in poll["removed"]]
+    else:
+        del poll["removed"]
+    return poll
+
+
+def _poll_from_json(poll):
+    poll["removed"] = [_key_from_json(key) for key in poll.get("removed", [])]
+    return poll
+
+
+class SnapshotStore(object):
+    """Stores the snapshots of a single endpoint as keyframes and deltas."""
+
+    def __init__(self, directory, dataset, key_fields=None,
+                 keyframe_interval=DEFAULT_KEYFRAME_INTERVAL,
+                 compression=None, level=None):
+        """Opens a store, creating it if it doesn't exist.
+
+        Parameters
+        ----------
+        directory : str
+            Directory containing the store's files.
+        dataset : str
+            Name of the endpoint (e.g., "HighwayCameras").
+        key_fields : sequence, optional
+            Fields that identify a record. Defaults to the keyFields of the
+            dataset's table definition.
+        keyframe_interval : int, optional
+            Number of polls between keyframes.
+        compression : str, optional
+            Compression of new data files (see wsdottraffic.compression).
+        level : int, optional
+            Compression level.
+        """
+        if keyframe_interval < 1:
+            raise ValueError("keyframe_interval must be at least 1.")
+        self.directory = directory
+        self.dataset = dataset
+        self.key_fields = key_fields or get_key_fields(dataset)
+        self.keyframe_interval = keyframe_interval
+        self.compression = compression
+        self.level = level
+        self.index_path = os.path.join(directory, "%s.index.json" % dataset)
+        self.journal_path = os.path.join(directory,
+                                         "%s.journal.jsonl" % dataset)
+        self._polls = []
+        self._times = []
+        self._keyframes = []
+        # Hashes of the records of the latest poll, by key.
+        self._hashes = None
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as index_file:
+                index = json.load(index_file)
+            for poll in index["polls"]:
+                self._add_poll(_poll_from_json(poll))
+            self._read_journal()
+        elif not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __len__(self):
+        return len(self._polls)
+
+    @property
+    def times(self):
+        """The times of the polls in the store, as naive UTC datetimes."""
+        return [from_timestamp(time) for time in self._times]
+
+    def _add_poll(self, poll):
+        if poll["keyframe"]:
+            self._keyframes.append(len(self._polls))
+        self._polls.append(poll)
+        self._times.append(poll["time"])
+
+    def _read_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "rb") as journal_file:
+            data = journal_file.read()
+        complete = data[:data.rfind(b"\n") + 1]
+        if len(complete) < len(data):
+            _LOGGER.warning(
+                "Discarding the incomplete last line of %(path)s.",
+                {"path": self.journal_path})
+            with open(self.journal_path, "r+b") as journal_file:
+                journal_file.truncate(len(complete))
+        for line in complete.splitlines():
+            poll = json.loads(line.decode("utf-8"))
+            # Polls written before the index was last compacted are already
+            # in the index.
+            if poll.pop("number") >= len(self._polls):
+                self._add_poll(_poll_from_json(poll))
+
+    def _append_journal(self):
+        poll = _poll_to_json(self._polls[-1])
+        poll["number"] = len(self._polls) - 1
+        with open(self.journal_path, "a") as journal_file:
+            journal_file.write(json.dumps(poll) + "\n")
+
+    def _save_index(self):
+        """Writes every poll to the index and empties the journal."""
+        polls = [_poll_to_json(poll) for poll in self._polls]
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w") as index_file:
+            json.dump({"version": INDEX_VERSION, "dataset": self.dataset,
+                       "keyFields": self.key_fields, "polls": polls},
+                      index_file)
+        os.replace(temp_path, self.index_path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def _read_records(self, poll):
+        return read_rows(os.path.join(self.directory, poll["file"]))
+
+    def _get_latest_hashes(self):
+        if self._hashes is None:
+            self._hashes = {}
+            if self._polls:
+                state = self._reconstruct(len(self._polls) - 1)
+                for key, record in state.items():
+                    self._hashes[key] = get_record_hash(record)
+        return self._hashes
+
+    def append(self, records, poll_time=None):
+        """Adds a poll to the store.
+
+        Parameters
+        ----------
+        records : iterable of dict
+            All of the records returned by the endpoint.
+        poll_time : datetime.datetime, optional
+            Time of the poll (naive UTC). Defaults to the current time. Polls
+            must be appended in chronological order.
+
+        Returns
+        -------
+        dict
+            Counts of the "added", "changed" and "removed" records.
+        """
+        if poll_time is None:
+            poll_time = datetime.datetime.utcnow()
+        timestamp = to_timestamp(poll_time)
+        if self._times and timestamp < self._times[-1]:
+            raise ValueError("Polls must be appended in chronological order.")
+        previous = self._get_latest_hashes()
+        current = OrderedDict()
+        for record in records:
+            key = get_record_key(record, self.key_fields)
+            current[key] = (record, get_record_hash(record))
+        counts = {"added": 0, "changed": 0, "removed": 0}
+        changed_records = []
+        for key, (record, record_hash) in current.items():
+            previous_hash = previous.get(key)
+            if previous_hash is None:
+                counts["added"] += 1
+                changed_records.append(record)
+            elif previous_hash != record_hash:
+                counts["changed"] += 1
+                changed_records.append(record)
+        removed = [key for key in previous if key not in current]
+        counts["removed"] = len(removed)
+
+        number = len(self._polls)
+        keyframe = not self._keyframes or (
+            number - self._keyframes[-1] >= self.keyframe_interval)
+        file_name = add_extension("%s-%06d.rows" % (self.dataset, number),
+                                  self.compression)
+        write_rows(os.path.join(self.directory, file_name),
+                   [record for record, _ in current.values()] if keyframe
+                   else changed_records, self.compression, self.level)
+        self._add_poll({
+            "time": timestamp,
+            "file": file_name,
+            "keyframe": keyframe,
+            "removed": [] if keyframe else removed
+        })
+        if keyframe:
+            self._save_index()
+        else:
+            self._append_journal()
+        self._hashes = dict(
+            (key, record_hash) for key, (_, record_hash) in current.items())
+        _LOGGER.debug("Stored %(dataset)s poll %(number)d: %(counts)s", {
+            "dataset": self.dataset, "number": number, "counts": counts})
+        return counts
+
+    def _apply(self, state, poll):
+        if poll["keyframe"]:
+            state.clear()
+        for key in poll["removed"]:
+            state.pop(key, None)
+        for record in self._read_records(poll):
+            state[get_record_key(record, self.key_fields)] = record
+
+    def _reconstruct(self, poll_number):
+        keyframe = self._keyframes[
+            bisect_right(self._keyframes, poll_number) - 1]
+        state = OrderedDict()
+        for number in range(keyframe, poll_number + 1):
+            self._apply(state, self._polls[number])
+        return state
+
+    def find_poll(self, time):
+        """Returns the number of the latest poll at or before a time, or None
+        if the store has no polls that old.
+        """
+        number = bisect_right(self._times, to_timestamp(time)) - 1
+        return number if number >= 0 else None
+
+    def get_snapshot(self, time=None):
+        """Reconstructs the records of the latest poll at or before a time.
+
+        Parameters
+        ----------
+        time : datetime.datetime, optional
+            Naive UTC time. Defaults to the latest poll.
+
+        Returns
+        -------
+        list
+            The records, in the same form as returned by get_traveler_info.
+        """
+        if time is None:
+            number = len(self._polls) - 1
+        else:
+            number = self.find_poll(time)
+        if number is None or number < 0:
+            return []
+        return list(self._reconstruct(number).values())
+
+    def iter_snapshots(self, start=None, end=None):
+        """Reconstructs every poll between two times, applying each delta
+        once.
+
+        Parameters
+        ----------
+        start, end : datetime.datetime, optional
+            Naive UTC times. Default to the first and latest polls.
+
+        Yields
+        ------
+        tuple
+            The time of the poll and a list of its records.
+        """
+        if not self._polls:
+            return
+        first = 0
+        if start is not None:
+            first = bisect_right(self._times, to_timestamp(start) - 1)
+        last = len(self._polls) - 1
+        if end is not None:
+            last = bisect_right(self._times, to_timestamp(end)) - 1
+        if first > last:
+            return
+        state = self._reconstruct(first)
+        yield from_timestamp(self._times[first]), list(state.values())
+        for number in range(first + 1, last + 1):
+            self._apply(state, self._polls[number])
+            yield from_timestamp(self._times[number]), list(state.values())
@@ -0,0 +1,309 @@
+"""An in-memory spatial index for the records returned by get_traveler_info.
+
+Records are located by the same coordinate fields that to_geo_json uses:
+Longitude/Latitude for points, and StartLongitude/StartLatitude and
+EndLongitude/EndLatitude for multipoints. Each point is stored in a uniform
+grid of longitude/latitude cells, so bounding box, radius and k-nearest
+queries only look at the records in nearby cells instead of every record.
+
+Example
+-------
+Find the cameras within 2 km of each highway alert::
+
+    cameras = SpatialIndex.from_records(
+        get_traveler_info("HighwayCameras"), get_key_fields("HighwayCameras"))
+    for alert in get_traveler_info("HighwayAlerts"):
+        nearby = cameras.near_record(alert, 2000)
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import heapq
+import math
+
+from .geometry import get_points
+from .jsonhelpers import get_geometry_fields
+from .tabledefs import (GEOMETRY_TYPE_MULTIPOINT, GEOMETRY_TYPE_POINT,
+                        get_record_key)
+
+EARTH_RADIUS_METERS = 6371008.8
+# Approximate length of one degree of latitude.
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180
+
+# Default cell size in degrees (about 5.5 km north-south).
+DEFAULT_CELL_SIZE = 0.05
+
+
+def haversine_distance(x1, y1, x2, y2):
+    """Returns the great-circle distance in meters between two
+    longitude/latitude points.
+    """
+    lat1, lat2 = math.radians(y1), math.radians(y2)
+    dlat = lat2 - lat1
+    dlon = math.radians(x2 - x1)
+    a = (math.sin(dlat / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2)
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def get_record_points(record):
+    """Returns the valid (longitude, latitude) points of a record, using the
+    fields recognized by to_geo_json.
+    """
+    geometry_type, geometry_fields = get_geometry_fields(record)
+    if geometry_type == "Point":
+        return get_points(record, GEOMETRY_TYPE_POINT, geometry_fields)
+    if geometry_type == "MultiPoint":
+        return get_points(record, GEOMETRY_TYPE_MULTIPOINT, geometry_fields)
+    return []
+
+
+class SpatialIndex(object):
+    """A grid index of records by their point coordinates.
+
+    Records are identified by keys (see tabledefs.get_record_key). Records
+    without valid coordinates are stored, but never returned by the spatial
+    queries.
+    """
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE, key_fields=None):
+        """Creates an empty index.
+
+        Parameters
+        ----------
+        cell_size : float
+            Size of the grid cells in degrees. Cells about the size of a
+            typical query radius work best.
+        key_fields : sequence, optional
+            Fields used by add_records and apply_diff to determine the key of
+            each record.
+        """
+        self.cell_size = cell_size
+        self.key_fields = key_fields
+        self._cells = {}
+        self._records = {}
+        self._points = {}
+
+    @classmethod
+    def from_records(cls, records, key_fields=None,
+                     cell_size=DEFAULT_CELL_SIZE):
+        """Creates an index containing a list of records."""
+        index = cls(cell_size, key_fields)
+        index.add_records(records)
+        return index
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, key):
+        return key in self._records
+
+    def get(self, key, default=None):
+        """Returns the record with the given key."""
+        return self._records.get(key, default)
+
+    def get_points(self, key):
+        """Returns the indexed points of the record with the given key."""
+        return self._points.get(key, [])
+
+    def _cell(self, x, y):
+        return (int(math.floor(x / self.cell_size)),
+                int(math.floor(y / self.cell_size)))
+
+    def insert(self, key, record):
+        """Adds a record to the index, replacing any record with the same key.
+        """
+        if key in self._records:
+            self.remove(key)
+        points = get_record_points(record)
+        self._records[key] = record
+        self._points[key] = points
+        for x, y in points:
+            self._cells.setdefault(self._cell(x, y), set()).add(key)
+
+    def remove(self, key):
+        """Removes a record from the index. Does nothing if the key is not in
+        the index.
+        """
+        if key not in self._records:
+            return
+        del self._records[key]
+        for x, y in self._points.pop(key):
+            cell = self._cell(x, y)
+            keys = self._cells.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._cells[cell]
+
+    def add_records(self, records):
+        """Adds records, using key_fields to determine their keys."""
+        for record in records:
+            self.insert(get_record_key(record, self.key_fields), record)
+
+    def apply_diff(self, added=(), changed=(), removed=()):
+        """Updates the index with the differences between two snapshots.
+
+        Parameters
+        ----------
+        added : sequence of dict
+            New records.
+        changed : sequence of dict
+            Records that replace the records with the same key.
+        removed : sequence
+            Keys of the records that no longer exist.
+        """
+        for key in removed:
+            self.remove(key)
+        self.add_records(added)
+        self.add_records(changed)
+
+    def _keys_in_cells(self, min_x, min_y, max_x, max_y):
+        min_ix, min_iy = self._cell(min_x, min_y)
+        max_ix, max_iy = self._cell(max_x, max_y)
+        cells = self._cells
+        if (max_ix - min_ix + 1) * (max_iy - min_iy + 1) > len(cells):
+            # Cheaper to check every occupied cell.
+            for (ix, iy), keys in cells.items():
+                if min_ix <= ix <= max_ix and min_iy <= iy <= max_iy:
+                    for key in keys:
+                        yield key
+            return
+        for ix in range(min_ix, max_ix + 1):
+            for iy in range(min_iy, max_iy + 1):
+                keys = cells.get((ix, iy))
+                if keys:
+                    for key in keys:
+                        yield key
+
+    def bbox(self, min_x, min_y, max_x, max_y):
+        """Returns the set of keys of the records that have at least one point
+        inside of a bounding box (in degrees).
+        """
+        output = set()
+        for key in self._keys_in_cells(min_x, min_y, max_x, max_y):
+            if key in output:
+                continue
+            for x, y in self._points[key]:
+                if min_x <= x <= max_x and min_y <= y <= max_y:
+                    output.add(key)
+                    break
+        return output
+
+    def _distance_to_record(self, key, x, y):
+        return min(haversine_distance(x, y, px, py)
+                   for px, py in self._points[key])
+
+    def within_distance(self, x, y, meters):
+        """Returns the records that have a point within a distance of a
+        longitude/latitude point.
+
+        Returns
+        -------
+        list
+            (distance in meters, key) tuples sorted by distance.
+        """
+        dlat = meters / METERS_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(89.0, abs(y) + dlat)))
+        dlon = min(180.0, dlat / max(cos_lat, 1e-6))
+        output = []
+        seen = set()
+        for key in self._keys_in_cells(x - dlon, y - dlat, x + dlon, y + dlat):
+            if key in seen:
+                continue
+            seen.add(key)
+            distance = self._distance_to_record(key, x, y)
+            if distance <= meters:
+                output.append((distance, key))
+        output.sort(key=lambda item: item[0])
+        return output
+
+    def nearest(self, x, y, count=1, max_distance=None):
+        """Returns the records closest to a longitude/latitude point.
+
+        The grid is searched in rings of cells around the point, stopping as
+        soon as no unsearched cell can contain a closer record.
+
+        Parameters
+        ----------
+        x, y : float
+            Longitude and latitude of the point.
+        count : int
+            Number of records to return.
+        max_distance : float, optional
+            Records farther than this distance (in meters) are not returned.
+
+        Returns
+        -------
+        list
+            (distance in meters, key) tuples sorted by distance.
+        """
+        if not self._cells or count < 1:
+            return []
+        center_ix, center_iy = self._cell(x, y)
+        ixs = [cell[0] for cell in self._cells]
+        iys = [cell[1] for cell in self._cells]
+        max_ring = max(abs(center_ix - min(ixs)), abs(center_ix - max(ixs)),
+                       abs(center_iy - min(iys)), abs(center_iy - max(iys)))
+        # Max-heap (negated distances) of the best candidates so far.
+        best = []
+        seen = set()
+        for ring in range(max_ring + 1):
+            for cell in self._ring_cells(center_ix, center_iy, ring):
+                for key in self._cells.get(cell, ()):
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    distance = self._distance_to_record(key, x, y)
+                    if max_distance is not None and distance > max_distance:
+                        continue
+                    if len(best) < count:
+                        heapq.heappush(best, (-distance, key))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, key))
+            # Any point in the next ring is at least this far away.
+            lower_bound = self._ring_lower_bound(y, ring)
+            if len(best) == count and lower_bound >= -best[0][0]:
+                break
+            if max_distance is not None and lower_bound > max_distance:
+                break
+        return sorted(((-neg, key) for neg, key in best),
+                      key=lambda item: item[0])
+
+    def _ring_lower_bound(self, y, ring):
+        """Minimum distance in meters from a point to any cell outside of the
+        given ring.
+        """
+        degrees = ring * self.cell_size
+        cos_lat = math.cos(math.radians(min(90.0, abs(y) + degrees +
+                                            self.cell_size)))
+        return degrees * METERS_PER_DEGREE * max(cos_lat, 0.0)
+
+    @staticmethod
+    def _ring_cells(center_ix, center_iy, ring):
+        if ring == 0:
+            yield center_ix, center_iy
+            return
+        for ix in range(center_ix - ring, center_ix + ring + 1):
+            yield ix, center_iy - ring
+            yield ix, center_iy + ring
+        for iy in range(center_iy - ring + 1, center_iy + ring):
+            yield center_ix - ring, iy
+            yield center_ix + ring, iy
+
+    def near_record(self, record, meters):
+        """Returns the records within a distance of any of another record's
+        points (e.g., cameras near a highway alert).
+
+        Returns
+        -------
+        list
+            (distance in meters, key) tuples sorted by distance.
+        """
+        closest = {}
+        for x, y in get_record_points(record):
+            for distance, key in self.within_distance(x, y, meters):
+                if key not in closest or distance < closest[key]:
+                    closest[key] = distance
+        return sorted(((distance, key) for key, distance in closest.items()),
+                      key=lambda item: item[0])
@@ -0,0 +1,436 @@
+"""Generates synthetic WSDOT Traffic API responses for scale testing.
+
+The records have the fields of the tables in tabledefs.json and the shape of
+the API's WCF responses, so they go through the same parsing as real
+responses (see jsonhelpers.parse_traveler_info_object):
+
+* Locations are nested objects (e.g., StartRoadwayLocation, CameraLocation)
+  that parse_traveler_info_object flattens into the table's fields.
+* Dates are WCF date strings, e.g. /Date(1539982800000-0700)/.
+* Road names are labels such as "SR 520" or "I-5" as well as three-digit
+  route IDs.
+* Boolean fields are true/false and coded value fields use the codes of
+  their domains.
+
+Scanweb responses are generated from the Scanweb tables, with nested
+surface and sub-surface measurements and ISO 8601 reading times.
+
+The records are generated from a seeded random number generator, so the same
+seed always produces the same response.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+import random
+import uuid
+from collections import OrderedDict
+
+from .jsonhelpers import _simplify_field_name
+from .resturls import URLS
+from .routeshields import SHIELD_DICT, id_to_label
+from .tabledefs import (DOMAINS, TABLE_DEFS_DICT_DICT, get_domain_values,
+                        iter_field_defs)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Approximate number of records in a response of the live API. The size of a
+# generated response is a multiple of these.
+TYPICAL_COUNTS = {
+    "BorderCrossings": 10,
+    "BridgeClearances": 2500,
+    "CVRestrictions": 300,
+    "HighwayAlerts": 150,
+    "HighwayCameras": 1600,
+    "MountainPassConditions": 16,
+    "Scanweb": 100,
+    "TollRates": 100,
+    "TrafficFlow": 1200,
+    "TravelTimes": 180,
+    "WeatherInformation": 100,
+    "WeatherStations": 100,
+}
+
+# Fraction of the optional values that are null.
+DEFAULT_NULL_RATE = 0.05
+
+_LOCATION_KEYS = ("Description", "Direction", "Latitude", "Longitude",
+                  "MilePost", "RoadName")
+_ROADWAY_LOCATIONS = OrderedDict([("StartRoadwayLocation", _LOCATION_KEYS),
+                                  ("EndRoadwayLocation", _LOCATION_KEYS)])
+
+# The nested objects of each endpoint's records, and the keys of the nested
+# objects. Table fields that aren't in a nested object are top-level values.
+NESTED_OBJECTS = {
+    "BorderCrossings": {"BorderCrossingLocation": _LOCATION_KEYS},
+    "CVRestrictions": _ROADWAY_LOCATIONS,
+    "HighwayAlerts": _ROADWAY_LOCATIONS,
+    "HighwayCameras": {"CameraLocation": _LOCATION_KEYS},
+    "MountainPassConditions": OrderedDict([
+        ("RestrictionOne", ("RestrictionText", "TravelDirection")),
+        ("RestrictionTwo", ("RestrictionText", "TravelDirection"))]),
+    "TrafficFlow": {"FlowStationLocation": _LOCATION_KEYS},
+    "TravelTimes": OrderedDict([("StartPoint", _LOCATION_KEYS),
+                                ("EndPoint", _LOCATION_KEYS)]),
+}
+
+# Top-level keys of the API that parse_traveler_info_object renames.
+_RAW_KEYS = {
+    "BridgeClearances": {"StartLatitude": "BeginLatitude",
+                         "StartLongitude": "BeginLongitude",
+                         "StartMilePost": "BeginMilePost"},
+}
+
+# Table fields that the API doesn't return as top-level values. (The border
+# crossing location's description is parsed as LocationDescription.)
+_OMITTED_KEYS = {
+    "BorderCrossings": ("Description",),
+}
+
+# Washington State, as (min, max) longitude and latitude.
+_LONGITUDE_RANGE = (-124.7, -116.9)
+_LATITUDE_RANGE = (45.6, 49.0)
+# Maximum distance, in degrees, between the start and end of a location.
+_END_OFFSET = 0.05
+
+_BASE_TIME = datetime.datetime(2018, 10, 19, 20, 0, 0)
+_EPOCH = datetime.datetime(1970, 1, 1)
+_TIME_RANGE_SECONDS = 30 * 24 * 60 * 60
+_UTC_OFFSETS = ("-0700", "-0800")
+
+_DIRECTIONS = ("N", "S", "E", "W", "NB", "SB", "EB", "WB", "Both")
+_CHOICES = {
+    "County": ("King", "Pierce", "Snohomish", "Spokane", "Clark", "Kittitas",
+               "Yakima", "Whatcom", "Thurston", "Chelan"),
+    "EventStatus": ("Open", "Closed"),
+    "Priority": ("Highest", "High", "Medium", "Low", "Lowest"),
+    "Region": ("Northwest", "North Central", "Olympic", "South Central",
+               "Southwest", "Eastern"),
+    "SkyCoverage": ("N/A", "Clear", "Overcast", "Partly Cloudy"),
+    "State": ("WA",),
+    "WindDirectionCardinal": ("N", "NE", "E", "SE", "S", "SW", "W", "NW"),
+}
+_WORDS = (
+    "northbound", "southbound", "eastbound", "westbound", "lane", "lanes",
+    "closed", "open", "right", "left", "shoulder", "ramp", "exit", "bridge",
+    "pass", "summit", "collision", "construction", "maintenance", "traction",
+    "tires", "advised", "nightly", "from", "to", "at", "near", "the", "and",
+    "Seattle", "Tacoma", "Spokane", "Everett", "Bellevue", "Olympia",
+    "Snoqualmie", "Stevens", "Montlake", "Mercer", "Island", "Street",
+    "Avenue", "Blvd", "Road", "milepost", "vehicles", "prohibited", "delays",
+    "expected", "use", "alternate", "route", "bare", "wet", "pavement",
+    "snow", "ice", "compact", "light", "heavy",
+)
+# Longest generated text when the field has no length.
+_MAX_TEXT_LENGTH = 120
+
+_ROUTES = sorted(SHIELD_DICT)
+
+
+def get_endpoint_names():
+    """Returns the names of the endpoints that responses can be generated
+    for: the keys of resturls.URLS.
+    """
+    return sorted(URLS)
+
+
+def _get_count(name, count=None, scale=1):
+    if count is not None:
+        return count
+    return int(round(TYPICAL_COUNTS.get(name, 100) * scale))
+
+
+def _wcf_date(rng):
+    """Returns a WCF date string of a random time in the month before
+    _BASE_TIME.
+    """
+    time = _BASE_TIME - datetime.timedelta(
+        seconds=rng.randrange(_TIME_RANGE_SECONDS))
+    milliseconds = int((time - _EPOCH).total_seconds()) * 1000
+    return "/Date(%d%s)/" % (milliseconds, rng.choice(_UTC_OFFSETS))
+
+
+def _iso_date(rng):
+    """Returns an ISO 8601 string of a random time, in Pacific time."""
+    time = _BASE_TIME - datetime.timedelta(
+        seconds=rng.randrange(_TIME_RANGE_SECONDS), hours=7)
+    return time.isoformat() + "-07:00"
+
+
+def _text(rng, length=None):
+    """Returns random words, at most length characters long."""
+    length = min(length or _MAX_TEXT_LENGTH, _MAX_TEXT_LENGTH)
+    words = []
+    size = -1
+    for _ in range(rng.randint(1, 12)):
+        word = rng.choice(_WORDS)
+        if size + 1 + len(word) > length:
+            break
+        words.append(word)
+        size += 1 + len(word)
+    return " ".join(words) or rng.choice(_WORDS)[:length]
+
+
+def _route_id(rng):
+    return "%03d" % rng.choice(_ROUTES)
+
+
+def _route_label(rng):
+    """Returns a route label as the API writes it: either a label with the
+    shield type (e.g., "SR 520", "I-5") or a three-digit route ID.
+    """
+    route = rng.choice(_ROUTES)
+    if rng.random() < 0.5:
+        return id_to_label(route)
+    return "%03d" % route
+
+
+class _RecordGenerator(object):
+    """Generates the records of one endpoint."""
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, name, rng, null_rate=DEFAULT_NULL_RATE):
+        self.name = name
+        self.rng = rng
+        self.null_rate = null_rate
+        table_def_dict = TABLE_DEFS_DICT_DICT[name]
+        self.key_fields = set(table_def_dict.get("keyFields") or ())
+        self.field_defs = OrderedDict(
+            (field_def.key, field_def)
+            for field_def in iter_field_defs(table_def_dict))
+        self.domains = table_def_dict.get("domains", {})
+
+        # Map each key of the nested objects to the field it is parsed into.
+        self.nested = OrderedDict()
+        nested_fields = set()
+        for object_key, keys in NESTED_OBJECTS.get(name, {}).items():
+            self.nested[object_key] = [
+                (key, _simplify_field_name(object_key + key)) for key in keys]
+            nested_fields.update(field for _, field in self.nested[object_key])
+        raw_keys = _RAW_KEYS.get(name, {})
+        omitted = _OMITTED_KEYS.get(name, ())
+        self.top_level = [
+            (raw_keys.get(key, key), key) for key in self.field_defs
+            if key not in nested_fields and key not in omitted]
+
+    def _coordinate(self, field, anchor):
+        """Returns a coordinate near the record's anchor point. End points
+        are offset from start points.
+        """
+        value = anchor[0] if field.endswith("Longitude") else anchor[1]
+        if field.startswith("End"):
+            value += self.rng.uniform(-_END_OFFSET, _END_OFFSET)
+        return round(value, 6)
+
+    def _value(self, field, index, anchor):
+        """Returns a random value for one of the table's fields (or one of
+        the fields of a nested object).
+        """
+        rng = self.rng
+        field_def = self.field_defs.get(field)
+        field_type = field_def.field_type if field_def else None
+        length = field_def.length if field_def else None
+
+        if field in self.key_fields:
+            if field_type == "GUID":
+                return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            if field_type in ("SHORT", "LONG"):
+                return index + 1
+            return "%s%06d" % (field, index + 1)
+        if field.endswith(("Latitude", "Longitude")):
+            return self._coordinate(field, anchor)
+        if rng.random() < self.null_rate:
+            return None
+        if field in self.domains:
+            if self.domains[field] == "Boolean":
+                return rng.random() < 0.5
+            domain = DOMAINS[self.domains[field]]
+            code, description = rng.choice(get_domain_values(domain))
+            # Text domains are coded by their descriptions.
+            return description if domain.get("field_type") == "TEXT" else code
+        if field.lower().endswith("milepost"):
+            return round(rng.uniform(0, 400), 2)
+        if field.endswith("RoadName"):
+            return _route_label(rng)
+        if field in ("StateRouteID", "StateRoute", "LRSRoute"):
+            return _route_id(rng)
+        if field.endswith("Direction") and field_type in (None, "TEXT"):
+            return rng.choice(_DIRECTIONS)
+        if field in _CHOICES:
+            return rng.choice(_CHOICES[field])
+        if field.endswith("URL"):
+            return "https://images.wsdot.wa.gov/nw/%s.jpg" % _route_id(rng)
+        if field_type == "DATE":
+            return _wcf_date(rng)
+        if field_type == "SHORT":
+            return rng.randint(0, 100)
+        if field_type == "LONG":
+            return rng.randint(0, 100000)
+        if field_type in ("FLOAT", "SINGLE", "DOUBLE"):
+            return round(rng.uniform(0, 100), 2)
+        return _text(rng, length)
+
+    def _anchor(self):
+        return (self.rng.uniform(*_LONGITUDE_RANGE),
+                self.rng.uniform(*_LATITUDE_RANGE))
+
+    def get_values(self, index, anchor):
+        """Returns the top-level values of a record."""
+        return OrderedDict((raw_key, self._value(field, index, anchor))
+                           for raw_key, field in self.top_level)
+
+    def generate(self, index):
+        """Returns the index-th record of the response."""
+        anchor = self._anchor()
+        record = self.get_values(index, anchor)
+        for object_key, keys in self.nested.items():
+            record[object_key] = OrderedDict(
+                (key, self._value(field, index, anchor))
+                for key, field in keys)
+        return record
+
+
+class _ScanwebGenerator(_RecordGenerator):
+    """Generates Scanweb weather readings."""
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, rng, null_rate=DEFAULT_NULL_RATE):
+        super(_ScanwebGenerator, self).__init__(
+            "ScanwebWeatherReadings", rng, null_rate)
+        self.surface = _RecordGenerator("ScanwebSurfaceMeasurements", rng,
+                                        null_rate)
+        self.subsurface = _RecordGenerator("ScanwebSubSurfaceMeasurements",
+                                           rng, null_rate)
+
+    @staticmethod
+    def _measurements(generator, count, anchor):
+        measurements = []
+        for sensor_index in range(count):
+            # Measurements are nested in their reading, so they don't have
+            # its StationId.
+            measurement = generator.get_values(sensor_index, anchor)
+            del measurement["StationId"]
+            measurements.append(measurement)
+        return measurements
+
+    def generate(self, index):
+        anchor = self._anchor()
+        record = self.get_values(index, anchor)
+        # The API returns station IDs as strings.
+        record["StationId"] = str(index + 1)
+        record["ReadingTime"] = _iso_date(self.rng)
+        record["Latitude"] = round(anchor[1], 6)
+        record["Longitude"] = round(anchor[0], 6)
+        record["Elevation"] = self.rng.randint(0, 5000)
+        record["SurfaceMeasurements"] = self._measurements(
+            self.surface, self.rng.randint(1, 3), anchor)
+        record["SubSurfaceMeasurements"] = self._measurements(
+            self.subsurface, self.rng.randint(0, 2), anchor)
+        return record
+
+
+def iter_records(name, count=None, scale=1, seed=None,
+                 null_rate=DEFAULT_NULL_RATE):
+    """Generates the records of a synthetic API response, one at a time.
+
+    Parameters
+    ----------
+    name : str
+        One of the keys of resturls.URLS.
+    count : int, optional
+        Number of records. Defaults to scale times the typical number of
+        records of the endpoint (see TYPICAL_COUNTS).
+    scale : float, optional
+        See count.
+    seed : optional
+        Seed of the random number generator. The same seed produces the same
+        records.
+    null_rate : float, optional
+        Fraction of the optional values that are null.
+
+    Yields
+    ------
+    dict
+        Records as they are decoded from the API's JSON, before they are
+        parsed with parse_traveler_info_object.
+    """
+    if name not in URLS:
+        raise ValueError("Unknown endpoint: %s" % name)
+    rng = random.Random(seed)
+    if name == "Scanweb":
+        generator = _ScanwebGenerator(rng, null_rate)
+    else:
+        generator = _RecordGenerator(name, rng, null_rate)
+    for index in range(_get_count(name, count, scale)):
+        yield generator.generate(index)
+
+
+def generate_records(name, count=None, scale=1, seed=None,
+                     null_rate=DEFAULT_NULL_RATE):
+    """Returns the records of a synthetic API response as a list (see
+    iter_records).
+    """
+    return list(iter_records(name, count, scale, seed, null_rate))
+
+
+def generate_payload(name, count=None, scale=1, seed=None,
+                     null_rate=DEFAULT_NULL_RATE):
+    """Returns a synthetic API response as UTF-8 encoded JSON, as returned
+    by get_traveler_info_json (see iter_records).
+    """
+    return json.dumps(generate_records(name, count, scale, seed,
+                                       null_rate)).encode("utf-8")
+
+
+def write_payload(out_path, name, count=None, scale=1, seed=None,
+                  null_rate=DEFAULT_NULL_RATE):
+    """Writes a synthetic API response to a file, one record at a time, so
+    large responses don't have to fit in memory. Returns the number of
+    records written.
+    """
+    record_count = 0
+    with io.open(out_path, "w", encoding="utf-8") as out_file:
+        out_file.write("[")
+        for record in iter_records(name, count, scale, seed, null_rate):
+            if record_count:
+                out_file.write(",\n")
+            out_file.write(json.dumps(record))
+            record_count += 1
+        out_file.write("]\n")
+    _LOGGER.info("Wrote %(record_count)d records to %(out_path)s.", {
+        "record_count": record_count, "out_path": out_path})
+    return record_count
+
+
+def main():
+    """Uses this when run as a script
+    """
+    parser = argparse.ArgumentParser(
+        description="Writes synthetic WSDOT Traffic API responses, as <name>.json files, for scale testing.")
+    parser.add_argument("--out-dir", default="synthetic", help='Directory the responses are written to. Defaults to "synthetic".')
+    parser.add_argument("--scale", type=float, default=1, help="Size of each response, as a multiple of the typical size of the endpoint's response. Defaults to 1.")
+    parser.add_argument("--count", type=int, help="Number of records in each response. Overrides --scale.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random number generator. Defaults to 0.")
+    parser.add_argument("--null-rate", type=float, default=DEFAULT_NULL_RATE, help="Fraction of optional values that are null. Defaults to %s." % DEFAULT_NULL_RATE)
+    parser.add_argument("names", nargs="*", help="One or more of %s. Defaults to all of them." % ", ".join(get_endpoint_names()))
+    args = parser.parse_args()
+
+    unknown_names = set(args.names) - set(URLS)
+    if unknown_names:
+        parser.error("Unknown endpoints: %s" % ", ".join(sorted(unknown_names)))
+    if not os.path.isdir(args.out_dir):
+        os.makedirs(args.out_dir)
+    for name in args.names or get_endpoint_names():
+        out_path = os.path.join(args.out_dir, "%s.json" % name)
+        record_count = write_payload(out_path, name, args.count, args.scale,
+                                     args.seed, args.null_rate)
+        print("Wrote %d records to %s." % (record_count, out_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Table and domain definitions for the traveler info tables.
+
+The definitions are stored in the tabledefs.json and domains.json files in the
+wsdottraffic.gp package. This module loads them without importing arcpy, so
+they can be used by the output backends that don't depend on ArcGIS.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import hashlib
+import json
+import re
+from collections import OrderedDict, namedtuple
+from os.path import join, dirname
+
+from .dicttools import dict_has_all_keys
+from .jsonhelpers import CustomEncoder
+from .parseutils import split_camel_case
+
+GEOMETRY_TYPE_POINT = "POINT"
+GEOMETRY_TYPE_MULTIPOINT = "MULTIPOINT"
+
+POINT_FIELD_NAMES = ("Longitude", "Latitude")
+MULTIPOINT_FIELD_NAMES = ("StartLongitude", "StartLatitude",
+                          "EndLongitude", "EndLatitude")
+
+# Length used by arcpy for TEXT fields when no length is specified.
+DEFAULT_TEXT_LENGTH = 255
+
+
+def _get_json_dir():
+    return join(dirname(__file__), "gp")
+
+
+# Load list info for creating geodatabase domains.
+with open(join(_get_json_dir(), "domains.json"), "r") as domains_file:
+    DOMAINS = json.load(domains_file, object_pairs_hook=OrderedDict)
+
+# This dictionary defines the fields in each table.  Each field's dictionary
+# entry can either contain a single string value indicating the field type, or
+# a dictionary with parameters for the arcpy.management.AddField function
+# (excluding in_table and field_name, which are already provided by the
+# dictionary keys).
+with open(join(_get_json_dir(), "tabledefs.json"), "r") as def_file:
+    TABLE_DEFS_DICT_DICT = json.load(def_file, object_pairs_hook=OrderedDict)
+
+
+# Describes a field defined in TABLE_DEFS_DICT_DICT.
+#   key: the key of the value in the records returned by get_traveler_info.
+#   name: the name of the field in the output table.
+#   field_type: an arcpy field type name (e.g., TEXT, DOUBLE, DATE).
+#   length: the field length or None.
+#   alias: the field alias.
+FieldDef = namedtuple("FieldDef", ("key", "name", "field_type", "length",
+                                   "alias"))
+
+
+def iter_field_defs(table_def_dict, ignored_fields=None):
+    """Iterates through the fields of a table definition, yielding FieldDef
+    tuples.
+
+    Parameters
+    ----------
+    table_def_dict : dict
+        One of the values of TABLE_DEFS_DICT_DICT.
+    ignored_fields : sequence, optional
+        Keys of fields that will be skipped.
+    """
+    for key, val in table_def_dict["fields"].items():
+        if ignored_fields is not None and key in ignored_fields:
+            continue
+        if isinstance(val, dict):
+            name = val.get("field_name", key)
+            length = val.get("field_length")
+            if length is not None:
+                length = int(length)
+            yield FieldDef(key, name, val["field_type"], length,
+                           val.get("field_alias", split_camel_case(name)))
+        else:
+            yield FieldDef(key, key, val, None, split_camel_case(key))
+
+
+def get_geometry_info(table_def_dict):
+    """Determines the geometry type of a table.
+
+    Returns
+    -------
+    tuple
+        The geometry type (GEOMETRY_TYPE_POINT, GEOMETRY_TYPE_MULTIPOINT, or
+        None for tables without geometry) and the names of the fields that
+        contain the coordinates.
+    """
+    field_dict = table_def_dict["fields"]
+    # Check to see if geometry type and fields are explicitly specified.
+    if "geometryInfo" in table_def_dict:
+        geometry_info = table_def_dict["geometryInfo"]
+        if re.match("POINT", geometry_info["geometryType"], re.IGNORECASE):
+            return GEOMETRY_TYPE_POINT, tuple(
+                geometry_info.get("fields", POINT_FIELD_NAMES))
+        return None, ()
+    # If input contains fields for both shape types, multipoint is used,
+    # since a feature class can't have both.
+    if dict_has_all_keys(field_dict, *MULTIPOINT_FIELD_NAMES):
+        return GEOMETRY_TYPE_MULTIPOINT, MULTIPOINT_FIELD_NAMES
+    if dict_has_all_keys(field_dict, *POINT_FIELD_NAMES):
+        return GEOMETRY_TYPE_POINT, POINT_FIELD_NAMES
+    return None, ()
+
+
+def get_table_def(table_name, table_def_dict=None):
+    """Returns the definition of a table: table_def_dict if provided,
+    otherwise the table's entry in TABLE_DEFS_DICT_DICT.
+
+    Weather readings have point geometry, though the coordinate fields are
+    not part of their table definition, so geometryInfo is added to it.
+    """
+    if table_def_dict is None:
+        table_def_dict = TABLE_DEFS_DICT_DICT[table_name]
+    if table_name == "ScanwebWeatherReadings" and \
+            "geometryInfo" not in table_def_dict:
+        table_def_dict = dict(table_def_dict, geometryInfo={
+            "geometryType": GEOMETRY_TYPE_POINT,
+            "fields": list(POINT_FIELD_NAMES)})
+    return table_def_dict
+
+
+def get_domain_values(domain_info):
+    """Returns the coded values of one of the DOMAINS as a list of
+    (code, description) tuples.
+
+    A list of values is coded by position. A dict maps descriptions to codes.
+    """
+    values = domain_info.get("values")
+    if values is None:
+        return []
+    if isinstance(values, dict):
+        return [(code, description) for description, code in values.items()]
+    return list(enumerate(values))
+
+
+def get_key_fields(table_name):
+    """Returns the names of the fields that identify a record of a table
+    (the "keyFields" of the table definition), or None if the table has no
+    natural key.
+    """
+    table_def_dict = TABLE_DEFS_DICT_DICT.get(table_name)
+    if table_def_dict is None:
+        return None
+    key_fields = table_def_dict.get("keyFields")
+    return tuple(key_fields) if key_fields else None
+
+
+def get_record_hash(record):
+    """Returns a hash of a record's content as a hexadecimal string.
+    Records with the same keys and values have the same hash.
+    """
+    text = json.dumps(record, cls=CustomEncoder, sort_keys=True,
+                      separators=(",", ":"))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def get_record_key(record, key_fields):
+    """Returns the value that identifies a record.
+
+    Parameters
+    ----------
+    record : dict
+        A record returned by get_traveler_info.
+    key_fields : sequence
+        Names of the key fields (see get_key_fields).
+
+    Returns
+    -------
+    The value of the key field if there is a single key field, or a tuple of
+    the key fields' values. If key_fields is empty or the record is missing
+    one of the key fields, the record's content hash is returned instead.
+    """
+    if key_fields:
+        if len(key_fields) == 1:
+            value = record.get(key_fields[0])
+            if value is not None:
+                return value
+        else:
+            values = tuple(record.get(field) for field in key_fields)
+            if None not in values:
+                return values
+    return get_record_hash(record)
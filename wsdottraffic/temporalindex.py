@@ -0,0 +1,214 @@
+"""A temporal index for the records of the HighwayAlerts and CVRestrictions
+endpoints.
+
+Records are indexed by the period they are in effect (StartTime/EndTime or
+DateEffective/DateExpires) and by the time they were last changed
+(LastUpdatedTime or DatePosted, or the time the change was first seen). Both
+are stored in IntervalIndex objects, so "active at", "active during" and
+"changed since" queries don't scan every record.
+
+Dates are expected to be the naive UTC datetime objects returned by
+parse_wcf_date. A record without an end time is active indefinitely.
+
+Example
+-------
+::
+
+    index = TemporalIndex()
+    # After each poll:
+    index.apply_snapshot("HighwayAlerts", get_traveler_info("HighwayAlerts"),
+                         get_key_fields("HighwayAlerts"))
+    active_now = index.active_at(datetime.datetime.utcnow())
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+
+from .intervals import IntervalIndex
+from .tabledefs import get_record_hash, get_record_key
+
+# Endpoints whose records have effective time fields.
+TEMPORAL_DATASETS = ("HighwayAlerts", "CVRestrictions")
+
+# (start, end) fields that define the period a record is in effect.
+PERIOD_FIELDS = (("StartTime", "EndTime"), ("DateEffective", "DateExpires"))
+
+# Fields that contain the time a record was last changed.
+UPDATED_FIELDS = ("LastUpdatedTime", "DatePosted")
+
+
+def _get_date(record, field):
+    value = record.get(field)
+    return value if isinstance(value, datetime.datetime) else None
+
+
+def get_period(record):
+    """Returns the (start, end) period a record is in effect.
+
+    Missing start times are returned as datetime.min and missing end times as
+    datetime.max. Returns None if the record has none of the PERIOD_FIELDS.
+    """
+    for start_field, end_field in PERIOD_FIELDS:
+        if start_field in record or end_field in record:
+            start = _get_date(record, start_field) or datetime.datetime.min
+            end = _get_date(record, end_field) or datetime.datetime.max
+            return start, end
+    return None
+
+
+def get_updated_time(record):
+    """Returns the time a record says it was last updated, or None."""
+    for field in UPDATED_FIELDS:
+        value = _get_date(record, field)
+        if value is not None:
+            return value
+    return None
+
+
+class TemporalIndex(object):
+    """Indexes records from several datasets by their effective periods and
+    update times.
+
+    Records are identified by (dataset, key) tuples, where key is determined
+    by tabledefs.get_record_key.
+    """
+
+    def __init__(self):
+        self._periods = IntervalIndex()
+        self._updates = IntervalIndex()
+        self._records = {}
+        self._hashes = {}
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, item):
+        return item in self._records
+
+    def get(self, dataset, key, default=None):
+        """Returns a record in the index."""
+        return self._records.get((dataset, key), default)
+
+    def get_updated_time(self, dataset, key):
+        """Returns the time a record in the index was last changed."""
+        update = self._updates.get((dataset, key))
+        return update[0] if update else None
+
+    def insert(self, dataset, key, record, seen_time=None):
+        """Adds or replaces a record.
+
+        Parameters
+        ----------
+        dataset : str
+            Name of the dataset (e.g., "HighwayAlerts").
+        key : object
+            Value that identifies the record within the dataset.
+        record : dict
+            A record returned by get_traveler_info.
+        seen_time : datetime.datetime, optional
+            Time the record was retrieved (UTC). Used as the update time of
+            records that don't have one of the UPDATED_FIELDS. Defaults to
+            the current time.
+
+        Returns
+        -------
+        bool
+            True if the record is new or its content changed, False if the
+            index already contained an identical record.
+        """
+        item = (dataset, key)
+        record_hash = get_record_hash(record)
+        if self._hashes.get(item) == record_hash:
+            self._records[item] = record
+            return False
+        self._records[item] = record
+        self._hashes[item] = record_hash
+        period = get_period(record)
+        if period is None:
+            self._periods.remove(item)
+        else:
+            self._periods.insert(item, *period)
+        updated = get_updated_time(record)
+        if updated is None:
+            updated = seen_time or datetime.datetime.utcnow()
+        self._updates.insert(item, updated, updated)
+        return True
+
+    def remove(self, dataset, key):
+        """Removes a record. Does nothing if the record is not in the index.
+        """
+        item = (dataset, key)
+        if self._records.pop(item, None) is None:
+            return
+        del self._hashes[item]
+        self._periods.remove(item)
+        self._updates.remove(item)
+
+    def apply_snapshot(self, dataset, records, key_fields=None,
+                       seen_time=None):
+        """Updates the index with the current records of a dataset. Records of
+        the dataset that are no longer present are removed.
+
+        Parameters
+        ----------
+        dataset : str
+            Name of the dataset (e.g., "HighwayAlerts").
+        records : iterable of dict
+            All of the records currently returned by the endpoint.
+        key_fields : sequence, optional
+            Fields that identify a record (see tabledefs.get_key_fields).
+        seen_time : datetime.datetime, optional
+            Time the records were retrieved (UTC). Defaults to the current
+            time.
+
+        Returns
+        -------
+        tuple
+            Lists of the keys of the added, changed and removed records.
+        """
+        if seen_time is None:
+            seen_time = datetime.datetime.utcnow()
+        added, changed = [], []
+        current = set()
+        for record in records:
+            key = get_record_key(record, key_fields)
+            current.add(key)
+            is_new = (dataset, key) not in self._records
+            if self.insert(dataset, key, record, seen_time):
+                (added if is_new else changed).append(key)
+        removed = [item[1] for item in self._records
+                   if item[0] == dataset and item[1] not in current]
+        for key in removed:
+            self.remove(dataset, key)
+        return added, changed, removed
+
+    @staticmethod
+    def _filter(items, datasets):
+        if datasets is None:
+            return items
+        return [item for item in items if item[0] in datasets]
+
+    def active_at(self, time, datasets=None):
+        """Returns the (dataset, key) tuples of the records in effect at a
+        point in time, ordered by their start times.
+        """
+        return self._filter(self._periods.containing(time), datasets)
+
+    def active_during(self, start, end, datasets=None):
+        """Returns the (dataset, key) tuples of the records in effect at any
+        time during a window, ordered by their start times.
+        """
+        return self._filter(self._periods.overlapping(start, end), datasets)
+
+    def changed_since(self, time, datasets=None):
+        """Returns the (dataset, key) tuples of the records that were added
+        or changed at or after a time, ordered by their update times.
+        Removed records are not included (see apply_snapshot).
+        """
+        return self._filter(
+            self._updates.overlapping(time, datetime.datetime.max), datasets)
+
+    def get_records(self, items):
+        """Returns the (dataset, record) tuples of (dataset, key) tuples."""
+        return [(item[0], self._records[item]) for item in items]
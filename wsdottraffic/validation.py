@@ -0,0 +1,181 @@
+"""Validates records against table definitions before they are loaded.
+
+A value that doesn't fit its field (e.g., text longer than the field's
+length, or a string in a numeric field) makes an InsertCursor raise an error
+that aborts the load of the whole table. validate_records checks all of the
+records of a table up front, one field at a time, so the invalid records can
+be set aside (see write_quarantine) and the rest loaded without errors.
+
+Each column is first checked as a whole (the set of its value types, its
+longest text or its integer range) with builtins. Only the columns that fail
+that check are checked value by value to find the invalid records.
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import datetime
+import json
+from collections import namedtuple
+from numbers import Integral, Real
+
+from .jsonhelpers import CustomEncoder
+from .recordarrays import GUID_RE, INTEGER_RANGES, STRING_TYPES
+from .tabledefs import DEFAULT_TEXT_LENGTH, iter_field_defs
+
+# The result of validate_records.
+#   valid_indices: indices of the records without errors.
+#   errors: dict of lists of error messages, keyed by record index.
+ValidationResult = namedtuple("ValidationResult", ("valid_indices", "errors"))
+
+_NONE_TYPE = type(None)
+_TEXT_TYPES = frozenset(STRING_TYPES)
+_NUMBER_TYPES = frozenset((int, float))
+_DATE_TYPES = frozenset((datetime.datetime, datetime.date))
+
+
+def _column_fits(field_type, length, values):
+    """Returns True if every value of a column fits a field. A False result
+    means the column has to be checked value by value, not that a value
+    doesn't fit.
+    """
+    field_type = field_type.upper()
+    types = set(map(type, values))
+    types.discard(_NONE_TYPE)
+    if not types:
+        return True
+    values = [value for value in values if value is not None]
+    if field_type == "TEXT":
+        return (types <= _TEXT_TYPES and
+                max(map(len, values)) <= (length or DEFAULT_TEXT_LENGTH))
+    if field_type in ("FLOAT", "SINGLE", "DOUBLE"):
+        return types <= _NUMBER_TYPES
+    if field_type in INTEGER_RANGES:
+        minimum, maximum = INTEGER_RANGES[field_type]
+        return (types == set((int,)) and
+                minimum <= min(values) and max(values) <= maximum)
+    if field_type == "DATE":
+        return types <= _DATE_TYPES
+    if field_type == "GUID":
+        return types <= _TEXT_TYPES and all(map(GUID_RE.match, values))
+    return False
+
+
+def _get_check(field_type, length):
+    """Returns a function that returns an error message for a value that
+    doesn't fit a field, or None if it does. NULLs always fit.
+    """
+    field_type = field_type.upper()
+    if field_type == "TEXT":
+        length = length or DEFAULT_TEXT_LENGTH
+
+        def check_text(value):
+            if isinstance(value, STRING_TYPES):
+                if len(value) > length:
+                    return "text length %d exceeds the field length %d" % (
+                        len(value), length)
+            elif not isinstance(value, Real):
+                return "%s value is not text" % type(value).__name__
+            return None
+        return check_text
+    if field_type in ("FLOAT", "SINGLE", "DOUBLE"):
+        def check_float(value):
+            if not isinstance(value, Real):
+                return "%s value is not a number" % type(value).__name__
+            return None
+        return check_float
+    if field_type in INTEGER_RANGES:
+        minimum, maximum = INTEGER_RANGES[field_type]
+
+        def check_integer(value):
+            if not (isinstance(value, Integral) or (
+                    isinstance(value, float) and value.is_integer())):
+                return "%r is not an integer" % (value,)
+            if not minimum <= value <= maximum:
+                return "%d is outside of the %s range" % (value, field_type)
+            return None
+        return check_integer
+    if field_type == "DATE":
+        def check_date(value):
+            if not isinstance(value, datetime.date):
+                return "%s value is not a date" % type(value).__name__
+            return None
+        return check_date
+    if field_type == "GUID":
+        def check_guid(value):
+            if not isinstance(value, STRING_TYPES) or not GUID_RE.match(
+                    value):
+                return "%r is not a GUID" % (value,)
+            return None
+        return check_guid
+    return None
+
+
+def validate_records(records, table_def_dict, ignored_fields=None):
+    """Checks the values of records against the types and lengths of a
+    table definition's fields.
+
+    Parameters
+    ----------
+    records : sequence of dict
+        Records returned by get_traveler_info.
+    table_def_dict : dict
+        One of the values of TABLE_DEFS_DICT_DICT.
+    ignored_fields : sequence, optional
+        Keys of fields that are not checked (e.g., coordinates that become
+        geometry).
+
+    Returns
+    -------
+    ValidationResult
+    """
+    errors = {}
+    for field_def in iter_field_defs(table_def_dict, ignored_fields):
+        check = _get_check(field_def.field_type, field_def.length)
+        if check is None:
+            continue
+        key = field_def.key
+        values = [record.get(key) for record in records]
+        if _column_fits(field_def.field_type, field_def.length, values):
+            continue
+        for index, value in enumerate(values):
+            if value is None:
+                continue
+            error = check(value)
+            if error is not None:
+                errors.setdefault(index, []).append(
+                    "%s: %s" % (field_def.name, error))
+    valid_indices = [index for index in range(len(records))
+                     if index not in errors]
+    return ValidationResult(valid_indices, errors)
+
+
+def write_quarantine(path, table_name, records, errors, time=None):
+    """Appends invalid records, with their error messages, to a quarantine
+    file with a JSON object per line.
+
+    Parameters
+    ----------
+    path : str
+        Path of the quarantine file.
+    table_name : str
+        Name of the table the records were meant for.
+    records : sequence of dict
+        The records that were validated.
+    errors : dict
+        Error messages keyed by record index (ValidationResult.errors).
+    time : datetime.datetime, optional
+        Time of the load (naive UTC). Defaults to the current time.
+    """
+    if not errors:
+        return
+    if time is None:
+        time = datetime.datetime.utcnow()
+    with open(path, "a") as quarantine_file:
+        for index in sorted(errors):
+            quarantine_file.write(json.dumps({
+                "table": table_name,
+                "time": time,
+                "errors": errors[index],
+                "record": records[index]
+            }, cls=CustomEncoder))
+            quarantine_file.write("\n")
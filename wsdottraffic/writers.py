@@ -0,0 +1,401 @@
+"""Writes the traveler info tables through a common interface, so the same
+pipeline can produce a file geodatabase, a GeoPackage, GeoParquet files or
+PostgreSQL COPY files.
+
+Each output format is implemented by a TableWriter subclass:
+
+    gdb      wsdottraffic.gp.writer.GeodatabaseWriter (requires arcpy)
+    gpkg     wsdottraffic.geopackage.GeoPackageWriter
+    parquet  wsdottraffic.geoparquet.ParquetWriter (requires pyarrow)
+    copy     wsdottraffic.pgcopy.CopyWriter
+
+The writer classes are only imported when a format is used, so a format's
+dependencies are only needed when it is selected. choose_format picks the
+format of an output path, falling back to the fastest format available on
+this host, so the same command works on workers without ArcGIS:
+
+    python -m wsdottraffic.writers --out-path TravelerInfo.gdb
+
+Example
+-------
+::
+
+    with open_writer("TravelerInfo.gpkg") as writer:
+        write_traveler_info(writer, ["HighwayAlerts", "Scanweb"])
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import argparse
+import importlib
+import logging
+import os
+from collections import OrderedDict
+from functools import partial
+
+from . import ENVIRONMENT_VAR_NAME, get_traveler_info
+from .pipeline import DEFAULT_MAX_WORKERS, prefetch
+from .resturls import URLS
+from .tabledefs import get_table_def
+
+_LOGGER = logging.getLogger(__name__)
+
+# Output formats and the (module, class name) of their writers, relative to
+# this package.
+FORMATS = OrderedDict([
+    ("gdb", (".gp.writer", "GeodatabaseWriter")),
+    ("gpkg", (".geopackage", "GeoPackageWriter")),
+    ("parquet", (".geoparquet", "ParquetWriter")),
+    ("copy", (".pgcopy", "CopyWriter")),
+])
+
+# Output path extensions of the FORMATS. The parquet and copy formats write
+# a directory of files.
+EXTENSIONS = {
+    "gdb": ".gdb",
+    "gpkg": ".gpkg",
+    "parquet": ".parquet",
+    "copy": ".pgcopy",
+}
+
+# Formats used for output paths that don't name an available format, fastest
+# first. The GeoPackage writer only needs the standard library, so one of
+# them is always available.
+FALLBACK_FORMATS = ("gpkg", "parquet", "copy")
+
+SCANWEB_TABLE_NAMES = ("ScanwebWeatherReadings", "ScanwebSurfaceMeasurements",
+                       "ScanwebSubSurfaceMeasurements")
+
+
+class TableWriter(object):
+    """Base class of the output format writers.
+
+    A writer creates tables from the table definitions in tabledefs.json (see
+    wsdottraffic.tabledefs) and loads records returned by get_traveler_info
+    into them. Subclasses implement create_schema, truncate and append, and
+    may override upsert, finalize and close.
+
+    Writers are context managers. finalize is called when the with block
+    completes without an exception, and close is always called.
+
+    Attributes
+    ----------
+    format_name : str
+        The key of the format in FORMATS.
+    out_path : str
+        The path of the output file or directory.
+    """
+
+    format_name = None
+
+    def __init__(self, out_path):
+        self.out_path = out_path
+
+    @classmethod
+    def is_available(cls):
+        """Returns True if the writer's dependencies are installed."""
+        return True
+
+    def create_schema(self, table_name, table_def_dict=None):
+        """Creates a table if it does not already exist.
+
+        Parameters
+        ----------
+        table_name : str
+            The name of the table.
+        table_def_dict : dict, optional
+            The table definition. Defaults to the table's definition in
+            tabledefs.json (see tabledefs.get_table_def).
+        """
+        raise NotImplementedError()
+
+    def truncate(self, table_name):
+        """Deletes all of the rows of an existing table."""
+        raise NotImplementedError()
+
+    def append(self, table_name, data_list, table_def_dict=None):
+        """Bulk inserts records into an existing table, keeping its current
+        rows.
+        """
+        raise NotImplementedError()
+
+    def upsert(self, table_name, data_list, table_def_dict=None):
+        """Makes the rows of an existing table match a list of records.
+
+        Rows are matched to records by the table's keyFields: changed rows
+        are updated, new records inserted and rows without a record deleted.
+        This implementation replaces all of the rows, which is what writers
+        that rewrite whole tables do anyway.
+        """
+        self.truncate(table_name)
+        self.append(table_name, data_list, table_def_dict)
+
+    def finalize(self):
+        """Completes the output, e.g. by writing buffered tables or scripts.
+        """
+        pass
+
+    def close(self):
+        """Releases the writer's resources."""
+        pass
+
+    def write_table(self, table_name, data_list=None, table_def_dict=None,
+                    sync=False):
+        """Creates a table, if needed, and replaces its rows with data_list.
+
+        Parameters
+        ----------
+        table_name : str
+            The name of the table.
+        data_list : list, optional
+            Records returned by get_traveler_info. If omitted, only the table
+            is created.
+        table_def_dict : dict, optional
+            The table definition. Defaults to the table's definition in
+            tabledefs.json.
+        sync : bool, optional
+            If True and the table has keyFields, the table is updated with
+            upsert instead of being truncated and reloaded.
+        """
+        self.create_schema(table_name, table_def_dict)
+        if data_list is None:
+            return
+        table_def_dict = get_table_def(table_name, table_def_dict)
+        if sync and table_def_dict.get("keyFields"):
+            self.upsert(table_name, data_list, table_def_dict)
+        else:
+            self.truncate(table_name)
+            self.append(table_name, data_list, table_def_dict)
+
+    def write_scanweb(self, readings=None, sync=False):
+        """Writes the Scanweb weather readings and their surface and
+        sub-surface measurements to their three tables.
+
+        Parameters
+        ----------
+        readings : list of scanweb.WeatherReading, optional
+            The readings returned by scanweb.get_scanweb. If omitted, only
+            the tables are created.
+        sync : bool, optional
+            See write_table.
+        """
+        tables = {}
+        if readings is not None:
+            # Scanweb support requires the requests and python-dateutil
+            # packages, so it is only imported when needed.
+            from .scanweb import to_table_rows
+            tables = to_table_rows(readings)
+        for table_name in SCANWEB_TABLE_NAMES:
+            self.write_table(table_name, tables.get(table_name), sync=sync)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.finalize()
+        finally:
+            self.close()
+
+
+def get_writer_class(format_name):
+    """Imports and returns the TableWriter subclass of one of the FORMATS.
+
+    Raises ValueError for unknown formats and ImportError if the writer's
+    module can't be imported (e.g., the gdb writer without arcpy).
+    """
+    try:
+        module_name, class_name = FORMATS[format_name]
+    except KeyError:
+        raise ValueError("Unknown format: %s. Must be one of %s" % (
+            format_name, tuple(FORMATS)))
+    module = importlib.import_module(module_name, __package__)
+    return getattr(module, class_name)
+
+
+def is_available(format_name):
+    """Returns True if one of the FORMATS can be written on this host."""
+    try:
+        return get_writer_class(format_name).is_available()
+    except ImportError as ex:
+        _LOGGER.debug("The %(format)s format is not available: %(error)s",
+                      {"format": format_name, "error": ex})
+        return False
+
+
+def get_format_of_path(out_path):
+    """Returns the format named by the extension of an output path, or None.
+    """
+    extension = os.path.splitext(out_path.rstrip("/\\"))[1].lower()
+    for format_name in FORMATS:
+        if extension == EXTENSIONS[format_name]:
+            return format_name
+    return None
+
+
+def choose_format(out_path=None, format_name=None):
+    """Picks the format of an output.
+
+    Parameters
+    ----------
+    out_path : str, optional
+        The output path. If its extension names an available format, that
+        format is used.
+    format_name : str, optional
+        One of the FORMATS. Raises ValueError if the format isn't available.
+
+    Returns
+    -------
+    str
+        format_name, the format of out_path or the first available of
+        FALLBACK_FORMATS.
+    """
+    if format_name is not None:
+        if not is_available(format_name):
+            raise ValueError("The %s format is not available. Is the "
+                             "writer's package installed?" % format_name)
+        return format_name
+    if out_path:
+        path_format = get_format_of_path(out_path)
+        if path_format is not None and is_available(path_format):
+            return path_format
+    for fallback in FALLBACK_FORMATS:
+        if is_available(fallback):
+            return fallback
+    raise ValueError("No output format is available.")
+
+
+def open_writer(out_path, format_name=None, **options):
+    """Opens a writer for an output path.
+
+    If format_name is omitted, it is chosen by choose_format. If the chosen
+    format isn't the one named by out_path's extension, the extension is
+    replaced (e.g., TravelerInfo.gdb is written as TravelerInfo.gpkg on hosts
+    without arcpy).
+
+    Other keyword arguments are passed to the writer's constructor.
+    """
+    format_name = choose_format(out_path, format_name)
+    if get_format_of_path(out_path) != format_name:
+        new_path = os.path.splitext(out_path.rstrip("/\\"))[0] + \
+            EXTENSIONS[format_name]
+        _LOGGER.warning("Writing %(format)s output to %(new_path)s instead "
+                        "of %(out_path)s.", {"format": format_name,
+                                             "new_path": new_path,
+                                             "out_path": out_path})
+        out_path = new_path
+    return get_writer_class(format_name)(out_path, **options)
+
+
+def get_default_names():
+    """Returns the names of all of the endpoints, with Scanweb last."""
+    return tuple(name for name in URLS if name != "Scanweb") + ("Scanweb",)
+
+
+def fetch_data(name, access_code=None):
+    """Downloads and parses the data of an endpoint (or of Scanweb).
+
+    If access_code is omitted, the default from the environment or text file
+    is used (see get_traveler_info).
+    """
+    if name == "Scanweb":
+        from .scanweb import get_scanweb
+        if access_code:
+            return get_scanweb(access_code)
+        return get_scanweb()
+    if access_code:
+        return get_traveler_info(name, access_code)
+    return get_traveler_info(name)
+
+
+def write_traveler_info(writer, names=None, access_code=None,
+                        skip_data=False, sync=False,
+                        fetch_workers=DEFAULT_MAX_WORKERS):
+    """Downloads endpoints and writes them with a TableWriter.
+
+    Endpoints are downloaded by a pool of fetch_workers threads while the
+    calling thread, the only one that uses the writer, writes the tables in
+    the order of names (see pipeline.prefetch).
+
+    Parameters
+    ----------
+    writer : TableWriter
+        The output.
+    names : sequence of str, optional
+        Endpoint names (keys of URLS). Defaults to get_default_names().
+    access_code : str, optional
+        WSDOT Traffic API access code.
+    skip_data : bool, optional
+        If True, only the tables are created.
+    sync : bool, optional
+        If True, tables with keyFields are updated with upsert instead of
+        being reloaded (see TableWriter.write_table).
+    fetch_workers : int, optional
+        Number of download threads. Use 0 to download each endpoint just
+        before its table is written.
+    """
+    if not names:
+        names = get_default_names()
+
+    if skip_data:
+        for name in names:
+            if name == "Scanweb":
+                writer.write_scanweb()
+            else:
+                writer.create_schema(name)
+        return
+
+    fetch = partial(fetch_data, access_code=access_code)
+    for name, data in prefetch(names, fetch, fetch_workers):
+        if name == "Scanweb":
+            writer.write_scanweb(data, sync)
+        else:
+            print("Retrieved %s." % URLS[name])
+            writer.write_table(name, data, sync=sync)
+
+
+def main():
+    """Uses this when run as a script
+    """
+    default_out_path = "./TravelerInfo.gdb"
+    api_code = os.environ.get(ENVIRONMENT_VAR_NAME)
+
+    parser = argparse.ArgumentParser(
+        description="Writes data from the WSDOT Traffic API to a file geodatabase, GeoPackage, GeoParquet files or PostgreSQL COPY files.")
+    parser.add_argument("--out-path", type=str, default=default_out_path,
+                        help='Path of the output. Its extension (%s) selects the format. Defaults to "%s".' % (", ".join(EXTENSIONS[name] for name in FORMATS), default_out_path))
+    parser.add_argument("--format", choices=tuple(FORMATS), help="Output format. Defaults to the format of --out-path if it is available, otherwise to the fastest available format (%s)." % ", ".join(FALLBACK_FORMATS))
+    p_help = "WSDOT Traffic API code. Defaults to value of %s environment variable if available. If this environment variable does not exist, then this parameter is required." % ENVIRONMENT_VAR_NAME
+    parser.add_argument("--code", "-c", type=str,
+                        required=api_code is None, default=api_code,
+                        help=p_help)
+    parser.add_argument("--schema-only", action="store_true", help="Using this flag will generate the tables but skips the data download and population steps.")
+    parser.add_argument("--sync", action="store_true", help="Update existing tables in place, matching rows by their tables' key fields, instead of truncating and reloading them.")
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_MAX_WORKERS, help="Number of endpoints downloaded in parallel while tables are being written. Defaults to %d." % DEFAULT_MAX_WORKERS)
+    parser.add_argument("--log-level", choices=(
+        "CRITICAL",
+        "ERROR",
+        "WARNING",
+        "INFO",
+        "DEBUG",
+        "NOTSET"
+    ), default=logging.NOTSET)
+
+    p_help = 'One or more of the following values: %s' % set(URLS.keys())
+
+    parser.add_argument("names", type=str,
+                        nargs=argparse.REMAINDER, help=p_help)
+
+    args = parser.parse_args()
+    if args.log_level:
+        logging.basicConfig(level=getattr(logging, args.log_level.upper()))
+
+    with open_writer(args.out_path, args.format) as writer:
+        print("Writing %s (%s)..." % (writer.out_path, writer.format_name))
+        write_traveler_info(writer, args.names or None, args.code,
+                            args.schema_only, args.sync, args.fetch_workers)
+
+
+if __name__ == '__main__':
+    main()
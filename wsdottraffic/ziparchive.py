@@ -0,0 +1,411 @@
+"""Writes ZIP archives of directories (e.g., file geodatabases) using
+several threads and, optionally, reusing the members of the previous
+archive.
+
+The members are compressed on a pool of worker threads (zlib and bz2
+release the GIL) and written to the archive in a deterministic order by the
+calling thread. Lock files (``*.lock``) are skipped.
+
+In incremental mode, a ``<zip path>.manifest.json`` file records the size,
+modification time, CRC and compression settings of every member. When the
+archive is rebuilt, the already-compressed data of members whose files have
+the same size and modification time (or, when comparing by hash, the same
+size and CRC-32) is copied from the previous archive instead of being
+compressed again.
+
+Example
+-------
+::
+
+    stats = zip_directory("TravelerInfo.gdb", compression="deflate",
+                          level=6, incremental=True)
+"""
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+
+import bz2
+import json
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import time
+import zipfile
+import zlib
+
+from .pipeline import DEFAULT_MAX_WORKERS, prefetch
+
+_LOGGER = logging.getLogger(__name__)
+
+ZIP_STORED = "stored"
+ZIP_DEFLATED = "deflate"
+ZIP_BZIP2 = "bzip2"
+
+COMPRESSIONS = (ZIP_STORED, ZIP_DEFLATED, ZIP_BZIP2)
+
+# ZIP compression method numbers.
+_METHODS = {
+    ZIP_STORED: zipfile.ZIP_STORED,
+    ZIP_DEFLATED: zipfile.ZIP_DEFLATED,
+    ZIP_BZIP2: zipfile.ZIP_BZIP2,
+}
+
+# Versions needed to extract, by method. 4.5 for ZIP64 members.
+_VERSIONS = {
+    zipfile.ZIP_STORED: 10,
+    zipfile.ZIP_DEFLATED: 20,
+    zipfile.ZIP_BZIP2: 46,
+}
+_ZIP64_VERSION = 45
+
+COMPARE_MTIME = "mtime"
+COMPARE_HASH = "hash"
+
+MANIFEST_VERSION = 1
+
+LOCK_FILE_EXTENSION = ".lock"
+
+_CHUNK_SIZE = 1024 * 1024
+# Compressed members larger than this are spooled to a temporary file
+# instead of being kept in memory until they are written.
+_SPOOL_SIZE = 16 * 1024 * 1024
+
+_LIMIT_32 = 0xFFFFFFFF
+_LIMIT_16 = 0xFFFF
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5H2L")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_ZIP64_END_RECORD = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_END_LOCATOR = struct.Struct("<4sLQL")
+
+
+def get_manifest_path(zip_path):
+    """Returns the path of the manifest of an incremental archive."""
+    return "%s.manifest.json" % zip_path
+
+
+def _get_compressor(method, level):
+    if method == zipfile.ZIP_DEFLATED:
+        return zlib.compressobj(-1 if level is None else level,
+                                zlib.DEFLATED, -15)
+    if method == zipfile.ZIP_BZIP2:
+        return bz2.BZ2Compressor(9 if level is None else level)
+    return None
+
+
+def _get_dos_time(mtime):
+    """Converts a modification time into the ZIP (MS-DOS) date and time."""
+    date_time = time.localtime(mtime)
+    if date_time.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return ((date_time.tm_hour << 11) | (date_time.tm_min << 5) |
+            (date_time.tm_sec // 2),
+            ((date_time.tm_year - 1980) << 9) | (date_time.tm_mon << 5) |
+            date_time.tm_mday)
+
+
+def _get_file_crc(path):
+    crc = 0
+    with open(path, "rb") as in_file:
+        for chunk in iter(lambda: in_file.read(_CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc & _LIMIT_32
+
+
+class _Member(object):
+    """A member of the archive that is ready to be written: either data
+    compressed by a worker thread or a member of the previous archive.
+    """
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+
+    def __init__(self, name, stat, method, crc, file_size, compress_size,
+                 data=None):
+        self.name = name
+        self.stat = stat
+        self.method = method
+        self.crc = crc
+        self.compress_size = compress_size
+        # The size of the data the CRC was computed over, which may differ
+        # from stat.st_size if the file changed after it was stat'ed.
+        self.file_size = file_size
+        # A file positioned at the compressed data, or None to copy the
+        # data from the previous archive.
+        self.data = data
+
+
+def _compress_file(path, name, stat, method, level):
+    """Compresses a file into a spooled temporary file."""
+    spool = tempfile.SpooledTemporaryFile(max_size=_SPOOL_SIZE)
+    compressor = _get_compressor(method, level)
+    crc = 0
+    file_size = 0
+    with open(path, "rb") as in_file:
+        for chunk in iter(lambda: in_file.read(_CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            spool.write(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        spool.write(compressor.flush())
+    compress_size = spool.tell()
+    spool.seek(0)
+    return _Member(name, stat, method, crc & _LIMIT_32, file_size,
+                   compress_size, spool)
+
+
+class _ZipWriter(object):
+    """Writes members with already-compressed data to a ZIP file."""
+
+    def __init__(self, out_file):
+        self.out_file = out_file
+        self.entries = []
+
+    def write(self, member, copy_data):
+        """Writes a member's local header, then calls copy_data to write its
+        compressed data.
+        """
+        offset = self.out_file.tell()
+        name = member.name.encode("utf-8")
+        flags = 0 if all(ord(c) < 128 for c in member.name) else 0x800
+        dos_time, dos_date = _get_dos_time(member.stat.st_mtime)
+        zip64 = (member.file_size >= _LIMIT_32 or
+                 member.compress_size >= _LIMIT_32)
+        extra = b""
+        if zip64:
+            extra = struct.pack("<2H2Q", 1, 16, member.file_size,
+                                member.compress_size)
+        version = _ZIP64_VERSION if zip64 else _VERSIONS[member.method]
+        self.out_file.write(_LOCAL_HEADER.pack(
+            b"PK\x03\x04", version, flags, member.method, dos_time, dos_date,
+            member.crc,
+            _LIMIT_32 if zip64 else member.compress_size,
+            _LIMIT_32 if zip64 else member.file_size,
+            len(name), len(extra)))
+        self.out_file.write(name)
+        self.out_file.write(extra)
+        copy_data(self.out_file)
+        self.entries.append((member, name, flags, version, dos_time,
+                             dos_date, offset))
+
+    def close(self):
+        """Writes the central directory."""
+        start = self.out_file.tell()
+        for (member, name, flags, version, dos_time, dos_date,
+             offset) in self.entries:
+            zip64_values = []
+            file_size = member.file_size
+            compress_size = member.compress_size
+            if file_size >= _LIMIT_32:
+                zip64_values.append(file_size)
+                file_size = _LIMIT_32
+            if compress_size >= _LIMIT_32:
+                zip64_values.append(compress_size)
+                compress_size = _LIMIT_32
+            if offset >= _LIMIT_32:
+                zip64_values.append(offset)
+                offset = _LIMIT_32
+            extra = b""
+            if zip64_values:
+                extra = struct.pack(
+                    "<2H%dQ" % len(zip64_values), 1, 8 * len(zip64_values),
+                    *zip64_values)
+                version = max(version, _ZIP64_VERSION)
+            self.out_file.write(_CENTRAL_HEADER.pack(
+                b"PK\x01\x02", (3 << 8) | version, version, flags,
+                member.method, dos_time, dos_date, member.crc,
+                compress_size, file_size, len(name), len(extra), 0, 0, 0,
+                (member.stat.st_mode & 0xFFFF) << 16, offset))
+            self.out_file.write(name)
+            self.out_file.write(extra)
+        end = self.out_file.tell()
+        count = len(self.entries)
+        size = end - start
+        if (count >= _LIMIT_16 or start >= _LIMIT_32 or
+                size >= _LIMIT_32):
+            self.out_file.write(_ZIP64_END_RECORD.pack(
+                b"PK\x06\x06", _ZIP64_END_RECORD.size - 12,
+                (3 << 8) | _ZIP64_VERSION, _ZIP64_VERSION, 0, 0, count,
+                count, size, start))
+            self.out_file.write(_ZIP64_END_LOCATOR.pack(
+                b"PK\x06\x07", 0, end, 1))
+            count = min(count, _LIMIT_16)
+            size = min(size, _LIMIT_32)
+            start = min(start, _LIMIT_32)
+        self.out_file.write(_END_RECORD.pack(
+            b"PK\x05\x06", 0, 0, count, count, size, start, 0))
+
+
+def _list_files(dir_path):
+    """Returns the (path, archive name) of the files in a directory, in a
+    deterministic order, excluding lock files. Archive names start with the
+    directory's name.
+    """
+    dir_path = os.path.normpath(dir_path)
+    base = os.path.dirname(dir_path)
+    files = []
+    for dirpath, dirnames, filenames in os.walk(dir_path):
+        dirnames.sort()
+        for file_name in sorted(filenames):
+            if file_name.lower().endswith(LOCK_FILE_EXTENSION):
+                continue
+            path = os.path.join(dirpath, file_name)
+            name = os.path.relpath(path, base).replace(os.sep, "/")
+            files.append((path, name))
+    return files
+
+
+def _read_manifest(zip_path):
+    manifest_path = get_manifest_path(zip_path)
+    if not (os.path.exists(zip_path) and os.path.exists(manifest_path)):
+        return {}
+    try:
+        with open(manifest_path, "r") as manifest_file:
+            manifest = json.load(manifest_file)
+    except ValueError:
+        _LOGGER.warning("Ignoring invalid manifest %(path)s.",
+                        {"path": manifest_path})
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("members", {})
+
+
+def _get_data_offset(zip_file, info):
+    """Returns the position of a member's compressed data in its archive."""
+    zip_file.fp.seek(info.header_offset)
+    header = _LOCAL_HEADER.unpack(zip_file.fp.read(_LOCAL_HEADER.size))
+    return info.header_offset + _LOCAL_HEADER.size + header[-2] + header[-1]
+
+
+def _copy(in_file, out_file, size):
+    """Copies size bytes between file objects."""
+    while size > 0:
+        chunk = in_file.read(min(size, _CHUNK_SIZE))
+        if not chunk:
+            raise IOError("Unexpected end of file.")
+        out_file.write(chunk)
+        size -= len(chunk)
+
+
+def zip_directory(dir_path, zip_path=None, compression=ZIP_DEFLATED,
+                  level=None, max_workers=DEFAULT_MAX_WORKERS,
+                  incremental=False, compare=COMPARE_MTIME):
+    """Writes the files of a directory to a ZIP archive.
+
+    Parameters
+    ----------
+    dir_path : str
+        Directory to archive, e.g. a file geodatabase.
+    zip_path : str, optional
+        Path of the archive. Defaults to dir_path + ".zip". An existing
+        archive is replaced.
+    compression : str, optional
+        One of COMPRESSIONS.
+    level : int, optional
+        Compression level. Defaults to the compressor's default.
+    max_workers : int, optional
+        Number of threads that compress files.
+    incremental : bool, optional
+        If True, members of the existing archive whose files haven't changed
+        are copied instead of compressed, and a manifest is written for the
+        next run.
+    compare : str, optional
+        How unchanged files are detected in incremental mode:
+        COMPARE_MTIME (size and modification time) or COMPARE_HASH (size
+        and CRC-32 of the content).
+
+    Returns
+    -------
+    dict
+        The number of "compressed", "reused" and "skipped" (lock) files and
+        the "seconds" taken.
+    """
+    if compression not in COMPRESSIONS:
+        raise ValueError("Unsupported compression: %s. Must be one of %s" % (
+            compression, COMPRESSIONS))
+    start_time = time.time()
+    if zip_path is None:
+        zip_path = "%s.zip" % os.path.normpath(dir_path)
+    method = _METHODS[compression]
+    settings = {"method": method, "level": level}
+
+    manifest = _read_manifest(zip_path) if incremental else {}
+    old_zip = zipfile.ZipFile(zip_path, "r") if manifest else None
+    old_infos = dict((info.filename, info)
+                     for info in old_zip.infolist()) if old_zip else {}
+
+    def prepare(file_info):
+        """Compresses a file, or returns a member that refers to the previous
+        archive's data if the file hasn't changed. Runs on worker threads.
+        """
+        path, name = file_info
+        stat = os.stat(path)
+        entry = manifest.get(name)
+        info = old_infos.get(name)
+        if (entry is not None and info is not None and
+                entry.get("method") == method and
+                entry.get("level") == level and
+                info.compress_type == method and
+                entry["size"] == stat.st_size == info.file_size):
+            if compare == COMPARE_HASH:
+                unchanged = _get_file_crc(path) == info.CRC
+            else:
+                unchanged = entry["mtime"] == stat.st_mtime
+            if unchanged:
+                return _Member(name, stat, method, info.CRC,
+                               info.file_size, info.compress_size)
+        return _compress_file(path, name, stat, method, level)
+
+    files = _list_files(dir_path)
+    skipped = sum(1 for _, _, filenames in os.walk(dir_path)
+                  for file_name in filenames
+                  if file_name.lower().endswith(LOCK_FILE_EXTENSION))
+    stats = {"compressed": 0, "reused": 0, "skipped": skipped}
+    members = {}
+    temp_path = "%s.tmp" % zip_path
+    try:
+        with open(temp_path, "wb") as out_file:
+            writer = _ZipWriter(out_file)
+            for _, member in prefetch(files, prepare, max_workers):
+                if member.data is None:
+                    info = old_infos[member.name]
+                    old_zip.fp.seek(_get_data_offset(old_zip, info))
+
+                    def copy_data(out, size=info.compress_size):
+                        _copy(old_zip.fp, out, size)
+                    stats["reused"] += 1
+                else:
+                    def copy_data(out, data=member.data):
+                        shutil.copyfileobj(data, out, _CHUNK_SIZE)
+                        data.close()
+                    stats["compressed"] += 1
+                writer.write(member, copy_data)
+                members[member.name] = dict(
+                    settings, size=member.file_size,
+                    mtime=member.stat.st_mtime, crc=member.crc)
+            writer.close()
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        if old_zip is not None:
+            old_zip.close()
+    os.replace(temp_path, zip_path)
+
+    manifest_path = get_manifest_path(zip_path)
+    if incremental:
+        with open(manifest_path, "w") as manifest_file:
+            json.dump({"version": MANIFEST_VERSION, "members": members},
+                      manifest_file)
+    elif os.path.exists(manifest_path):
+        # The manifest would no longer match the archive.
+        os.remove(manifest_path)
+    stats["seconds"] = time.time() - start_time
+    _LOGGER.info(
+        "Wrote %(zip_path)s: %(compressed)d files compressed, %(reused)d "
+        "reused, %(skipped)d lock files skipped in %(seconds).2f seconds.",
+        dict(stats, zip_path=zip_path))
+    return stats
+